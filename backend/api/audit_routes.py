@@ -2,7 +2,9 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from backend.database.models import get_db, AuditLog, User
+from backend.database.pagination import newest_first
 from backend.auth.dependencies import get_current_user, admin_required
+from backend.services.immutable_audit import ImmutableAuditService
 from pydantic import BaseModel
 from datetime import datetime
 
@@ -24,14 +26,20 @@ class AuditLogResponse(BaseModel):
 @router.get("/logs", response_model=List[AuditLogResponse])
 async def get_audit_logs(
     skip: int = 0,
-    limit: int = 50,
+    limit: int = Query(50, ge=1, le=1000),
     user_id: Optional[int] = None,
     action_type: Optional[str] = None,
+    risk_level: Optional[str] = None,
+    before: Optional[datetime] = None,
+    before_id: Optional[int] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(admin_required)
 ):
     """
-    Get audit logs. Only accessible by admins.
+    Get audit logs, newest first. Only accessible by admins.
+    Pass the timestamp and id of the last log of a page as `before` and
+    `before_id` to fetch the next page; unlike `skip`, this stays fast however
+    deep you page.
     """
     query = db.query(AuditLog)
     
@@ -39,7 +47,36 @@ async def get_audit_logs(
         query = query.filter(AuditLog.user_id == user_id)
     if action_type:
         query = query.filter(AuditLog.action_type == action_type)
-        
-    # Order by newest first
-    logs = query.order_by(AuditLog.timestamp.desc()).offset(skip).limit(limit).all()
-    return logs
+    if risk_level:
+        query = query.filter(AuditLog.risk_level == risk_level)
+
+    query = newest_first(query, AuditLog.timestamp, AuditLog.id, before, before_id)
+    if skip:
+        query = query.offset(skip)
+    return query.limit(limit).all()
+
+@router.get("/history/{resource_id}", response_model=List[AuditLogResponse])
+def get_resource_history(
+    resource_id: str,
+    after_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(admin_required)
+):
+    """
+    Audit chain entries for one resource, oldest first.
+    Pass the last id of a page as `after_id` to fetch the next page.
+    """
+    return ImmutableAuditService(db).get_history(resource_id, after_id=after_id, limit=limit)
+
+@router.get("/verify")
+def verify_audit_chain(
+    full: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(admin_required)
+):
+    """
+    Verify the audit hash chain. Checks rows added since the last verified
+    checkpoint, or the whole chain with `full=true`.
+    """
+    return ImmutableAuditService(db).verify_chain_integrity(full=full)
@@ -1,8 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import Session, select
 from typing import Dict, Any
+import json
 from backend.database.models import get_db, AuditLog
-from backend.compliance.framework import ComplianceFramework
+from backend.auth.dependencies import admin_required
+from backend.compliance.batch import compliance_status_for, run_compliance_batch
 from backend.services.immutable_audit import ImmutableAuditService
 
 router = APIRouter(prefix="/api/compliance", tags=["compliance"])
@@ -20,20 +23,14 @@ def get_dashboard_stats(valuation_id: str, db: Session = Depends(get_db)):
     }
     
     # 1. Framework Checks (ASC 820, SOX)
-    # We need to fetch valuation inputs. For now mocking or fetching from DB if Validation model existed.
-    # Assuming we receive inputs or fetch them. 
-    # For this demo, we'll use a dummy valuation object to run the check.
-    # In production, we'd fetch `Valuation` by `valuation_id`.
+    # Read the stored batch result; the run is only re-audited (not saved) if it changed since
+    compliance = compliance_status_for(db, valuation_id)
+    if compliance is None:
+        return stats
+    checks = json.loads(compliance.checks_json or "{}")
     
-    framework = ComplianceFramework()
-    # Mock data for dashboard visualization
-    mock_val_data = {"fair_value_level": 2, "process_controls": ["checked"]} 
-    
-    # Run audit
-    audit = framework.audit_valuation(valuation_id, mock_val_data)
-    
-    stats["status_checks"]["asc_820"] = "Compliant" if audit.results.get("asc_820", {}).status == "pass" else "Issue Detected"
-    stats["status_checks"]["sox_404"] = "Compliant" if audit.results.get("sox_404", {}).status == "pass" else "Issue Detected"
+    stats["status_checks"]["asc_820"] = "Compliant" if checks.get("asc_820", {}).get("status") == "pass" else "Issue Detected"
+    stats["status_checks"]["sox_404"] = "Compliant" if checks.get("sox_404", {}).get("status") == "pass" else "Issue Detected"
     
     # 2. Integrity Check
     audit_service = ImmutableAuditService(db)
@@ -44,22 +41,26 @@ def get_dashboard_stats(valuation_id: str, db: Session = Depends(get_db)):
     stats["status_checks"]["data_privacy"] = "Compliant"
     
     # 4. Risk Heatmap
-    # We count remediation steps by priority
-    for step in audit.remediation_plan:
-        if step.priority == "high":
-            stats["risk_heatmap"]["high"] += 1
-        elif step.priority == "medium":
-            stats["risk_heatmap"]["medium"] += 1
-        else:
-            stats["risk_heatmap"]["low"] += 1
+    # Remediation steps by priority
+    stats["risk_heatmap"]["high"] = compliance.high_issues or 0
+    stats["risk_heatmap"]["medium"] = compliance.medium_issues or 0
+    stats["risk_heatmap"]["low"] = compliance.low_issues or 0
             
     # Mock remediation progress
     stats["remediation_progress"] = 80 if stats["risk_heatmap"]["high"] == 0 else 40
     
     # 5. Doc Completeness (Mock logic)
     # Check if we have logs
-    logs = audit_service.get_history(valuation_id)
-    has_logs = len(logs) > 0
+    has_logs = len(audit_service.get_history(valuation_id, limit=1)) > 0
     stats["doc_completeness"] = 95 if has_logs else 50
     
     return stats
+
+@router.post("/batch")
+async def run_batch_audit(force: bool = False, user: dict = Depends(admin_required)):
+    """
+    Audit every active valuation (ASC 820, SOX 404, lending covenants) and
+    refresh the stored per-run compliance status. Unchanged runs are skipped
+    unless `force` is set.
+    """
+    return await run_in_threadpool(run_compliance_batch, force)
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 import json
 
 from backend.database.models import get_db, DecisionRecord, Company
+from backend.database.pagination import newest_first
 from backend.services.decision_engine import (
     DecisionEngine, 
     Covenant, 
@@ -18,7 +20,8 @@ from datetime import datetime
 from datetime import datetime, timedelta
 import json
 import os
-from backend.services.journal.reality_check import generate_weekly_reality_check
+from backend.services.journal.reality_check import generate_weekly_reality_check, get_weekly_rollups, regenerate_year
+from fastapi.concurrency import run_in_threadpool
 from backend.services.decision_engine import bucket_severity
 
 router = APIRouter(prefix="/api/decisions", tags=["Decision Engine"])
@@ -137,13 +140,21 @@ def evaluate_covenant_breach(
 @router.get("/history/{company_ticker}", response_model=List[DecisionResponse])
 def get_decision_history(
     company_ticker: str, 
-    limit: int = 50,
+    limit: int = Query(50, ge=1, le=1000),
+    severity: Optional[str] = None,
+    before: Optional[datetime] = None,
+    before_id: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    """Retrieve decision history for a company."""
-    records = db.query(DecisionRecord)\
-        .filter(DecisionRecord.company_id == company_ticker)\
-        .order_by(DecisionRecord.created_at.desc())\
+    """
+    Retrieve decision history for a company, newest first.
+    Pass the created_at and decision_id of the last decision of a page as
+    `before` and `before_id` to fetch the next page.
+    """
+    query = db.query(DecisionRecord).filter(DecisionRecord.company_id == company_ticker)
+    if severity:
+        query = query.filter(DecisionRecord.severity == severity)
+    records = newest_first(query, DecisionRecord.created_at, DecisionRecord.decision_id, before, before_id)\
         .limit(limit)\
         .all()
         
@@ -233,15 +244,25 @@ def acknowledge_decision(
 @router.get("/critical", response_model=List[DecisionResponse])
 def get_critical_decisions(
     since: Optional[datetime] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    before: Optional[datetime] = None,
+    before_id: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    """Fetch CRITICAL decisions, optionally filtering by 'since' date."""
+    """
+    Fetch CRITICAL decisions, newest first, optionally filtering by 'since' date.
+    With `limit`, page through them by passing the last decision's created_at
+    and decision_id as `before` and `before_id`.
+    """
     query = db.query(DecisionRecord).filter(DecisionRecord.severity == "CRITICAL")
     
     if since:
         query = query.filter(DecisionRecord.created_at >= since)
-        
-    records = query.order_by(DecisionRecord.created_at.desc()).all()
+
+    query = newest_first(query, DecisionRecord.created_at, DecisionRecord.decision_id, before, before_id)
+    if limit:
+        query = query.limit(limit)
+    records = query.all()
     
     results = []
     for r in records:
@@ -264,7 +285,6 @@ def get_pilot_analysis(db: Session = Depends(get_db)):
     # 1. Lead Time Stats
     # In a real app, we'd calculate this from the 'lead_time_days' stored in metadata or separate analytics table
     # For now, we mock/calculate based on existing records
-    records = db.query(DecisionRecord).all()
     
     # Mock aggregation
     lead_times = {
@@ -289,18 +309,23 @@ def get_pilot_analysis(db: Session = Depends(get_db)):
         }
     ]
     
-    # 3. Decisions vs Outcomes
-    criticals = [r for r in records if r.severity == "CRITICAL"]
-    acknowledged = [r for r in criticals if r.state in ["resolved", "acknowledged"]]
-    overridden = [r for r in criticals if r.state == "overridden"]
+    # 3. Decisions vs Outcomes (counted in SQL, one row per state)
+    critical_states = dict(
+        db.query(DecisionRecord.state, func.count(DecisionRecord.decision_id))
+        .filter(DecisionRecord.severity == "CRITICAL")
+        .group_by(DecisionRecord.state)
+        .all()
+    )
+    acknowledged = critical_states.get("resolved", 0) + critical_states.get("acknowledged", 0)
+    overridden = critical_states.get("overridden", 0)
     
     stats = {
-        "total_critical": len(criticals),
-        "acknowledged": len(acknowledged),
-        "overridden": len(overridden),
+        "total_critical": sum(critical_states.values()),
+        "acknowledged": acknowledged,
+        "overridden": overridden,
         # Mock outcome alignment until real outcome data flows in
-        "ack_negative_outcome": int(len(acknowledged) * 0.8), 
-        "over_negative_outcome": int(len(overridden) * 0.6)
+        "ack_negative_outcome": int(acknowledged * 0.8), 
+        "over_negative_outcome": int(overridden * 0.6)
     }
     
     return {
@@ -310,3 +335,26 @@ def get_pilot_analysis(db: Session = Depends(get_db)):
         "key_insight": "The system detected 92% of material negative events with an average 38-day warning."
     }
 
+@router.get("/reality-check/weekly")
+def get_weekly_reality_checks(weeks: int = 12, db: Session = Depends(get_db)):
+    """Stored weekly rollups ('Decisions Fired vs Reality'), most recent `weeks` weeks."""
+    since = datetime.utcnow() - timedelta(weeks=weeks)
+    return [
+        {
+            "week_start": w.week_start.date().isoformat(),
+            "total_decisions": w.total_decisions,
+            "critical_decisions": w.critical_decisions,
+            "acknowledged": w.acknowledged,
+            "with_outcomes": w.with_outcomes,
+            "tuning_required": w.tuning_required,
+            "avg_response_lag_hours": w.avg_response_lag_hours,
+            "max_response_lag_hours": w.max_response_lag_hours,
+            "report_path": w.report_path,
+        }
+        for w in get_weekly_rollups(db, since)
+    ]
+
+@router.post("/reality-check/regenerate")
+async def regenerate_weekly_reality_checks(year: int, force: bool = False, db: Session = Depends(get_db)):
+    """Regenerate every weekly report of a year in one batch; unchanged weeks are skipped unless forced."""
+    return await run_in_threadpool(regenerate_year, db, year, force)
@@ -1,21 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import StreamingResponse, HTMLResponse
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import HTMLResponse
 from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from io import BytesIO
+from datetime import date
 import json
 
 from backend.database.models import get_db, ValuationRun
-from backend.utils.excel_export import create_valuation_excel
-from backend.reporting.pdf_generator import PDFGenerator
-from backend.reporting.word_generator import WordGenerator
-from backend.reporting.ppt_generator import PPTGenerator
+from backend.services.export.artifacts import ArtifactStore, run_revision, serve_artifact
 from backend.services.report_generator_service import ReportGeneratorService
 
 router = APIRouter()
 
+# Bump when a generator's layout changes so cached documents are re-rendered
+DOCUMENT_TEMPLATE_VERSION = "1"
+
+def _document_key(run: ValuationRun, fmt: str) -> str:
+    # The generated documents print today's date, so it is part of the key
+    return ArtifactStore.key("document", run.id, run_revision(run), fmt, DOCUMENT_TEMPLATE_VERSION, date.today().isoformat())
+
+def _write_bytes(generate):
+    def render(fh):
+        fh.write(generate())
+    return render
+
 @router.get("/export/{run_id}")
-async def export_run_to_excel(run_id: str, db: Session = Depends(get_db)):
+async def export_run_to_excel(run_id: str, request: Request, db: Session = Depends(get_db)):
     run = db.query(ValuationRun).filter(ValuationRun.id == run_id).first()
     if not run:
         raise HTTPException(status_code=404, detail="Run not found")
@@ -29,72 +38,70 @@ async def export_run_to_excel(run_id: str, db: Session = Depends(get_db)):
         "results": run.results
     }
     
-    # Generate Excel file
-    excel_file = create_valuation_excel(run_data)
-    
+    from backend.utils import excel_export  # openpyxl loads on first export
+    key = ArtifactStore.key("valuation", run.id, run_revision(run), "xlsx", excel_export.TEMPLATE_VERSION)
     filename = f"valuation_{run.company_name.replace(' ', '_')}_{run_id[:8]}.xlsx"
     
-    return StreamingResponse(
-        excel_file,
+    # Served from the artifact store when the run is unchanged; rendered in the threadpool otherwise
+    return await serve_artifact(
+        request, key, "xlsx",
+        lambda fh: excel_export.write_valuation_excel(run_data, fh),
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
+        filename=filename
     )
 
 @router.get("/export/pdf/{run_id}")
-async def export_run_to_pdf(run_id: str, db: Session = Depends(get_db)):
+async def export_run_to_pdf(run_id: str, request: Request, db: Session = Depends(get_db)):
     run = db.query(ValuationRun).filter(ValuationRun.id == run_id).first()
     if not run:
         raise HTTPException(status_code=404, detail="Run not found")
     
     results = json.loads(run.results)
     
-    generator = PDFGenerator()
-    pdf_file = generator.generate_executive_summary(results, run_id)
-    
     filename = f"Executive_Summary_{run.company_name.replace(' ', '_')}_{run_id[:8]}.pdf"
     
-    return StreamingResponse(
-        BytesIO(pdf_file),
+    from backend.reporting.pdf_generator import PDFGenerator  # ReportLab loads on first export
+    return await serve_artifact(
+        request, _document_key(run, "pdf"), "pdf",
+        _write_bytes(lambda: PDFGenerator().generate_executive_summary(results, run_id)),
         media_type="application/pdf",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
+        filename=filename
     )
 
 @router.get("/export/word/{run_id}")
-async def export_run_to_word(run_id: str, db: Session = Depends(get_db)):
+async def export_run_to_word(run_id: str, request: Request, db: Session = Depends(get_db)):
     run = db.query(ValuationRun).filter(ValuationRun.id == run_id).first()
     if not run:
         raise HTTPException(status_code=404, detail="Run not found")
     
     results = json.loads(run.results)
     
-    generator = WordGenerator()
-    word_file = generator.generate_analyst_report(results, run_id)
-    
     filename = f"Analyst_Report_{run.company_name.replace(' ', '_')}_{run_id[:8]}.docx"
     
-    return StreamingResponse(
-        BytesIO(word_file),
+    from backend.reporting.word_generator import WordGenerator
+    return await serve_artifact(
+        request, _document_key(run, "docx"), "docx",
+        _write_bytes(lambda: WordGenerator().generate_analyst_report(results, run_id)),
         media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
+        filename=filename
     )
 
 @router.get("/export/ppt/{run_id}")
-async def export_run_to_ppt(run_id: str, db: Session = Depends(get_db)):
+async def export_run_to_ppt(run_id: str, request: Request, db: Session = Depends(get_db)):
     run = db.query(ValuationRun).filter(ValuationRun.id == run_id).first()
     if not run:
         raise HTTPException(status_code=404, detail="Run not found")
     
     results = json.loads(run.results)
     
-    generator = PPTGenerator()
-    ppt_file = generator.generate_presentation(results, run_id)
-    
     filename = f"Valuation_Presentation_{run.company_name.replace(' ', '_')}_{run_id[:8]}.pptx"
     
-    return StreamingResponse(
-        BytesIO(ppt_file),
+    from backend.reporting.ppt_generator import PPTGenerator
+    return await serve_artifact(
+        request, _document_key(run, "pptx"), "pptx",
+        _write_bytes(lambda: PPTGenerator().generate_presentation(results, run_id)),
         media_type="application/vnd.openxmlformats-officedocument.presentationml.presentation",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
+        filename=filename
     )
 
 @router.get("/api/export/report/{run_id}", response_class=HTMLResponse)
@@ -1,17 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 from backend.services.financial_data.factory import FinancialDataFactory
 from backend.services.wacc.service import WaccCalculatorService
 from backend.services.benchmarking_service import BenchmarkingService
 from backend.services.peer_finding_service import PeerFindingService
-from backend.calculations.benchmarking_models import BenchmarkResponse
+from backend.calculations.benchmarking_models import BenchmarkResponse, SectorScreenResponse
+from backend.calculations.models import MarketAssumptions
 from backend.services.analytics.debt_market_service import debt_market_service
 from backend.services.analytics.market_aware_service import market_aware_service
 from backend.services.analytics.transaction_radar_service import transaction_radar_service
 from backend.services.analytics.refinancing_service import refinancing_service, RefinancingAnalysisRequest
 from backend.services.analytics.market_intelligence_service import market_intelligence, SectorSignal, DistressedOpportunity
-from backend.database.models import User, get_db
+from backend.database.models import User, get_db, get_read_db
 from backend.auth.dependencies import get_current_user
 from sqlalchemy.orm import Session
 from backend.services.audit_service import AuditLogger
@@ -24,6 +26,13 @@ class BenchmarkRequest(BaseModel):
     peer_tickers: Optional[List[str]] = None
     use_sector_average: bool = False
 
+class SectorScreenRequest(BaseModel):
+    sector: Optional[str] = None
+    tickers: Optional[List[str]] = None
+
+class MarketDataBatchRequest(BaseModel):
+    tickers: List[str]
+
 @router.get("/api/financials/{ticker}")
 @limiter.limit("5/minute")
 async def get_financials(ticker: str, request: Request):
@@ -51,24 +60,58 @@ async def get_market_data(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/api/market-data/batch", response_model=Dict[str, MarketAssumptions])
+async def get_market_data_batch(
+    payload: MarketDataBatchRequest,
+    service: WaccCalculatorService = Depends(WaccCalculatorService),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Locally estimated market assumptions (beta, cost of capital, WACC) for
+    many tickers, e.g. a peer set. Tickers without estimates are omitted.
+    """
+    return await run_in_threadpool(service.get_cached_market_data, payload.tickers, db)
+
 @router.post("/api/benchmark", response_model=BenchmarkResponse)
 @limiter.limit("5/minute")
 async def get_benchmark_data(
     request: Request,
     payload: BenchmarkRequest,
-    service: BenchmarkingService = Depends(BenchmarkingService)
+    service: BenchmarkingService = Depends(BenchmarkingService),
+    db: Session = Depends(get_db)
 ):
     try:
-        return service.get_comparison(
+        return await run_in_threadpool(
+            service.get_comparison,
             target_ticker=payload.ticker,
             peer_tickers=payload.peer_tickers,
-            use_sector=payload.use_sector_average
+            use_sector=payload.use_sector_average,
+            db=db
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/api/benchmark/screen", response_model=SectorScreenResponse)
+@limiter.limit("5/minute")
+async def screen_sector(
+    request: Request,
+    payload: SectorScreenRequest,
+    service: BenchmarkingService = Depends(BenchmarkingService),
+    db: Session = Depends(get_db)
+):
+    """
+    Metrics, medians and within-panel percentiles for every company in a
+    sector (and/or an explicit ticker list), fetched concurrently.
+    """
+    try:
+        return await run_in_threadpool(service.screen_sector, sector=payload.sector, tickers=payload.tickers, db=db)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/api/peers/{ticker}")
 async def get_peers(ticker: str, sector: Optional[str] = None):
     try:
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
+from fastapi.concurrency import run_in_threadpool
 from typing import List, Optional
 from backend.services.scenario_generator import ScenarioGeneratorService
 from backend.services.monte_carlo_service import MonteCarloService
@@ -8,6 +9,7 @@ from backend.services.auditing_service import AuditingService
 from backend.calculations.core import ValuationEngine
 from backend.calculations.models import ValuationInput
 from backend.calculations.models import PWSARequest, PWSAResult, GenerateScenarioResponse, AuditIssue
+from backend.calculations.models import ScenarioVariant, ScenarioFamilyResponse, AuditReport, AuditDiffRequest
 from backend.calculations.monte_carlo_models import MonteCarloRequest, MonteCarloResult
 from backend.calculations.merger_models import MergerAnalysisRequest, MergerAnalysisResult
 from backend.calculations.models import LBOInput
@@ -15,7 +17,7 @@ from backend.services.valuation.formulas.monte_carlo_lbo import LBOMonteCarlo
 from backend.services.analytics.sensitivity_service import sensitivity_service
 from backend.services.analytics.fund_simulator_service import LBOFundSimulator
 from backend.services.analytics.backtesting_service import BacktestingService
-from backend.calculations.fund_models import FundModel, FundStrategy, FundReturns
+from backend.calculations.fund_models import FundModel, FundStrategy, FundReturns, FundSimulationDistribution, FundPathsRequest
 from backend.database.models import User, get_db
 from backend.auth.dependencies import get_current_user
 from sqlalchemy.orm import Session
@@ -46,6 +48,28 @@ async def generate_scenario(request: GenerateScenarioRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+class GenerateScenarioFamilyRequest(BaseModel):
+    base_assumptions: ValuationInput
+    variants: List[ScenarioVariant]
+
+@router.post("/api/scenarios/generate-family", response_model=ScenarioFamilyResponse)
+async def generate_scenario_family(request: GenerateScenarioFamilyRequest):
+    service = ScenarioGeneratorService()
+    try:
+        deltas = await run_in_threadpool(
+            service.generate_family,
+            request.base_assumptions,
+            [(variant.scenario_type, variant.intensity) for variant in request.variants]
+        )
+        explanations = {
+            delta.scenario_type: service.templates[delta.scenario_type]["explanation"] for delta in deltas
+        }
+        return ScenarioFamilyResponse(scenarios=deltas, explanations=explanations)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.post("/api/monte-carlo/simulate", response_model=MonteCarloResult)
 async def run_monte_carlo_simulation(request: MonteCarloRequest):
     try:
@@ -85,6 +109,38 @@ async def audit_assumptions(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post('/api/audit/assumptions/incremental', response_model=AuditReport)
+async def start_incremental_audit(
+    input_data: ValuationInput,
+    service: AuditingService = Depends(AuditingService)
+):
+    """
+    Audit an input and keep it server-side; send later edits to /diff.
+    """
+    try:
+        return service.start_audit(input_data)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post('/api/audit/assumptions/diff', response_model=AuditReport)
+async def reaudit_assumptions(
+    request: AuditDiffRequest,
+    service: AuditingService = Depends(AuditingService)
+):
+    """
+    Re-audit a previously audited input after changing a few fields; only the
+    rules that read those fields run again. Send the base input along so a
+    worker that didn't run the original audit can serve the diff.
+    """
+    try:
+        return service.reaudit(request.audit_id, request.changes, base=request.base)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/api/valuation/sensitivity/{cache_key}")
 async def get_precomputed_sensitivity(cache_key: str):
     """
@@ -173,6 +229,33 @@ async def run_fund_simulation(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/api/analytics/fund-simulation/paths", response_model=FundSimulationDistribution)
+async def run_fund_simulation_paths(
+    request: Request,
+    payload: FundPathsRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Simulate many deal-flow paths of the fund at once and return the
+    distribution of net IRR, TVPI, DPI and carry.
+    """
+    try:
+        logger = AuditLogger(db)
+        logger.log(
+            action_type="ANALYTICS_FUND_SIMULATION",
+            user_id=current_user.id,
+            resource_type="analytics",
+            details={"fund_name": payload.fund.name, "paths": payload.paths},
+            ip_address=request.client.host
+        )
+
+        return await run_in_threadpool(
+            fund_simulator.simulate_fund_paths, payload.fund, payload.strategy, payload.paths, payload.seed
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 
 class BacktestRequest(BaseModel):
     sector: str
@@ -9,7 +9,7 @@ import os
 import uuid
 import json
 
-from backend.database.models import get_db, ValuationRun, User
+from backend.database.models import get_db, get_read_db, write_queue, ValuationRun, User
 from backend.auth.dependencies import get_current_user
 from backend.services.audit_service import AuditService
 from backend.services.auditing_service import AuditingService
@@ -106,8 +106,7 @@ async def run_valuation(
         results=json.dumps(jsonable_encoder(results)),
         user_id=current_user.id 
     )
-    db.add(db_run)
-    db.commit()
+    await run_in_threadpool(write_queue.run, lambda session: session.add(db_run))
     
     results["run_id"] = run_id
     
@@ -164,8 +163,7 @@ async def calculate_valuation_manual(
         results=json.dumps(jsonable_encoder(results)),
         user_id=current_user.id
     )
-    db.add(db_run)
-    db.commit()
+    await run_in_threadpool(write_queue.run, lambda session: session.add(db_run))
     
     results["run_id"] = run_id
     
@@ -185,7 +183,7 @@ async def calculate_valuation_manual(
     return results
 
 @router.get("/runs")
-async def get_recent_runs(limit: int = 10, db: Session = Depends(get_db)):
+async def get_recent_runs(limit: int = 10, db: Session = Depends(get_read_db)):
     runs = db.query(ValuationRun).order_by(ValuationRun.created_at.desc()).limit(limit).all()
     return [{
         "id": run.id,
@@ -196,7 +194,7 @@ async def get_recent_runs(limit: int = 10, db: Session = Depends(get_db)):
     } for run in runs]
 
 @router.get("/runs/{run_id}")
-async def get_run_details(run_id: str, db: Session = Depends(get_db)):
+async def get_run_details(run_id: str, db: Session = Depends(get_read_db)):
     run = db.query(ValuationRun).filter(ValuationRun.id == run_id).first()
     if not run:
         raise HTTPException(status_code=404, detail="Run not found")
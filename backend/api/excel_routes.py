@@ -4,16 +4,16 @@ from typing import List, Optional
 import json
 import hashlib
 from datetime import datetime
-import csv
-import io
-from fastapi import APIRouter, Depends, HTTPException, status, Header, Response, UploadFile, File
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Request, Response, UploadFile, File
 
-from backend.database.models import get_db, ValuationRun, AuditLog, User
+from fastapi.concurrency import run_in_threadpool
+from backend.database.models import get_db, write_queue, ValuationRun, AuditLog, User
 from backend.auth.dependencies import get_current_user
 from backend.services.audit.service import audit_service
 from backend.parser.valuation_parser import ValuationExcelParser
 from backend.schemas.valuation_import import ImportResponse, ValuationImportData
+from backend.services.export.artifacts import ArtifactStore, run_revision, stream_artifact
+from backend.utils import csv_export
 
 router = APIRouter(prefix="/api/excel", tags=["excel"])
 
@@ -35,6 +35,7 @@ async def get_companies(
 @router.get("/valuation/{valuation_id}/export")
 async def export_valuation(
     valuation_id: str,
+    request: Request,
     response: Response,
     format: str = "json",
     current_user: User = Depends(get_current_user),
@@ -64,7 +65,7 @@ async def export_valuation(
         "inputs": inputs,
         "outputs": results,
         "meta": {
-            "last_updated": valuation.updated_at.isoformat() if valuation.updated_at else valuation.created_at.isoformat(),
+            "last_updated": (getattr(valuation, "updated_at", None) or valuation.created_at).isoformat(),
             "version": "1.0"
         },
         "validation": {
@@ -89,33 +90,12 @@ async def export_valuation(
     )
 
     if format == "csv":
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(["Section", "Key", "Value"])
-        
-        def flatten_dict(d, parent_key='', sep='.'):
-            items = []
-            for k, v in d.items():
-                new_key = f"{parent_key}{sep}{k}" if parent_key else k
-                if isinstance(v, dict):
-                    items.extend(flatten_dict(v, new_key, sep=sep).items())
-                elif isinstance(v, list):
-                     items.append((new_key, json.dumps(v)))
-                else:
-                    items.append((new_key, v))
-            return dict(items)
-
-        for k, v in flatten_dict(inputs, parent_key="Input").items():
-            writer.writerow(["Input", k, v])
-            
-        for k, v in flatten_dict(results, parent_key="Output").items():
-            writer.writerow(["Output", k, v])
-            
-        output.seek(0)
-        return StreamingResponse(
-            io.BytesIO(output.getvalue().encode()),
+        key = ArtifactStore.key("valuation", valuation.id, run_revision(valuation), "csv", csv_export.TEMPLATE_VERSION)
+        return stream_artifact(
+            request, key, "csv",
+            csv_export.iter_valuation_csv(inputs, results),
             media_type="text/csv",
-            headers={"Content-Disposition": f"attachment; filename=valuation_{valuation_id}.csv"}
+            filename=f"valuation_{valuation_id}.csv"
         )
 
     return export_data
@@ -152,7 +132,7 @@ async def import_valuation(
             "inputs": current_inputs,
             "outputs": current_results,
             "meta": {
-                "last_updated": valuation.updated_at.isoformat() if valuation.updated_at else valuation.created_at.isoformat(),
+                "last_updated": (getattr(valuation, "updated_at", None) or valuation.created_at).isoformat(),
                 "version": "1.0"
             },
             "validation": {
@@ -365,9 +345,7 @@ async def save_valuation_data(
             status="draft" # Needs review
         )
         
-        db.add(new_run)
-        db.commit()
-        db.refresh(new_run)
+        await run_in_threadpool(write_queue.run, lambda session: session.add(new_run))
         
         audit_service.log(
             action="EXCEL_SAVE",
@@ -0,0 +1,121 @@
+"""
+Router groups imported on their first request.
+
+Some routers pull in heavy modules (report rendering, AI suggestions, Excel
+parsing, option pricing) that most workers never need. A LazyRouterGroup
+takes the group's place in the route table as a single placeholder matching
+the group's path prefixes. The first request under one of them imports the
+group's modules (in a thread, so the event loop keeps serving), splices the
+real routes in at the placeholder's position - preserving route precedence -
+and dispatches the request again.
+
+With LAZY_ROUTERS=false, or when the app is preloaded into the gunicorn
+master (APP_PRELOAD=true, see start.sh), every group is mounted up front.
+Groups mounted lazily are missing from /openapi.json until they load.
+"""
+import asyncio
+import importlib
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from starlette.routing import BaseRoute, Match, NoMatchFound
+from starlette.types import Receive, Scope, Send
+
+LAZY_ROUTERS = os.getenv("LAZY_ROUTERS", "true").lower() == "true"
+
+# (module, include_router keyword arguments)
+RouterSpec = Tuple[str, Dict[str, Any]]
+
+
+class LazyRouterGroup(BaseRoute):
+    def __init__(self, name: str, prefixes: List[str], routers: List[RouterSpec]):
+        self.name = name
+        self.prefixes = tuple(prefix.rstrip("/") for prefix in prefixes)
+        self.routers = routers
+        self.loaded = False
+        self.load_seconds: Optional[float] = None
+        self.modules_imported = 0
+        self._lock: Optional[asyncio.Lock] = None
+
+    def matches(self, scope: Scope) -> Tuple[Match, Scope]:
+        if scope["type"] in ("http", "websocket"):
+            path = scope["path"]
+            if any(path == prefix or path.startswith(prefix + "/") for prefix in self.prefixes):
+                return Match.FULL, {}
+        return Match.NONE, {}
+
+    def url_path_for(self, name: str, /, **path_params: Any):
+        raise NoMatchFound(name, path_params)
+
+    async def handle(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if not self.loaded:
+                modules = await run_in_threadpool(self._import)
+                self._mount(scope["app"], modules)
+        await scope["router"].app(scope, receive, send)
+
+    def load(self, app: FastAPI):
+        """Import and mount the group now (preload / eager mode)."""
+        if not self.loaded:
+            self._mount(app, self._import())
+
+    def _import(self) -> list:
+        started, before = time.perf_counter(), len(sys.modules)
+        modules = [importlib.import_module(module) for module, _ in self.routers]
+        self.load_seconds = time.perf_counter() - started
+        self.modules_imported = len(sys.modules) - before
+        return modules
+
+    def _mount(self, app: FastAPI, modules: list):
+        routes = app.router.routes
+        start = len(routes)
+        for module, (_, options) in zip(modules, self.routers):
+            app.include_router(module.router, **options)
+        mounted = routes[start:]
+        del routes[start:]
+        if self in routes:
+            index = routes.index(self)
+            routes[index:index + 1] = mounted
+        else:
+            routes.extend(mounted)
+        app.openapi_schema = None  # Regenerate the schema with the new routes
+        self.loaded = True
+        print(f"Mounted router group '{self.name}' ({self.modules_imported} modules imported "
+              f"in {self.load_seconds or 0:.2f}s)")
+
+
+lazy_router_groups: List[LazyRouterGroup] = []
+
+
+def include_lazy(app: FastAPI, name: str, prefixes: List[str], routers: List[RouterSpec]) -> LazyRouterGroup:
+    """Mount a router group at this point of the route table, lazily unless LAZY_ROUTERS is off."""
+    group = LazyRouterGroup(name, prefixes, routers)
+    lazy_router_groups.append(group)
+    app.router.routes.append(group)
+    if not LAZY_ROUTERS:
+        group.load(app)
+    return group
+
+
+def load_all(app: FastAPI):
+    for group in lazy_router_groups:
+        group.load(app)
+
+
+def router_group_status() -> List[Dict[str, Any]]:
+    return [
+        {
+            "name": group.name,
+            "prefixes": list(group.prefixes),
+            "loaded": group.loaded,
+            "load_seconds": group.load_seconds,
+            "modules_imported": group.modules_imported,
+        }
+        for group in lazy_router_groups
+    ]
@@ -1,9 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import Dict, Any, List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from typing import Dict, Any, List, Optional
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
 from backend.utils.cache import cache
-from backend.services.metrics.aggregator import aggregate_metrics
+from backend.services.metrics.aggregator import aggregate_metrics, merge_sketch_buckets
+from backend.services.metrics.rollup import rollup_series
+from backend.services.metrics.sketch import LatencyRecorder
+from backend.services.metrics.writer import metrics_writer
 from backend.auth.dependencies import get_current_user, admin_required
-from backend.database.models import UserRole
+from backend.database.models import UserRole, get_db
 
 router = APIRouter(prefix="/api/performance", tags=["performance"])
 
@@ -15,16 +21,71 @@ async def get_performance_summary(user: dict = Depends(admin_required)):
     # Try to get from cache
     sys_summary = cache.get_sync("metrics:system_summary")
     val_summary = cache.get_sync("metrics:valuation_summary")
-    
+
     if not sys_summary or not val_summary:
-        # Trigger aggregation if missing
-        aggregate_metrics()
+        # Trigger aggregation if missing (merges sketches, off the event loop)
+        await run_in_threadpool(aggregate_metrics)
         sys_summary = cache.get_sync("metrics:system_summary")
         val_summary = cache.get_sync("metrics:valuation_summary")
-        
+
     return {
         "system": sys_summary or {},
-        "valuation": val_summary or {}
+        "valuation": val_summary or {},
+        "pipeline": metrics_writer.stats()
+    }
+
+@router.get("/latency")
+def get_latency_breakdown(
+    kind: str = Query(LatencyRecorder.KIND_ENDPOINT, pattern="^(endpoint|valuation)$"),
+    minutes: int = Query(60, ge=1, le=60 * 24 * 30),
+    user: dict = Depends(admin_required),
+    db: Session = Depends(get_db)
+):
+    """
+    Latency percentiles per endpoint / valuation method over an arbitrary window,
+    merged from persisted per-minute sketches.
+    """
+    since = datetime.utcnow() - timedelta(minutes=minutes)
+    merged = merge_sketch_buckets(db, kind, since)
+    return {
+        "kind": kind,
+        "window_minutes": minutes,
+        "items": [
+            {
+                "key": key,
+                "count": stats.count,
+                "errors": stats.error_count,
+                "cache_hits": stats.hit_count,
+                "avg": stats.sketch.mean,
+                "p50": stats.sketch.quantile(0.5),
+                "p95": stats.sketch.quantile(0.95),
+                "p99": stats.sketch.quantile(0.99),
+                "max": stats.sketch.max if stats.count else 0.0,
+            }
+            for key, stats in sorted(merged.items(), key=lambda kv: kv[1].count, reverse=True)
+        ]
+    }
+
+@router.get("/trends")
+def get_performance_trends(
+    kind: str = Query(LatencyRecorder.KIND_ENDPOINT, pattern="^(endpoint|valuation)$"),
+    granularity: str = Query("day", pattern="^(hour|day)$"),
+    days: int = Query(90, ge=1, le=3650),
+    key: Optional[str] = None,
+    user: dict = Depends(admin_required),
+    db: Session = Depends(get_db)
+):
+    """
+    Long-range request / valuation trends per hour or day, from the metric
+    rollups (they outlive the raw rows). Optionally for one endpoint or method.
+    """
+    since = datetime.utcnow() - timedelta(days=days)
+    return {
+        "kind": kind,
+        "granularity": granularity,
+        "window_days": days,
+        "key": key,
+        "series": rollup_series(db, kind, granularity, since, key)
     }
 
 @router.post("/aggregate")
@@ -32,5 +93,14 @@ async def trigger_aggregation(user: dict = Depends(admin_required)):
     """
     Manually trigger aggregation.
     """
-    aggregate_metrics()
+    await run_in_threadpool(aggregate_metrics)
     return {"status": "success", "message": "Aggregation triggered"}
+
+@router.get("/startup")
+async def get_startup_profile(user: dict = Depends(admin_required)):
+    """
+    This worker's startup cost: import time, memory, heavy libraries loaded
+    and which lazily mounted router groups have been loaded.
+    """
+    from backend.services.system.startup_profile import startup_profile
+    return startup_profile.report()
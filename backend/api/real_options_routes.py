@@ -0,0 +1,53 @@
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from backend.calculations.real_options_models import (
+    RealOptionsRequest, RealOptionsResult,
+    OptionGridRequest, OptionGridResult, OptionSurfaceRequest, OptionSurfaceResult
+)
+from backend.services.real_options_service import RealOptionsService
+from backend.auth.dependencies import get_current_user
+from backend.database.models import get_db, User
+
+router = APIRouter(prefix="/api/real-options", tags=["real-options"])
+
+@router.post("/calculate", response_model=RealOptionsResult)
+async def calculate_real_option(
+    request: RealOptionsRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Value a single real option, filling in missing rate, volatility and asset value.
+    """
+    try:
+        return await RealOptionsService().calculate_option_value(request, db)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/price-grid", response_model=OptionGridResult)
+async def price_option_grid(
+    request: OptionGridRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Price a batch of options (e.g. a portfolio of real options) with all
+    Greeks in one vectorized pass.
+    """
+    try:
+        return await run_in_threadpool(RealOptionsService().price_grid, request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/surface", response_model=OptionSurfaceResult)
+async def price_option_surface(
+    request: OptionSurfaceRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Option value across a volatility x time-to-expiration grid, for charting.
+    """
+    try:
+        return await run_in_threadpool(RealOptionsService().price_surface, request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -9,23 +9,39 @@ async def websocket_endpoint(websocket: WebSocket):
     """
     WebSocket endpoint for real-time market data.
     Clients connect here to receive live updates.
+
+    Client messages:
+    - {"type": "ping"} -> {"type": "pong"}
+    - {"type": "subscribe", "topics": ["AAPL", "portfolio:42"]}
+    - {"type": "unsubscribe", "topics": [...]}
+    Clients without subscriptions receive every broadcast.
     """
     print(f"WebSocket connection attempt from {websocket.client}")
     await manager.connect(websocket)
     try:
         while True:
-            # Keep connection alive and listen for any client messages (optional)
             # In this push-based model, we primarily send data TO the client.
             data = await websocket.receive_text()
             
-            # Echo or process if needed (e.g., subscription requests)
-            # For now, just acknowledge heartbeats if implemented
             try:
                 message = json.loads(data)
-                if message.get("type") == "ping":
-                    await manager.send_personal_message({"type": "pong"}, websocket)
-            except:
-                pass
+            except ValueError:
+                continue
+            if not isinstance(message, dict):
+                continue
+
+            msg_type = message.get("type")
+            if msg_type == "ping":
+                await manager.send_personal_message({"type": "pong"}, websocket)
+            elif msg_type in ("subscribe", "unsubscribe"):
+                topics = message.get("topics") or []
+                if isinstance(topics, str):
+                    topics = [topics]
+                if msg_type == "subscribe":
+                    current = manager.subscribe(websocket, topics)
+                else:
+                    current = manager.unsubscribe(websocket, topics)
+                await manager.send_personal_message({"type": "subscriptions", "topics": sorted(current)}, websocket)
                 
     except WebSocketDisconnect:
         manager.disconnect(websocket)
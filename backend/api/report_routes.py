@@ -1,13 +1,21 @@
 from fastapi import APIRouter, HTTPException, Depends, Response
-from fastapi.responses import StreamingResponse
+from fastapi.responses import FileResponse
+from pydantic import BaseModel
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List
+from datetime import date
 
 from backend.database.models import get_db, ValuationRun, User
 from backend.auth.dependencies import get_current_user
 from backend.services.report_service import ReportService, ReportConfig
 from backend.services.audit.service import audit_service
+from backend.services.export.artifacts import ArtifactStore, artifact_store, run_revision
+from backend.reports.adapters import TEMPLATE_VERSION as REPORT_TEMPLATE_VERSION
+from backend.services.analytics.render_pool import report_render_pool
+import io
 import json
+import zipfile
 
 router = APIRouter(prefix="/api/reports", tags=["Reports"])
 
@@ -42,44 +50,116 @@ async def generate_report(
         }
     }
     
-    # 2. Generate Report
-    service = ReportService()
-    try:
-        file_buffer = await service.generate_report(config, data)
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Report generation failed: {str(e)}")
-
-    # 3. Audit Log
-    audit_service.log(
-        action="REPORT_GENERATED",
-        user_id=current_user.id,
-        resource=f"valuation:{config.valuation_id}",
-        details={"format": config.format, "sections": config.sections}
-    )
-
-    # 4. Return File
     media_types = {
         "pdf": "application/pdf",
         "pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
-        "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+        "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        "excel": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     }
     
     extensions = {
         "pdf": "pdf",
         "pptx": "pptx",
-        "docx": "docx"
+        "docx": "docx",
+        "excel": "xlsx"
     }
-    
-    filename = f"{config.company_name}_Report.{extensions.get(config.format, 'bin')}"
+    extension = extensions.get(config.format, "bin")
+
+    # 2. Generate Report (or reuse the identical artifact rendered earlier today)
+    key = ArtifactStore.key(
+        "report", valuation.id, run_revision(valuation), config.format, config.sections,
+        config.branding, data["company_name"], REPORT_TEMPLATE_VERSION, date.today().isoformat()
+    )
+    path = artifact_store.get(key, extension)
+    cached = path is not None
+    if not cached:
+        service = ReportService()
+        try:
+            file_buffer = await service.generate_report(config, data)
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            raise HTTPException(status_code=500, detail=f"Report generation failed: {str(e)}")
+        path = await run_in_threadpool(
+            artifact_store.get_or_render, key, extension, lambda fh: fh.write(file_buffer.getvalue())
+        )
+
+    # 3. Audit Log
+    audit_service.log(
+        action="REPORT_GENERATED",
+        user_id=current_user.id,
+        resource=f"valuation:{config.valuation_id}",
+        details={"format": config.format, "sections": config.sections, "cached": cached}
+    )
+
+    # 4. Return File
+    filename = f"{config.company_name}_Report.{extension}"
     # Sanitize filename
     filename = "".join([c for c in filename if c.isalpha() or c.isdigit() or c in (' ', '.', '_')]).strip()
     
-    return StreamingResponse(
-        file_buffer,
+    return FileResponse(
+        path,
         media_type=media_types.get(config.format, "application/octet-stream"),
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
+        filename=filename,
+        headers={"ETag": f'"{key}"'}
+    )
+
+class BoardPackRequest(BaseModel):
+    run_ids: List[str]
+
+def _safe_filename(name: str) -> str:
+    return "".join([c for c in name if c.isalpha() or c.isdigit() or c in (' ', '.', '_')]).strip()
+
+@router.get("/board/{run_id}")
+async def get_board_report(
+    run_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Board report PDF for a valuation run, rendered by the report worker pool
+    and cached until the run changes.
+    """
+    try:
+        path = await run_in_threadpool(report_render_pool.render_board_report, db, run_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return FileResponse(path, media_type="application/pdf", filename=f"{run_id[:8]}_Board_Report.pdf")
+
+@router.post("/board-pack")
+async def generate_board_pack(
+    request: BoardPackRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Board reports for a set of runs (e.g. a whole portfolio) as one zip.
+    Uncached reports are rendered in parallel across the worker pool.
+    """
+    if not request.run_ids:
+        raise HTTPException(status_code=400, detail="run_ids is required")
+    try:
+        paths = await run_in_threadpool(report_render_pool.render_board_pack, db, request.run_ids)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    names = dict(db.query(ValuationRun.id, ValuationRun.company_name).filter(ValuationRun.id.in_(list(paths))).all())
+    buffer = io.BytesIO()
+    # PDFs are already compressed; store them as-is
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+        for run_id, path in paths.items():
+            archive.write(path, _safe_filename(f"{names.get(run_id) or 'Company'}_{run_id[:8]}.pdf"))
+
+    audit_service.log(
+        action="REPORT_GENERATED",
+        user_id=current_user.id,
+        resource="board_pack",
+        details={"format": "pdf", "runs": len(paths)}
+    )
+    return Response(
+        buffer.getvalue(),
+        media_type="application/zip",
+        headers={"Content-Disposition": "attachment; filename=Board_Pack.zip"}
     )
 
 @router.get("/historical-simulation")
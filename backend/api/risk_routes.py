@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from backend.database.models import get_db, User
 from backend.auth.dependencies import get_current_user
@@ -29,7 +30,7 @@ async def get_qualitative_correlation(
     return service.calculate_qualitative_similarity()
 
 from backend.services.risk.stress_test_service import StressTestService
-from backend.calculations.risk_models import StressScenario, PortfolioStressTestResponse
+from backend.calculations.risk_models import StressScenario, PortfolioStressTestResponse, StressGridRequest
 
 @router.get("/scenarios", response_model=list[StressScenario])
 async def get_stress_scenarios(
@@ -54,6 +55,22 @@ async def run_stress_test(
     service = StressTestService(db)
     return service.run_stress_test(scenario_name)
 
+@router.post("/stress-test", response_model=list[PortfolioStressTestResponse])
+async def run_stress_grid(
+    request: StressGridRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Run a user-defined grid of shock scenarios on the portfolio in one pass.
+    Each company result carries the value change attributed to each shock.
+    """
+    service = StressTestService(db)
+    try:
+        return await run_in_threadpool(service.run_stress_grid, request.scenarios)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 from backend.services.risk.concentration_service import ConcentrationService
 
 @router.get("/concentration/sector")
@@ -1,5 +1,5 @@
 # Auth dependencies for FastAPI
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer
 from fastapi.security.http import HTTPAuthorizationCredentials
 from typing import Optional
@@ -10,6 +10,7 @@ from sqlalchemy.orm import Session
 security = HTTPBearer()
 
 async def get_current_user(
+    request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ) -> User:
@@ -41,7 +42,9 @@ async def get_current_user(
             detail="User not found",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
+
+    # Resolved principal for middleware (audit) so it never decodes the JWT again
+    request.state.user_id = user.id
     return user
 
 async def get_current_user_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> str:
@@ -48,3 +48,10 @@ class BenchmarkResponse(BaseModel):
     peer_avg: CompanyMetrics
     comparisons: List[BenchmarkComparison]
     peers_used: List[str]
+
+class SectorScreenResponse(BaseModel):
+    sector: Optional[str]
+    companies: List[CompanyMetrics]
+    medians: CompanyMetrics
+    percentiles: Dict[str, Dict[str, float]] # ticker -> metric -> 0-100 within the panel
+    tickers_failed: List[str]
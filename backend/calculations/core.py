@@ -6,7 +6,9 @@ from backend.utils.cache import cache
 import hashlib
 import json
 from datetime import datetime
-from backend.database.models import SessionLocal, ValuationMetric
+from backend.database.models import ValuationMetric
+from backend.services.metrics.sketch import latency_recorder
+from backend.services.metrics.writer import metrics_writer
 
 # Import new services
 from backend.services.valuation.formulas.dcf import DCFCalculator
@@ -17,6 +19,7 @@ from backend.services.valuation.formulas.precedent_transactions import Precedent
 from backend.services.valuation.formulas.anav import ANAVCalculator
 from backend.services.valuation.formulas.vc_method import VCMethodCalculator
 from backend.services.validation.assumption_validator import AssumptionValidator
+from backend.services.valuation.pwsa import PWSAExecutor
 
 class ValuationEngine:
     def __init__(self, workbook_data: Optional[WorkbookData] = None, mappings: Optional[Dict[str, str]] = None, user_id: Optional[int] = None):
@@ -37,90 +40,40 @@ class ValuationEngine:
 
     def calculate(self, valuation_input: ValuationInput) -> Dict[str, Any]:
         # 1. Check Cache
+        call_start = datetime.utcnow()
         cache_key = self._generate_cache_key(valuation_input)
         cached_result = cache.get_sync(cache_key)
         if cached_result:
             # Record cache hit metric
-            try:
-                db = SessionLocal()
-                metric = ValuationMetric(
-                    valuation_id="cached", # Or generate a new ID
-                    method_type="ALL",
-                    start_time=datetime.utcnow(),
-                    end_time=datetime.utcnow(),
-                    duration_ms=0,
-                    cache_hit=True,
-                    input_complexity_score=len(str(valuation_input)),
-                    user_id=self.user_id
-                )
-                db.add(metric)
-                db.commit()
-                db.close()
-            except Exception:
-                pass
+            metrics_writer.submit(ValuationMetric, {
+                "valuation_id": "cached",
+                "method_type": "ALL",
+                "start_time": call_start,
+                "end_time": datetime.utcnow(),
+                "duration_ms": 0,
+                "cache_hit": True,
+                "input_complexity_score": len(str(valuation_input)),
+                "user_id": self.user_id
+            })
+            latency_recorder.record_valuation("ALL", (datetime.utcnow() - call_start).total_seconds() * 1000, cache_hit=True)
             return cached_result
 
         start_time = datetime.utcnow()
 
         # Perform calculations using new services
         dcf_value, dcf_flows, dcf_details = DCFCalculator.calculate(valuation_input.dcf_input)
-        gpc_value = GPCCalculator.calculate(valuation_input.gpc_input)
-        fcfe_value = FCFECalculator.calculate(valuation_input.dcfe_input)
-        pt_value = PrecedentTransactionsCalculator.calculate(valuation_input.precedent_transactions_input)
-        
-        # Unpack LBO result
-        lbo_result = LBOCalculator.calculate(valuation_input.lbo_input)
-        if isinstance(lbo_result, tuple):
-            lbo_value, lbo_details = lbo_result
-        else:
-            lbo_value = lbo_result
-            lbo_details = {}
-            
-        anav_value = ANAVCalculator.calculate(valuation_input.anav_input)
-        
-        # VC Method
-        vc_result = None
-        vc_value = 0.0
-        if valuation_input.vc_method_input:
-            vc_result = VCMethodCalculator.calculate(valuation_input.vc_method_input)
-            vc_value = vc_result.pre_money_valuation if vc_result else 0.0
+        invariant = self._scenario_invariant_methods(valuation_input)
+        lbo_value, lbo_details = invariant["lbo"], invariant["lbo_details"]
+        vc_result = invariant["vc_result"]
 
-        
         # Validation
         validation_errors = AssumptionValidator.validate_valuation_assumptions(valuation_input)
         warnings = [e.message for e in validation_errors if e.severity == "warning"]
         critical_errors = [e.message for e in validation_errors if e.severity == "error"]
         
         # Determine which methods were used and apply weights
-        methods_used = {}
-        
-        # Default weights if not provided
-        weights = valuation_input.method_weights
-        if not weights:
-            # Fallback to simple logic if no weights provided
-            if dcf_value > 0: methods_used["DCF_FCFF"] = {"value": dcf_value, "weight": 0.4}
-            if gpc_value > 0: methods_used["GPC"] = {"value": gpc_value, "weight": 0.3}
-            if pt_value > 0: methods_used["Precedent_Transactions"] = {"value": pt_value, "weight": 0.3}
-            if fcfe_value > 0 and "DCF_FCFF" not in methods_used: methods_used["DCF_FCFE"] = {"value": fcfe_value, "weight": 0.4}
-            if lbo_value > 0: methods_used["LBO"] = {"value": lbo_value, "weight": 0.0}
-            if anav_value > 0: methods_used["ANAV"] = {"value": anav_value, "weight": 0.0}
-            if vc_value > 0: methods_used["VC_Method"] = {"value": vc_value, "weight": 0.0}
-        else:
-            # Use provided weights
-            if dcf_value > 0: methods_used["DCF_FCFF"] = {"value": dcf_value, "weight": weights.dcf}
-            if fcfe_value > 0: methods_used["DCF_FCFE"] = {"value": fcfe_value, "weight": weights.fcfe}
-            if gpc_value > 0: methods_used["GPC"] = {"value": gpc_value, "weight": weights.gpc}
-            if pt_value > 0: methods_used["Precedent_Transactions"] = {"value": pt_value, "weight": weights.precedent}
-            if lbo_value > 0: methods_used["LBO"] = {"value": lbo_value, "weight": weights.lbo}
-            if anav_value > 0: methods_used["ANAV"] = {"value": anav_value, "weight": weights.anav}
-            if vc_value > 0: methods_used["VC_Method"] = {"value": vc_value, "weight": 0.0}
-
-        # Normalize weights
-        total_weight = sum(m["weight"] for m in methods_used.values())
-        if total_weight > 0:
-            enterprise_value = sum(m["value"] * m["weight"] for m in methods_used.values()) / total_weight
-        else:
-            enterprise_value = 0
+        methods_used = self._select_methods(dcf_value, invariant, valuation_input.method_weights)
+        enterprise_value = self._blend(methods_used)
         
         # Equity value calculation
         net_debt = valuation_input.dcf_input.net_debt if valuation_input.dcf_input else 0
@@ -182,30 +135,88 @@ class ValuationEngine:
         # Cache the result
         cache.set_sync(cache_key, self.results, ttl=3600)
 
+        latency_recorder.record_valuation("ALL", (datetime.utcnow() - call_start).total_seconds() * 1000)
+
         # Record Metric
-        # try:
-        #     end_time = datetime.utcnow()
-        #     duration = int((end_time - start_time).total_seconds() * 1000)
-            
-        #     db = SessionLocal()
-        #     metric = ValuationMetric(
-        #         valuation_id=cache_key, # Using cache key as ID for now
-        #         method_type="ALL",
-        #         start_time=start_time,
-        #         end_time=end_time,
-        #         duration_ms=duration,
-        #         cache_hit=False,
-        #         input_complexity_score=len(str(valuation_input)),
-        #         user_id=self.user_id
-        #     )
-        #     db.add(metric)
-        #     db.commit()
-        #     db.close()
-        # except Exception as e:
-        #     print(f"Failed to save valuation metric: {e}")
+        end_time = datetime.utcnow()
+        metrics_writer.submit(ValuationMetric, {
+            "valuation_id": cache_key, # Using cache key as ID for now
+            "method_type": "ALL",
+            "start_time": start_time,
+            "end_time": end_time,
+            "duration_ms": int((end_time - start_time).total_seconds() * 1000),
+            "cache_hit": False,
+            "input_complexity_score": len(str(valuation_input)),
+            "user_id": self.user_id
+        })
         
         return self.results
 
+    def _scenario_invariant_methods(self, valuation_input: ValuationInput) -> Dict[str, Any]:
+        """
+        Every method value except the FCFF DCF. These depend only on inputs
+        that PWSA scenarios usually share, so they can be computed once per
+        scenario family.
+        """
+        # Unpack LBO result
+        lbo_result = LBOCalculator.calculate(valuation_input.lbo_input)
+        if isinstance(lbo_result, tuple):
+            lbo_value, lbo_details = lbo_result
+        else:
+            lbo_value = lbo_result
+            lbo_details = {}
+
+        # VC Method
+        vc_result = None
+        vc_value = 0.0
+        if valuation_input.vc_method_input:
+            vc_result = VCMethodCalculator.calculate(valuation_input.vc_method_input)
+            vc_value = vc_result.pre_money_valuation if vc_result else 0.0
+
+        return {
+            "gpc": GPCCalculator.calculate(valuation_input.gpc_input),
+            "fcfe": FCFECalculator.calculate(valuation_input.dcfe_input),
+            "precedent": PrecedentTransactionsCalculator.calculate(valuation_input.precedent_transactions_input),
+            "lbo": lbo_value,
+            "lbo_details": lbo_details,
+            "anav": ANAVCalculator.calculate(valuation_input.anav_input),
+            "vc": vc_value,
+            "vc_result": vc_result,
+        }
+
+    def _select_methods(self, dcf_value: float, invariant: Dict[str, Any], weights) -> Dict[str, Dict[str, float]]:
+        gpc_value, fcfe_value, pt_value = invariant["gpc"], invariant["fcfe"], invariant["precedent"]
+        lbo_value, anav_value, vc_value = invariant["lbo"], invariant["anav"], invariant["vc"]
+        methods_used = {}
+        
+        # Default weights if not provided
+        if not weights:
+            # Fallback to simple logic if no weights provided
+            if dcf_value > 0: methods_used["DCF_FCFF"] = {"value": dcf_value, "weight": 0.4}
+            if gpc_value > 0: methods_used["GPC"] = {"value": gpc_value, "weight": 0.3}
+            if pt_value > 0: methods_used["Precedent_Transactions"] = {"value": pt_value, "weight": 0.3}
+            if fcfe_value > 0 and "DCF_FCFF" not in methods_used: methods_used["DCF_FCFE"] = {"value": fcfe_value, "weight": 0.4}
+            if lbo_value > 0: methods_used["LBO"] = {"value": lbo_value, "weight": 0.0}
+            if anav_value > 0: methods_used["ANAV"] = {"value": anav_value, "weight": 0.0}
+            if vc_value > 0: methods_used["VC_Method"] = {"value": vc_value, "weight": 0.0}
+        else:
+            # Use provided weights
+            if dcf_value > 0: methods_used["DCF_FCFF"] = {"value": dcf_value, "weight": weights.dcf}
+            if fcfe_value > 0: methods_used["DCF_FCFE"] = {"value": fcfe_value, "weight": weights.fcfe}
+            if gpc_value > 0: methods_used["GPC"] = {"value": gpc_value, "weight": weights.gpc}
+            if pt_value > 0: methods_used["Precedent_Transactions"] = {"value": pt_value, "weight": weights.precedent}
+            if lbo_value > 0: methods_used["LBO"] = {"value": lbo_value, "weight": weights.lbo}
+            if anav_value > 0: methods_used["ANAV"] = {"value": anav_value, "weight": weights.anav}
+            if vc_value > 0: methods_used["VC_Method"] = {"value": vc_value, "weight": 0.0}
+        return methods_used
+
+    def _blend(self, methods_used: Dict[str, Dict[str, float]]) -> float:
+        # Normalize weights
+        total_weight = sum(m["weight"] for m in methods_used.values())
+        if total_weight > 0:
+            return sum(m["value"] * m["weight"] for m in methods_used.values()) / total_weight
+        return 0
+
     def _generate_cache_key(self, valuation_input) -> str:
         # Convert to JSON-serializable dict, sorting keys for consistency
         input_dict = valuation_input.dict()
@@ -260,71 +271,11 @@ class ValuationEngine:
 
     def calculate_pwsa(self, request: PWSARequest) -> PWSAResult:
         """
-        Calculate Probability-Weighted Scenario Analysis
+        Calculate Probability-Weighted Scenario Analysis. Scenario-invariant
+        methods are valued once per family of scenarios that differ only in
+        DCF projections; see PWSAExecutor.
         """
-        # 1. Normalize Probabilities
-        total_prob = sum(s.probability for s in request.scenarios)
-        if total_prob == 0:
-            raise ValueError("Total probability cannot be zero")
-            
-        normalized_scenarios = []
-        for s in request.scenarios:
-            # Create a copy to avoid mutating input
-            norm_s = s.copy()
-            norm_s.probability = s.probability / total_prob
-            normalized_scenarios.append(norm_s)
-            
-        # 2. Calculate individual scenario valuations
-        scenario_results = []
-        values = []
-        
-        for scenario in normalized_scenarios:
-            # Run full valuation for this scenario
-            result = self.calculate(scenario.assumptions)
-            val = result["enterprise_value"]
-            
-            scenario_results.append(ScenarioResult(
-                name=scenario.name,
-                value=val,
-                probability=scenario.probability
-            ))
-            values.append(val)
-            
-        # 3. Calculate Weighted Average
-        weighted_value = sum(r.value * r.probability for r in scenario_results)
-        
-        # 4. Calculate Risk Metrics
-        import numpy as np
-        
-        # Standard Deviation
-        variance = sum(r.probability * ((r.value - weighted_value) ** 2) for r in scenario_results)
-        std_dev = variance ** 0.5
-        
-        # Value at Risk (VaR) - 95%
-        sorted_scenarios = sorted(scenario_results, key=lambda x: x.value)
-        cum_prob = 0
-        var_95 = sorted_scenarios[0].value # Default to lowest
-        
-        for s in sorted_scenarios:
-            cum_prob += s.probability
-            if cum_prob >= 0.05:
-                var_95 = s.value
-                break
-                
-        # Upside Potential (Best Case)
-        upside = max(values) if values else 0
-        
-        risk_metrics = RiskMetrics(
-            var_95=var_95,
-            upside_potential=upside,
-            standard_deviation=std_dev
-        )
-        
-        return PWSAResult(
-            probability_weighted_value=weighted_value,
-            scenario_results=scenario_results,
-            risk_metrics=risk_metrics
-        )
+        return PWSAExecutor(self).run(request)
 
     def generate_sensitivity_matrix(self, sensitivity_input, dcf_input) -> Dict[str, Any]:
         """
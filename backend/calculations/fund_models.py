@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict
 
 class FundModel(BaseModel):
@@ -27,7 +27,7 @@ class CashFlow(BaseModel):
     type: str  # "Capital Call", "Distribution", "Management Fee"
 
 class FundReturns(BaseModel):
-    net_irr: float
+    net_irr: Optional[float]  # None when the net cash flows have no IRR (e.g. capital never returned)
     tvpi: float  # Total Value to Paid-In
     dpi: float   # Distributions to Paid-In
     moic: float  # Multiple on Invested Capital
@@ -36,3 +36,29 @@ class FundReturns(BaseModel):
     total_invested: float
     total_distributed: float
     total_value: float
+
+class DistributionSummary(BaseModel):
+    mean: float
+    std: float
+    p5: float
+    p25: float
+    median: float
+    p75: float
+    p95: float
+
+class FundSimulationDistribution(BaseModel):
+    paths: int
+    net_irr: Optional[DistributionSummary]  # Over paths with a defined IRR; None if there are none
+    tvpi: DistributionSummary
+    dpi: DistributionSummary
+    carry: DistributionSummary  # Total GP carried interest (incl. catch-up)
+    irr_undefined_paths: int  # Paths whose net cash flows have no IRR
+    probability_below_hurdle: float
+    probability_loss: float  # Share of paths with TVPI < 1.0x
+    mean_net_cash_flows: List[float]  # Mean LP net flow per fund year
+
+class FundPathsRequest(BaseModel):
+    fund: FundModel
+    strategy: FundStrategy
+    paths: int = Field(10000, ge=1, le=100000)
+    seed: Optional[int] = None
@@ -1,99 +1,164 @@
-from typing import Optional, List
+from typing import Optional, List, Dict
 import numpy as np
 from backend.calculations.models import HistoricalFinancials
 from backend.calculations.benchmarking_models import CompanyMetrics
 
+# Every ratio field of CompanyMetrics, in declaration order
+METRIC_FIELDS = [f for f in CompanyMetrics.__fields__ if f not in ("ticker", "period")]
+
 class MetricsCalculator:
     @staticmethod
     def calculate_metrics(financials: HistoricalFinancials, ticker: str) -> CompanyMetrics:
         """
         Calculates financial metrics for the latest available period (usually LTM or last FY).
         """
-        if not financials.years:
-            return CompanyMetrics(ticker=ticker)
-
-        # Helper to safely get the first element (latest year)
-        def get_latest(data_list: Optional[List[float]]) -> float:
-            return data_list[0] if data_list and len(data_list) > 0 else 0.0
-
-        # Helper for growth calculation (CAGR)
-        def calculate_cagr(data_list: Optional[List[float]], years: int = 3) -> Optional[float]:
-            if not data_list or len(data_list) < 2:
-                return None
-            
-            # Use available years if less than requested
-            n = min(len(data_list) - 1, years)
-            if n < 1: 
-                return None
-                
-            start_val = data_list[n]
-            end_val = data_list[0]
-            
-            if start_val <= 0 or end_val <= 0:
-                return None # CAGR undefined for negative/zero start/end
-                
-            return (end_val / start_val) ** (1 / n) - 1
+        return MetricsCalculator.calculate_panel({ticker: financials})[ticker]
+
+    @staticmethod
+    def calculate_panel(panel: Dict[str, HistoricalFinancials]) -> Dict[str, CompanyMetrics]:
+        """
+        Calculates metrics for a whole peer panel at once: each ratio is one
+        column-wise NumPy operation over all companies.
+        """
+        tickers = [t for t, f in panel.items() if f.years]
+        metrics = {t: CompanyMetrics(ticker=t) for t, f in panel.items() if not f.years}
+        if not tickers:
+            return metrics
+        rows = [panel[t] for t in tickers]
+
+        # Latest value of a series per company (first element, 0.0 if missing)
+        def latest(field: str) -> np.ndarray:
+            return np.array([(getattr(f, field) or [0.0])[0] for f in rows], dtype=float)
+
+        # CAGR over up to `years` periods, NaN where undefined (short series, negative/zero start/end)
+        def cagr(field: str, years: int = 3) -> np.ndarray:
+            series = np.full((len(rows), years + 1), np.nan)
+            for i, f in enumerate(rows):
+                values = (getattr(f, field) or [])[:years + 1]
+                series[i, :len(values)] = values
+            lengths = (~np.isnan(series)).sum(axis=1)
+            n = np.minimum(lengths - 1, years)
+            valid = n >= 1
+            start = series[np.arange(len(rows)), np.maximum(n, 0)]
+            end = series[:, 0]
+            valid &= (start > 0) & (end > 0)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return np.where(valid, (end / start) ** (1 / np.where(valid, n, 1)) - 1, np.nan)
+
+        def ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return np.where(denominator > 0, numerator / denominator, np.nan)
 
         # Extract latest values
-        revenue = get_latest(financials.revenue)
-        ebitda = get_latest(financials.ebitda)
-        ebit = get_latest(financials.ebit)
-        net_income = get_latest(financials.net_income)
-        
-        total_assets = get_latest(financials.total_assets)
-        total_equity = get_latest(financials.total_equity)
-        total_debt = get_latest(financials.total_debt)
-        current_assets = get_latest(financials.current_assets)
-        current_liabilities = get_latest(financials.current_liabilities)
-        cash = get_latest(financials.cash_and_equivalents)
-        inventory = get_latest(financials.inventory)
-        receivables = get_latest(financials.receivables)
-        
-        metrics = CompanyMetrics(ticker=ticker, period=str(financials.years[0]))
-
-        # --- Profitability ---
-        if total_equity > 0:
-            metrics.roe = net_income / total_equity
-        if total_assets > 0:
-            metrics.roa = net_income / total_assets
-        if revenue > 0:
-            metrics.net_margin = net_income / revenue
-            metrics.ebitda_margin = ebitda / revenue
-            metrics.operating_margin = ebit / revenue
-            # Gross margin requires Gross Profit which we might not have explicitly, 
-            # but usually Revenue - Cost of Revenue. 
-            # If we don't have COGS, we skip Gross Margin or approximate if possible.
-            # For now, let's skip if not available.
-
-        # --- Liquidity ---
-        if current_liabilities > 0:
-            metrics.current_ratio = current_assets / current_liabilities
-            metrics.quick_ratio = (current_assets - inventory) / current_liabilities
-            metrics.cash_ratio = cash / current_liabilities
-
-        # --- Leverage ---
-        if total_equity > 0:
-            metrics.debt_to_equity = total_debt / total_equity
-        if total_assets > 0:
-            metrics.debt_to_assets = total_debt / total_assets
-        if ebitda > 0:
-            metrics.net_debt_to_ebitda = (total_debt - cash) / ebitda
-        
-        # Interest Coverage requires Interest Expense. 
-        # We didn't add Interest Expense to HistoricalFinancials yet.
-        # Let's skip for now or add it.
-
-        # --- Efficiency ---
-        if total_assets > 0:
-            metrics.asset_turnover = revenue / total_assets
-        if inventory > 0:
-            metrics.inventory_turnover = revenue / inventory # Approximation (usually COGS / Avg Inv)
-        if receivables > 0:
-            metrics.receivables_turnover = revenue / receivables
-
-        # --- Growth ---
-        metrics.revenue_growth = calculate_cagr(financials.revenue, 3)
-        metrics.ebitda_growth = calculate_cagr(financials.ebitda, 3)
-        metrics.net_income_growth = calculate_cagr(financials.net_income, 3)
+        revenue = latest("revenue")
+        ebitda = latest("ebitda")
+        ebit = latest("ebit")
+        net_income = latest("net_income")
+
+        total_assets = latest("total_assets")
+        total_equity = latest("total_equity")
+        total_debt = latest("total_debt")
+        current_assets = latest("current_assets")
+        current_liabilities = latest("current_liabilities")
+        cash = latest("cash_and_equivalents")
+        inventory = latest("inventory")
+        receivables = latest("receivables")
+
+        columns = {
+            # --- Profitability ---
+            "roe": ratio(net_income, total_equity),
+            "roa": ratio(net_income, total_assets),
+            "net_margin": ratio(net_income, revenue),
+            "ebitda_margin": ratio(ebitda, revenue),
+            # Gross margin requires Gross Profit (COGS), which HistoricalFinancials doesn't carry yet
+            "operating_margin": ratio(ebit, revenue),
+
+            # --- Liquidity ---
+            "current_ratio": ratio(current_assets, current_liabilities),
+            "quick_ratio": ratio(current_assets - inventory, current_liabilities),
+            "cash_ratio": ratio(cash, current_liabilities),
+
+            # --- Leverage ---
+            "debt_to_equity": ratio(total_debt, total_equity),
+            "debt_to_assets": ratio(total_debt, total_assets),
+            "net_debt_to_ebitda": ratio(total_debt - cash, ebitda),
+            # Interest Coverage requires Interest Expense, not in HistoricalFinancials yet
 
+            # --- Efficiency ---
+            "asset_turnover": ratio(revenue, total_assets),
+            "inventory_turnover": ratio(revenue, inventory),  # Approximation (usually COGS / Avg Inv)
+            "receivables_turnover": ratio(revenue, receivables),
+
+            # --- Growth ---
+            "revenue_growth": cagr("revenue", 3),
+            "ebitda_growth": cagr("ebitda", 3),
+            "net_income_growth": cagr("net_income", 3),
+        }
+
+        for i, (ticker, f) in enumerate(zip(tickers, rows)):
+            values = {field: float(column[i]) for field, column in columns.items() if not np.isnan(column[i])}
+            metrics[ticker] = CompanyMetrics(ticker=ticker, period=str(f.years[0]), **values)
         return metrics
+
+
+class MetricsPanel:
+    """
+    Metrics of a set of companies as one (companies x fields) matrix, NaN
+    where a metric is unavailable, for panel-wide medians and percentiles.
+    """
+
+    def __init__(self, metrics: List[CompanyMetrics], fields: List[str] = METRIC_FIELDS):
+        self.tickers = [m.ticker for m in metrics]
+        self.fields = list(fields)
+        self.matrix = np.array(
+            [[getattr(m, f) if getattr(m, f) is not None else np.nan for f in self.fields] for m in metrics],
+            dtype=float
+        ).reshape(len(metrics), len(self.fields))
+
+    def medians(self) -> Dict[str, Optional[float]]:
+        present = ~np.isnan(self.matrix)
+        medians = {f: None for f in self.fields}
+        if not len(self.tickers):
+            return medians
+        # nanmedian warns on all-NaN columns; only report columns with data
+        with np.errstate(all="ignore"):
+            values = np.nanmedian(np.where(present.any(axis=0), self.matrix, 0.0), axis=0)
+        for j, f in enumerate(self.fields):
+            if present[:, j].any():
+                medians[f] = float(values[j])
+        return medians
+
+    def percentile_of(self, values: Dict[str, Optional[float]]) -> Dict[str, float]:
+        """
+        Percentile rank (0-100) of an outside company's values within the
+        panel plus itself: its rank among the sorted values / (count - 1).
+        """
+        result = {}
+        for j, f in enumerate(self.fields):
+            value = values.get(f)
+            if value is None:
+                continue
+            column = self.matrix[:, j]
+            column = column[~np.isnan(column)]
+            if not len(column):
+                result[f] = 50.0
+                continue
+            rank = int((column < value).sum())
+            result[f] = rank / len(column) * 100
+        return result
+
+    def percentiles(self) -> np.ndarray:
+        """
+        Percentile rank (0-100) of every company within the panel, per field,
+        in one pass. NaN where the company has no value.
+        """
+        present = ~np.isnan(self.matrix)
+        counts = present.sum(axis=0)
+        # rank = number of panel values strictly below; NaNs sort last and never count
+        ordered = np.sort(self.matrix, axis=0)
+        ranks = np.empty_like(self.matrix)
+        for j in range(len(self.fields)):
+            ranks[:, j] = np.searchsorted(ordered[:counts[j], j], self.matrix[:, j], side="left")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pct = np.where(counts > 1, ranks / (counts - 1) * 100, 100.0)
+        return np.where(present, pct, np.nan)
@@ -328,6 +328,11 @@ class AuditIssue(BaseModel):
     message: str
     severity: str # "error", "warning", "info"
 
+class AuditReport(BaseModel):
+    audit_id: str  # Submit diffs against this id to re-audit incrementally
+    issues: List[AuditIssue]
+    rules_run: List[str]
+
 class VCMethodResult(BaseModel):
     pre_money_valuation: float
     post_money_valuation: float
@@ -352,6 +357,11 @@ class ValuationInput(BaseModel):
     vc_method_input: Optional[VCMethodInput] = None
     reporting_date: str = "2023-12-31"
 
+class AuditDiffRequest(BaseModel):
+    audit_id: str
+    changes: Dict[str, Any]  # Dotted input path -> new value, e.g. {"dcf_input.projections.discount_rate": 0.09}
+    base: Optional[ValuationInput] = None  # Input audit_id was issued for; lets any worker serve the diff
+
 class ConfidenceScore(BaseModel):
     score: float  # 0-100
     rating: str  # "High", "Medium", "Low"
@@ -414,3 +424,18 @@ class GenerateScenarioResponse(BaseModel):
     explanation: str
     scenario_name: str
 
+class ScenarioVariant(BaseModel):
+    scenario_type: str
+    intensity: float = 1.0
+
+class ScenarioDelta(BaseModel):
+    """A generated scenario as the projection fields it overrides (dotted for nested, e.g. working_capital.dso)"""
+    scenario_type: str
+    scenario_name: str
+    intensity: float
+    changes: Dict[str, float]
+
+class ScenarioFamilyResponse(BaseModel):
+    scenarios: List[ScenarioDelta]
+    explanations: Dict[str, str]
+
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 
 class RealOptionsRequest(BaseModel):
@@ -14,6 +14,11 @@ class RealOptionsRequest(BaseModel):
     sector: Optional[str] = None  # For volatility defaults
     dcf_valuation_id: Optional[str] = None  # To link to existing DCF for S
 
+    # Pricing
+    value_leakage: float = 0.0  # q: annual cash flow lost while the option is unexercised
+    pricing_method: str = "black_scholes"  # "black_scholes" (European) or "binomial" (early exercise)
+    lattice_steps: int = Field(200, ge=2, le=2000)
+
 class OptionGreeks(BaseModel):
     delta: float
     gamma: float
@@ -26,3 +31,48 @@ class RealOptionsResult(BaseModel):
     greeks: OptionGreeks
     strategic_insight: str
     inputs_used: Dict[str, Any]  # Return the actual inputs used (after derivation)
+
+# Most options priced by one grid request
+MAX_GRID_OPTIONS = 10000
+
+class OptionGridRequest(BaseModel):
+    """Parallel arrays of option inputs; length-1 arrays apply to every option."""
+    asset_value: List[float] = Field(max_length=MAX_GRID_OPTIONS)
+    strike_price: List[float] = Field(max_length=MAX_GRID_OPTIONS)
+    time_to_expiration: List[float] = Field(max_length=MAX_GRID_OPTIONS)
+    risk_free_rate: List[float] = Field(max_length=MAX_GRID_OPTIONS)
+    volatility: List[float] = Field(max_length=MAX_GRID_OPTIONS)
+    option_type: List[str] = Field(["expansion"], max_length=MAX_GRID_OPTIONS)  # real option type, or "call"/"put"
+    value_leakage: List[float] = Field([0.0], max_length=MAX_GRID_OPTIONS)
+    pricing_method: str = "black_scholes"
+    lattice_steps: int = Field(200, ge=2, le=2000)
+
+class OptionGridResult(BaseModel):
+    price: List[float]
+    delta: List[float]
+    gamma: List[float]
+    vega: List[float]
+    theta: List[float]
+    rho: List[float]
+    pricing_method: str
+
+class OptionSurfaceRequest(BaseModel):
+    asset_value: float
+    strike_price: float
+    risk_free_rate: float = 0.04
+    option_type: str = "expansion"
+    value_leakage: float = 0.0
+    volatility_min: float = Field(0.05, gt=0)
+    volatility_max: float = Field(0.80, gt=0)
+    volatility_steps: int = Field(50, ge=2, le=500)
+    time_min: float = Field(0.25, ge=0)
+    time_max: float = Field(10.0, gt=0)
+    time_steps: int = Field(50, ge=2, le=500)
+    pricing_method: str = "black_scholes"
+    lattice_steps: int = Field(100, ge=2, le=1000)
+
+class OptionSurfaceResult(BaseModel):
+    volatilities: List[float]  # rows
+    times: List[float]  # columns
+    values: List[List[float]]
+    pricing_method: str
@@ -11,6 +11,8 @@ class StressScenario(BaseModel):
     # "discount_rate": +0.02 (2% increase)
     # "terminal_multiple": -0.20 (20% decrease)
     # "public_comp_multiple": -0.30 (30% decrease)
+    # "terminal_growth": -0.01 (1% decrease)
+    # "tax_rate": +0.05 (5% increase)
 
 class StressTestResult(BaseModel):
     scenario_name: str
@@ -20,6 +22,10 @@ class StressTestResult(BaseModel):
     stressed_value: float
     change_percent: float
     impact_description: str
+    # Value change by shock factor (each applied alone) plus "interaction"
+    attribution: Dict[str, float] = {}
+    # Stress engine's unshocked value minus the stored EV it is anchored to
+    model_gap: float = 0.0
 
 class PortfolioStressTestResponse(BaseModel):
     scenario: str
@@ -28,6 +34,9 @@ class PortfolioStressTestResponse(BaseModel):
     total_change_percent: float
     company_results: List[StressTestResult]
 
+class StressGridRequest(BaseModel):
+    scenarios: List[StressScenario]
+
 class CompanyHealthResult(BaseModel):
     company_name: str
     runway_months: Optional[float]
@@ -0,0 +1,224 @@
+"""
+Batch compliance audits over the whole portfolio.
+
+Quarter-end needs every active ValuationRun audited for ASC 820, SOX 404 and
+lending covenants. BatchComplianceRunner pages through runs with keyset
+pagination (id > last_id), hashes the data each audit depends on, skips runs
+whose hash matches the stored ValuationComplianceStatus row, and evaluates
+the rest in worker processes. Results are kept as one compact row per run,
+which the compliance dashboard and workflow gates read instead of
+re-running the validators.
+"""
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from backend.compliance.framework import ComplianceFramework
+from backend.database.models import SessionLocal, ValuationRun, ValuationComplianceStatus
+
+# Bump when validators change so every run is re-audited on the next batch
+RULESET_VERSION = "2"
+
+INACTIVE_STATUSES = ("archived",)
+
+_RUN_COLUMNS = (
+    ValuationRun.id, ValuationRun.input_data, ValuationRun.results, ValuationRun.user_id,
+    ValuationRun.reviewer_id, ValuationRun.signoff_timestamp,
+)
+
+
+def _loads(raw: Optional[str]) -> Dict[str, Any]:
+    if not raw:
+        return {}
+    try:
+        value = json.loads(raw)
+    except (TypeError, ValueError):
+        return {}
+    return value if isinstance(value, dict) else {}
+
+
+def build_valuation_data(run) -> Dict[str, Any]:
+    """Shape a ValuationRun (or a row with the same columns) into the dict the validators read."""
+    inputs = _loads(run.input_data)
+    results = _loads(run.results)
+    # Compliance fields (fair_value_level, company_ticker, ...) are captured with the inputs
+    data = dict(inputs)
+    data["inputs"] = inputs
+    data["results"] = results
+    data.setdefault("metadata", {
+        "created_by": run.user_id,
+        "reviewed_by": run.reviewer_id,
+        "approved_at": run.signoff_timestamp.isoformat() if run.signoff_timestamp else None,
+    })
+    return data
+
+
+def content_hash(valuation_data: Dict[str, Any]) -> str:
+    payload = json.dumps(valuation_data, sort_keys=True, default=str)
+    return hashlib.sha256(f"{RULESET_VERSION}:{payload}".encode()).hexdigest()
+
+
+def audit_payload(valuation_id: str, valuation_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Run every validator for one run and reduce the audit to the stored summary."""
+    audit = ComplianceFramework().audit_valuation(valuation_id, valuation_data)
+    return {
+        "compliance_status": audit.compliance_status,
+        "overall_risk_score": audit.overall_risk_score,
+        "checks": {
+            key: {"status": res.status, "risk_score": res.risk_score}
+            for key, res in audit.results.items()
+        },
+        "high_issues": sum(1 for step in audit.remediation_plan if step.priority == "high"),
+        "medium_issues": sum(1 for step in audit.remediation_plan if step.priority == "medium"),
+        "low_issues": sum(1 for step in audit.remediation_plan if step.priority not in ("high", "medium")),
+    }
+
+
+def _audit_job(job):
+    # Top-level so it pickles into worker processes
+    valuation_id, valuation_data = job
+    try:
+        return valuation_id, audit_payload(valuation_id, valuation_data), None
+    except Exception as e:
+        return valuation_id, None, str(e)
+
+
+def _fill(row: ValuationComplianceStatus, digest: str, summary: Dict[str, Any]) -> ValuationComplianceStatus:
+    row.content_hash = digest
+    row.compliance_status = summary["compliance_status"]
+    row.overall_risk_score = summary["overall_risk_score"]
+    row.checks_json = json.dumps(summary["checks"], separators=(",", ":"))
+    row.high_issues = summary["high_issues"]
+    row.medium_issues = summary["medium_issues"]
+    row.low_issues = summary["low_issues"]
+    row.checked_at = datetime.utcnow()
+    return row
+
+
+def _store(db: Session, existing: Optional[ValuationComplianceStatus], valuation_id: str,
+           digest: str, summary: Dict[str, Any]) -> ValuationComplianceStatus:
+    row = _fill(existing or ValuationComplianceStatus(valuation_id=valuation_id), digest, summary)
+    if existing is None:
+        db.add(row)
+    return row
+
+
+def compliance_status_for(db: Session, valuation_id: str, persist: bool = False) -> Optional[ValuationComplianceStatus]:
+    """
+    Stored compliance status for one run, re-audited inline only if the run
+    changed since the last batch (or was never audited). None if the run does not exist.
+
+    A re-audit is only written back when `persist` is set; otherwise it comes
+    back as an unsaved row and the stored one is left for the batch to refresh.
+    """
+    run = db.query(*_RUN_COLUMNS).filter(ValuationRun.id == valuation_id).first()
+    if run is None:
+        return None
+    data = build_valuation_data(run)
+    digest = content_hash(data)
+    row = db.get(ValuationComplianceStatus, valuation_id)
+    if row is not None and row.content_hash == digest:
+        return row
+    summary = audit_payload(valuation_id, data)
+    if not persist:
+        return _fill(ValuationComplianceStatus(valuation_id=valuation_id), digest, summary)
+    row = _store(db, row, valuation_id, digest, summary)
+    db.commit()
+    return row
+
+
+class BatchComplianceRunner:
+    """Audits every active run, page by page, in a pool of worker processes."""
+
+    def __init__(self, session_factory=SessionLocal, page_size: int = 200, max_workers: Optional[int] = None):
+        self.session_factory = session_factory
+        self.page_size = page_size
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+
+    def _pages(self, db: Session):
+        last_id = ""
+        while True:
+            rows = (
+                db.query(*_RUN_COLUMNS)
+                .filter(or_(ValuationRun.status.is_(None), ValuationRun.status.notin_(INACTIVE_STATUSES)))
+                .filter(ValuationRun.id > last_id)
+                .order_by(ValuationRun.id)
+                .limit(self.page_size)
+                .all()
+            )
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1].id
+
+    def run(self, force: bool = False) -> Dict[str, Any]:
+        """
+        Audit all active runs. Unchanged runs are skipped unless `force`.
+        Returns counts for the batch.
+        """
+        start = time.perf_counter()
+        summary = {"scanned": 0, "skipped": 0, "audited": 0, "errors": 0,
+                   "by_status": {"compliant": 0, "requires_review": 0, "non_compliant": 0}}
+        executor = ProcessPoolExecutor(max_workers=self.max_workers) if self.max_workers > 1 else None
+        db = self.session_factory()
+        try:
+            for rows in self._pages(db):
+                summary["scanned"] += len(rows)
+                ids = [row.id for row in rows]
+                existing = {
+                    s.valuation_id: s
+                    for s in db.query(ValuationComplianceStatus).filter(ValuationComplianceStatus.valuation_id.in_(ids))
+                }
+
+                jobs: List = []
+                digests: Dict[str, str] = {}
+                for row in rows:
+                    data = build_valuation_data(row)
+                    digest = content_hash(data)
+                    stored = existing.get(row.id)
+                    if not force and stored is not None and stored.content_hash == digest:
+                        summary["skipped"] += 1
+                        summary["by_status"][stored.compliance_status] = summary["by_status"].get(stored.compliance_status, 0) + 1
+                        continue
+                    digests[row.id] = digest
+                    jobs.append((row.id, data))
+
+                if executor is not None and len(jobs) > 1:
+                    chunksize = max(1, len(jobs) // (self.max_workers * 4))
+                    outcomes = executor.map(_audit_job, jobs, chunksize=chunksize)
+                else:
+                    outcomes = map(_audit_job, jobs)
+
+                for valuation_id, result, error in outcomes:
+                    if error is not None:
+                        summary["errors"] += 1
+                        print(f"Error auditing valuation {valuation_id}: {error}")
+                        continue
+                    _store(db, existing.get(valuation_id), valuation_id, digests[valuation_id], result)
+                    summary["audited"] += 1
+                    summary["by_status"][result["compliance_status"]] = summary["by_status"].get(result["compliance_status"], 0) + 1
+
+                db.commit()
+                # Release the page's ORM objects before fetching the next one
+                db.expunge_all()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+            if executor is not None:
+                executor.shutdown()
+
+        summary["duration_seconds"] = round(time.perf_counter() - start, 3)
+        return summary
+
+
+def run_compliance_batch(force: bool = False) -> Dict[str, Any]:
+    return BatchComplianceRunner().run(force=force)
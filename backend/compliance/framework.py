@@ -6,19 +6,28 @@ from backend.compliance.validators.sox404 import SOX404Validator
 from backend.compliance.validators.lending import LendingComplianceValidator
 from datetime import datetime
 
+# Validators are stateless, so one set is shared by every ComplianceFramework
+# (workflow services, report service, batch workers) in the process.
+_VALIDATORS: Optional[Dict[str, BaseValidator]] = None
+
+def shared_validators() -> Dict[str, BaseValidator]:
+    global _VALIDATORS
+    if _VALIDATORS is None:
+        _VALIDATORS = {
+            "asc_820": ASC820Validator(),
+            "sox_404": SOX404Validator(),
+            "lending_covenants": LendingComplianceValidator()
+        }
+    return _VALIDATORS
+
 class ComplianceFramework:
     """
     Central registry for compliance checks.
     Aggregates results and calculates total risk.
     """
     
-    def __init__(self):
-        self.validators: Dict[str, BaseValidator] = {
-            "asc_820": ASC820Validator(),
-            "asc_820": ASC820Validator(),
-            "sox_404": SOX404Validator(),
-            "lending_covenants": LendingComplianceValidator()
-        }
+    def __init__(self, validators: Optional[Dict[str, BaseValidator]] = None):
+        self.validators: Dict[str, BaseValidator] = validators if validators is not None else shared_validators()
 
     def audit_valuation(self, valuation_id: str, valuation_data: Dict[str, Any], requested_regs: Optional[List[str]] = None) -> ComplianceAudit:
         results = {}
@@ -0,0 +1,161 @@
+"""
+Database engine profiles, read/write session factories and the SQLite write queue.
+
+Several gunicorn workers share one database. Each dialect gets a tuned profile:
+
+- SQLite: WAL journal (readers never block the writer and vice versa),
+  synchronous=NORMAL (safe with WAL, no fsync per commit), a busy_timeout so
+  lock waits retry inside SQLite instead of failing with "database is locked",
+  plus mmap and page cache sizing. Write transactions that go through the
+  write queue start with BEGIN IMMEDIATE so they take the write lock up front
+  instead of failing on a read-to-write upgrade.
+- Postgres: sized connection pool with pre-ping and recycling.
+
+Read-only work can use the read session factory: on SQLite its connections
+are query_only, on Postgres it points at DATABASE_READ_URL (a replica) when
+set. On SQLite, valuation saves and the background metric and audit writers
+go through one bounded writer thread per process (write_queue) on a writer
+engine that holds a single connection, so a worker never has several threads
+contending for the file lock; on Postgres the queue runs writes inline on the
+primary engine.
+"""
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 10000)),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_BYTES", 256 * 1024 * 1024)),
+    "cache_size": -int(os.getenv("SQLITE_CACHE_KB", 64 * 1024)),  # Negative = KiB
+    "temp_store": "MEMORY",
+}
+
+POSTGRES_POOL = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", 10)),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 20)),
+    "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", 30)),
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 1800)),
+    "pool_pre_ping": True,
+}
+
+WRITE_QUEUE_CAPACITY = int(os.getenv("SQLITE_WRITE_QUEUE_SIZE", 1000))
+
+
+def is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def _is_memory(url: str) -> bool:
+    return url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url
+
+
+def build_engine(url: str, read_only: bool = False, pragmas: Optional[Dict[str, Any]] = None,
+                 writer: bool = False) -> Engine:
+    """
+    Engine with the profile for the URL's dialect (`read_only` and `writer`
+    only affect SQLite). A writer engine keeps a single connection, for the
+    write queue's one thread.
+    """
+    if not is_sqlite(url):
+        return create_engine(url, **POSTGRES_POOL) if url.startswith("postgresql") else create_engine(url)
+
+    pool = {"pool_size": 1, "max_overflow": 0} if writer and not _is_memory(url) else {}
+    engine = create_engine(url, connect_args={"check_same_thread": False}, **pool)
+    settings = dict(SQLITE_PRAGMAS if pragmas is None else pragmas)
+    if _is_memory(url):
+        settings.pop("journal_mode", None)  # In-memory databases have no WAL
+    if read_only:
+        settings["query_only"] = "ON"
+
+    @event.listens_for(engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in settings.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+    return engine
+
+
+class WriteQueue:
+    """
+    Bounded queue of write jobs, each run with its own session in one writer
+    thread (SQLite) or inline in the caller's thread (other dialects).
+    A job is a callable taking the session; the queue commits after it returns.
+    """
+
+    def __init__(self, session_factory: sessionmaker, serialize: bool, capacity: int = WRITE_QUEUE_CAPACITY):
+        self.session_factory = session_factory
+        self.serialize = serialize
+        self._queue: "queue.Queue" = queue.Queue(maxsize=capacity)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.completed = 0
+        self.failed = 0
+
+    @classmethod
+    def for_engine(cls, engine: Engine) -> "WriteQueue":
+        """Queue with its own sessions on `engine` (writers handed an engine, e.g. in tests)."""
+        return cls(sessionmaker(bind=engine), serialize=engine.dialect.name == "sqlite")
+
+    def submit(self, job: Callable[[Session], Any], timeout: Optional[float] = None) -> Future:
+        """
+        Queue a write and return a Future of its result. Blocks up to `timeout`
+        seconds while the queue is full, then raises queue.Full.
+        """
+        future: Future = Future()
+        if not self.serialize:
+            self._execute(job, future)
+            return future
+        self._ensure_thread()
+        self._queue.put((job, future), timeout=timeout)
+        return future
+
+    def run(self, job: Callable[[Session], Any], timeout: Optional[float] = None) -> Any:
+        """Queue a write and wait for its result (re-raising its error)."""
+        return self.submit(job, timeout=timeout).result(timeout=timeout)
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._drain, name="sqlite-writer", daemon=True)
+                self._thread.start()
+
+    def _drain(self):
+        while True:
+            job, future = self._queue.get()
+            try:
+                self._execute(job, future)
+            finally:
+                self._queue.task_done()
+
+    def _execute(self, job: Callable[[Session], Any], future: Future):
+        if not future.set_running_or_notify_cancel():
+            return
+        session = self.session_factory()
+        try:
+            if self.serialize:
+                # Take the write lock up front; other processes wait in busy_timeout
+                session.connection().exec_driver_sql("BEGIN IMMEDIATE")
+            result = job(session)
+            session.commit()
+            self.completed += 1
+            future.set_result(result)
+        except BaseException as e:
+            session.rollback()
+            self.failed += 1
+            future.set_exception(e)
+        finally:
+            session.close()
@@ -77,6 +77,25 @@ class ValuationRun(Base):
     signoff_signature = Column(String(500), nullable=True) # Digital signature linked to audit chain
 
 
+class ValuationComplianceStatus(Base):
+    """Latest compliance audit per valuation run, written by the batch runner and read by dashboards/gates."""
+    __tablename__ = 'valuation_compliance_status'
+
+    valuation_id = Column(String(36), ForeignKey('valuation_runs.id'), primary_key=True)
+    content_hash = Column(String(64), nullable=False) # Hash of the audited data + ruleset version
+    compliance_status = Column(String(32), nullable=False) # compliant, requires_review, non_compliant
+    overall_risk_score = Column(Float, nullable=False)
+    checks_json = Column(Text, nullable=True) # {"asc_820": {"status": "pass", "risk_score": 0.0}, ...}
+    high_issues = Column(Integer, default=0)
+    medium_issues = Column(Integer, default=0)
+    low_issues = Column(Integer, default=0)
+    checked_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index('idx_compliance_status', 'compliance_status'),
+    )
+
+
 class AuditLog(Base):
     __tablename__ = 'audit_logs'
     
@@ -97,6 +116,27 @@ class AuditLog(Base):
     nonce = Column(Integer, default=0)
     risk_level = Column(String(20), default="low")
 
+    __table_args__ = (
+        # Per-resource history in chain order, paginated by id
+        Index('idx_audit_resource_id', 'resource_id', 'id'),
+        # Newest-first log pages, keyset-paginated on (timestamp, id) per filter
+        Index('idx_audit_timestamp_id', 'timestamp', 'id'),
+        Index('idx_audit_user_timestamp', 'user_id', 'timestamp', 'id'),
+        Index('idx_audit_action_timestamp', 'action_type', 'timestamp', 'id'),
+        Index('idx_audit_risk_timestamp', 'risk_level', 'timestamp', 'id'),
+    )
+
+
+class AuditChainCheckpoint(Base):
+    """A verified prefix of the audit chain: every row with id <= last_id checked out, ending in last_hash."""
+    __tablename__ = 'audit_chain_checkpoints'
+
+    id = Column(Integer, primary_key=True)
+    last_id = Column(Integer, nullable=False, unique=True)
+    last_hash = Column(String(64), nullable=True)
+    row_count = Column(Integer, nullable=False) # Rows in the chain up to and including last_id
+    verified_at = Column(DateTime, default=datetime.utcnow)
+
 
 class IndustryNorm(Base):
     __tablename__ = 'industry_norms'
@@ -119,10 +159,23 @@ class ValidationPattern(Base):
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     pattern_type = Column(String(100), nullable=False, index=True) # e.g., "growth_margin_mismatch"
+    sector = Column(String(100), nullable=True, index=True) # Sector of cluster archetypes (also in condition_json)
     condition_json = Column(Text, nullable=False) # JSON logic
     severity = Column(String(20), nullable=False) # "warning", "critical"
     message_template = Column(Text, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Bumped on every change; the in-memory pattern store reloads when the newest one moves
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+class PatternTrainingState(Base):
+    """How far incremental pattern training got: runs up to (trained_through, last_run_id) are folded in."""
+    __tablename__ = 'pattern_training_state'
+
+    name = Column(String(50), primary_key=True)
+    trained_through = Column(DateTime, nullable=False)
+    last_run_id = Column(String(36), nullable=False, default="")
+    runs_seen = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 class UserFeedback(Base):
     __tablename__ = 'user_feedback'
@@ -180,6 +233,65 @@ class SystemMetric(Base):
     user_agent = Column(String(255))
     timestamp = Column(DateTime, default=datetime.utcnow, index=True)
 
+class LatencySketchBucket(Base):
+    __tablename__ = 'latency_sketch_buckets'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    bucket_start = Column(DateTime, nullable=False, index=True) # Start of the 1-minute bucket (UTC)
+    kind = Column(String(20), nullable=False) # "endpoint" or "valuation"
+    key = Column(String(255), nullable=False) # Route template or valuation method type
+    count = Column(Integer, default=0)
+    error_count = Column(Integer, default=0)
+    hit_count = Column(Integer, default=0) # Cache hits (valuations)
+    sum_ms = Column(Float, default=0.0)
+    max_ms = Column(Float, default=0.0)
+    sketch = Column(Text, nullable=False) # Serialized LatencySketch (JSON)
+
+    __table_args__ = (
+        Index('idx_latency_kind_bucket', 'kind', 'bucket_start'),
+    )
+
+class MetricRollup(Base):
+    """Hourly / daily aggregate of raw system or valuation metrics; kept after the raw rows expire."""
+    __tablename__ = 'metric_rollups'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    granularity = Column(String(10), nullable=False) # "hour" or "day"
+    bucket_start = Column(DateTime, nullable=False)
+    kind = Column(String(20), nullable=False) # "endpoint" or "valuation"
+    key = Column(String(255), nullable=False) # Endpoint route template or valuation method type
+    method = Column(String(10), nullable=False, default="") # HTTP method ("" for valuations)
+    count = Column(Integer, default=0)
+    error_count = Column(Integer, default=0)
+    hit_count = Column(Integer, default=0) # Cache hits (valuations)
+    sum_ms = Column(Float, default=0.0)
+    max_ms = Column(Float, default=0.0)
+    p50_ms = Column(Float, default=0.0)
+    p95_ms = Column(Float, default=0.0)
+    p99_ms = Column(Float, default=0.0)
+    sketch = Column(Text, nullable=False) # Serialized LatencySketch, so rollups merge over longer windows
+
+    __table_args__ = (
+        UniqueConstraint('granularity', 'kind', 'key', 'method', 'bucket_start', name='uq_metric_rollup_bucket'),
+        Index('idx_metric_rollup_window', 'granularity', 'kind', 'bucket_start'),
+    )
+
+class ServiceLease(Base):
+    __tablename__ = 'service_leases'
+
+    name = Column(String(100), primary_key=True) # e.g. "background-jobs"
+    holder = Column(String(255), nullable=False) # hostname:pid of the current holder
+    expires_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class StartupTaskRecord(Base):
+    __tablename__ = 'startup_tasks'
+
+    name = Column(String(100), primary_key=True) # e.g. "init_db"
+    version = Column(String(64), nullable=False) # Schema fingerprint or task version
+    completed_by = Column(String(255), nullable=True)
+    completed_at = Column(DateTime, default=datetime.utcnow)
+
 class HistoricalTransaction(Base):
     __tablename__ = 'historical_transactions'
     
@@ -252,6 +364,62 @@ class MarketSnapshot(Base):
     
     created_at = Column(DateTime, default=datetime.utcnow)
 
+class MarketMultiplePoint(Base):
+    """One sector multiple of one MarketSnapshot, in long form for range queries and downsampling."""
+    __tablename__ = 'market_multiple_points'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    snapshot_id = Column(Integer, ForeignKey('market_snapshots.id'), nullable=False, index=True)
+    date = Column(DateTime, nullable=False) # Copy of the snapshot date
+    sector = Column(String(50), nullable=False)
+    metric = Column(String(50), nullable=False) # exit_multiple, senior_leverage, total_leverage, leverage, ...
+    value = Column(Float, nullable=True)
+
+    __table_args__ = (
+        Index('idx_market_multiple_date', 'date', 'sector', 'metric'),
+    )
+
+class SecurityPrice(Base):
+    """Weekly adjusted close of a ticker (or the market index), for beta regressions."""
+    __tablename__ = 'security_prices'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    ticker = Column(String(20), nullable=False)
+    date = Column(DateTime, nullable=False)
+    adj_close = Column(Float, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint('ticker', 'date', name='uq_security_price_ticker_date'),
+        Index('idx_security_price_date', 'date'),
+    )
+
+class WaccComponent(Base):
+    """WACC build-up of one ticker as of one price date, computed locally by services.wacc.estimation."""
+    __tablename__ = 'wacc_components'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    ticker = Column(String(20), nullable=False)
+    as_of = Column(DateTime, nullable=False)
+    observations = Column(Integer, nullable=False) # Weekly returns in the regression window
+    raw_beta = Column(Float, nullable=True) # None when there were too few observations
+    adjusted_beta = Column(Float, nullable=False) # Blume-adjusted
+    unlevered_beta = Column(Float, nullable=False)
+    relevered_beta = Column(Float, nullable=False) # At the target capital structure
+    debt_to_equity = Column(Float, nullable=False)
+    tax_rate = Column(Float, nullable=False)
+    risk_free_rate = Column(Float, nullable=False)
+    market_risk_premium = Column(Float, nullable=False)
+    cost_of_equity = Column(Float, nullable=False)
+    cost_of_debt = Column(Float, nullable=False)
+    equity_weight = Column(Float, nullable=False)
+    debt_weight = Column(Float, nullable=False)
+    wacc = Column(Float, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint('ticker', 'as_of', name='uq_wacc_component_ticker_as_of'),
+    )
+
 class EvidenceAttachment(Base):
     __tablename__ = 'evidence_attachments'
     
@@ -308,6 +476,10 @@ class AcknowledgementRecord(Base):
     signature_hash = Column(String(64), nullable=False) # SHA-256
     evidence_links_json = Column(Text, nullable=True)
 
+    __table_args__ = (
+        Index('idx_ack_signature_hash', 'signature_hash'),
+    )
+
 class DecisionSignature(Base):
     __tablename__ = 'decision_signatures'
     
@@ -346,6 +518,33 @@ class DecisionRecord(Base):
     outcome_notes = Column(Text, nullable=True)
     outcome_recorded_at = Column(DateTime, nullable=True)
 
+    __table_args__ = (
+        # History pages, keyset-paginated on (created_at, decision_id) per filter
+        Index('idx_decision_company_created', 'company_id', 'created_at', 'decision_id'),
+        Index('idx_decision_company_severity_created', 'company_id', 'severity', 'created_at', 'decision_id'),
+        Index('idx_decision_severity_created', 'severity', 'created_at', 'decision_id'),
+        # Pilot statistics: counts by state per severity
+        Index('idx_decision_severity_state', 'severity', 'state'),
+    )
+
+
+class RealityCheckWeek(Base):
+    """Per-week rollup of the 'Decisions Fired vs Reality' report; refreshed only when the week sees new activity."""
+    __tablename__ = 'reality_check_weeks'
+
+    week_start = Column(DateTime, primary_key=True)
+    total_decisions = Column(Integer, default=0)
+    critical_decisions = Column(Integer, default=0)
+    acknowledged = Column(Integer, default=0)
+    with_outcomes = Column(Integer, default=0)
+    tuning_required = Column(Integer, default=0)
+    avg_response_lag_hours = Column(Float, nullable=True)
+    max_response_lag_hours = Column(Float, nullable=True)
+    # Latest decision, acknowledgement or outcome timestamp seen in the week
+    activity_watermark = Column(DateTime, nullable=True)
+    report_path = Column(String(255), nullable=True)
+    generated_at = Column(DateTime, default=datetime.utcnow)
+
 
 # Database setup
 # Database setup
@@ -380,8 +579,26 @@ if DATABASE_URL:
         new_query = urlencode(query_params, doseq=True)
         DATABASE_URL = urlunparse(parsed._replace(query=new_query))
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {})
+from backend.database.engine import WriteQueue, build_engine, is_sqlite
+
+# Read-only work (listings, history, dashboards) may use a replica on Postgres;
+# on SQLite it is the same file through query_only connections
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL", "").strip().strip('"').strip("'")
+
+engine = build_engine(DATABASE_URL)
+if is_sqlite(DATABASE_URL):
+    read_engine = build_engine(DATABASE_URL, read_only=True)
+    write_engine = build_engine(DATABASE_URL, writer=True)
+else:
+    read_engine = build_engine(DATABASE_READ_URL) if DATABASE_READ_URL else engine
+    write_engine = engine
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+WriteSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=write_engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+# Valuation saves and the metric/audit writers: one writer thread per process on SQLite, inline elsewhere
+write_queue = WriteQueue(WriteSessionLocal, serialize=is_sqlite(DATABASE_URL))
 
 def init_db():
     Base.metadata.create_all(bind=engine)
@@ -392,3 +609,10 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
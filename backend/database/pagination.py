@@ -0,0 +1,30 @@
+"""
+Keyset (cursor) pagination for newest-first history lists.
+
+OFFSET pagination makes the database walk and discard every skipped row, so
+deep pages get slower as tables grow. A keyset page instead starts from the
+last row the client saw - its sort value and id, the id breaking ties - and
+seeks straight to it through a (filter columns..., sort column, id) index,
+which keeps every page equally cheap.
+"""
+from typing import Any, Optional
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+
+
+def newest_first(query: Query, sort_column, id_column, before: Optional[Any] = None,
+                 before_id: Optional[Any] = None) -> Query:
+    """
+    Order `query` newest first on (sort_column, id_column) and, given the last
+    row of the previous page as (`before`, `before_id`), keep only rows past it.
+    """
+    if before is not None:
+        if before_id is None:
+            query = query.filter(sort_column < before)
+        else:
+            query = query.filter(or_(
+                sort_column < before,
+                and_(sort_column == before, id_column < before_id)
+            ))
+    return query.order_by(sort_column.desc(), id_column.desc())
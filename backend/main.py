@@ -1,3 +1,4 @@
+from backend.services.system.startup_profile import startup_profile
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
@@ -5,6 +6,7 @@ import os
 import time
 from datetime import datetime
 from backend.services.system.health_monitor import health_monitor_service
+from backend.services.metrics.sketch import latency_recorder
 
 # Load environment variables from .env file
 # Explicitly point to the .env file in the current directory (backend/)
@@ -38,42 +40,93 @@ async def global_exception_handler(request: Request, exc: Exception):
         content={"message": "Internal Server Error", "detail": str(exc)},
     )
 
+def _seed_historical_defaults():
+    from backend.services.historical_data_service import HistoricalDataService
+    db = SessionLocal()
+    try:
+        HistoricalDataService(db).seed_defaults()
+    finally:
+        db.close()
+
 # Initialize database on startup
 @app.on_event("startup")
 async def startup_event():
-    # Run synchronous DB initialization in a separate thread to avoid blocking the event loop
+    import asyncio
+    from fastapi.concurrency import run_in_threadpool
+    from backend.services.system.coordination import run_once, schema_fingerprint
+    from backend.services.system.singleton_jobs import singleton_jobs
+    from backend.services.metrics.sketch import flush_latency_sketches_periodically
+
+    # One-time tasks run in the first worker to get the startup lock; the other
+    # workers wait for it to finish (or skip straight past if already done for
+    # this schema version). Run in a thread to avoid blocking the event loop.
+    schema_version = schema_fingerprint()
+
     # In production, migrations should be handled externally (e.g., via alembic upgrade head early in CD)
     if os.getenv("ENV") != "production":
-        from fastapi.concurrency import run_in_threadpool
-        await run_in_threadpool(init_db)
-    
+        await run_in_threadpool(run_once, "init_db", init_db, schema_version)
     
     from backend.database.views import create_views
-    await run_in_threadpool(create_views)
-    
-    # Start Market Simulator in background
-    from backend.services.realtime.market_simulator import simulate_market_data
-    import asyncio
-    asyncio.create_task(simulate_market_data())
+    await run_in_threadpool(run_once, "create_views", create_views, schema_version)
 
     # Seed Historical Data
     try:
-        from backend.services.historical_data_service import HistoricalDataService
-        db = SessionLocal()
-        service = HistoricalDataService(db)
-        service.seed_defaults()
-        db.close()
+        await run_in_threadpool(run_once, "seed_historical_defaults", _seed_historical_defaults)
     except Exception as e:
         print(f"Failed to seed historical data: {e}")
 
-    # Start Scheduler
-    from backend.services.system.scheduler_service import scheduler_service
-    scheduler_service.start()
+    # Realtime hub: subscribe this worker to the broadcast backplane
+    from backend.services.realtime.realtime_service import manager as realtime_manager
+    await realtime_manager.start()
+
+    # Scheduler and Market Simulator run only in the elected leader worker
+    singleton_jobs.start(asyncio.get_running_loop())
+
+    # Each worker flushes its own latency sketches
+    asyncio.create_task(flush_latency_sketches_periodically())
+
+    # Audit sink writer (also replays events spilled by workers that died)
+    from backend.services.audit.sink import audit_sink
+    await run_in_threadpool(audit_sink.start)
+
+    # Each worker keeps its own industry reference table for audits, refreshed in the background
+    from backend.services.wacc.sector_table import refresh_sector_wacc_periodically
+    if os.getenv("SECTOR_WACC_REFRESH", "true").lower() == "true":
+        asyncio.create_task(refresh_sector_wacc_periodically())
+
+    # Validation patterns and industry norms too; validations then read only memory
+    from backend.services.ai.pattern_store import refresh_pattern_store_periodically
+    if os.getenv("PATTERN_STORE_REFRESH", "true").lower() == "true":
+        asyncio.create_task(refresh_pattern_store_periodically())
+
+    # Health dashboard OS stats are sampled in the background and served from a snapshot
+    from backend.services.system.health_monitor import sample_health_periodically
+    if os.getenv("HEALTH_SAMPLING", "true").lower() == "true":
+        asyncio.create_task(sample_health_periodically())
+
+    # Optionally start the report render workers in the background (by default
+    # they start on the first report, so idle web workers don't carry them)
+    from backend.services.analytics.render_pool import report_render_pool
+    if os.getenv("REPORT_RENDER_PREWARM", "false").lower() == "true":
+        asyncio.create_task(run_in_threadpool(report_render_pool.warm))
 
 @app.on_event("shutdown")
-def shutdown_event():
-    from backend.services.system.scheduler_service import scheduler_service
-    scheduler_service.stop()
+async def shutdown_event():
+    from fastapi.concurrency import run_in_threadpool
+    from backend.services.system.singleton_jobs import singleton_jobs
+    from backend.services.realtime.realtime_service import manager as realtime_manager
+    from backend.services.metrics.writer import metrics_writer
+    from backend.services.audit.sink import audit_sink
+    from backend.services.analytics.render_pool import report_render_pool
+
+    await run_in_threadpool(singleton_jobs.stop)
+    await realtime_manager.stop()
+    await run_in_threadpool(latency_recorder.flush, include_open=True)
+
+    # Drain queued telemetry rows and audit events before the worker exits
+    await run_in_threadpool(metrics_writer.stop)
+    await run_in_threadpool(audit_sink.stop)
+    await run_in_threadpool(report_render_pool.shutdown)
 
 
 
@@ -97,12 +150,16 @@ if frontend_url:
     allowed_origins.append(frontend_url)
 
 # app.add_middleware(SecurityHeadersMiddleware)
-# app.add_middleware(AuditMiddleware)
-# app.add_middleware(SystemMetricsMiddleware)
+from backend.middleware.security_middleware import AuditMiddleware
+app.add_middleware(AuditMiddleware)
+from backend.middleware.metrics import SystemMetricsMiddleware
+app.add_middleware(SystemMetricsMiddleware)
 
 # Include routers
 # Include routers
-from backend.api import performance_routes, compliance_routes, audit_routes, excel_routes, risk_routes, validation_routes, feedback_routes, suggestion_routes, historical_routes, historical_market_data, market_data, settings, advisory, evidence_routes, workflow_routes, regulatory_routes, realtime_routes
+from backend.api import performance_routes, compliance_routes, audit_routes, risk_routes, feedback_routes, historical_routes, historical_market_data, market_data, settings, advisory, evidence_routes, workflow_routes, regulatory_routes, realtime_routes
+# Router groups with heavy dependencies are imported on their first request
+from backend.api.lazy_routes import include_lazy
 
 # Specific routers first to avoid shadowing by generic routes
 app.include_router(realtime_routes.router)
@@ -121,11 +178,12 @@ app.include_router(workflow_routes.router)
 app.include_router(regulatory_routes.router)
 app.include_router(evidence_routes.router)
 app.include_router(audit_routes.router)
-app.include_router(excel_routes.router)
+include_lazy(app, "excel", ["/api/excel"], [("backend.api.excel_routes", {})])
 app.include_router(risk_routes.router)
-app.include_router(validation_routes.router)
+include_lazy(app, "validation", ["/api/validation"], [("backend.api.validation_routes", {})])
 app.include_router(feedback_routes.router)
-app.include_router(suggestion_routes.router, prefix="/api/ai", tags=["AI Suggestions"])
+include_lazy(app, "ai_suggestions", ["/api/ai"],
+             [("backend.api.suggestion_routes", {"prefix": "/api/ai", "tags": ["AI Suggestions"]})])
 app.include_router(historical_routes.router)
 
 
@@ -135,8 +193,10 @@ from backend.api import admin_routes
 app.include_router(admin_routes.router)
 
 # Report Routes
-from backend.api import report_routes
-app.include_router(report_routes.router)
+include_lazy(app, "reports", ["/api/reports"], [("backend.api.report_routes", {})])
+
+# Real Options Routes
+include_lazy(app, "real_options", ["/api/real-options"], [("backend.api.real_options_routes", {})])
 
 @app.get("/api/search")
 async def search_companies(q: str):
@@ -149,6 +209,9 @@ async def search_companies(q: str):
 from backend.api import decision_routes
 app.include_router(decision_routes.router)
 
+# Latency key for requests that matched no route
+UNMATCHED_ROUTE = "unmatched"
+
 @app.middleware("http")
 async def monitor_requests(request: Request, call_next):
     start_time = time.time()
@@ -161,6 +224,19 @@ async def monitor_requests(request: Request, call_next):
         status_code=response.status_code,
         duration_ms=process_time
     )
+
+    # Group by route template (e.g. /api/runs/{run_id}) to keep sketch keys bounded;
+    # requests that matched no route (404 scans) all share one key
+    route = request.scope.get("route")
+    latency_recorder.record_request(
+        endpoint=getattr(route, "path", UNMATCHED_ROUTE),
+        status_code=response.status_code,
+        duration_ms=process_time
+    )
+    # Set by get_current_user, so only authenticated requests are counted per user
+    user_id = getattr(request.state, "user_id", None)
+    if user_id is not None:
+        latency_recorder.record_user(user_id, process_time)
     
     return response
 
@@ -176,6 +252,13 @@ app.add_middleware(
 
 
 
+# Preload mode (start.sh with GUNICORN_PRELOAD=true): the gunicorn master imports
+# the app once and forks the workers, which share these modules copy-on-write
+if os.getenv("APP_PRELOAD", "false").lower() == "true":
+    startup_profile.preload(app)
+
+startup_profile.app_imported()
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the Enterprise Valuation Automation API"}
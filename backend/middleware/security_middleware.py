@@ -1,10 +1,8 @@
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.types import ASGIApp
 from fastapi import Request, Response
-from backend.database.models import SessionLocal
-from backend.services.audit_service import AuditLogger
+from backend.services.audit.sink import audit_sink
 from backend.auth.jwt_handler import verify_token
-import time
 
 class SecurityHeadersMiddleware(BaseHTTPMiddleware):
     def __init__(self, app: ASGIApp):
@@ -47,14 +45,10 @@ class AuditMiddleware(BaseHTTPMiddleware):
         if request.method not in ["POST", "PUT", "DELETE", "PATCH"]:
             return await call_next(request)
 
-        # Capture start time
-        start_time = time.time()
-        
         # Process request
         response = await call_next(request)
-        
-        # Async logging to not block response
-        # Note: In a real production app, use a background task or queue
+
+        # Queue for the audit sink; the DB write happens off the request path
         try:
             self.log_request(request, response)
         except Exception as e:
@@ -62,34 +56,31 @@ class AuditMiddleware(BaseHTTPMiddleware):
 
         return response
 
-    def log_request(self, request: Request, response: Response):
-        db = SessionLocal()
-        try:
-            logger = AuditLogger(db)
-            
-            # Extract user from token if present
-            user_id = None
-            auth_header = request.headers.get("Authorization")
-            if auth_header and auth_header.startswith("Bearer "):
-                token = auth_header.split(" ")[1]
-                payload = verify_token(token)
-                if payload:
-                    user_id = int(payload.get("sub"))
+    def _principal(self, request: Request):
+        # Set by get_current_user when the route authenticated the caller
+        user_id = getattr(request.state, "user_id", None)
+        if user_id is not None:
+            return user_id
+        # Routes without the dependency: decode the bearer token only if one was sent
+        auth_header = request.headers.get("Authorization")
+        if auth_header and auth_header.startswith("Bearer "):
+            payload = verify_token(auth_header.split(" ")[1])
+            if payload and payload.get("sub") is not None:
+                return int(payload.get("sub"))
+        return None
 
-            # Determine action type
-            path = request.url.path
-            method = request.method
-            action_type = f"{method}_{path}"
+    def log_request(self, request: Request, response: Response):
+        # Determine action type
+        path = request.url.path
+        method = request.method
 
-            logger.log(
-                action_type=action_type,
-                user_id=user_id,
-                ip_address=request.client.host,
-                details={
-                    "status_code": response.status_code,
-                    "method": method,
-                    "path": path
-                }
-            )
-        finally:
-            db.close()
+        audit_sink.submit(
+            action_type=f"{method}_{path}",
+            user_id=self._principal(request),
+            ip_address=request.client.host if request.client else None,
+            details={
+                "status_code": response.status_code,
+                "method": method,
+                "path": path
+            }
+        )
@@ -0,0 +1,44 @@
+"""add_latency_sketch_buckets
+
+Revision ID: 7a1c2e9d4b10
+Revises: 58c78f7619d1
+Create Date: 2026-10-19 09:12:44.201537
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a1c2e9d4b10'
+down_revision: Union[str, Sequence[str], None] = '58c78f7619d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('latency_sketch_buckets',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('key', sa.String(length=255), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=True),
+    sa.Column('error_count', sa.Integer(), nullable=True),
+    sa.Column('hit_count', sa.Integer(), nullable=True),
+    sa.Column('sum_ms', sa.Float(), nullable=True),
+    sa.Column('max_ms', sa.Float(), nullable=True),
+    sa.Column('sketch', sa.Text(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_latency_sketch_buckets_bucket_start'), 'latency_sketch_buckets', ['bucket_start'], unique=False)
+    op.create_index('idx_latency_kind_bucket', 'latency_sketch_buckets', ['kind', 'bucket_start'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_latency_kind_bucket', table_name='latency_sketch_buckets')
+    op.drop_index(op.f('ix_latency_sketch_buckets_bucket_start'), table_name='latency_sketch_buckets')
+    op.drop_table('latency_sketch_buckets')
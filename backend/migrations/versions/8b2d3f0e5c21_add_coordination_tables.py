@@ -0,0 +1,42 @@
+"""add_coordination_tables
+
+Revision ID: 8b2d3f0e5c21
+Revises: 7a1c2e9d4b10
+Create Date: 2026-10-19 11:03:17.554210
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2d3f0e5c21'
+down_revision: Union[str, Sequence[str], None] = '7a1c2e9d4b10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('service_leases',
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('holder', sa.String(length=255), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.create_table('startup_tasks',
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('version', sa.String(length=64), nullable=False),
+    sa.Column('completed_by', sa.String(length=255), nullable=True),
+    sa.Column('completed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('startup_tasks')
+    op.drop_table('service_leases')
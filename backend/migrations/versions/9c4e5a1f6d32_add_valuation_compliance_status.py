@@ -0,0 +1,41 @@
+"""add_valuation_compliance_status
+
+Revision ID: 9c4e5a1f6d32
+Revises: 8b2d3f0e5c21
+Create Date: 2026-10-19 14:21:40.118302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c4e5a1f6d32'
+down_revision: Union[str, Sequence[str], None] = '8b2d3f0e5c21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('valuation_compliance_status',
+    sa.Column('valuation_id', sa.String(length=36), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('compliance_status', sa.String(length=32), nullable=False),
+    sa.Column('overall_risk_score', sa.Float(), nullable=False),
+    sa.Column('checks_json', sa.Text(), nullable=True),
+    sa.Column('high_issues', sa.Integer(), nullable=True),
+    sa.Column('medium_issues', sa.Integer(), nullable=True),
+    sa.Column('checked_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['valuation_id'], ['valuation_runs.id'], ),
+    sa.PrimaryKeyConstraint('valuation_id')
+    )
+    op.create_index('idx_compliance_status', 'valuation_compliance_status', ['compliance_status'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_compliance_status', table_name='valuation_compliance_status')
+    op.drop_table('valuation_compliance_status')
@@ -0,0 +1,38 @@
+"""add_audit_chain_checkpoints
+
+Revision ID: a1d7f3b08e45
+Revises: 9c4e5a1f6d32
+Create Date: 2026-10-19 15:42:08.371954
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1d7f3b08e45'
+down_revision: Union[str, Sequence[str], None] = '9c4e5a1f6d32'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('audit_chain_checkpoints',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('last_id', sa.Integer(), nullable=False),
+    sa.Column('last_hash', sa.String(length=64), nullable=True),
+    sa.Column('row_count', sa.Integer(), nullable=False),
+    sa.Column('verified_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('last_id')
+    )
+    op.create_index('idx_audit_resource_id', 'audit_logs', ['resource_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_audit_resource_id', table_name='audit_logs')
+    op.drop_table('audit_chain_checkpoints')
@@ -0,0 +1,48 @@
+"""add_metric_rollups
+
+Revision ID: a9c3e6f1d4b7
+Revises: f7b2d5c9e3a1
+Create Date: 2026-10-20 00:41:27.905163
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9c3e6f1d4b7'
+down_revision: Union[str, Sequence[str], None] = 'f7b2d5c9e3a1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('metric_rollups',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('granularity', sa.String(length=10), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('key', sa.String(length=255), nullable=False),
+    sa.Column('method', sa.String(length=10), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=True),
+    sa.Column('error_count', sa.Integer(), nullable=True),
+    sa.Column('hit_count', sa.Integer(), nullable=True),
+    sa.Column('sum_ms', sa.Float(), nullable=True),
+    sa.Column('max_ms', sa.Float(), nullable=True),
+    sa.Column('p50_ms', sa.Float(), nullable=True),
+    sa.Column('p95_ms', sa.Float(), nullable=True),
+    sa.Column('p99_ms', sa.Float(), nullable=True),
+    sa.Column('sketch', sa.Text(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('granularity', 'kind', 'key', 'method', 'bucket_start', name='uq_metric_rollup_bucket')
+    )
+    op.create_index('idx_metric_rollup_window', 'metric_rollups', ['granularity', 'kind', 'bucket_start'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_metric_rollup_window', table_name='metric_rollups')
+    op.drop_table('metric_rollups')
@@ -0,0 +1,43 @@
+"""add_reality_check_weeks
+
+Revision ID: b3e8c4d19f57
+Revises: a1d7f3b08e45
+Create Date: 2026-10-19 17:05:31.604218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3e8c4d19f57'
+down_revision: Union[str, Sequence[str], None] = 'a1d7f3b08e45'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('reality_check_weeks',
+    sa.Column('week_start', sa.DateTime(), nullable=False),
+    sa.Column('total_decisions', sa.Integer(), nullable=True),
+    sa.Column('critical_decisions', sa.Integer(), nullable=True),
+    sa.Column('acknowledged', sa.Integer(), nullable=True),
+    sa.Column('with_outcomes', sa.Integer(), nullable=True),
+    sa.Column('tuning_required', sa.Integer(), nullable=True),
+    sa.Column('avg_response_lag_hours', sa.Float(), nullable=True),
+    sa.Column('max_response_lag_hours', sa.Float(), nullable=True),
+    sa.Column('activity_watermark', sa.DateTime(), nullable=True),
+    sa.Column('report_path', sa.String(length=255), nullable=True),
+    sa.Column('generated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('week_start')
+    )
+    op.create_index('idx_ack_signature_hash', 'acknowledgement_records', ['signature_hash'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_ack_signature_hash', table_name='acknowledgement_records')
+    op.drop_table('reality_check_weeks')
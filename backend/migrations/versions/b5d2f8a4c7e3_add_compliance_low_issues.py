@@ -0,0 +1,28 @@
+"""add_compliance_low_issues
+
+Revision ID: b5d2f8a4c7e3
+Revises: a9c3e6f1d4b7
+Create Date: 2026-10-19 10:12:44.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d2f8a4c7e3'
+down_revision: Union[str, Sequence[str], None] = 'a9c3e6f1d4b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('valuation_compliance_status', sa.Column('low_issues', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('valuation_compliance_status', 'low_issues')
@@ -0,0 +1,62 @@
+"""add_market_multiple_points
+
+Revision ID: c5f1a7e2b6d8
+Revises: b3e8c4d19f57
+Create Date: 2026-10-19 18:12:47.215093
+
+"""
+from typing import Sequence, Union
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5f1a7e2b6d8'
+down_revision: Union[str, Sequence[str], None] = 'b3e8c4d19f57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    points = op.create_table('market_multiple_points',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('snapshot_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.DateTime(), nullable=False),
+    sa.Column('sector', sa.String(length=50), nullable=False),
+    sa.Column('metric', sa.String(length=50), nullable=False),
+    sa.Column('value', sa.Float(), nullable=True),
+    sa.ForeignKeyConstraint(['snapshot_id'], ['market_snapshots.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_market_multiple_date', 'market_multiple_points', ['date', 'sector', 'metric'], unique=False)
+    op.create_index(op.f('ix_market_multiple_points_snapshot_id'), 'market_multiple_points', ['snapshot_id'], unique=False)
+
+    # Backfill from the JSON columns (same explosion as market_history.explode_multiples)
+    bind = op.get_bind()
+    rows = []
+    snapshots = bind.execute(sa.text(
+        "SELECT id, date, sector_leverage_multiples, sector_exit_multiples FROM market_snapshots"
+    ))
+    for snapshot_id, date, leverage_json, exit_json in snapshots:
+        leverage = json.loads(leverage_json) if leverage_json else {}
+        exits = json.loads(exit_json) if exit_json else {}
+        for sector, value in exits.items():
+            rows.append({"snapshot_id": snapshot_id, "date": date, "sector": sector, "metric": "exit_multiple", "value": value})
+        for sector, value in leverage.items():
+            if isinstance(value, dict):
+                for metric, v in value.items():
+                    rows.append({"snapshot_id": snapshot_id, "date": date, "sector": sector, "metric": metric, "value": v})
+            else:
+                rows.append({"snapshot_id": snapshot_id, "date": date, "sector": sector, "metric": "leverage", "value": value})
+    if rows:
+        op.bulk_insert(points, rows)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_market_multiple_points_snapshot_id'), table_name='market_multiple_points')
+    op.drop_index('idx_market_multiple_date', table_name='market_multiple_points')
+    op.drop_table('market_multiple_points')
@@ -0,0 +1,60 @@
+"""add_security_prices_and_wacc_components
+
+Revision ID: d2a9c6f4e1b3
+Revises: c5f1a7e2b6d8
+Create Date: 2026-10-19 21:04:11.538207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a9c6f4e1b3'
+down_revision: Union[str, Sequence[str], None] = 'c5f1a7e2b6d8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('security_prices',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('ticker', sa.String(length=20), nullable=False),
+    sa.Column('date', sa.DateTime(), nullable=False),
+    sa.Column('adj_close', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('ticker', 'date', name='uq_security_price_ticker_date')
+    )
+    op.create_index('idx_security_price_date', 'security_prices', ['date'], unique=False)
+    op.create_table('wacc_components',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('ticker', sa.String(length=20), nullable=False),
+    sa.Column('as_of', sa.DateTime(), nullable=False),
+    sa.Column('observations', sa.Integer(), nullable=False),
+    sa.Column('raw_beta', sa.Float(), nullable=True),
+    sa.Column('adjusted_beta', sa.Float(), nullable=False),
+    sa.Column('unlevered_beta', sa.Float(), nullable=False),
+    sa.Column('relevered_beta', sa.Float(), nullable=False),
+    sa.Column('debt_to_equity', sa.Float(), nullable=False),
+    sa.Column('tax_rate', sa.Float(), nullable=False),
+    sa.Column('risk_free_rate', sa.Float(), nullable=False),
+    sa.Column('market_risk_premium', sa.Float(), nullable=False),
+    sa.Column('cost_of_equity', sa.Float(), nullable=False),
+    sa.Column('cost_of_debt', sa.Float(), nullable=False),
+    sa.Column('equity_weight', sa.Float(), nullable=False),
+    sa.Column('debt_weight', sa.Float(), nullable=False),
+    sa.Column('wacc', sa.Float(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('ticker', 'as_of', name='uq_wacc_component_ticker_as_of')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('wacc_components')
+    op.drop_index('idx_security_price_date', table_name='security_prices')
+    op.drop_table('security_prices')
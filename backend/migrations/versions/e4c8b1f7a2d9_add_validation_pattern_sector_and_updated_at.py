@@ -0,0 +1,63 @@
+"""add_validation_pattern_sector_and_updated_at
+
+Also adds pattern_training_state for incremental archetype training.
+
+Revision ID: e4c8b1f7a2d9
+Revises: d2a9c6f4e1b3
+Create Date: 2026-10-19 23:12:40.318846
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4c8b1f7a2d9'
+down_revision: Union[str, Sequence[str], None] = 'd2a9c6f4e1b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('validation_patterns', sa.Column('sector', sa.String(length=100), nullable=True))
+    op.add_column('validation_patterns', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.create_index(op.f('ix_validation_patterns_sector'), 'validation_patterns', ['sector'], unique=False)
+    op.create_index(op.f('ix_validation_patterns_updated_at'), 'validation_patterns', ['updated_at'], unique=False)
+
+    op.create_table('pattern_training_state',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('trained_through', sa.DateTime(), nullable=False),
+    sa.Column('last_run_id', sa.String(length=36), nullable=False),
+    sa.Column('runs_seen', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+    # Backfill the sector from each pattern's condition
+    bind = op.get_bind()
+    patterns = sa.table(
+        'validation_patterns',
+        sa.column('id', sa.Integer), sa.column('condition_json', sa.Text),
+        sa.column('sector', sa.String), sa.column('created_at', sa.DateTime), sa.column('updated_at', sa.DateTime)
+    )
+    for row in bind.execute(sa.select(patterns.c.id, patterns.c.condition_json, patterns.c.created_at)).fetchall():
+        try:
+            sector = json.loads(row.condition_json).get('sector')
+        except (TypeError, ValueError, AttributeError):
+            sector = None
+        bind.execute(
+            patterns.update().where(patterns.c.id == row.id).values(sector=sector, updated_at=row.created_at)
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('pattern_training_state')
+    op.drop_index(op.f('ix_validation_patterns_updated_at'), table_name='validation_patterns')
+    op.drop_index(op.f('ix_validation_patterns_sector'), table_name='validation_patterns')
+    op.drop_column('validation_patterns', 'updated_at')
+    op.drop_column('validation_patterns', 'sector')
@@ -0,0 +1,42 @@
+"""add_history_keyset_indexes
+
+Revision ID: f7b2d5c9e3a1
+Revises: e4c8b1f7a2d9
+Create Date: 2026-10-19 23:58:02.114390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7b2d5c9e3a1'
+down_revision: Union[str, Sequence[str], None] = 'e4c8b1f7a2d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('idx_audit_timestamp_id', 'audit_logs', ['timestamp', 'id'], unique=False)
+    op.create_index('idx_audit_user_timestamp', 'audit_logs', ['user_id', 'timestamp', 'id'], unique=False)
+    op.create_index('idx_audit_action_timestamp', 'audit_logs', ['action_type', 'timestamp', 'id'], unique=False)
+    op.create_index('idx_audit_risk_timestamp', 'audit_logs', ['risk_level', 'timestamp', 'id'], unique=False)
+    op.create_index('idx_decision_company_created', 'decision_records', ['company_id', 'created_at', 'decision_id'], unique=False)
+    op.create_index('idx_decision_company_severity_created', 'decision_records', ['company_id', 'severity', 'created_at', 'decision_id'], unique=False)
+    op.create_index('idx_decision_severity_created', 'decision_records', ['severity', 'created_at', 'decision_id'], unique=False)
+    op.create_index('idx_decision_severity_state', 'decision_records', ['severity', 'state'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_decision_severity_state', table_name='decision_records')
+    op.drop_index('idx_decision_severity_created', table_name='decision_records')
+    op.drop_index('idx_decision_company_severity_created', table_name='decision_records')
+    op.drop_index('idx_decision_company_created', table_name='decision_records')
+    op.drop_index('idx_audit_risk_timestamp', table_name='audit_logs')
+    op.drop_index('idx_audit_action_timestamp', table_name='audit_logs')
+    op.drop_index('idx_audit_user_timestamp', table_name='audit_logs')
+    op.drop_index('idx_audit_timestamp_id', table_name='audit_logs')
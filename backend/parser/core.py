@@ -1,4 +1,3 @@
-import openpyxl
 from typing import Dict, Any, List
 from .models import WorkbookData, SheetData
 from .utils import clean_header
@@ -9,6 +8,7 @@ class SheetParser:
         self.wb = None
 
     def load(self):
+        import openpyxl
         self.wb = openpyxl.load_workbook(self.file_path, read_only=True, data_only=True)
 
     def parse_sheet(self, sheet_name: str) -> SheetData:
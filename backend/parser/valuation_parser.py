@@ -1,4 +1,3 @@
-import openpyxl
 from io import BytesIO
 from typing import Dict, Any, Union
 from datetime import datetime
@@ -6,6 +5,7 @@ from backend.schemas.valuation_import import ValuationImportData
 
 class ValuationExcelParser:
     def __init__(self, file_content: bytes):
+        import openpyxl
         self.wb = openpyxl.load_workbook(filename=BytesIO(file_content), data_only=True)
         if "Inp_1" not in self.wb.sheetnames:
             # Fallback or strict error? User mentioned accuracy is key.
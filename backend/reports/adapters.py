@@ -1,15 +1,19 @@
 from typing import Any
 import io
-import pandas as pd
 from backend.reports.content import ReportContent, FormatAdapter
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
-from pptx import Presentation
-from docx import Document
+
+# Each adapter imports its rendering library when it renders, so loading this
+# module (e.g. for TEMPLATE_VERSION) doesn't pull in ReportLab, pptx, docx or pandas
+
+# Bump when an adapter's output changes so cached reports are re-rendered
+TEMPLATE_VERSION = "1"
 
 class PDFAdapter(FormatAdapter):
     def render(self, content: ReportContent) -> io.BytesIO:
+        from reportlab.lib.pagesizes import letter
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+        from reportlab.lib.styles import getSampleStyleSheet
+
         buffer = io.BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=letter)
         styles = getSampleStyleSheet()
@@ -33,6 +37,8 @@ class PDFAdapter(FormatAdapter):
 
 class PPTXAdapter(FormatAdapter):
     def render(self, content: ReportContent) -> io.BytesIO:
+        from pptx import Presentation
+
         prs = Presentation()
         
         # Title Slide
@@ -51,6 +57,8 @@ class PPTXAdapter(FormatAdapter):
 
 class ExcelAdapter(FormatAdapter):
     def render(self, content: ReportContent) -> io.BytesIO:
+        import pandas as pd
+
         buffer = io.BytesIO()
         with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
             # Summary Sheet
@@ -71,6 +79,8 @@ class ExcelAdapter(FormatAdapter):
 
 class DocxAdapter(FormatAdapter):
     def render(self, content: ReportContent) -> io.BytesIO:
+        from docx import Document
+
         doc = Document()
         doc.add_heading(f"Valuation Report: {content.company_name}", 0)
         
@@ -1,57 +1,107 @@
 from typing import Dict, Any, Optional
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import seaborn as sns
+from collections import OrderedDict
+import hashlib
+import json
+import threading
 import io
 
+# Rendered charts by (context, format, input series); charts are pure functions of their data
+_CHART_CACHE: "OrderedDict[str, bytes]" = OrderedDict()
+_CHART_CACHE_SIZE = 128
+_cache_lock = threading.Lock()
+_style_lock = threading.Lock()
+_styled = False
+
+
+def _pyplot():
+    """
+    matplotlib and seaborn, imported on the first chart rather than when the
+    module loads; the theme is process-wide, so it is applied once here.
+    """
+    global _styled
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    with _style_lock:
+        if not _styled:
+            sns.set_theme(style="white", font="sans-serif")
+            plt.rcParams['figure.figsize'] = (10, 6)
+            plt.rcParams['axes.titlesize'] = 14
+            plt.rcParams['axes.labelsize'] = 11
+            plt.rcParams['xtick.labelsize'] = 10
+            plt.rcParams['ytick.labelsize'] = 10
+            plt.rcParams['axes.spines.top'] = False
+            plt.rcParams['axes.spines.right'] = False
+            plt.rcParams['axes.grid'] = True
+            plt.rcParams['grid.alpha'] = 0.3
+            plt.rcParams['grid.linestyle'] = '--'
+            _styled = True
+    return plt, sns
+
 class SmartChartGenerator:
     """
     Context-aware chart generator.
     Decides chart type based on data context (Comparison, Trend, Composition).
     """
-    def __init__(self):
-        sns.set_theme(style="white", font="sans-serif")
-        self._setup_style()
-    
-    def _setup_style(self):
-        plt.rcParams['axes.spines.top'] = False
-        plt.rcParams['axes.spines.right'] = False
-        plt.rcParams['axes.grid'] = True
-        plt.rcParams['grid.alpha'] = 0.3
-
-    def generate_chart(self, data: Dict[str, Any], context: str) -> Optional[io.BytesIO]:
+
+    @staticmethod
+    def cache_key(data: Dict[str, Any], context: str, fmt: str) -> str:
+        return hashlib.sha256(json.dumps([context, fmt, data], sort_keys=True, default=str).encode()).hexdigest()
+
+    def generate_chart(self, data: Dict[str, Any], context: str, fmt: str = "png") -> Optional[io.BytesIO]:
         """
-        Generates a chart. 
+        Generates a chart.
         context: 'dcf_waterfall', 'revenue_trend', 'comps_scatter'
+        fmt: 'png' (cached raster) or 'svg' (vector)
         """
-        plt.figure(figsize=(10, 6))
+        key = self.cache_key(data, context, fmt)
+        with _cache_lock:
+            cached = _CHART_CACHE.get(key)
+            if cached is not None:
+                _CHART_CACHE.move_to_end(key)
+                return io.BytesIO(cached)
+
+        plt, _ = _pyplot()
+        fig = plt.figure(figsize=(10, 6))
         buffer = io.BytesIO()
-        
+
         try:
             if context == 'dcf_waterfall':
                 self._generate_waterfall(data)
             elif context == 'revenue_trend':
                 self._generate_line_chart(data)
             # Add more types...
-            
-            plt.savefig(buffer, format='png', dpi=300, bbox_inches='tight')
-            plt.close()
-            buffer.seek(0)
-            return buffer
+
+            if fmt == "svg":
+                plt.savefig(buffer, format='svg', bbox_inches='tight')
+            else:
+                plt.savefig(buffer, format='png', dpi=300, bbox_inches='tight')
         except Exception as e:
             print(f"Chart generation error: {e}")
             return None
+        finally:
+            plt.close(fig)
+
+        with _cache_lock:
+            _CHART_CACHE[key] = buffer.getvalue()
+            while len(_CHART_CACHE) > _CHART_CACHE_SIZE:
+                _CHART_CACHE.popitem(last=False)
+        buffer.seek(0)
+        return buffer
 
     def _generate_waterfall(self, data: Dict[str, Any]):
         # Simplified bar for now
         labels = data.get('labels', [])
         values = data.get('values', [])
         colors = ['green' if v >= 0 else 'red' for v in values]
+        plt, sns = _pyplot()
         sns.barplot(x=labels, y=values, palette=colors)
         plt.title("Valuation Bridge")
         plt.axhline(0, color='black')
 
     def _generate_line_chart(self, data: Dict[str, Any]):
+        plt, sns = _pyplot()
         sns.lineplot(x=data['x'], y=data['y'], marker='o')
         plt.title("Financial Trends")
@@ -0,0 +1,137 @@
+"""
+Cross-process SQLite concurrency benchmark: default engine vs the tuned profile.
+
+Several processes (like gunicorn workers), each with a few threads (like the
+request thread pool), run a mixed read/write load against one database file:
+reads list recent rows, writes insert a row in a read-then-write
+transaction. Reports throughput and "database is locked" failures per profile.
+
+    python -m backend.scripts.db_concurrency_benchmark --processes 4 --threads 4 --seconds 10
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Float, Integer, String, create_engine, func, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from backend.database.engine import WriteQueue, build_engine
+
+Base = declarative_base()
+
+
+class BenchRun(Base):
+    __tablename__ = "bench_runs"
+    id = Column(Integer, primary_key=True)
+    company_name = Column(String(100), index=True)
+    enterprise_value = Column(Float)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+def _write(session, worker: int):
+    # Read-then-write, like a save that checks for an existing run first
+    session.execute(select(func.count(BenchRun.id)).where(BenchRun.company_name == f"Co{worker}"))
+    session.add(BenchRun(company_name=f"Co{worker}", enterprise_value=random.random() * 1e9))
+
+
+def _read(session):
+    session.execute(select(BenchRun).order_by(BenchRun.created_at.desc()).limit(20)).all()
+
+
+def _worker(profile: str, url: str, threads: int, seconds: float, write_ratio: float, worker: int, results):
+    if profile == "tuned":
+        engine = build_engine(url)
+        reads = sessionmaker(bind=build_engine(url, read_only=True))
+        writes = WriteQueue(sessionmaker(bind=build_engine(url, writer=True)), serialize=True)
+    else:
+        engine = create_engine(url, connect_args={"check_same_thread": False})
+        reads = sessionmaker(bind=engine)
+        writes = None
+    plain = sessionmaker(bind=engine)
+
+    counts = {"reads": 0, "writes": 0, "locked": 0, "errors": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def loop():
+        local = {key: 0 for key in counts}
+        while time.perf_counter() < deadline:
+            is_write = random.random() < write_ratio
+            try:
+                if is_write and writes is not None:
+                    writes.run(lambda session: _write(session, worker), timeout=30)
+                elif is_write:
+                    with plain() as session:
+                        _write(session, worker)
+                        session.commit()
+                else:
+                    with reads() as session:
+                        _read(session)
+                local["writes" if is_write else "reads"] += 1
+            except OperationalError as e:
+                local["locked" if "locked" in str(e) else "errors"] += 1
+            except Exception:
+                local["errors"] += 1
+        with lock:
+            for key, value in local.items():
+                counts[key] += value
+
+    pool = [threading.Thread(target=loop) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    results.put(counts)
+
+
+def run_profile(profile: str, processes: int, threads: int, seconds: float, write_ratio: float) -> dict:
+    directory = tempfile.mkdtemp(prefix="dbbench-")
+    url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    setup = create_engine(url)
+    Base.metadata.create_all(setup)
+    setup.dispose()
+
+    results = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(target=_worker, args=(profile, url, threads, seconds, write_ratio, i, results))
+        for i in range(processes)
+    ]
+    started = time.perf_counter()
+    for process in workers:
+        process.start()
+    totals = {"reads": 0, "writes": 0, "locked": 0, "errors": 0}
+    for _ in workers:
+        for key, value in results.get().items():
+            totals[key] += value
+    for process in workers:
+        process.join()
+    elapsed = time.perf_counter() - started
+
+    totals["ops_per_sec"] = (totals["reads"] + totals["writes"]) / elapsed
+    totals["writes_per_sec"] = totals["writes"] / elapsed
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+
+    print(f"{args.processes} processes x {args.threads} threads, {args.seconds:.0f}s, {args.write_ratio:.0%} writes")
+    for profile in ("default", "tuned"):
+        r = run_profile(profile, args.processes, args.threads, args.seconds, args.write_ratio)
+        print(f"{profile:>8}: {r['ops_per_sec']:8.0f} ops/s  {r['writes_per_sec']:7.0f} writes/s  "
+              f"reads={r['reads']} writes={r['writes']} locked={r['locked']} other_errors={r['errors']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Startup import profile of the API app.
+
+Imports backend.main in a fresh interpreter under `python -X importtime` for
+each mode (lazy router groups, everything eager, preload) and reports import
+time, resident memory, the slowest backend modules and, for each heavy
+library loaded at startup, the import chain that pulled it in.
+
+    python -m backend.scripts.import_profile [--top 15] [--modes lazy eager preload]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+from backend.services.system.startup_profile import HEAVY_MODULES
+
+MODES = {
+    "lazy": {"LAZY_ROUTERS": "true", "APP_PRELOAD": "false"},
+    "eager": {"LAZY_ROUTERS": "false", "APP_PRELOAD": "false"},
+    "preload": {"LAZY_ROUTERS": "true", "APP_PRELOAD": "true"},
+}
+
+PROBE = (
+    "import time; t = time.perf_counter(); import backend.main; "
+    "from backend.services.system.startup_profile import rss_mb, startup_profile; import json; "
+    "print('PROFILE ' + json.dumps({'seconds': time.perf_counter() - t, 'rss_mb': rss_mb(), "
+    "'heavy': startup_profile.heavy_modules_loaded()}))"
+)
+
+
+def parse_importtime(stderr: str) -> List[Tuple[int, str, int]]:
+    """(depth, module, cumulative microseconds) in the order Python reports them (children first)."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        stripped = name.rstrip()
+        rows.append(((len(stripped) - len(stripped.lstrip())) // 2, stripped.strip(), int(cumulative)))
+    return rows
+
+
+def import_chain(rows: List[Tuple[int, str, int]], module: str) -> List[str]:
+    """The first import of `module` and its chain of importers up to the top level."""
+    for i, (depth, name, _) in enumerate(rows):
+        if name == module:
+            chain = [name]
+            for parent_depth, parent, _ in rows[i + 1:]:
+                if parent_depth < depth:
+                    chain.append(parent)
+                    depth = parent_depth
+                if depth == 0:
+                    break
+            return chain
+    return []
+
+
+def profile(mode: str, top: int) -> Dict:
+    env = dict(os.environ, **MODES[mode])
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        env=env, capture_output=True, text=True
+    )
+    summary = next((json.loads(line[len("PROFILE "):]) for line in result.stdout.splitlines()
+                    if line.startswith("PROFILE ")), None)
+    if summary is None:
+        raise RuntimeError(f"Import failed in {mode} mode:\n{result.stderr[-2000:]}")
+
+    rows = parse_importtime(result.stderr)
+    backend = sorted(((us, name) for _, name, us in rows if name.startswith("backend.")), reverse=True)
+    summary["slowest"] = [(name, us / 1000) for us, name in backend[:top]]
+    summary["chains"] = {module: import_chain(rows, module) for module in summary["heavy"]}
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup import profile of the API app")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    args = parser.parse_args()
+
+    for mode in args.modes:
+        summary = profile(mode, args.top)
+        print(f"\n== {mode}: {summary['seconds']:.2f}s, RSS {summary['rss_mb'] or 0:.0f} MB")
+        print(f"heavy libraries loaded: {', '.join(summary['heavy']) or 'none'}")
+        for module, chain in summary["chains"].items():
+            print(f"  {module} <- " + (" <- ".join(chain[1:]) or "(imported at runtime)"))
+        print("slowest backend modules (cumulative ms):")
+        for name, ms in summary["slowest"]:
+            print(f"  {ms:8.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
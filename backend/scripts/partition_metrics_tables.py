@@ -0,0 +1,40 @@
+"""
+Convert the raw metrics tables to daily range partitions (PostgreSQL only).
+
+After this one-off conversion, the nightly retention job drops whole expired
+days instead of deleting rows and keeps a week of partitions created ahead.
+Each table is rebuilt and its rows copied in one transaction, so run it in a
+quiet period.
+
+    python -m backend.scripts.partition_metrics_tables [--tables system_metrics valuation_metrics]
+"""
+import argparse
+
+from backend.database.models import SessionLocal
+from backend.services.metrics.partitions import PARTITIONED_TABLES, convert_to_partitioned, is_partitioned
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Partition the raw metrics tables by day (PostgreSQL)")
+    parser.add_argument("--tables", nargs="+", choices=list(PARTITIONED_TABLES), default=list(PARTITIONED_TABLES))
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if db.get_bind().dialect.name != "postgresql":
+            raise SystemExit("Partitioning needs PostgreSQL; SQLite keeps batched deletes.")
+        for table in args.tables:
+            if is_partitioned(db, table):
+                print(f"{table}: already partitioned")
+                continue
+            copied = convert_to_partitioned(db, table)
+            print(f"{table}: partitioned by day, {copied} rows copied")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
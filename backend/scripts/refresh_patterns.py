@@ -1,5 +1,6 @@
 import sys
 import os
+import argparse
 import logging
 
 # Add parent directory to path to allow imports
@@ -19,11 +20,26 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 def main():
+    parser = argparse.ArgumentParser(description="Retrain validation patterns")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Fold valuation runs saved since the last pass into the existing archetypes instead of retraining")
+    args = parser.parse_args()
+
     logger.info("Starting pattern refresh job...")
     try:
-        service = PatternRecognitionService()
-        service.train_patterns()
-        logger.info("Pattern refresh completed successfully.")
+        if args.incremental:
+            from backend.database.models import SessionLocal
+            from backend.services.ai.pattern_store import pattern_store
+            db = SessionLocal()
+            try:
+                applied = pattern_store.train_incremental(db)
+            finally:
+                db.close()
+            logger.info(f"Incremental pattern refresh folded in {applied} valuation runs.")
+        else:
+            service = PatternRecognitionService()
+            service.train_patterns()
+            logger.info("Pattern refresh completed successfully.")
     except Exception as e:
         logger.error(f"Pattern refresh failed: {e}")
         sys.exit(1)
@@ -1,20 +1,21 @@
 import json
-import pandas as pd
 import numpy as np
 from typing import Dict, Any
-from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans
 from backend.database.models import SessionLocal, ValidationPattern, UserFeedback
+from backend.services.ai.pattern_store import pattern_store
 import os
 
 class PatternRecognitionService:
     def __init__(self, data_path="historical_valuations.json"):
         self.data_path = data_path
         self.df = None
-        self.scaler = StandardScaler()
+        self.scaler = None
 
     def load_data(self):
         """Loads historical data from JSON or Database."""
+        # pandas/sklearn are only needed for offline training; imported here so
+        # serving workers that build this service never load them
+        import pandas as pd
         if os.path.exists(self.data_path):
             with open(self.data_path, 'r') as f:
                 data = json.load(f)
@@ -31,6 +32,8 @@ class PatternRecognitionService:
         
         # We focus on Revenue Growth and EBITDA Margin for clustering
         features = self.df[['revenue_growth', 'ebitda_margin']].copy()
+        from sklearn.preprocessing import StandardScaler
+        self.scaler = StandardScaler()
         
         # Handle outliers before clustering (optional, but good for stability)
         # For now, we just use standard scaling
@@ -47,6 +50,7 @@ class PatternRecognitionService:
         """
         if self.df is None or self.df.empty:
             return
+        from sklearn.cluster import KMeans
 
         db = SessionLocal()
         try:
@@ -86,6 +90,7 @@ class PatternRecognitionService:
                     # Create Pattern Record
                     pattern = ValidationPattern(
                         pattern_type="cluster_archetype",
+                        sector=sector,
                         severity="info", # These are informational baselines
                         message_template=f"Similar {sector} companies ({archetype_name}) typically have Growth: {{growth}} and Margin: {{margin}}",
                         condition_json=json.dumps({
@@ -95,6 +100,9 @@ class PatternRecognitionService:
                             "avg_margin": round(avg_margin, 4),
                             "growth_range": [round(cluster_data['revenue_growth'].quantile(0.25), 4), round(cluster_data['revenue_growth'].quantile(0.75), 4)],
                             "margin_range": [round(cluster_data['ebitda_margin'].quantile(0.25), 4), round(cluster_data['ebitda_margin'].quantile(0.75), 4)],
+                            # Spreads let incremental training merge new runs into the cluster
+                            "growth_std": round(float(cluster_data['revenue_growth'].std(ddof=0)), 6),
+                            "margin_std": round(float(cluster_data['ebitda_margin'].std(ddof=0)), 6),
                             "sample_size": int(len(cluster_data))
                         })
                     )
@@ -103,6 +111,7 @@ class PatternRecognitionService:
 
             db.commit()
             print("Pattern training complete. Patterns saved to DB.")
+            pattern_store.refresh(force=True)
 
         except Exception as e:
             print(f"Error training patterns: {e}")
@@ -0,0 +1,329 @@
+"""
+Shared in-memory store of validation patterns and industry norms.
+
+Anomaly detection and suggestions used to load and json.loads every
+ValidationPattern (and query IndustryNorm) on each call. The store instead
+keeps each sector's cluster archetypes parsed into arrays (centroids, spreads,
+sample sizes) plus the industry norms, and reloads them only when a cheap
+watermark query - row counts and newest update times - shows they changed.
+Each worker refreshes its copy in the background, so validation calls read
+memory only.
+
+Nearest-archetype and outlier queries are vectorized distance computations
+over a sector's centroids (a handful per sector, so a KD-tree would only add
+overhead). Outliers are measured in standardized distance: each axis is
+divided by the archetype's spread.
+
+Archetypes are kept current incrementally: new valuation runs are assigned to
+their sector's nearest archetype and folded in as mini-batch k-means updates
+(the centroid moves to the running mean of its members, with the spread
+merged alongside), instead of refitting every sector from scratch.
+"""
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session
+
+from backend.database.models import (
+    Company, IndustryNorm, PatternTrainingState, UserFeedback, ValidationPattern, ValuationRun
+)
+
+REFRESH_INTERVAL_SECONDS = float(os.getenv("PATTERN_STORE_REFRESH_SECONDS", 60))
+CLUSTER_PATTERN = "cluster_archetype"
+TRAINING_STATE = "cluster_archetypes"
+OUTLIER_DISTANCE = 2.0  # Standardized distance beyond which a point fits no archetype
+IQR_TO_STD = 1.349  # Interquartile range of a normal distribution, in standard deviations
+MIN_STD = 0.005
+TRAINING_BATCH_SIZE = 500
+
+
+def archetype_name(message_template: str) -> str:
+    """Archetype name from a pattern message ("Similar SaaS companies (Efficient Growth) ...")."""
+    try:
+        return message_template.split('(')[1].split(')')[0]
+    except IndexError:
+        return message_template
+
+
+def _spread(condition: Dict, metric: str) -> float:
+    std = condition.get(f"{metric}_std")
+    if std is None:
+        # Batch-trained patterns only carry the interquartile range
+        low, high = condition.get(f"{metric}_range") or (0.0, 0.0)
+        std = (high - low) / IQR_TO_STD
+    return max(float(std), MIN_STD)
+
+
+class PatternHit:
+    def __init__(self, pattern_id: int, name: str, condition: Dict, distance: float, standardized_distance: float):
+        self.pattern_id = pattern_id
+        self.name = name
+        self.condition = condition
+        self.distance = distance
+        self.standardized_distance = standardized_distance
+
+    @property
+    def is_outlier(self) -> bool:
+        return self.standardized_distance > OUTLIER_DISTANCE
+
+
+class SectorPatterns:
+    """One sector's cluster archetypes as arrays (growth, margin)."""
+
+    def __init__(self, ids: List[int], names: List[str], conditions: List[Dict]):
+        self.ids = ids
+        self.names = names
+        self.conditions = conditions
+        self.centroids = np.array([[c.get("avg_growth", 0.0), c.get("avg_margin", 0.0)] for c in conditions], dtype=float)
+        self.spreads = np.array([[_spread(c, "growth"), _spread(c, "margin")] for c in conditions])
+        self.sample_sizes = np.array([int(c.get("sample_size", 0)) for c in conditions])
+
+    def nearest(self, points: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        For every row of `points` (n x 2): index of the nearest centroid, the
+        Euclidean distance to it and the standardized distance.
+        """
+        points = np.atleast_2d(np.asarray(points, dtype=float))
+        offsets = points[:, None, :] - self.centroids[None, :, :]
+        distances = np.sqrt((offsets ** 2).sum(axis=2))
+        index = distances.argmin(axis=1)
+        rows = np.arange(len(points))
+        standardized = np.sqrt(((offsets[rows, index] / self.spreads[index]) ** 2).sum(axis=1))
+        return index, distances[rows, index], standardized
+
+    def hit(self, j: int, distance: float, standardized: float) -> PatternHit:
+        return PatternHit(self.ids[j], self.names[j], self.conditions[j], float(distance), float(standardized))
+
+
+def fold_in(condition: Dict, batch: np.ndarray) -> Dict:
+    """
+    Mini-batch k-means update of one archetype: the centroid becomes the mean
+    of its previous members and `batch` (the 1/count learning rate), and the
+    spread is merged the same way. Returns the updated condition.
+    """
+    n0 = int(condition.get("sample_size", 0))
+    n1 = len(batch)
+    n = n0 + n1
+    mean0 = np.array([condition.get("avg_growth", 0.0), condition.get("avg_margin", 0.0)], dtype=float)
+    var0 = np.array([_spread(condition, "growth"), _spread(condition, "margin")]) ** 2
+    mean1, var1 = batch.mean(axis=0), batch.var(axis=0)
+
+    delta = mean1 - mean0
+    mean = mean0 + delta * n1 / n
+    std = np.sqrt((var0 * n0 + var1 * n1 + delta ** 2 * n0 * n1 / n) / n)
+    half_iqr = std * IQR_TO_STD / 2
+
+    updated = dict(condition)
+    updated.update({
+        "avg_growth": round(float(mean[0]), 4),
+        "avg_margin": round(float(mean[1]), 4),
+        "growth_std": round(float(std[0]), 6),
+        "margin_std": round(float(std[1]), 6),
+        "growth_range": [round(float(mean[0] - half_iqr[0]), 4), round(float(mean[0] + half_iqr[0]), 4)],
+        "margin_range": [round(float(mean[1] - half_iqr[1]), 4), round(float(mean[1] + half_iqr[1]), 4)],
+        "sample_size": n,
+    })
+    return updated
+
+
+def _run_point(input_data: Optional[str]) -> Optional[Tuple[float, float]]:
+    """(revenue growth, EBITDA margin) assumed by a stored valuation run."""
+    try:
+        projections = json.loads(input_data)["dcf_input"]["projections"]
+        return float(projections["revenue_growth_start"]), float(projections["ebitda_margin_start"])
+    except (TypeError, ValueError, KeyError):
+        return None
+
+
+class PatternStore:
+    def __init__(self):
+        self._sectors: Dict[str, SectorPatterns] = {}
+        self._norms: Dict[str, Dict[str, Tuple[float, float]]] = {}
+        self._feedback = (0, 0)  # Pattern-match feedback: (total, accepted)
+        self._refresh_lock = threading.Lock()
+        self.watermark: Optional[tuple] = None
+        self._load_attempted = False
+        self.version = 0
+        self.refreshed_at: Optional[datetime] = None
+
+    # --- Lookups (memory only once loaded) ---
+
+    def ensure_loaded(self):
+        # Cold start only; after that (even if it failed) the background refresh retries
+        if not self._load_attempted:
+            self.refresh()
+
+    def sector_patterns(self, sector: str) -> Optional[SectorPatterns]:
+        self.ensure_loaded()
+        return self._sectors.get(sector)
+
+    def nearest(self, sector: str, growth: float, margin: float) -> Optional[PatternHit]:
+        """Closest archetype of the sector to (growth, margin), if it has any."""
+        patterns = self.sector_patterns(sector)
+        if patterns is None:
+            return None
+        index, distance, standardized = patterns.nearest(np.array([[growth, margin]]))
+        return patterns.hit(int(index[0]), distance[0], standardized[0])
+
+    def nearest_many(self, sector: str, points: np.ndarray) -> List[Optional[PatternHit]]:
+        patterns = self.sector_patterns(sector)
+        if patterns is None:
+            return [None] * len(points)
+        index, distance, standardized = patterns.nearest(points)
+        return [patterns.hit(int(j), d, z) for j, d, z in zip(index, distance, standardized)]
+
+    def norms(self, sector: str) -> Dict[str, Tuple[float, float]]:
+        """{metric: (mean, std dev)} industry norms of the sector."""
+        self.ensure_loaded()
+        return self._norms.get(sector, {})
+
+    def feedback_acceptance(self) -> Optional[float]:
+        """Share of pattern-match suggestions users accepted (None without feedback)."""
+        self.ensure_loaded()
+        total, accepted = self._feedback
+        return accepted / total if total else None
+
+    # --- Loading ---
+
+    def _current_watermark(self, db: Session) -> tuple:
+        return tuple(db.execute(select(
+            select(func.count(ValidationPattern.id)).scalar_subquery(),
+            select(func.max(ValidationPattern.updated_at)).scalar_subquery(),
+            select(func.count(IndustryNorm.id)).scalar_subquery(),
+            select(func.max(IndustryNorm.last_updated)).scalar_subquery(),
+            select(func.count(UserFeedback.id)).where(UserFeedback.anomaly_field == "pattern_match").scalar_subquery(),
+        )).one())
+
+    def refresh(self, db: Optional[Session] = None, force: bool = False) -> bool:
+        """Reload patterns and norms if their watermark moved. Returns True if reloaded."""
+        from backend.database.models import ReadSessionLocal
+
+        if not self._refresh_lock.acquire(blocking=False):
+            return False  # A refresh is already running
+        self._load_attempted = True
+        own_session = db is None
+        db = db or ReadSessionLocal()
+        try:
+            watermark = self._current_watermark(db)
+            if watermark == self.watermark and not force:
+                return False
+
+            grouped: Dict[str, Tuple[List[int], List[str], List[Dict]]] = {}
+            rows = db.query(ValidationPattern.id, ValidationPattern.sector, ValidationPattern.message_template,
+                            ValidationPattern.condition_json)\
+                .filter(ValidationPattern.pattern_type == CLUSTER_PATTERN)\
+                .order_by(ValidationPattern.id)
+            for pattern_id, sector, message, condition_json in rows:
+                try:
+                    condition = json.loads(condition_json)
+                except ValueError:
+                    continue
+                ids, names, conditions = grouped.setdefault(sector or condition.get("sector"), ([], [], []))
+                ids.append(pattern_id)
+                names.append(archetype_name(message))
+                conditions.append(condition)
+
+            norms: Dict[str, Dict[str, Tuple[float, float]]] = {}
+            for sector, metric, mean, std_dev in db.query(
+                IndustryNorm.sector, IndustryNorm.metric, IndustryNorm.mean, IndustryNorm.std_dev
+            ):
+                norms.setdefault(sector, {})[metric] = (mean, std_dev)
+
+            feedback = dict(db.query(UserFeedback.user_action, func.count(UserFeedback.id))
+                            .filter(UserFeedback.anomaly_field == "pattern_match")
+                            .group_by(UserFeedback.user_action).all())
+
+            self._sectors = {sector: SectorPatterns(*group) for sector, group in grouped.items() if sector}
+            self._norms = norms
+            self._feedback = (sum(feedback.values()), feedback.get("accept", 0))
+            self.watermark = watermark
+            self.version += 1
+            self.refreshed_at = datetime.utcnow()
+            return True
+        except Exception as e:
+            print(f"Error refreshing pattern store: {e}")
+            return False
+        finally:
+            if own_session:
+                db.close()
+            self._refresh_lock.release()
+
+    # --- Incremental training ---
+
+    def partial_fit(self, db: Session, sector: str, points: np.ndarray) -> int:
+        """Fold (growth, margin) points into the sector's archetypes. Returns points applied."""
+        rows = db.query(ValidationPattern)\
+            .filter(ValidationPattern.pattern_type == CLUSTER_PATTERN, ValidationPattern.sector == sector)\
+            .order_by(ValidationPattern.id).all()
+        if not rows or not len(points):
+            return 0
+        conditions = [json.loads(row.condition_json) for row in rows]
+        index, _, _ = SectorPatterns([row.id for row in rows], [""] * len(rows), conditions).nearest(points)
+        for j, row in enumerate(rows):
+            batch = points[index == j]
+            if len(batch):
+                row.condition_json = json.dumps(fold_in(conditions[j], batch))
+        return len(points)
+
+    def train_incremental(self, db: Session, batch_size: int = TRAINING_BATCH_SIZE) -> int:
+        """
+        Fold valuation runs saved since the last pass into their sector's
+        archetypes, one mini-batch at a time. Runs are matched to a sector
+        through their company; runs without one, or without DCF growth/margin
+        assumptions, are skipped. Returns the number of runs folded in.
+        """
+        state = db.get(PatternTrainingState, TRAINING_STATE)
+        if state is None:
+            state = PatternTrainingState(name=TRAINING_STATE, trained_through=datetime.min, last_run_id="")
+            db.add(state)
+
+        applied = 0
+        while True:
+            runs = db.query(ValuationRun.id, ValuationRun.created_at, ValuationRun.input_data, Company.sector)\
+                .join(Company, Company.name == ValuationRun.company_name)\
+                .filter(ValuationRun.created_at.isnot(None), or_(
+                    ValuationRun.created_at > state.trained_through,
+                    and_(ValuationRun.created_at == state.trained_through, ValuationRun.id > state.last_run_id)
+                ))\
+                .order_by(ValuationRun.created_at, ValuationRun.id).limit(batch_size).all()
+            if not runs:
+                break
+
+            by_sector: Dict[str, list] = {}
+            for run_id, created_at, input_data, sector in runs:
+                point = _run_point(input_data)
+                if point is not None:
+                    by_sector.setdefault(sector, []).append(point)
+            for sector, points in by_sector.items():
+                applied += self.partial_fit(db, sector, np.array(points))
+
+            state.trained_through, state.last_run_id = runs[-1][1], runs[-1][0]
+            state.runs_seen = (state.runs_seen or 0) + len(runs)
+            db.commit()
+            if len(runs) < batch_size:
+                break
+
+        if applied:
+            self.refresh(force=True)
+        return applied
+
+
+async def refresh_pattern_store_periodically(interval: float = REFRESH_INTERVAL_SECONDS):
+    """
+    Per-worker watermark check: each worker serves validations from its own
+    copy of the store, so this runs in each of them.
+    """
+    import asyncio
+    from fastapi.concurrency import run_in_threadpool
+
+    while True:
+        await run_in_threadpool(pattern_store.refresh)
+        await asyncio.sleep(interval)
+
+
+pattern_store = PatternStore()
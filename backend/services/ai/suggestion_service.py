@@ -2,7 +2,7 @@ from typing import Dict, Any, List, Optional
 import json
 from backend.services.ai.pattern_service import PatternRecognitionService
 from backend.services.finance.impact_engine import ImpactEstimationEngine
-from backend.database.models import SessionLocal, ValidationPattern
+from backend.services.ai.pattern_store import PatternHit, pattern_store
 
 import hashlib
 import time
@@ -27,10 +27,7 @@ class SuggestionService:
                 return data
         
         # 2. Find Matching Pattern
-        # We need a way to find the closest cluster. 
-        # Since PatternRecognitionService doesn't expose a direct "find_closest" that returns the cluster object easily without re-running logic,
-        # we might need to duplicate some logic or enhance PatternService.
-        # For now, let's assume we can query the DB for the best match based on sector/growth/margin.
+        # Closest archetype from the in-memory pattern store (no DB query per request)
         
         matched_pattern = self._find_best_pattern(company_data, current_assumptions)
         
@@ -58,9 +55,10 @@ class SuggestionService:
                 "reasoning": reasoning,
                 "expected_impact": impact,
                 "archetype_match": {
-                    "name": matched_pattern.message_template.split('(')[1].split(')')[0] if matched_pattern else "Unknown",
+                    "name": matched_pattern.name if matched_pattern else "Unknown",
                     "confidence": confidence_scores.get("overall", 0.0),
-                    # "similar_companies_count": matched_pattern.condition_json.get("sample_size", 0) # Need to parse JSON
+                    "similar_companies_count": matched_pattern.condition.get("sample_size", 0),
+                    "is_outlier": matched_pattern.is_outlier
                 } if matched_pattern else None
             },
             "context": {
@@ -82,47 +80,20 @@ class SuggestionService:
         }, sort_keys=True)
         return hashlib.md5(raw.encode()).hexdigest()
 
-    def _find_best_pattern(self, company_data: Dict[str, Any], current_assumptions: Dict[str, float]) -> Optional[ValidationPattern]:
+    def _find_best_pattern(self, company_data: Dict[str, Any], current_assumptions: Dict[str, float]) -> Optional[PatternHit]:
         """
-        Finds the best matching pattern from the database.
+        Finds the closest archetype of the company's sector (Euclidean distance on growth/margin).
         """
-        db = SessionLocal()
-        try:
-            sector = company_data.get("sector", "SaaS") # Default to SaaS
-            patterns = db.query(ValidationPattern).filter(ValidationPattern.condition_json.contains(sector)).all()
-            
-            best_match = None
-            min_dist = float('inf')
-            
-            # Simple Euclidean distance on Growth/Margin
-            growth = current_assumptions.get("revenue_growth", 0)
-            margin = current_assumptions.get("ebitda_margin", 0)
-            
-            for p in patterns:
-                try:
-                    cond = json.loads(p.condition_json)
-                    if cond.get("sector") != sector: continue
-                    
-                    avg_growth = cond.get("avg_growth", 0)
-                    avg_margin = cond.get("avg_margin", 0)
-                    
-                    dist = ((growth - avg_growth)**2 + (margin - avg_margin)**2)**0.5
-                    
-                    if dist < min_dist:
-                        min_dist = dist
-                        best_match = p
-                except:
-                    continue
-            
-            return best_match
-        finally:
-            db.close()
+        sector = company_data.get("sector", "SaaS") # Default to SaaS
+        growth = current_assumptions.get("revenue_growth", 0)
+        margin = current_assumptions.get("ebitda_margin", 0)
+        return pattern_store.nearest(sector, growth, margin)
 
-    def _derive_suggestions(self, pattern: ValidationPattern, current: Dict[str, float], context: Dict[str, Any]) -> Dict[str, float]:
+    def _derive_suggestions(self, pattern: PatternHit, current: Dict[str, float], context: Dict[str, Any]) -> Dict[str, float]:
         """
         Derives suggested values based on pattern averages and user context (Risk Profile).
         """
-        cond = json.loads(pattern.condition_json)
+        cond = pattern.condition
         avg_growth = cond.get("avg_growth", 0.10)
         avg_margin = cond.get("avg_margin", 0.10)
         
@@ -149,7 +120,7 @@ class SuggestionService:
             "terminal_growth": current.get("terminal_growth", 0.03) # Pass through
         }
 
-    def _calculate_confidence(self, pattern: ValidationPattern, context: Dict[str, Any]) -> Dict[str, float]:
+    def _calculate_confidence(self, pattern: PatternHit, context: Dict[str, Any]) -> Dict[str, float]:
         """
         Calculates confidence scores based on pattern match, sample size, and historical accuracy.
         """
@@ -157,16 +128,12 @@ class SuggestionService:
         base_confidence = 0.85 
         
         # 2. Adjust for Sample Size
-        try:
-            cond = json.loads(pattern.condition_json)
-            sample_size = cond.get("sample_size", 0)
-            if sample_size < 10: base_confidence -= 0.1
-            elif sample_size > 50: base_confidence += 0.05
-        except:
-            pass
+        sample_size = pattern.condition.get("sample_size", 0)
+        if sample_size < 10: base_confidence -= 0.1
+        elif sample_size > 50: base_confidence += 0.05
 
         # 3. Adjust for Historical Accuracy
-        accuracy_score = self._get_historical_accuracy(pattern.id)
+        accuracy_score = self._get_historical_accuracy(pattern.pattern_id)
         final_confidence = min(0.99, base_confidence + (accuracy_score * 0.1))
 
         return {
@@ -177,31 +144,21 @@ class SuggestionService:
 
     def _get_historical_accuracy(self, pattern_id: int) -> float:
         """
-        Queries UserFeedback to see how often this pattern's suggestions were accepted.
+        How often pattern suggestions were accepted, from the feedback counts cached in the pattern store.
         Returns a score between -0.1 (poor) and +0.1 (good).
         """
-        db = SessionLocal()
-        try:
-            # This is a simplified query. In reality, we'd link feedback to specific patterns.
-            # For now, we'll check general pattern acceptance.
-            total = db.query(UserFeedback).filter(UserFeedback.anomaly_field == "pattern_match").count()
-            if total == 0: return 0.0
-            
-            accepted = db.query(UserFeedback).filter(UserFeedback.anomaly_field == "pattern_match", UserFeedback.user_action == "accept").count()
-            rate = accepted / total
-            
-            # Normalize: 50% acceptance is neutral. >50% adds confidence.
-            return (rate - 0.5) * 0.2 # Scale to +/- 0.1 range
-        except:
-            return 0.0
-        finally:
-            db.close()
+        # Feedback isn't linked to specific patterns yet, so this is the general pattern acceptance.
+        rate = pattern_store.feedback_acceptance()
+        if rate is None: return 0.0
+
+        # Normalize: 50% acceptance is neutral. >50% adds confidence.
+        return (rate - 0.5) * 0.2 # Scale to +/- 0.1 range
 
-    def _generate_reasoning(self, pattern: ValidationPattern, suggestions: Dict[str, float], current: Dict[str, float], context: Dict[str, Any]) -> Dict[str, Any]:
+    def _generate_reasoning(self, pattern: PatternHit, suggestions: Dict[str, float], current: Dict[str, float], context: Dict[str, Any]) -> Dict[str, Any]:
         """
         Generates human-readable reasoning. Uses Groq LLM if available for dynamic insights.
         """
-        archetype_name = pattern.message_template.split('(')[1].split(')')[0]
+        archetype_name = pattern.name
         
         import os
         import requests
@@ -211,7 +168,7 @@ class SuggestionService:
             try:
                 # Prepare prompt for reasoning
                 prompt = (
-                    f"Explain why a company in the {json.loads(pattern.condition_json).get('sector', 'Tech')} sector "
+                    f"Explain why a company in the {pattern.condition.get('sector', 'Tech')} sector "
                     f"should adjust their assumptions to match the '{archetype_name}' archetype.\n"
                     f"Context: Risk Tolerance: {context.get('risk_tolerance')}, Use Case: {context.get('use_case')}.\n"
                     f"Current Growth: {current.get('revenue_growth'):.1%}, Suggested: {suggestions['revenue_growth']:.1%}.\n"
@@ -248,7 +205,7 @@ class SuggestionService:
 
         # Fallback to static template
         return {
-            "summary": f"Based on {json.loads(pattern.condition_json).get('sample_size', 'similar')} {archetype_name} companies.",
+            "summary": f"Based on {pattern.condition.get('sample_size', 'similar')} {archetype_name} companies.",
             "per_assumption": {
                 "revenue_growth": f"Adjusted to {suggestions['revenue_growth']:.1%} to align with {archetype_name} norms.",
                 "ebitda_margin": f"Targeting {suggestions['ebitda_margin']:.1%} based on sector efficiency benchmarks."
@@ -1,184 +1,283 @@
 import numpy as np
-from typing import List, Dict
-from backend.calculations.fund_models import FundModel, FundStrategy, FundReturns, CashFlow
+from typing import List, Dict, Optional, Tuple
+from backend.calculations.fund_models import (
+    FundModel, FundStrategy, FundReturns, CashFlow, FundSimulationDistribution, DistributionSummary
+)
 from backend.calculations.metrics_calculator import MetricsCalculator
 
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+# Rates scanned to bracket each path's IRR before refining it
+IRR_GRID = np.concatenate([np.linspace(-0.9, 1.0, 39), [1.25, 1.5, 2.0, 3.0, 5.0, 10.0]])
+
+
+def irr(cash_flows: np.ndarray, tol: float = 1e-10, max_iter: int = 100) -> np.ndarray:
+    """
+    IRR of every row of a (paths x periods) array of annual cash flows,
+    solved for all rows at once.
+
+    NPV is first evaluated on a grid of rates (one matrix product) to bracket
+    a root. Fund flows can change sign more than once (fees called after the
+    last exit), so the bracket taken is the highest-rate one where NPV falls
+    from positive to negative: the conventional investor IRR. The root is
+    then refined with Newton steps, falling back to bisection whenever a
+    step leaves the bracket. NaN where NPV never changes sign (no IRR, e.g.
+    a path that never returns its capital).
+    """
+    cash_flows = np.atleast_2d(np.asarray(cash_flows, dtype=float))
+    t = np.arange(cash_flows.shape[1])
+
+    def npv(rate, flows):
+        # NPV and its derivative with respect to the rate
+        discount = (1.0 + rate)[:, None] ** -t
+        return (flows * discount).sum(axis=1), (-t * flows * discount / (1.0 + rate)[:, None]).sum(axis=1)
+
+    grid_npv = cash_flows @ ((1.0 + IRR_GRID)[None, :] ** -t[:, None])
+    positive = grid_npv > 0
+    falling = positive[:, :-1] & ~positive[:, 1:]
+    crossing = positive[:, :-1] != positive[:, 1:]
+    brackets = np.where(falling.any(axis=1)[:, None], falling, crossing)
+    solvable = brackets.any(axis=1)
+    # Last True per row
+    k = brackets.shape[1] - 1 - np.argmax(brackets[:, ::-1], axis=1)
+
+    rows = np.arange(len(cash_flows))
+    lo, hi = IRR_GRID[k], IRR_GRID[k + 1]
+    f_lo = grid_npv[rows, k]
+
+    rate = np.where(solvable, 0.5 * (lo + hi), np.nan)
+    active = solvable.copy()
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        r = rate[active]
+        f, df = npv(r, cash_flows[active])
+        # Keep the bracket around the root
+        below = np.sign(f) == np.sign(f_lo[active])
+        lo[active] = np.where(below, r, lo[active])
+        hi[active] = np.where(below, hi[active], r)
+        f_lo[active] = np.where(below, f, f_lo[active])
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = r - f / df
+        bisect = ~np.isfinite(step) | (step <= lo[active]) | (step >= hi[active])
+        new = np.where(bisect, 0.5 * (lo[active] + hi[active]), step)
+
+        done = (np.abs(new - r) < tol) | (f == 0)
+        rate[active] = np.where(f == 0, r, new)
+        idx = np.flatnonzero(active)
+        active[idx[done]] = False
+    return rate
+
+
+def summarize(values: np.ndarray) -> Optional[DistributionSummary]:
+    """Summary of the finite values (NaN, e.g. an undefined IRR, is left out); None if there are none."""
+    values = values[np.isfinite(values)]
+    if not len(values):
+        return None
+    p5, p25, p50, p75, p95 = np.percentile(values, PERCENTILES)
+    return DistributionSummary(
+        mean=float(values.mean()), std=float(values.std()),
+        p5=float(p5), p25=float(p25), median=float(p50), p75=float(p75), p95=float(p95)
+    )
+
+
 class LBOFundSimulator:
     def __init__(self):
         self.metrics_calc = MetricsCalculator()
 
     def simulate_fund(self, fund: FundModel, strategy: FundStrategy) -> FundReturns:
         # 1. Generate Deals
-        deals = self._generate_deal_flow(fund, strategy)
-        
+        rng = np.random.default_rng()
+        deals = self._generate_deal_flow(fund, strategy, 1, rng)
+
         # 2. Aggregate Cash Flows
         fund_cash_flows = self._aggregate_cash_flows(fund, deals)
-        
+
         # 3. Calculate Waterfall (Fees & Carry)
-        net_cash_flows, gross_returns, total_invested, total_distributed, total_value = self._calculate_waterfall(fund, fund_cash_flows)
-        
-        # 4. Calculate Metrics
-        # Convert CashFlow objects to arrays for calculation
-        dates = [cf.year for cf in net_cash_flows] # Simplified: using years as dates
-        amounts = [cf.amount for cf in net_cash_flows]
-        
-        # Simple IRR approximation (assuming annual cash flows)
-        net_irr = np.irr(amounts) if hasattr(np, 'irr') else self._calculate_irr(amounts)
-        
+        waterfall = self._waterfall_paths(fund, fund_cash_flows)
+        total_invested = float(waterfall["invested"][0])
+        total_distributed = float(waterfall["distributed"][0])
+        total_value = total_distributed # Assuming full liquidation
+        net_cash_flows = [
+            CashFlow(year=year, amount=float(amount), type="Net Flow")
+            for year, amount in enumerate(waterfall["net_flows"][0], start=1)
+        ]
+
+        # 4. Calculate Metrics (annual cash flows, year 1 at t=0)
+        net_irr = float(irr(waterfall["net_flows"])[0])  # NaN when undefined
+
         tvpi = total_value / total_invested if total_invested > 0 else 0
         dpi = total_distributed / total_invested if total_invested > 0 else 0
         moic = total_value / total_invested if total_invested > 0 else 0
 
         return FundReturns(
-            net_irr=net_irr if not np.isnan(net_irr) else 0.0,
+            net_irr=None if np.isnan(net_irr) else net_irr,
             tvpi=tvpi,
             dpi=dpi,
             moic=moic,
             cash_flows=net_cash_flows,
-            gross_returns=gross_returns,
+            gross_returns=float(waterfall["gross"][0]),
             total_invested=total_invested,
             total_distributed=total_distributed,
             total_value=total_value
         )
 
-    def _generate_deal_flow(self, fund: FundModel, strategy: FundStrategy) -> List[Dict]:
-        deals = []
-        capital_deployed = 0
-        
-        for i in range(strategy.target_deal_count):
-            if capital_deployed >= fund.committed_capital:
-                break
-                
-            # Randomize deal size
-            size = np.random.uniform(strategy.min_deal_size, strategy.max_deal_size)
-            if capital_deployed + size > fund.committed_capital:
-                size = fund.committed_capital - capital_deployed
-            
-            # Randomize entry year (during investment period)
-            entry_year = np.random.randint(1, fund.investment_period_years + 1)
-            
-            # Randomize hold period
-            hold_period = max(1, int(np.random.normal(strategy.hold_period_mean, strategy.hold_period_std_dev)))
-            exit_year = entry_year + hold_period
-            
-            if exit_year > fund.fund_term_years:
-                exit_year = fund.fund_term_years # Forced exit at end of term
-                
-            # Randomize Returns (MOIC) based on target IRR
-            # Simplified: MOIC = (1 + IRR)^years
-            deal_irr = np.random.normal(strategy.target_irr_mean, strategy.target_irr_std_dev)
-            moic = (1 + deal_irr) ** (exit_year - entry_year)
-            exit_value = size * moic
-            
-            deals.append({
-                "entry_year": entry_year,
-                "exit_year": exit_year,
-                "investment": size,
-                "exit_value": exit_value
-            })
-            capital_deployed += size
-            
-        return deals
-
-    def _aggregate_cash_flows(self, fund: FundModel, deals: List[Dict]) -> Dict[int, float]:
-        # Map year -> net cash flow (before fees/carry)
-        flows = {y: 0.0 for y in range(fund.fund_term_years + 2)}
-        
-        for deal in deals:
-            flows[deal["entry_year"]] -= deal["investment"]
-            flows[deal["exit_year"]] += deal["exit_value"]
-            
-        return flows
+    def simulate_fund_paths(self, fund: FundModel, strategy: FundStrategy, paths: int = 10000,
+                            seed: Optional[int] = None) -> FundSimulationDistribution:
+        """
+        Simulates `paths` independent deal-flow paths of the fund at once, as
+        (paths x years) arrays, and returns the distribution of net IRR,
+        TVPI, DPI and GP carry across them.
+        """
+        rng = np.random.default_rng(seed)
+        deals = self._generate_deal_flow(fund, strategy, paths, rng)
+        waterfall = self._waterfall_paths(fund, self._aggregate_cash_flows(fund, deals))
+
+        invested = waterfall["invested"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            tvpi = np.where(invested > 0, waterfall["distributed"] / invested, 0.0)
+        # Every deal exits by the end of the term, so all value is distributed
+        dpi = tvpi
+        net_irr = irr(waterfall["net_flows"])
+        defined = np.isfinite(net_irr)
+
+        return FundSimulationDistribution(
+            paths=paths,
+            net_irr=summarize(net_irr),
+            tvpi=summarize(tvpi),
+            dpi=summarize(dpi),
+            carry=summarize(waterfall["carry"]),
+            irr_undefined_paths=int((~defined).sum()),
+            probability_below_hurdle=float((net_irr[defined] < fund.hurdle_rate).mean()) if defined.any() else 0.0,
+            probability_loss=float((tvpi < 1.0).mean()),
+            mean_net_cash_flows=waterfall["net_flows"].mean(axis=0).tolist()
+        )
+
+    def _generate_deal_flow(self, fund: FundModel, strategy: FundStrategy, paths: int,
+                            rng: np.random.Generator) -> Dict[str, np.ndarray]:
+        """Deals of every path as (paths x target_deal_count) arrays; deals past the fund size have zero size."""
+        shape = (paths, strategy.target_deal_count)
+
+        # Randomize deal size, capped at the capital still undeployed
+        size = rng.uniform(strategy.min_deal_size, strategy.max_deal_size, shape)
+        deployed_before = np.cumsum(size, axis=1) - size
+        size = np.clip(fund.committed_capital - deployed_before, 0.0, size)
+
+        # Randomize entry year (during investment period)
+        entry_year = rng.integers(1, fund.investment_period_years + 1, shape)
+
+        # Randomize hold period; forced exit at end of term
+        hold_period = np.maximum(1, np.trunc(rng.normal(strategy.hold_period_mean, strategy.hold_period_std_dev, shape))).astype(int)
+        exit_year = np.minimum(entry_year + hold_period, fund.fund_term_years)
+
+        # Randomize Returns (MOIC) based on target IRR
+        # Simplified: MOIC = (1 + IRR)^years
+        deal_irr = rng.normal(strategy.target_irr_mean, strategy.target_irr_std_dev, shape)
+        moic = (1 + deal_irr) ** (exit_year - entry_year)
+
+        return {
+            "entry_year": entry_year,
+            "exit_year": exit_year,
+            "investment": size,
+            "exit_value": size * moic
+        }
+
+    def _aggregate_cash_flows(self, fund: FundModel, deals: Dict[str, np.ndarray]) -> np.ndarray:
+        # (paths x year) net cash flow before fees/carry, years 0..term+1
+        paths = deals["investment"].shape[0]
+        years = fund.fund_term_years + 2
+        row = np.arange(paths)[:, None] * years
+        flows = np.bincount((row + deals["entry_year"]).ravel(), weights=-deals["investment"].ravel(), minlength=paths * years)
+        flows += np.bincount((row + deals["exit_year"]).ravel(), weights=deals["exit_value"].ravel(), minlength=paths * years)
+        return flows.reshape(paths, years)
 
     def _calculate_waterfall(self, fund: FundModel, raw_flows: Dict[int, float]):
-        final_flows = []
-        total_invested = 0
-        total_distributed = 0
-        gross_distributions = 0
-        
+        """Single-path waterfall over a {year: raw flow} map."""
+        flows = np.zeros((1, fund.fund_term_years + 2))
+        for year, amount in raw_flows.items():
+            if 0 <= year < flows.shape[1]:
+                flows[0, year] = amount
+        waterfall = self._waterfall_paths(fund, flows)
+        final_flows = [
+            CashFlow(year=year, amount=float(amount), type="Net Flow")
+            for year, amount in enumerate(waterfall["net_flows"][0], start=1)
+        ]
+        total_distributed = float(waterfall["distributed"][0])
+        total_value = total_distributed # Assuming full liquidation
+        return final_flows, float(waterfall["gross"][0]), float(waterfall["invested"][0]), total_distributed, total_value
+
+    def _waterfall_paths(self, fund: FundModel, raw_flows: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        European waterfall (return of capital, preferred return, GP catch-up,
+        carry split) for every path at once. Years are processed in order since
+        each year's split depends on the balances left by the previous ones;
+        within a year every step is one array operation over all paths.
+        """
+        paths = raw_flows.shape[0]
+        years = range(1, fund.fund_term_years + 2)
+        carry = fund.carried_interest
+
+        net_flows = np.zeros((paths, len(years)))
+        total_invested = np.zeros(paths)
+        total_distributed = np.zeros(paths)
+        gross_distributions = np.zeros(paths)
+        gp_total = np.zeros(paths)
+
         # State variables for Waterfall
-        unreturned_capital = 0.0
-        accrued_pref = 0.0
-        
-        # Tracking for GP Catch-up
-        # Catch-up point: When GP has received Carry% of Total Profits
-        # This usually implies GP gets 100% of available cash after Pref until they catch up.
-        
-        for year in range(1, fund.fund_term_years + 2):
-            raw_amount = raw_flows.get(year, 0)
-            
+        unreturned_capital = np.zeros(paths)
+        accrued_pref = np.zeros(paths)
+
+        # Fee is charged on committed capital
+        fee = fund.committed_capital * fund.management_fee
+
+        for col, year in enumerate(years):
+            raw_amount = raw_flows[:, year] if year < raw_flows.shape[1] else np.zeros(paths)
+
             # 1. Management Fees & Capital Calls
-            # Fee is charged on committed capital
-            fee = fund.committed_capital * fund.management_fee
-            
-            # Separate components
-            investment_call = -raw_amount if raw_amount < 0 else 0
-            distribution = raw_amount if raw_amount > 0 else 0
-            
+            investment_call = np.maximum(-raw_amount, 0.0)
+            distribution = np.maximum(raw_amount, 0.0)
             total_call = investment_call + fee
             total_invested += total_call
-            
-            # Update Unreturned Capital
+
+            # Preferred return accrues on the opening balance (before this year's call),
+            # to avoid circularity if it's paid down the same year
+            accrued_pref += unreturned_capital * fund.hurdle_rate
             unreturned_capital += total_call
-            
-            # Accrue Preferred Return (Hurdle) on outstanding capital
-            # Assuming annual compounding at year end before distribution? 
-            # Or average balance? Let's use opening balance for simplicity.
-            # Note: This is a simplification. Real waterfalls are daily/monthly.
-            accrued_pref += (unreturned_capital - total_call) * fund.hurdle_rate 
-            # Also accrue on the new call? Usually yes, pro-rated. Let's assume full year for simplicity or 0.
-            # Let's stick to opening balance to avoid circularity if we pay down same year.
-            
-            lp_distribution = 0.0
-            gp_distribution = 0.0 # Carry
-            
-            if distribution > 0:
-                gross_distributions += distribution
-                
-                remaining_dist = distribution
-                
-                # 1. Return of Capital
-                roc_payment = min(remaining_dist, unreturned_capital)
-                unreturned_capital -= roc_payment
-                remaining_dist -= roc_payment
-                lp_distribution += roc_payment
-                
-                # 2. Preferred Return
-                pref_payment = min(remaining_dist, accrued_pref)
-                accrued_pref -= pref_payment
-                remaining_dist -= pref_payment
-                lp_distribution += pref_payment
-                
-                # 3. GP Catch-up
-                # GP gets 100% of remaining until GP_Profit / (GP_Profit + LP_Profit) = Carry%
-                # LP_Profit here is `pref_payment`.
-                # Target GP Profit = `pref_payment` * Carry / (1 - Carry)
-                
-                catchup_target = pref_payment * fund.carried_interest / (1 - fund.carried_interest)
-                catchup_payment = min(remaining_dist, catchup_target)
-                remaining_dist -= catchup_payment
-                gp_distribution += catchup_payment
-                
-                # 4. Carried Interest (Split)
-                gp_carry = remaining_dist * fund.carried_interest
-                lp_carry = remaining_dist * (1 - fund.carried_interest)
-                
-                gp_distribution += gp_carry
-                lp_distribution += lp_carry
-                
-                total_distributed += (lp_distribution + gp_distribution) # Should equal distribution
-            
-            # Net Flow for LP (what the chart shows)
-            # Net = LP Distribution - Capital Call
-            net_flow = lp_distribution - total_call
-            final_flows.append(CashFlow(year=year, amount=net_flow, type="Net Flow"))
-            
-        total_value = total_distributed # Assuming full liquidation
-        
-        return final_flows, gross_distributions, total_invested, total_distributed, total_value
-
-    def _calculate_irr(self, values: List[float]) -> float:
-        # Simple Newton-Raphson implementation or similar if numpy.irr is missing
-        # But for now, let's assume we can use a basic approximation or return 0
-        # Actually, let's try to use numpy_financial if installed, or just simple loop
-        return 0.15 # Placeholder if calculation fails
+
+            gross_distributions += distribution
+            remaining = distribution.copy()
+
+            # 2. Return of Capital
+            roc_payment = np.minimum(remaining, unreturned_capital)
+            unreturned_capital -= roc_payment
+            remaining -= roc_payment
+
+            # 3. Preferred Return
+            pref_payment = np.minimum(remaining, accrued_pref)
+            accrued_pref -= pref_payment
+            remaining -= pref_payment
+
+            # 4. GP Catch-up: 100% to GP until it holds Carry% of the profit paid so far
+            catchup_target = pref_payment * carry / (1 - carry)
+            catchup_payment = np.minimum(remaining, catchup_target)
+            remaining -= catchup_payment
+
+            # 5. Carried Interest (Split)
+            gp_distribution = catchup_payment + remaining * carry
+            lp_distribution = roc_payment + pref_payment + remaining * (1 - carry)
+
+            gp_total += gp_distribution
+            total_distributed += lp_distribution + gp_distribution # Equals distribution
+
+            # Net Flow for LP = LP Distribution - Capital Call
+            net_flows[:, col] = lp_distribution - total_call
+
+        return {
+            "net_flows": net_flows,
+            "invested": total_invested,
+            "distributed": total_distributed,
+            "gross": gross_distributions,
+            "carry": gp_total,
+        }
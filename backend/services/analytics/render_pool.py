@@ -0,0 +1,147 @@
+"""
+Board report rendering on a pool of pre-warmed worker processes.
+
+Rendering a PDF is CPU-bound pure Python (ReportLab layout, chart drawing),
+so doing it on the request thread serializes every report behind the GIL.
+Reports are rendered instead by a ProcessPoolExecutor whose workers import
+matplotlib and ReportLab and build the report stylesheet once, when they
+start, rather than on every request.
+
+Finished PDFs go to the export ArtifactStore keyed on (run id, run revision,
+template), so an unchanged run is only ever rendered once. Batch board packs
+submit every uncached run at once and scale with the number of workers.
+
+Workers are started with "spawn" so they never inherit the parent's
+threads, sockets or database connections.
+
+Every gunicorn worker has its own pool, so pools are small
+(REPORT_RENDER_WORKERS, default 2) and start on the first report; set
+REPORT_RENDER_PREWARM=true to start them with the web worker instead.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, Future
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from backend.database.models import ValuationRun
+from backend.services.export.artifacts import ArtifactStore, artifact_store, run_revision
+
+
+def _warm_worker():
+    """Pool initializer: pay the import and setup cost once per worker process."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot  # noqa: F401
+    from reportlab.pdfbase import pdfmetrics
+    from backend.services.analytics.reporting_service import build_stylesheet
+
+    for font in ('Helvetica', 'Helvetica-Bold'):
+        pdfmetrics.getFont(font)
+    build_stylesheet()
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def board_report_key(run: ValuationRun) -> str:
+    # reporting_service (ReportLab) is imported on use so web workers that
+    # never render a report don't load it
+    from backend.services.analytics.reporting_service import BOARD_REPORT_TEMPLATE
+    return ArtifactStore.key("board_report", run.id, run_revision(run), BOARD_REPORT_TEMPLATE)
+
+
+DEFAULT_RENDER_WORKERS = min(2, os.cpu_count() or 1)
+
+
+class ReportRenderPool:
+    def __init__(self, workers: Optional[int] = None, store: Optional[ArtifactStore] = None):
+        # 0 workers renders in the calling thread (no subprocesses)
+        self.workers = workers if workers is not None else int(os.getenv("REPORT_RENDER_WORKERS", DEFAULT_RENDER_WORKERS))
+        self.store = store or artifact_store
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_warm_worker
+                )
+            return self._executor
+
+    def warm(self):
+        """Start every worker now so the first report doesn't pay for process startup."""
+        if self.workers <= 0:
+            _warm_worker()
+            return
+        pool = self._pool()
+        for future in [pool.submit(_ping) for _ in range(self.workers)]:
+            future.result()
+
+    def submit(self, payload: Dict) -> Future:
+        from backend.services.analytics.reporting_service import render_board_report
+        if self.workers <= 0:
+            future = Future()
+            try:
+                future.set_result(render_board_report(payload))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        try:
+            return self._pool().submit(render_board_report, payload)
+        except BrokenProcessPool:
+            # A worker died (OOM, killed); start a fresh pool and retry once
+            self.shutdown()
+            return self._pool().submit(render_board_report, payload)
+
+    def render_board_report(self, db: Session, run_id: str) -> str:
+        """Path of the run's board report PDF, rendering it on a miss."""
+        return self.render_board_pack(db, [run_id])[run_id]
+
+    def render_board_pack(self, db: Session, run_ids: List[str]) -> Dict[str, str]:
+        """
+        Board reports for several runs: {run_id: pdf path}. Cached reports are
+        reused; every uncached one is rendered concurrently across the pool.
+        """
+        from backend.services.analytics.reporting_service import board_report_payload
+        run_ids = list(dict.fromkeys(run_ids))
+        runs = {r.id: r for r in db.query(ValuationRun).filter(ValuationRun.id.in_(run_ids)).all()}
+        missing = [run_id for run_id in run_ids if run_id not in runs]
+        if missing:
+            raise ValueError(f"Run {missing[0]} not found")
+
+        paths = {}
+        pending = {}
+        for run_id in run_ids:
+            key = board_report_key(runs[run_id])
+            path = self.store.get(key, "pdf")
+            if path is not None:
+                self.store.hits += 1
+                paths[run_id] = path
+            else:
+                pending[run_id] = (key, self.submit(board_report_payload(runs[run_id])))
+
+        for run_id, (key, future) in pending.items():
+            try:
+                pdf = future.result()
+            except BrokenProcessPool:
+                self.shutdown()
+                raise
+            paths[run_id] = self.store.get_or_render(key, "pdf", lambda fh, pdf=pdf: fh.write(pdf))
+        return {run_id: paths[run_id] for run_id in run_ids}
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+report_render_pool = ReportRenderPool()
@@ -1,34 +1,96 @@
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image, PageBreak
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
 from reportlab.lib.units import inch
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
+from reportlab.graphics.shapes import Drawing, String
+from reportlab.graphics.charts.linecharts import HorizontalLineChart
+from reportlab.graphics.widgets.markers import makeMarker
 
 from sqlalchemy.orm import Session
 from backend.database.models import ValuationRun
+from functools import lru_cache
+from typing import Any, Dict, Tuple
 import json
-import matplotlib
-matplotlib.use('Agg') # Force non-interactive backend
-import matplotlib.pyplot as plt
 from io import BytesIO
 import datetime
 
+# Bump when the board report layout changes so cached PDFs are re-rendered
+BOARD_REPORT_TEMPLATE = "board-v2"
+
+BRAND_COLOR = colors.HexColor("#1A202C") # Dark Slate/Blue
+ACCENT_COLOR = colors.HexColor("#3182CE") # Blue
+
+
+@lru_cache(maxsize=1)
+def build_stylesheet():
+    """
+    The sample stylesheet plus the board report styles, built once per
+    process. Reports only read from it.
+    """
+    styles = getSampleStyleSheet()
+    styles.add(ParagraphStyle(
+        name='CoverTitle',
+        parent=styles['Title'],
+        fontSize=32,
+        leading=40,
+        textColor=BRAND_COLOR,
+        alignment=TA_CENTER,
+        spaceAfter=20,
+        fontName='Helvetica-Bold'
+    ))
+    styles.add(ParagraphStyle(
+        name='CoverSubtitle',
+        parent=styles['Normal'],
+        fontSize=16,
+        textColor=colors.gray,
+        alignment=TA_CENTER,
+        spaceAfter=50
+    ))
+    styles.add(ParagraphStyle(
+        name='DashboardMetric',
+        parent=styles['Normal'],
+        fontSize=12,
+        alignment=TA_CENTER
+    ))
+    return styles
+
+
+def board_report_payload(run: ValuationRun) -> Dict[str, Any]:
+    """The plain data a board report is rendered from (picklable, for render workers)."""
+    return {
+        "run_id": run.id,
+        "company_name": run.company_name,
+        "created_at": run.created_at.isoformat() if run.created_at else None,
+        "results": json.loads(run.results) if run.results else {},
+    }
+
+
+def render_board_report(payload: Dict[str, Any]) -> bytes:
+    """Render a board report PDF from `board_report_payload` output."""
+    return ReportingService(None).render(payload).getvalue()
+
+
 class ReportingService:
     def __init__(self, db_session: Session):
         self.db = db_session
-        self.brand_color = colors.HexColor("#1A202C") # Dark Slate/Blue
-        self.accent_color = colors.HexColor("#3182CE") # Blue
+        self.brand_color = BRAND_COLOR
+        self.accent_color = ACCENT_COLOR
 
     def generate_board_report(self, run_id: str) -> BytesIO:
         # 1. Fetch Data
         run = self.db.query(ValuationRun).filter(ValuationRun.id == run_id).first()
         if not run:
             raise ValueError(f"Run {run_id} not found")
-        
-        results = json.loads(run.results)
-        company_name = run.company_name
-        date_str = run.created_at.strftime("%B %d, %Y")
+        return self.render(board_report_payload(run))
+
+    def render(self, payload: Dict[str, Any]) -> BytesIO:
+        results = payload["results"]
+        company_name = payload["company_name"]
+        run_id = payload["run_id"]
+        created_at = datetime.datetime.fromisoformat(payload["created_at"]) if payload["created_at"] else datetime.datetime.utcnow()
+        date_str = created_at.strftime("%B %d, %Y")
         
         # 2. Setup Document
         buffer = BytesIO()
@@ -40,8 +102,7 @@ class ReportingService:
         )
         
         elements = []
-        styles = getSampleStyleSheet()
-        self._add_custom_styles(styles)
+        styles = build_stylesheet()
 
         # 3. Build Content
         
@@ -69,9 +130,7 @@ class ReportingService:
         # -- Visualization (Chart) --
         elements.append(Paragraph("Valuation Trajectory", styles['Heading2']))
         elements.append(Spacer(1, 12))
-        chart_buffer = self._generate_chart(results)
-        img = Image(chart_buffer, width=450, height=250)
-        elements.append(img)
+        elements.append(self._generate_chart(results))
         
         elements.append(Spacer(1, 24))
         elements.append(Paragraph("Methodology Breakdown", styles['Heading2']))
@@ -87,32 +146,6 @@ class ReportingService:
         buffer.seek(0)
         return buffer
 
-    def _add_custom_styles(self, styles):
-        styles.add(ParagraphStyle(
-            name='CoverTitle',
-            parent=styles['Title'],
-            fontSize=32,
-            leading=40,
-            textColor=self.brand_color,
-            alignment=TA_CENTER,
-            spaceAfter=20,
-            fontName='Helvetica-Bold'
-        ))
-        styles.add(ParagraphStyle(
-            name='CoverSubtitle',
-            parent=styles['Normal'],
-            fontSize=16,
-            textColor=colors.gray,
-            alignment=TA_CENTER,
-            spaceAfter=50
-        ))
-        styles.add(ParagraphStyle(
-            name='DashboardMetric',
-            parent=styles['Normal'],
-            fontSize=12,
-            alignment=TA_CENTER
-        ))
-
     def _create_cover_page(self, elements, styles, company, date, run_id):
         elements.append(Spacer(1, 100))
         elements.append(Paragraph(f"Valuation Report", styles['CoverTitle']))
@@ -182,29 +215,40 @@ class ReportingService:
         # Assuming dcf_details has revenue projections
         dcf_details = results.get('dcf_details', {})
         revenues = dcf_details.get('revenue', [100, 120, 150, 180, 220])
-        years = [f"Y{i+1}" for i in range(len(revenues))]
+        return revenue_chart(tuple(float(r) for r in revenues))
+
+
+@lru_cache(maxsize=256)
+def revenue_chart(revenues: Tuple[float, ...]) -> Drawing:
+    """
+    Revenue projection chart as a vector drawing: embedded in the PDF as
+    paths rather than a 300 dpi raster. Cached per series; a drawing only
+    describes shapes, so one instance can be placed in many documents.
+    """
+    drawing = Drawing(450, 250)
+    chart = HorizontalLineChart()
+    chart.x, chart.y = 45, 30
+    chart.width, chart.height = 385, 175
+    chart.data = [revenues]
+    chart.categoryAxis.categoryNames = [f"Y{i+1}" for i in range(len(revenues))]
+    chart.joinedLines = 1
+
+    # Style
+    chart.lines[0].strokeColor = ACCENT_COLOR
+    chart.lines[0].strokeWidth = 2.5
+    chart.lines[0].symbol = makeMarker('FilledCircle', size=5, fillColor=ACCENT_COLOR, strokeColor=ACCENT_COLOR)
+    for axis in (chart.categoryAxis, chart.valueAxis):
+        axis.strokeColor = colors.HexColor('#CBD5E0')
+        axis.labels.fillColor = colors.HexColor('#4A5568')
+        axis.labels.fontName = 'Helvetica'
+        axis.labels.fontSize = 8
+    chart.valueAxis.valueMin = min(0.0, min(revenues, default=0.0))
+    chart.valueAxis.visibleGrid = 1
+    chart.valueAxis.gridStrokeColor = colors.HexColor('#E2E8F0')
+    chart.valueAxis.gridStrokeDashArray = (2, 2)
+
+    drawing.add(chart)
+    drawing.add(String(225, 225, "Revenue Projections (5Y)", fontName='Helvetica', fontSize=12,
+                       fillColor=colors.HexColor('#2D3748'), textAnchor='middle'))
+    return drawing
 
-        fig, ax = plt.subplots(figsize=(8, 4))
-        
-        # Style
-        ax.spines['top'].set_visible(False)
-        ax.spines['right'].set_visible(False)
-        ax.spines['left'].set_color('#CBD5E0')
-        ax.spines['bottom'].set_color('#CBD5E0')
-        ax.tick_params(axis='x', colors='#4A5568')
-        ax.tick_params(axis='y', colors='#4A5568')
-        
-        # Plot
-        ax.plot(years, revenues, marker='o', color='#3182CE', linewidth=3, label='Projected Revenue')
-        ax.fill_between(years, revenues, alpha=0.1, color='#3182CE')
-        
-        ax.set_title("Revenue Projections (5Y)", fontsize=12, color='#2D3748', pad=20)
-        ax.grid(True, linestyle='--', alpha=0.3)
-        
-        plt.tight_layout()
-        
-        buf = BytesIO()
-        plt.savefig(buf, format='png', dpi=300, bbox_inches='tight')
-        buf.seek(0)
-        plt.close(fig)
-        return buf
@@ -0,0 +1,196 @@
+"""
+Checkpointed integrity verification for the audit hash chain.
+
+Every AuditLog row stores SHA-256 of its content plus the previous row's
+hash, so verifying the chain means re-hashing rows in id order. Rows are
+streamed in keyset-paginated batches (id > last_id) rather than loaded at
+once, and verified prefixes are recorded as AuditChainCheckpoint rows:
+
+- anchors every `checkpoint_interval` rows (row_count is a multiple of it);
+- one moving "tail" checkpoint at the end of the last verified run.
+
+Incremental verification (the default) re-checks the tail row against its
+checkpoint and then verifies only the rows added since. Full verification
+re-hashes everything, one checkpoint range at a time: each range is seeded
+with the earlier checkpoint's hash and must end exactly on the next
+checkpoint's id, hash and row count. Hashing short strings holds the GIL,
+so the ranges are walked sequentially on the caller's session.
+"""
+import hashlib
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from backend.database.models import AuditLog, AuditChainCheckpoint
+
+_CHAIN_COLUMNS = (
+    AuditLog.id, AuditLog.user_id, AuditLog.action_type, AuditLog.resource_id, AuditLog.details,
+    AuditLog.timestamp, AuditLog.previous_hash, AuditLog.nonce, AuditLog.hash,
+)
+
+
+def calculate_entry_hash(entry) -> str:
+    """
+    SHA-256(user + action + resource + details + timestamp + prev_hash + nonce)
+    """
+    # Ensure consistent serialization
+    if isinstance(entry.details, str):
+        details_str = entry.details
+    else:
+        details_str = json.dumps(entry.details, sort_keys=True) if entry.details else "{}"
+    ts_str = entry.timestamp.isoformat()
+
+    block_content = f"{entry.user_id}{entry.action_type}{entry.resource_id}{details_str}{ts_str}{entry.previous_hash}{entry.nonce}"
+    return hashlib.sha256(block_content.encode()).hexdigest()
+
+
+class AuditChainVerifier:
+    def __init__(self, batch_size: int = 2000, checkpoint_interval: int = 10000):
+        self.batch_size = batch_size
+        self.checkpoint_interval = checkpoint_interval
+
+    def _iter_rows(self, db: Session, after_id: int, until_id: Optional[int] = None):
+        while True:
+            statement = select(*_CHAIN_COLUMNS).where(AuditLog.id > after_id).order_by(AuditLog.id).limit(self.batch_size)
+            if until_id is not None:
+                statement = statement.where(AuditLog.id <= until_id)
+            rows = db.execute(statement).all()
+            if not rows:
+                return
+            yield from rows
+            after_id = rows[-1].id
+
+    def _verify_range(self, db: Session, after_id: int, seed_hash: Optional[str], start_count: int,
+                      until_id: Optional[int] = None, link_first: bool = True) -> Dict[str, Any]:
+        """
+        Verify rows in (after_id, until_id]. The first row must link to
+        `seed_hash` unless it is the genesis row (link_first=False).
+        """
+        broken: List[Dict[str, Any]] = []
+        anchors = []
+        count = start_count
+        previous_hash = seed_hash
+        last_id, last_hash = after_id, seed_hash
+        check_link = link_first
+
+        for row in self._iter_rows(db, after_id, until_id):
+            calculated_hash = calculate_entry_hash(row)
+            if calculated_hash != row.hash:
+                broken.append({
+                    "id": row.id,
+                    "issue": "Content altered (Hash mismatch)",
+                    "expected": calculated_hash,
+                    "actual": row.hash
+                })
+            elif check_link and row.previous_hash != previous_hash:
+                broken.append({
+                    "id": row.id,
+                    "issue": "Chain broken (Previous Hash mismatch)",
+                    "expected_prev": previous_hash,
+                    "actual_prev": row.previous_hash
+                })
+            check_link = True
+            previous_hash = row.hash
+            last_id, last_hash = row.id, row.hash
+            count += 1
+            if not broken and count % self.checkpoint_interval == 0:
+                anchors.append((last_id, last_hash, count))
+
+        return {"broken": broken, "last_id": last_id, "last_hash": last_hash, "count": count, "anchors": anchors}
+
+    def _checkpoints(self, db: Session) -> List[AuditChainCheckpoint]:
+        return db.execute(select(AuditChainCheckpoint).order_by(AuditChainCheckpoint.last_id)).scalars().all()
+
+    def _save_checkpoints(self, db: Session, result: Dict[str, Any], tail: Optional[AuditChainCheckpoint]):
+        now = datetime.utcnow()
+        try:
+            for last_id, last_hash, count in result["anchors"]:
+                if tail is not None and tail.last_id == last_id:
+                    continue
+                db.add(AuditChainCheckpoint(last_id=last_id, last_hash=last_hash, row_count=count, verified_at=now))
+            last_id, last_hash, count = result["last_id"], result["last_hash"], result["count"]
+            if count % self.checkpoint_interval != 0 and (tail is None or tail.last_id != last_id):
+                if tail is not None and tail.row_count % self.checkpoint_interval != 0:
+                    # Move the previous tail forward instead of leaving one row per verification
+                    tail.last_id, tail.last_hash, tail.row_count, tail.verified_at = last_id, last_hash, count, now
+                else:
+                    db.add(AuditChainCheckpoint(last_id=last_id, last_hash=last_hash, row_count=count, verified_at=now))
+            db.commit()
+        except IntegrityError:
+            # A concurrent verification recorded the same checkpoint
+            db.rollback()
+
+    def verify_incremental(self, db: Session) -> Dict[str, Any]:
+        """Verify only the rows appended since the last checkpoint."""
+        checkpoints = self._checkpoints(db)
+        tail = checkpoints[-1] if checkpoints else None
+        broken = []
+
+        if tail is not None:
+            current = db.execute(select(AuditLog.hash).where(AuditLog.id == tail.last_id)).first()
+            if current is None or current[0] != tail.last_hash:
+                broken.append({
+                    "id": tail.last_id,
+                    "issue": "Checkpoint mismatch (verified row altered or removed)",
+                    "expected": tail.last_hash,
+                    "actual": current[0] if current else None
+                })
+
+        result = self._verify_range(
+            db,
+            after_id=tail.last_id if tail else 0,
+            seed_hash=tail.last_hash if tail else None,
+            start_count=tail.row_count if tail else 0,
+            link_first=tail is not None
+        )
+        broken.extend(result["broken"])
+        if not broken and result["last_id"] != (tail.last_id if tail else 0):
+            self._save_checkpoints(db, result, tail)
+        return self._report("incremental", result, broken)
+
+    def verify_full(self, db: Session) -> Dict[str, Any]:
+        """Re-verify the whole chain, one range per checkpoint interval."""
+        checkpoints = self._checkpoints(db)
+        starts = [(0, None, 0)] + [(c.last_id, c.last_hash, c.row_count) for c in checkpoints]
+        ends = [c.last_id for c in checkpoints] + [None]
+        results = [
+            self._verify_range(db, after_id, seed_hash, start_count, until_id, link_first=i > 0)
+            for i, ((after_id, seed_hash, start_count), until_id) in enumerate(zip(starts, ends))
+        ]
+
+        broken = []
+        for i, result in enumerate(results):
+            broken.extend(result["broken"])
+            if i < len(checkpoints):
+                expected = checkpoints[i]
+                if (result["last_id"], result["last_hash"], result["count"]) != (expected.last_id, expected.last_hash, expected.row_count):
+                    broken.append({
+                        "id": expected.last_id,
+                        "issue": "Checkpoint mismatch (rows altered, inserted or removed)",
+                        "expected": {"hash": expected.last_hash, "row_count": expected.row_count},
+                        "actual": {"hash": result["last_hash"], "row_count": result["count"]}
+                    })
+
+        last = results[-1]
+        if not broken and last["last_id"] != starts[-1][0]:
+            self._save_checkpoints(db, last, checkpoints[-1] if checkpoints else None)
+        return self._report("full", last, sorted(broken, key=lambda b: b["id"]))
+
+    @staticmethod
+    def _report(mode: str, result: Dict[str, Any], broken: List[Dict[str, Any]]) -> Dict[str, Any]:
+        if broken:
+            return {"status": "compromised", "mode": mode, "broken_blocks": broken}
+        return {
+            "status": "valid",
+            "mode": mode,
+            "count": result["count"],
+            "verified_through": result["last_id"],
+            "last_hash": result["last_hash"]
+        }
+
+
+chain_verifier = AuditChainVerifier()
@@ -0,0 +1,354 @@
+"""
+Off-request-path sink for audit events.
+
+Request handlers and AuditMiddleware call submit(), which appends the event
+to a bounded in-memory queue and returns immediately. One daemon thread
+group-commits queued events through the database write queue, many rows per
+transaction, so auditing costs the request path a dict build and a deque
+append. The writer links each batch onto the audit hash chain as it inserts
+it (see immutable_audit).
+
+Audit events must not be lost, so unlike MetricsWriter nothing is dropped:
+
+- when the queue is full (the database is slow), new events are appended to
+  a per-process JSONL spill file instead;
+- when a batch insert fails, the whole batch goes to the spill file;
+- once writes succeed again the writer replays the spill file;
+- on startup, spill files left by dead processes on this host are replayed;
+- rows the database itself rejects (constraint violations) are isolated
+  into an audit-rejected file so they cannot block the rest;
+- stop() drains everything on graceful shutdown (to the DB, or to the spill
+  file if the DB is unavailable).
+"""
+import atexit
+import glob
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+
+from backend.database.engine import WriteQueue
+from backend.database.models import AuditLog
+
+_HOST = socket.gethostname()
+
+HIGH_RISK_ACTIONS = ("DELETE_VALUATION", "OVERRIDE_MARKET_DATA", "BYPASS_APPROVAL")
+MEDIUM_RISK_ACTIONS = ("UPDATE_ASSUMPTION", "CHANGE_METHODOLOGY")
+
+
+def assess_risk(action: str) -> str:
+    if action in HIGH_RISK_ACTIONS:
+        return "high"
+    if action in MEDIUM_RISK_ACTIONS:
+        return "medium"
+    return "low"
+
+
+def _default_spill_dir() -> str:
+    configured = os.getenv("AUDIT_SPILL_DIR")
+    if configured:
+        return configured
+    from backend.database.models import engine
+    database = engine.url.database
+    if engine.dialect.name == "sqlite" and database and database != ":memory:":
+        return os.path.dirname(os.path.abspath(database))
+    return tempfile.gettempdir()
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class AuditSink:
+    """Bounded queue + one group-committing writer for AuditLog rows, with a durable overflow file."""
+
+    def __init__(self, engine=None, capacity: int = 10000, batch_size: int = 500,
+                 flush_interval: float = 0.5, spill_dir: Optional[str] = None):
+        self._engine = engine
+        self._writes = None
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._spill_dir = spill_dir
+
+        self._queue: deque = deque()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._spill_pending = False
+
+        self.enqueued = 0
+        self.written = 0
+        self.spilled = 0
+        self.replayed = 0
+        self.batches = 0
+        self.write_errors = 0
+        self.rejected = 0
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            from backend.database.models import engine
+            self._engine = engine
+        return self._engine
+
+    @property
+    def writes(self):
+        if self._writes is None:
+            if self._engine is None:
+                from backend.database.models import write_queue
+                self._writes = write_queue
+            else:
+                self._writes = WriteQueue.for_engine(self._engine)
+        return self._writes
+
+    @property
+    def spill_dir(self) -> str:
+        if self._spill_dir is None:
+            self._spill_dir = _default_spill_dir()
+        return self._spill_dir
+
+    @property
+    def spill_path(self) -> str:
+        return os.path.join(self.spill_dir, f"audit-spill-{_HOST}-{os.getpid()}.jsonl")
+
+    def submit(self, action_type: str, user_id: Optional[int] = None, resource_type: Optional[str] = None,
+               resource_id: Optional[str] = None, details: Any = None, ip_address: Optional[str] = None,
+               risk_level: Optional[str] = None, timestamp: Optional[datetime] = None) -> bool:
+        """
+        Record one audit event without touching the database on the caller's
+        thread. Returns True if queued, False if it went to the spill file.
+        """
+        # Truncate to the column sizes so one long path cannot fail a whole batch
+        row = {
+            "action_type": action_type[:50],
+            "user_id": int(user_id) if user_id not in (None, "") else None,
+            "resource_type": resource_type[:50] if resource_type else resource_type,
+            "resource_id": str(resource_id)[:100] if resource_id is not None else None,
+            "details": details if details is None or isinstance(details, str) else json.dumps(details, default=str),
+            "ip_address": ip_address[:45] if ip_address else ip_address,
+            "risk_level": risk_level or assess_risk(action_type),
+            "timestamp": timestamp or datetime.utcnow(),
+        }
+        if self._thread is None and not self._stopping.is_set():
+            self.start()
+
+        if self._stopping.is_set() or len(self._queue) >= self.capacity:
+            # Backpressure: never block the request, never drop the event
+            self._spill([row])
+            self._wake.set()
+            return False
+
+        self._queue.append(row)
+        self.enqueued += 1
+        if len(self._queue) >= self.batch_size:
+            self._wake.set()
+        return True
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._stopping.clear()
+            self._spill_pending = self._claim_orphaned_spills() or os.path.exists(self.spill_path)
+            self._thread = threading.Thread(target=self._run, name="audit-sink", daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def stop(self, timeout: float = 10.0):
+        """Stop the writer after draining the queue (and any spill backlog it can write)."""
+        self._stopping.set()
+        self._wake.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        self._thread = None
+        # Whatever is still queued goes to the DB, or to disk if the DB is down
+        while self._queue:
+            self._write_batch()
+
+    def flush(self):
+        """Write everything currently queued (synchronously, on the caller's thread)."""
+        while self._queue:
+            self._write_batch()
+        if self._spill_pending:
+            self._replay_spill()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": len(self._queue),
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "spilled": self.spilled,
+            "replayed": self.replayed,
+            "batches": self.batches,
+            "write_errors": self.write_errors,
+            "rejected": self.rejected,
+        }
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            ok = True
+            while self._queue and ok:
+                ok = self._write_batch()
+            if ok and self._spill_pending:
+                self._replay_spill()
+            if not ok:
+                # Back off so a down database doesn't spin the writer
+                self._stopping.wait(1.0)
+        while self._queue:
+            self._write_batch()
+
+    def _insert(self, rows: List[Dict[str, Any]]):
+        from backend.services.immutable_audit import chain_lock, link_rows
+
+        def insert(session):
+            link_rows(session, rows)
+            conn = session.connection()
+            # One transaction, one executemany per batch_size rows
+            for i in range(0, len(rows), self.batch_size):
+                conn.execute(AuditLog.__table__.insert(), rows[i:i + self.batch_size])
+
+        # Rows join the hash chain at insert time (replayed rows too), under the chain lock
+        with chain_lock:
+            self.writes.run(insert)
+
+    def _db_reachable(self) -> bool:
+        try:
+            with self.engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            return True
+        except Exception:
+            return False
+
+    def _deliver(self, rows: List[Dict[str, Any]]):
+        """
+        Insert rows in one transaction. If that fails while the database is
+        reachable, some row is invalid (e.g. a constraint violation): insert
+        row by row so it cannot block the rest, and set the bad rows aside.
+        Raises if the database is unreachable.
+        """
+        try:
+            self._insert(rows)
+            return
+        except Exception:
+            if not self._db_reachable():
+                raise
+        for row in rows:
+            try:
+                self._insert([row])
+            except Exception as e:
+                self._reject(row, e)
+
+    def _write_batch(self) -> bool:
+        rows = []
+        while len(rows) < self.batch_size:
+            try:
+                rows.append(self._queue.popleft())
+            except IndexError:
+                break
+        if not rows:
+            return True
+        try:
+            self._deliver(rows)
+            self.written += len(rows)
+            self.batches += 1
+            return True
+        except Exception as e:
+            self.write_errors += 1
+            print(f"Error writing audit batch ({len(rows)} rows), spilling to disk: {e}")
+            self._spill(rows)
+            return False
+
+    # --- Spill file -------------------------------------------------------
+
+    def _spill(self, rows: List[Dict[str, Any]]):
+        self._append_jsonl(self.spill_path, rows)
+        self.spilled += len(rows)
+        self._spill_pending = True
+
+    def _reject(self, row: Dict[str, Any], error: Exception):
+        self.rejected += 1
+        print(f"Audit row rejected by the database, kept in {self._rejected_path()}: {error}")
+        self._append_jsonl(self._rejected_path(), [dict(row, error=str(error))])
+
+    def _rejected_path(self) -> str:
+        return os.path.join(self.spill_dir, f"audit-rejected-{_HOST}-{os.getpid()}.jsonl")
+
+    def _append_jsonl(self, path: str, rows: List[Dict[str, Any]]):
+        lines = "".join(json.dumps(r, default=str) + "\n" for r in rows)
+        with self._spill_lock:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            with open(path, "a") as fh:
+                fh.write(lines)
+                fh.flush()
+                os.fsync(fh.fileno())
+
+    def _replay_name(self, owner_pid: str) -> str:
+        # <dir>/audit-spill-<host>-<owner pid>.jsonl.<replayer pid>.<seq>.replay
+        return os.path.join(self.spill_dir, f"audit-spill-{_HOST}-{owner_pid}.jsonl.{os.getpid()}.{time.time_ns()}.replay")
+
+    def _claim_orphaned_spills(self) -> bool:
+        """Take over spill files left on this host by processes that are no longer running."""
+        claimed = False
+        me = os.getpid()
+        prefix = os.path.join(self.spill_dir, f"audit-spill-{_HOST}-")
+        for path in glob.glob(prefix + "*"):
+            # <owner>.jsonl while spilling, <owner>.jsonl.<replayer>.<seq>.replay once claimed
+            parts = path[len(prefix):].split(".")
+            try:
+                holder = int(parts[2]) if path.endswith(".replay") else int(parts[0])
+            except (IndexError, ValueError):
+                continue
+            if holder == me or _pid_alive(holder):
+                continue
+            try:
+                # rename is atomic: exactly one surviving worker claims each orphan
+                os.rename(path, self._replay_name(parts[0]))
+                claimed = True
+            except OSError:
+                continue
+        return claimed
+
+    def _replay_spill(self):
+        with self._spill_lock:
+            if os.path.exists(self.spill_path):
+                os.rename(self.spill_path, self._replay_name(str(os.getpid())))
+            self._spill_pending = False
+        pattern = os.path.join(self.spill_dir, f"audit-spill-{_HOST}-*.jsonl.{os.getpid()}.*.replay")
+        for path in sorted(glob.glob(pattern)):
+            try:
+                with open(path) as fh:
+                    rows = [json.loads(line) for line in fh if line.strip()]
+                for row in rows:
+                    row["timestamp"] = datetime.fromisoformat(row["timestamp"])
+                # One transaction per file, so a failed replay never leaves half the file inserted
+                self._deliver(rows)
+                os.remove(path)
+                self.replayed += len(rows)
+            except Exception as e:
+                # Keep the file; it is retried after the next successful write
+                self.write_errors += 1
+                self._spill_pending = True
+                print(f"Error replaying audit spill file {path}: {e}")
+                return
+
+
+audit_sink = AuditSink()
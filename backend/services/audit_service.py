@@ -1,7 +1,8 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from sqlmodel import Session, select
 from datetime import datetime
 from backend.database.models import AuditLog
+from backend.services.audit.sink import audit_sink, assess_risk
 
 class AuditService:
     def __init__(self, session: Session = None):
@@ -11,25 +12,31 @@ class AuditService:
         """
         Logs an event to the audit trail.
         Attributes risk level based on action type.
+        The row is group-committed by the background audit sink, off the request path.
         """
-        risk_level = self._assess_risk(action)
-        
-        log_entry = AuditLog(
-            user_id=user_id,
+        audit_sink.submit(
             action_type=action,
+            user_id=user_id,
             resource_type=resource_type,
             resource_id=resource_id,
             details=details or {},
-            risk_level=risk_level
+            risk_level=self._assess_risk(action)
+        )
+
+    def log(self, action_type: str, user_id: Optional[int] = None, resource_type: Optional[str] = None,
+            resource_id: Optional[str] = None, details: Optional[Dict[str, Any]] = None, ip_address: Optional[str] = None):
+        """
+        Keyword-style variant of log_event used by the analytics routes and AuditMiddleware.
+        """
+        audit_sink.submit(
+            action_type=action_type,
+            user_id=user_id,
+            resource_type=resource_type,
+            resource_id=resource_id,
+            details=details,
+            ip_address=ip_address,
+            risk_level=self._assess_risk(action_type)
         )
-        
-        if self.session:
-            self.session.add(log_entry)
-            self.session.commit()
-            self.session.refresh(log_entry)
-        else:
-            # Fallback for demo/no-db mode
-            print(f"[AUDIT] {datetime.now()} | {user_id} | {action} | {resource_id}")
 
     def get_history(self, resource_id: str) -> List[AuditLog]:
         if not self.session:
@@ -38,14 +45,7 @@ class AuditService:
         return self.session.execute(statement).scalars().all()
 
     def _assess_risk(self, action: str) -> str:
-        high_risk_actions = ["DELETE_VALUATION", "OVERRIDE_MARKET_DATA", "BYPASS_APPROVAL"]
-        medium_risk_actions = ["UPDATE_ASSUMPTION", "CHANGE_METHODOLOGY"]
-        
-        if action in high_risk_actions:
-            return "high"
-        if action in medium_risk_actions:
-            return "medium"
-        return "low"
+        return assess_risk(action)
 
 # Alias for backward compatibility 
 AuditLogger = AuditService
@@ -1,95 +1,267 @@
-from typing import List, Optional
-from backend.calculations.models import ValuationInput, AuditIssue
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from pydantic import ValidationError
+from backend.calculations.models import ValuationInput, AuditIssue, AuditReport
 from backend.config.settings import AUDIT_THRESHOLDS
-from backend.services.wacc.service import WaccCalculatorService
+from backend.services.wacc.sector_table import sector_wacc_table
+
+MAX_AUDIT_SESSIONS = 1024
+
+
+def _get(data: Optional[Dict[str, Any]], path: str):
+    """Value at a dotted path of a nested input dict (None if any part is missing)."""
+    for key in path.split("."):
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
+
+
+def _set(data: Dict[str, Any], path: str, value: Any) -> Dict[str, Any]:
+    """
+    Copy of `data` with the dotted path set. Only the dicts along the path are
+    copied; everything else is shared with the original.
+    """
+    head, _, rest = path.partition(".")
+    updated = dict(data)
+    if rest:
+        child = data.get(head)
+        updated[head] = _set(child if isinstance(child, dict) else {}, rest, value)
+    else:
+        updated[head] = value
+    return updated
+
+
+def _related(a: str, b: str) -> bool:
+    """True when one dotted path is the other or lies under it."""
+    return a == b or a.startswith(b + ".") or b.startswith(a + ".")
+
+
+class AuditRule:
+    """
+    One audit check over the input dict. `fields` are the dotted input paths
+    it reads; `external` rules also depend on the sector reference table.
+    """
+    def __init__(self, name: str, fields: Tuple[str, ...], check: Callable[[Dict[str, Any]], List[AuditIssue]],
+                 external: bool = False):
+        self.name = name
+        self.fields = fields
+        self.check = check
+        self.external = external
+
+    def affected_by(self, changed_paths) -> bool:
+        return any(_related(field, path) for field in self.fields for path in changed_paths)
+
+
+class AuditSession:
+    def __init__(self, data: Dict[str, Any], issues: Dict[str, List[AuditIssue]], reference_version: int):
+        self.data = data
+        self.issues = issues
+        self.reference_version = reference_version
+
+
+def audit_key(data: Dict[str, Any]) -> str:
+    """Content hash of an input dict: the same input gets the same audit id in every worker."""
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class AuditSessionStore:
+    """
+    Recently audited inputs and their per-rule issues, for diff re-audits (LRU).
+    Per process: a diff that lands on a worker without the session is rebuilt
+    from the base input the client sends along.
+    """
+    def __init__(self, max_sessions: int = MAX_AUDIT_SESSIONS):
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, AuditSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, audit_id: str) -> Optional[AuditSession]:
+        with self._lock:
+            session = self._sessions.get(audit_id)
+            if session is not None:
+                self._sessions.move_to_end(audit_id)
+            return session
+
+    def put(self, session: AuditSession) -> str:
+        audit_id = audit_key(session.data)
+        with self._lock:
+            self._sessions[audit_id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return audit_id
+
+
+audit_sessions = AuditSessionStore()
+
 
 class AuditingService:
     def __init__(self):
-        self.wacc_service = WaccCalculatorService()
         self.thresholds = AUDIT_THRESHOLDS
+        self.sector_table = sector_wacc_table
+        self.sessions = audit_sessions
+        self.rules = self._build_rules()
 
     async def audit_valuation_input(self, input_data: ValuationInput) -> List[AuditIssue]:
         """Main method to run all audit rules."""
-        issues = []
-        
-        # DCF Specific Checks
-        if input_data.dcf_input:
-            dcf = input_data.dcf_input
-            issues.extend(self._check_perpetual_growth(dcf.projections.terminal_growth_rate))
-            issues.extend(self._check_revenue_growth(dcf.projections.revenue_growth_start))
-            
-            # WACC Check requires industry context
-            # We need the ticker to get industry data. It's in GPC input or we can infer/pass it.
-            # ValuationInput has company_name, but not ticker at top level. 
-            # Usually ticker is passed or available. 
-            # Let's assume we can get it from GPC input if available, or we might need to update ValuationInput to include ticker.
-            # For now, let's check if GPC input has it.
-            ticker = None
-            if input_data.gpc_input:
-                ticker = input_data.gpc_input.target_ticker
-            
-            if ticker:
-                # This is async because WaccCalculatorService might fetch data
-                # But WaccCalculatorService methods are sync in current implementation?
-                # Let's check WaccCalculatorService. It seems sync based on previous file reads.
-                # But the plan said "await". Let's assume sync for now unless we see otherwise.
-                # Actually, let's make it sync to match the rest of the app for now, or async if needed.
-                # The routes are async.
-                
-                # Fetch industry WACC
-                try:
-                    market_data = self.wacc_service.get_market_data(ticker)
-                    industry_wacc = market_data.wacc
-                    issues.extend(self._check_wacc(dcf.projections.discount_rate, industry_wacc))
-                except Exception as e:
-                    print(f"Could not fetch industry WACC for audit: {e}")
-
-        # LBO Specific Checks
-        if input_data.lbo_input:
-            lbo = input_data.lbo_input
-            financing = lbo.financing
-            
-            # 1. Leverage Check (>6.0x strict warning)
-            total_lev = financing.total_leverage_ratio
-            if total_lev is None and financing.tranches:
-                total_lev = sum([t.leverage_multiple or 0 for t in financing.tranches])
-            
-            if total_lev and total_lev > 6.0:
-                 issues.append(AuditIssue(
-                    field="lbo_input.financing",
-                    value=total_lev,
-                    message=f"Total Leverage ({total_lev:.1f}x) exceeds recommended safety limit (>6.0x). Typical maximum is 6.0x for healthy LBOs.",
-                    severity="warning"
-                ))
-
-            # 2. Equity Contribution (<25% strict warning)
-            equity_pct = financing.equity_contribution_percent
-            # If not provided, try to calculate from implied
-            if equity_pct is None and lbo.entry_ev_ebitda_multiple and total_lev:
-                # Equity = EV - Debt
-                # Equity% = (EV - Debt) / EV = 1 - (Debt/EV)
-                # Debt/EV = Debt/EBITDA / EV/EBITDA
-                debt_to_ev = total_lev / lbo.entry_ev_ebitda_multiple
-                equity_pct = 1.0 - debt_to_ev
-
-            if equity_pct is not None and equity_pct < 0.25:
-                    issues.append(AuditIssue(
-                    field="lbo_input.financing.equity_contribution_percent",
-                    value=equity_pct,
-                    message=f"Equity Contribution ({equity_pct:.0%}) is dangerously low (<25%). Lenders typically require 30-40%.",
-                    severity="error"
-                ))
-
-            # 3. IRR Feasibility (High IRR requires High Growth?)
-            # Valid only if we have target IRR and growth logic
-            if lbo.solve_for == "entry_price" and lbo.target_irr:
-                issues.extend(self._check_irr_feasibility(lbo.target_irr, lbo.revenue_growth_rate))
-
-            # 4. Exit Multiple vs Entry/Market
-            if lbo.exit_ev_ebitda_multiple:
-                issues.extend(self._check_exit_multiple(lbo.exit_ev_ebitda_multiple, lbo.entry_ev_ebitda_multiple))
+        return self.start_audit(input_data).issues
 
-        return issues
+    def start_audit(self, input_data: ValuationInput) -> AuditReport:
+        """Run every rule and keep the result so later edits can be re-audited as diffs."""
+        return self._report(self._full_audit(input_data.model_dump()), [rule.name for rule in self.rules])
+
+    def reaudit(self, audit_id: str, changes: Dict[str, Any], base: Optional[ValuationInput] = None) -> AuditReport:
+        """
+        Apply {dotted path: new value} changes to a previously audited input and
+        re-run only the rules that read a changed path (plus reference-table
+        rules if the table was refreshed since). Returns a new audit id.
+
+        `base` is the input `audit_id` was issued for; it is only used when this
+        process doesn't hold the session (another worker audited it, or it was
+        evicted). Raises KeyError if neither is available and ValueError if the
+        base doesn't match the id or the changes don't yield a valid input.
+        """
+        session = self.sessions.get(audit_id)
+        if session is None:
+            if base is None:
+                raise KeyError(f"Unknown or expired audit: {audit_id} (send the base input)")
+            base_data = base.model_dump()
+            if audit_key(base_data) != audit_id:
+                raise ValueError(f"Base input does not match audit {audit_id}")
+            session = self._full_audit(base_data)
+            self.sessions.put(session)
+
+        data = session.data
+        for path, value in changes.items():
+            data = _set(data, path, value)
+        data = self._validated(data, changes)
+
+        version = self.sector_table.version
+        issues = dict(session.issues)
+        rerun = []
+        for rule in self.rules:
+            if rule.affected_by(changes) or (rule.external and version != session.reference_version):
+                issues[rule.name] = rule.check(data)
+                rerun.append(rule.name)
+        return self._report(AuditSession(data, issues, version), rerun)
+
+    def _full_audit(self, data: Dict[str, Any]) -> AuditSession:
+        return AuditSession(data, {rule.name: rule.check(data) for rule in self.rules}, self.sector_table.version)
+
+    @staticmethod
+    def _validated(data: Dict[str, Any], changes: Dict[str, Any]) -> Dict[str, Any]:
+        """The edited input, re-validated so a wrongly typed or unknown field fails before any rule runs."""
+        try:
+            validated = ValuationInput.model_validate(data).model_dump()
+        except ValidationError as e:
+            raise ValueError(f"Invalid changes: {e}")
+        for path, value in changes.items():
+            if value is not None and _get(validated, path) is None:
+                raise ValueError(f"Unknown input field: {path}")
+        return validated
+
+    def _report(self, session: AuditSession, rules_run: List[str]) -> AuditReport:
+        audit_id = self.sessions.put(session)
+        return AuditReport(
+            audit_id=audit_id,
+            issues=[issue for rule in self.rules for issue in session.issues[rule.name]],
+            rules_run=rules_run
+        )
+
+    def _build_rules(self) -> List[AuditRule]:
+        projections = "dcf_input.projections"
+        return [
+            # DCF Specific Checks
+            AuditRule("perpetual_growth", (f"{projections}.terminal_growth_rate",), self._rule_perpetual_growth),
+            AuditRule("revenue_growth", (f"{projections}.revenue_growth_start",), self._rule_revenue_growth),
+            AuditRule("industry_wacc", (f"{projections}.discount_rate", "gpc_input.target_ticker"),
+                      self._rule_industry_wacc, external=True),
+            # LBO Specific Checks
+            AuditRule("lbo_leverage", ("lbo_input.financing",), self._rule_leverage),
+            AuditRule("lbo_equity_contribution", ("lbo_input.financing", "lbo_input.entry_ev_ebitda_multiple"),
+                      self._rule_equity_contribution),
+            AuditRule("lbo_irr_feasibility",
+                      ("lbo_input.solve_for", "lbo_input.target_irr", "lbo_input.revenue_growth_rate"),
+                      self._rule_irr_feasibility),
+            AuditRule("lbo_exit_multiple", ("lbo_input.exit_ev_ebitda_multiple", "lbo_input.entry_ev_ebitda_multiple"),
+                      self._rule_exit_multiple),
+        ]
+
+    def _rule_perpetual_growth(self, data: Dict[str, Any]) -> List[AuditIssue]:
+        growth_rate = _get(data, "dcf_input.projections.terminal_growth_rate")
+        return self._check_perpetual_growth(growth_rate) if growth_rate is not None else []
+
+    def _rule_revenue_growth(self, data: Dict[str, Any]) -> List[AuditIssue]:
+        growth_rate = _get(data, "dcf_input.projections.revenue_growth_start")
+        return self._check_revenue_growth(growth_rate) if growth_rate is not None else []
+
+    def _rule_industry_wacc(self, data: Dict[str, Any]) -> List[AuditIssue]:
+        # Industry context comes from the target's sector in the pre-resolved
+        # reference table; it is never fetched inline
+        user_wacc = _get(data, "dcf_input.projections.discount_rate")
+        industry_wacc = self.sector_table.industry_wacc(_get(data, "gpc_input.target_ticker"))
+        if user_wacc is None or industry_wacc is None:
+            return []
+        return self._check_wacc(user_wacc, industry_wacc)
+
+    def _total_leverage(self, financing: Optional[Dict[str, Any]]) -> Optional[float]:
+        if not financing:
+            return None
+        total_lev = financing.get("total_leverage_ratio")
+        if total_lev is None and financing.get("tranches"):
+            total_lev = sum([t.get("leverage_multiple") or 0 for t in financing["tranches"]])
+        return total_lev
+
+    def _rule_leverage(self, data: Dict[str, Any]) -> List[AuditIssue]:
+        # 1. Leverage Check (>6.0x strict warning)
+        total_lev = self._total_leverage(_get(data, "lbo_input.financing"))
+        if total_lev and total_lev > 6.0:
+            return [AuditIssue(
+                field="lbo_input.financing",
+                value=total_lev,
+                message=f"Total Leverage ({total_lev:.1f}x) exceeds recommended safety limit (>6.0x). Typical maximum is 6.0x for healthy LBOs.",
+                severity="warning"
+            )]
+        return []
+
+    def _rule_equity_contribution(self, data: Dict[str, Any]) -> List[AuditIssue]:
+        # 2. Equity Contribution (<25% strict warning)
+        financing = _get(data, "lbo_input.financing")
+        if not financing:
+            return []
+        equity_pct = financing.get("equity_contribution_percent")
+        total_lev = self._total_leverage(financing)
+        entry_multiple = _get(data, "lbo_input.entry_ev_ebitda_multiple")
+        # If not provided, try to calculate from implied
+        if equity_pct is None and entry_multiple and total_lev:
+            # Equity% = (EV - Debt) / EV = 1 - (Debt/EBITDA / EV/EBITDA)
+            equity_pct = 1.0 - total_lev / entry_multiple
+
+        if equity_pct is not None and equity_pct < 0.25:
+            return [AuditIssue(
+                field="lbo_input.financing.equity_contribution_percent",
+                value=equity_pct,
+                message=f"Equity Contribution ({equity_pct:.0%}) is dangerously low (<25%). Lenders typically require 30-40%.",
+                severity="error"
+            )]
+        return []
+
+    def _rule_irr_feasibility(self, data: Dict[str, Any]) -> List[AuditIssue]:
+        # 3. IRR Feasibility: only when solving for entry price against a target IRR
+        lbo = data.get("lbo_input")
+        if lbo and lbo.get("solve_for") == "entry_price" and lbo.get("target_irr"):
+            return self._check_irr_feasibility(lbo["target_irr"], lbo.get("revenue_growth_rate") or 0.0)
+        return []
+
+    def _rule_exit_multiple(self, data: Dict[str, Any]) -> List[AuditIssue]:
+        # 4. Exit Multiple vs Entry/Market
+        exit_mult = _get(data, "lbo_input.exit_ev_ebitda_multiple")
+        if exit_mult:
+            return self._check_exit_multiple(exit_mult, _get(data, "lbo_input.entry_ev_ebitda_multiple"))
+        return []
 
     def _check_perpetual_growth(self, growth_rate: float) -> List[AuditIssue]:
         if growth_rate > self.thresholds["perpetual_growth_rate_max"]:
@@ -105,7 +277,7 @@ class AuditingService:
         threshold = industry_wacc * self.thresholds["wacc_industry_deviation_factor"]
         if user_wacc < threshold:
             return [AuditIssue(
-                field="dcf_input.projections.discount_rate", 
+                field="dcf_input.projections.discount_rate",
                 value=user_wacc,
                 message=f"WACC ({user_wacc:.1%}) is significantly below industry average ({industry_wacc:.1%}).",
                 severity="warning"
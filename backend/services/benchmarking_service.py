@@ -1,6 +1,11 @@
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Iterable
+import os
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-from backend.calculations.benchmarking_models import CompanyMetrics, BenchmarkResponse, BenchmarkComparison
+from sqlalchemy.orm import Session
+from backend.calculations.benchmarking_models import CompanyMetrics, BenchmarkResponse, BenchmarkComparison, SectorScreenResponse
+from backend.calculations.metrics_calculator import MetricsCalculator, MetricsPanel
+from backend.calculations.models import HistoricalFinancials
 from backend.services.financial_data.cache import cache
 from backend.services.financial_data.alpha_vantage import AlphaVantageProvider
 from backend.services.financial_data.transaction_comps_provider import transaction_comps_provider
@@ -8,23 +13,24 @@ from backend.services.financial_data.transaction_comps_provider import transacti
 # In a real app, we'd use dependency injection or a factory
 provider = AlphaVantageProvider()
 
+DEFAULT_PEERS = ["MSFT", "GOOGL", "AMZN", "META", "TSLA"]
+
 class BenchmarkingService:
+    # Provider calls are network-bound; a panel is fetched this many tickers at a time
+    max_fetch_workers = int(os.getenv("BENCHMARK_FETCH_WORKERS", 16))
+
     def get_transaction_comps(self, sector: str) -> List[Dict]:
         return transaction_comps_provider.get_recent_transactions(sector)
 
-    def get_comparison(self, target_ticker: str, peer_tickers: Optional[List[str]] = None, use_sector: bool = False) -> BenchmarkResponse:
-        # 1. Get Target Metrics
-        target_metrics = self._get_metrics(target_ticker)
-        if not target_metrics:
-            raise ValueError(f"Could not fetch data for target {target_ticker}")
-
-        # 2. Determine Peers
+    def get_comparison(self, target_ticker: str, peer_tickers: Optional[List[str]] = None, use_sector: bool = False,
+                       db: Optional[Session] = None) -> BenchmarkResponse:
+        # 1. Determine Peers
         final_peers = []
         if peer_tickers:
             final_peers.extend(peer_tickers)
         
         if use_sector:
-            sector_peers = self._get_sector_peers(target_ticker)
+            sector_peers = self._get_sector_peers(target_ticker, db)
             # Avoid duplicates and self
             for p in sector_peers:
                 if p not in final_peers and p != target_ticker:
@@ -37,23 +43,27 @@ class BenchmarkingService:
             if target_ticker in final_peers:
                 final_peers.remove(target_ticker)
 
-        # 3. Get Peer Metrics
+        # 2. Get Target and Peer Metrics, fetched concurrently
+        metrics = self.get_panel_metrics([target_ticker] + final_peers)
+        target_metrics = metrics.get(target_ticker)
+        if not target_metrics:
+            raise ValueError(f"Could not fetch data for target {target_ticker}")
+
+        # 3. Keep peers with enough data
         peer_metrics_list = []
         valid_peers = []
         for ticker in final_peers:
-            try:
-                m = self._get_metrics(ticker)
-                if m and self._is_sufficient_data(m):
-                    peer_metrics_list.append(m)
-                    valid_peers.append(ticker)
-            except Exception:
-                continue
+            m = metrics.get(ticker)
+            if m and ticker != target_ticker and ticker not in valid_peers and self._is_sufficient_data(m):
+                peer_metrics_list.append(m)
+                valid_peers.append(ticker)
         
         # 4. Aggregate Peer Data
-        peer_avg = self._aggregate_metrics(peer_metrics_list)
+        panel = MetricsPanel(peer_metrics_list)
+        peer_avg = self._aggregate_metrics(peer_metrics_list, panel)
         
         # 5. Compare and Calculate Percentiles
-        comparisons = self._generate_comparisons(target_metrics, peer_metrics_list, peer_avg)
+        comparisons = self._generate_comparisons(target_metrics, peer_metrics_list, peer_avg, panel)
         
         return BenchmarkResponse(
             target=target_metrics,
@@ -62,33 +72,100 @@ class BenchmarkingService:
             peers_used=valid_peers
         )
 
-    def _get_metrics(self, ticker: str) -> Optional[CompanyMetrics]:
-        # Try cache first
-        cached = cache.get(f"metrics:{ticker}")
+    def screen_sector(self, sector: Optional[str] = None, tickers: Optional[List[str]] = None,
+                      db: Optional[Session] = None) -> SectorScreenResponse:
+        """
+        Metrics, panel medians and within-panel percentiles for every company
+        in a sector (or an explicit ticker list).
+        """
+        universe = list(tickers or [])
+        if sector:
+            for t in self._get_sector_tickers(sector, db):
+                if t not in universe:
+                    universe.append(t)
+        if not universe:
+            raise ValueError("Provide a sector with known companies or a list of tickers")
+
+        metrics = self.get_panel_metrics(universe)
+        companies = [metrics[t] for t in universe if t in metrics and self._is_sufficient_data(metrics[t])]
+        panel = MetricsPanel(companies)
+        percentiles = panel.percentiles()
+
+        return SectorScreenResponse(
+            sector=sector,
+            companies=companies,
+            medians=self._aggregate_metrics(companies, panel),
+            percentiles={
+                ticker: {f: float(percentiles[i, j]) for j, f in enumerate(panel.fields) if not np.isnan(percentiles[i, j])}
+                for i, ticker in enumerate(panel.tickers)
+            },
+            tickers_failed=[t for t in universe if t not in panel.tickers]
+        )
+
+    def get_panel_metrics(self, tickers: Iterable[str]) -> Dict[str, CompanyMetrics]:
+        """
+        Metrics for many tickers: statements are fetched concurrently, and
+        metrics are computed in one vectorized pass for the tickers whose
+        latest filing period has not been computed before.
+        """
+        unique = list(dict.fromkeys(tickers))
+        if not unique:
+            return {}
+        workers = max(1, min(self.max_fetch_workers, len(unique)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            statements = dict(zip(unique, pool.map(self._get_statements, unique)))
+
+        metrics = {}
+        pending = {}
+        for ticker, financials in statements.items():
+            if financials is None:
+                continue
+            cached = cache.get(self._metrics_key(ticker, financials))
+            if cached:
+                metrics[ticker] = CompanyMetrics(**cached)
+            else:
+                pending[ticker] = financials
+
+        for ticker, m in MetricsCalculator.calculate_panel(pending).items():
+            # Metrics of a filing period don't change; keyed on it, they survive re-fetches
+            cache.set(self._metrics_key(ticker, pending[ticker]), m.dict())
+            metrics[ticker] = m
+        return metrics
+
+    @staticmethod
+    def _metrics_key(ticker: str, financials: HistoricalFinancials) -> str:
+        period = financials.years[0] if financials.years else "none"
+        return f"metrics:{ticker}:{period}"
+
+    def _get_statements(self, ticker: str) -> Optional[HistoricalFinancials]:
+        cached = cache.get(f"statements:{ticker}")
         if cached:
-            return CompanyMetrics(**cached)
-        
-        # Fetch financials (triggers calculation and caching)
+            return HistoricalFinancials(**cached)
         try:
-            financials = provider.get_financials(ticker)
-            return financials.metrics
+            financials = provider.get_statements(ticker)
         except Exception as e:
             print(f"Error fetching metrics for {ticker}: {e}")
             return None
+        cache.set(f"statements:{ticker}", financials.dict())
+        return financials
 
-    def _get_sector_peers(self, ticker: str) -> List[str]:
+    def _get_metrics(self, ticker: str) -> Optional[CompanyMetrics]:
+        return self.get_panel_metrics([ticker]).get(ticker)
+
+    def _get_sector_peers(self, ticker: str, db: Optional[Session] = None) -> List[str]:
         """
         Get peers in the same sector from the database.
         """
         from backend.database.models import SessionLocal, Company
-        db = SessionLocal()
+        own_session = db is None
+        db = db or SessionLocal()
         try:
             # 1. Find target company
             target = db.query(Company).filter(Company.ticker == ticker).first()
             if not target:
                 # Fallback if target not in DB
                 print(f"Target {ticker} not found in Company DB, using default peers")
-                return ["MSFT", "GOOGL", "AMZN", "META", "TSLA"]
+                return DEFAULT_PEERS
             
             # 2. Find peers in same sector
             peers = db.query(Company.ticker)\
@@ -108,9 +185,20 @@ class BenchmarkingService:
             
         except Exception as e:
             print(f"Error querying sector peers: {e}")
-            return ["MSFT", "GOOGL", "AMZN", "META", "TSLA"]
+            return DEFAULT_PEERS
         finally:
-            db.close()
+            if own_session:
+                db.close()
+
+    def _get_sector_tickers(self, sector: str, db: Optional[Session] = None) -> List[str]:
+        from backend.database.models import SessionLocal, Company
+        own_session = db is None
+        db = db or SessionLocal()
+        try:
+            return [t for (t,) in db.query(Company.ticker).filter(Company.sector == sector).order_by(Company.ticker)]
+        finally:
+            if own_session:
+                db.close()
 
     def _is_sufficient_data(self, metrics: CompanyMetrics) -> bool:
         # Check if > 50% of key fields are present
@@ -121,53 +209,20 @@ class BenchmarkingService:
         present = sum(1 for f in fields if f is not None)
         return present / len(fields) > 0.5
 
-    def _aggregate_metrics(self, metrics_list: List[CompanyMetrics]) -> CompanyMetrics:
+    def _aggregate_metrics(self, metrics_list: List[CompanyMetrics], panel: Optional[MetricsPanel] = None) -> CompanyMetrics:
         if not metrics_list:
             return CompanyMetrics(ticker="Peer Avg")
-            
-        avg_metrics = CompanyMetrics(ticker="Peer Avg", period="LTM")
-        
-        # Helper to get median of a field
-        def get_median(field_name: str) -> Optional[float]:
-            values = [getattr(m, field_name) for m in metrics_list if getattr(m, field_name) is not None]
-            if not values:
-                return None
-            return float(np.median(values))
-
-        # Profitability
-        avg_metrics.roe = get_median("roe")
-        avg_metrics.roa = get_median("roa")
-        avg_metrics.roic = get_median("roic")
-        avg_metrics.net_margin = get_median("net_margin")
-        avg_metrics.gross_margin = get_median("gross_margin")
-        avg_metrics.operating_margin = get_median("operating_margin")
-        avg_metrics.ebitda_margin = get_median("ebitda_margin")
-        
-        # Liquidity
-        avg_metrics.current_ratio = get_median("current_ratio")
-        avg_metrics.quick_ratio = get_median("quick_ratio")
-        avg_metrics.cash_ratio = get_median("cash_ratio")
-        
-        # Leverage
-        avg_metrics.debt_to_equity = get_median("debt_to_equity")
-        avg_metrics.debt_to_assets = get_median("debt_to_assets")
-        avg_metrics.interest_coverage = get_median("interest_coverage")
-        avg_metrics.net_debt_to_ebitda = get_median("net_debt_to_ebitda")
-        
-        # Efficiency
-        avg_metrics.asset_turnover = get_median("asset_turnover")
-        avg_metrics.inventory_turnover = get_median("inventory_turnover")
-        avg_metrics.receivables_turnover = get_median("receivables_turnover")
-        
-        # Growth
-        avg_metrics.revenue_growth = get_median("revenue_growth")
-        avg_metrics.ebitda_growth = get_median("ebitda_growth")
-        avg_metrics.net_income_growth = get_median("net_income_growth")
-        
-        return avg_metrics
 
-    def _generate_comparisons(self, target: CompanyMetrics, peers: List[CompanyMetrics], peer_avg: CompanyMetrics) -> List[BenchmarkComparison]:
+        # Median of every field over the panel, in one pass
+        panel = panel or MetricsPanel(metrics_list)
+        return CompanyMetrics(ticker="Peer Avg", period="LTM", **panel.medians())
+
+    def _generate_comparisons(self, target: CompanyMetrics, peers: List[CompanyMetrics], peer_avg: CompanyMetrics,
+                              panel: Optional[MetricsPanel] = None) -> List[BenchmarkComparison]:
         comparisons = []
+        # Rank of the target within peers + target, per field
+        panel = panel or MetricsPanel(peers)
+        percentiles = panel.percentile_of(target.dict())
         
         fields = [
             ("ROE", "roe"),
@@ -186,16 +241,7 @@ class BenchmarkingService:
             if target_val is None:
                 continue
                 
-            # Calculate Percentile
-            percentile = 50.0
-            if peers:
-                peer_vals = [getattr(p, field) for p in peers if getattr(p, field) is not None]
-                if peer_vals:
-                    peer_vals.append(target_val) # Include target in distribution
-                    peer_vals.sort()
-                    # Rank of target
-                    rank = peer_vals.index(target_val)
-                    percentile = (rank / (len(peer_vals) - 1)) * 100 if len(peer_vals) > 1 else 100.0
+            percentile = percentiles.get(field, 50.0)
             
             # Status
             status = "In Line"
@@ -0,0 +1,203 @@
+"""
+Content-addressed storage for rendered export artifacts.
+
+Exports (Excel workbooks, CSV dumps, PDF/PPTX/DOCX reports) are pure
+functions of the valuation run and the template that renders them, so each
+artifact is stored on disk under a hash of (kind, run id, run revision,
+format, template version, ...). A repeated download of an unchanged run is
+served straight from disk, and the same hash doubles as the HTTP ETag so
+clients can revalidate with If-None-Match and get a 304.
+
+Files are written to a temp file and renamed into place, so concurrent
+workers rendering the same artifact never serve a partial file. The store is
+pruned oldest-first once it grows past `max_bytes`.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+DEFAULT_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), ".export_cache")
+
+
+def run_revision(run) -> str:
+    """
+    Fingerprint of the stored fields an export is rendered from.
+    ValuationRun has no updated_at column, so any edit to the run's data or
+    workflow state changes the revision instead.
+    """
+    parts = [
+        run.company_name, run.mode, run.input_data, run.results, run.status,
+        run.created_at.isoformat() if run.created_at else None,
+    ]
+    return hashlib.sha256(json.dumps(parts, default=str).encode()).hexdigest()[:16]
+
+
+class ArtifactStore:
+    """Rendered files on disk, addressed by a hash of everything that determines their bytes."""
+
+    def __init__(self, root: Optional[str] = None, max_bytes: int = 512 * 1024 * 1024):
+        self.root = root or os.getenv("EXPORT_CACHE_DIR", DEFAULT_ROOT)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(*parts: Any) -> str:
+        return hashlib.sha256(json.dumps(parts, default=str).encode()).hexdigest()
+
+    def path(self, key: str, suffix: str) -> str:
+        # Two-level fan-out keeps directories small
+        return os.path.join(self.root, key[:2], f"{key}.{suffix}")
+
+    def get(self, key: str, suffix: str) -> Optional[str]:
+        path = self.path(key, suffix)
+        if not os.path.exists(path):
+            return None
+        try:
+            # Touch so pruning evicts the least recently served artifacts first
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def get_or_render(self, key: str, suffix: str, render: Callable[[Any], None]) -> str:
+        """
+        Return the artifact path, rendering it first if needed.
+        `render` receives a writable binary file object.
+        """
+        path = self.get(key, suffix)
+        if path is not None:
+            self.hits += 1
+            return path
+        self.misses += 1
+        return self._write(key, suffix, render)
+
+    def tee(self, key: str, suffix: str, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Yield `chunks` to the caller while writing them to the store. The
+        artifact is only published if the iteration completes.
+        """
+        path = self.path(key, suffix)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        completed = False
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                for chunk in chunks:
+                    fh.write(chunk)
+                    yield chunk
+            os.replace(tmp, path)
+            completed = True
+        finally:
+            if not completed and os.path.exists(tmp):
+                os.remove(tmp)
+        self.prune()
+
+    def _write(self, key: str, suffix: str, render: Callable[[Any], None]) -> str:
+        path = self.path(key, suffix)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                render(fh)
+            os.replace(tmp, path)
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self.prune()
+        return path
+
+    def prune(self):
+        """Drop least recently used artifacts until the store fits in max_bytes."""
+        entries = []
+        total = 0
+        try:
+            for shard in os.scandir(self.root):
+                if not shard.is_dir():
+                    continue
+                for entry in os.scandir(shard.path):
+                    if entry.name.endswith(".tmp"):
+                        continue
+                    st = entry.stat()
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+                    total += st.st_size
+        except FileNotFoundError:
+            return
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "root": self.root}
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [c.strip().removeprefix("W/").strip('"') for c in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def not_modified(request: Request, key: str) -> Optional[Response]:
+    """304 response if the client already holds artifact `key`, else None."""
+    if _etag_matches(request, key):
+        return Response(status_code=304, headers={"ETag": f'"{key}"'})
+    return None
+
+
+async def serve_artifact(request: Request, key: str, suffix: str, render: Callable[[Any], None],
+                         media_type: str, filename: str, store: Optional["ArtifactStore"] = None) -> Response:
+    """
+    Serve a cached artifact with ETag/304 handling, rendering it in the
+    threadpool on a miss so the event loop is never blocked by a renderer.
+    """
+    store = store or artifact_store
+    cached = not_modified(request, key)
+    if cached is not None:
+        return cached
+    path = await run_in_threadpool(store.get_or_render, key, suffix, render)
+    return FileResponse(
+        path,
+        media_type=media_type,
+        filename=filename,
+        headers={"ETag": f'"{key}"', "Cache-Control": "private, no-cache"}
+    )
+
+
+def stream_artifact(request: Request, key: str, suffix: str, chunks: Iterable[bytes],
+                    media_type: str, filename: str, store: Optional["ArtifactStore"] = None) -> Response:
+    """
+    Like serve_artifact, but for formats produced as a stream of chunks: a
+    cache miss is streamed to the client and written to the store as it goes.
+    """
+    store = store or artifact_store
+    cached = not_modified(request, key)
+    if cached is not None:
+        return cached
+    headers = {"ETag": f'"{key}"', "Cache-Control": "private, no-cache"}
+    path = store.get(key, suffix)
+    if path is not None:
+        store.hits += 1
+        return FileResponse(path, media_type=media_type, filename=filename, headers=headers)
+    store.misses += 1
+    headers["Content-Disposition"] = f"attachment; filename={filename}"
+    # Sync iterators are iterated in the threadpool by Starlette
+    return StreamingResponse(store.tee(key, suffix, chunks), media_type=media_type, headers=headers)
+
+
+artifact_store = ArtifactStore()
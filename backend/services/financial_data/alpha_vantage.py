@@ -144,12 +144,13 @@ class AlphaVantageProvider(FinancialDataProvider):
     def _get_mock_data(self, function: str, symbol: str) -> Dict[str, Any]:
         """Generate consistent mock data for demo purposes."""
         import random
-        # Seed with symbol to ensure consistent results for same ticker
-        random.seed(symbol)
+        # Seed with symbol to ensure consistent results for same ticker.
+        # A private generator, so concurrent fetches don't interleave one sequence.
+        rng = random.Random(symbol)
         
         years = ["2023-12-31", "2022-12-31", "2021-12-31", "2020-12-31", "2019-12-31"]
-        base_revenue = random.randint(100, 1000) * 1000000
-        growth_rate = random.uniform(0.05, 0.20)
+        base_revenue = rng.randint(100, 1000) * 1000000
+        growth_rate = rng.uniform(0.05, 0.20)
         
         if function == "OVERVIEW":
             return {
@@ -159,12 +160,26 @@ class AlphaVantageProvider(FinancialDataProvider):
                 "Sector": "Software",
                 "Description": f"This is a demo description for {symbol}.",
                 "Address": "123 Tech Blvd, San Francisco, CA",
-                "FullTimeEmployees": str(random.randint(1000, 50000)),
+                "FullTimeEmployees": str(rng.randint(1000, 50000)),
                 "FiscalYearEnd": "December",
-                "MarketCapitalization": str(int(base_revenue * random.uniform(5, 10))),
-                "Beta": str(round(random.uniform(0.8, 1.5), 2))
+                "MarketCapitalization": str(int(base_revenue * rng.uniform(5, 10))),
+                "Beta": str(round(rng.uniform(0.8, 1.5), 2))
             }
             
+        if function == "TIME_SERIES_WEEKLY_ADJUSTED":
+            # Three years of weekly closes: a random walk with a ticker-specific market exposure
+            from datetime import date as date_type, timedelta
+            market_rng = random.Random("market")
+            exposure = rng.uniform(0.6, 1.6)
+            price, series = 100.0, {}
+            week = date_type(2023, 12, 29)
+            weeks = [week - timedelta(weeks=k) for k in range(156)][::-1]
+            for day in weeks:
+                market_move = market_rng.gauss(0.0015, 0.022)
+                price *= 1 + exposure * market_move + rng.gauss(0, 0.02)
+                series[day.isoformat()] = {"5. adjusted close": f"{price:.4f}"}
+            return {"Weekly Adjusted Time Series": series}
+
         reports = []
         for i, date in enumerate(years):
             revenue = base_revenue * ((1 - growth_rate) ** i)
@@ -199,16 +214,7 @@ class AlphaVantageProvider(FinancialDataProvider):
         return {"annualReports": reports}
 
     def get_financials(self, ticker: str, user: Any = None) -> HistoricalFinancials:
-        # Fetch Income Statement
-        income_data = self._make_request("INCOME_STATEMENT", symbol=ticker, user=user)
-        # Fetch Balance Sheet
-        balance_data = self._make_request("BALANCE_SHEET", symbol=ticker, user=user)
-        # Fetch Cash Flow
-        cash_flow_data = self._make_request("CASH_FLOW", symbol=ticker, user=user)
-        # Fetch Company Overview for Profile
-        overview_data = self._make_request("OVERVIEW", symbol=ticker, user=user)
-        
-        financials = self._map_to_financials(income_data, balance_data, cash_flow_data, overview_data)
+        financials = self.get_statements(ticker, user=user)
         
         # Calculate and cache metrics
         metrics = MetricsCalculator.calculate_metrics(financials, ticker)
@@ -220,6 +226,22 @@ class AlphaVantageProvider(FinancialDataProvider):
             
         return financials
 
+    def get_statements(self, ticker: str, user: Any = None) -> HistoricalFinancials:
+        """
+        Historical statements without derived metrics, for callers that
+        compute metrics for a whole panel at once.
+        """
+        # Fetch Income Statement
+        income_data = self._make_request("INCOME_STATEMENT", symbol=ticker, user=user)
+        # Fetch Balance Sheet
+        balance_data = self._make_request("BALANCE_SHEET", symbol=ticker, user=user)
+        # Fetch Cash Flow
+        cash_flow_data = self._make_request("CASH_FLOW", symbol=ticker, user=user)
+        # Fetch Company Overview for Profile
+        overview_data = self._make_request("OVERVIEW", symbol=ticker, user=user)
+        
+        return self._map_to_financials(income_data, balance_data, cash_flow_data, overview_data)
+
     def _map_to_financials(self, income_data: Dict, balance_data: Dict, cash_flow_data: Dict, overview_data: Dict = None) -> HistoricalFinancials:
         # Extract annual reports
         income_reports = income_data.get("annualReports", [])
@@ -351,6 +373,11 @@ class AlphaVantageProvider(FinancialDataProvider):
             return float(data["data"][0]["value"] or 0) / 100.0 # Convert percentage to decimal
         return 0.045 # Fallback 4.5%
 
+    def get_price_history(self, ticker: str) -> Dict[str, float]:
+        data = self._make_request("TIME_SERIES_WEEKLY_ADJUSTED", symbol=ticker)
+        series = data.get("Weekly Adjusted Time Series", {})
+        return {day: float(values["5. adjusted close"]) for day, values in series.items()}
+
     def get_market_assumptions(self, ticker: str) -> MarketAssumptions:
         # Deprecated: Logic moved to WaccCalculatorService
         raise NotImplementedError("Use WaccCalculatorService for market assumptions")
@@ -0,0 +1,223 @@
+"""
+Market history: snapshot capture and downsampled time series.
+
+Every MarketSnapshot keeps its sector multiples as JSON (read by the
+backtester), and also as MarketMultiplePoint rows (one per snapshot, sector
+and metric) so history can be range-queried and bucketed in SQL without
+parsing JSON per row.
+
+Series are returned in columnar form (one array per series, aligned to
+one array of bucket dates). The bucket size is chosen from the requested
+range so a payload never exceeds MAX_POINTS buckets, however long the
+range is.
+"""
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, date
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from backend.database.models import MarketSnapshot, MarketMultiplePoint
+from backend.services.financial_data.market_data_service import market_data_service
+
+SNAPSHOT_SECTORS = ["Technology", "Healthcare", "Industrials", "Consumer"]
+RESOLUTIONS = ("day", "week", "month")
+AGGREGATIONS = ("last", "mean")
+MAX_POINTS = 370
+
+# Fallbacks for snapshots stored without rates (same as the snapshot API always used)
+RATE_DEFAULTS = {"risk_free_rate": 0.04, "corporate_spread_bbb": 0.02, "high_yield_spread": 0.04}
+
+
+def explode_multiples(leverage: Dict[str, Any], exits: Dict[str, Any]) -> List[Tuple[str, str, Optional[float]]]:
+    """(sector, metric, value) rows for the two sector-multiple dicts of a snapshot."""
+    rows = [(sector, "exit_multiple", value) for sector, value in exits.items()]
+    for sector, value in leverage.items():
+        if isinstance(value, dict):
+            rows.extend((sector, metric, v) for metric, v in value.items())
+        else:
+            rows.append((sector, "leverage", value))
+    return rows
+
+
+def record_snapshot(db: Session, risk_free_rate: Optional[float], corporate_spread_bbb: Optional[float],
+                    high_yield_spread: Optional[float], leverage_multiples: Dict[str, Any],
+                    exit_multiples: Dict[str, Any], date: Optional[datetime] = None) -> MarketSnapshot:
+    """Add a snapshot and its long-form multiples to the session (the caller commits)."""
+    snapshot = MarketSnapshot(
+        date=date or datetime.utcnow(),
+        risk_free_rate=risk_free_rate,
+        corporate_spread_bbb=corporate_spread_bbb,
+        high_yield_spread=high_yield_spread,
+        sector_leverage_multiples=json.dumps(leverage_multiples),
+        sector_exit_multiples=json.dumps(exit_multiples)
+    )
+    db.add(snapshot)
+    db.flush()
+    db.add_all([
+        MarketMultiplePoint(snapshot_id=snapshot.id, date=snapshot.date, sector=sector, metric=metric, value=value)
+        for sector, metric, value in explode_multiples(leverage_multiples, exit_multiples)
+    ])
+    return snapshot
+
+
+def capture_snapshot(db: Session, sectors: List[str] = SNAPSHOT_SECTORS) -> MarketSnapshot:
+    """Fetch current rates and every sector's multiples concurrently, and store one snapshot."""
+    def sector_multiples(sector):
+        return sector, market_data_service.fetch_leverage_multiples(sector), market_data_service.fetch_exit_multiples(sector)
+
+    with ThreadPoolExecutor(max_workers=len(sectors) + 1) as pool:
+        rates_future = pool.submit(market_data_service.fetch_interest_rates)
+        per_sector = list(pool.map(sector_multiples, sectors))
+        rates = rates_future.result()
+    if not rates:
+        raise ValueError("Failed to fetch market rates")
+
+    snapshot = record_snapshot(
+        db,
+        risk_free_rate=rates.get('risk_free_rate'),
+        corporate_spread_bbb=rates.get('senior_debt_rate') - rates.get('risk_free_rate'), # Backing out spread
+        high_yield_spread=rates.get('mezzanine_debt_rate') - rates.get('risk_free_rate'),
+        leverage_multiples={sector: lev for sector, lev, _ in per_sector},
+        exit_multiples={sector: exit_m['ev_ebitda'] for sector, _, exit_m in per_sector}
+    )
+    db.commit()
+    db.refresh(snapshot)
+    return snapshot
+
+
+def choose_resolution(start: datetime, end: datetime, max_points: int = MAX_POINTS) -> str:
+    days = max((end - start).days, 1)
+    if days <= max_points:
+        return "day"
+    if days / 7 <= max_points:
+        return "week"
+    return "month"
+
+
+def _bucket(db: Session, column, resolution: str):
+    """Start of the day/week (Monday)/month containing `column`, in the bound database's dialect."""
+    if db.get_bind().dialect.name == "sqlite":
+        if resolution == "day":
+            return func.date(column)
+        if resolution == "week":
+            return func.date(column, 'weekday 0', '-6 days')
+        return func.strftime('%Y-%m-01', column)
+    return func.date_trunc(resolution, column)
+
+
+def _bucket_key(value) -> str:
+    if isinstance(value, (datetime, date)):
+        return value.strftime("%Y-%m-%d")
+    return str(value)[:10]
+
+
+def get_series(db: Session, start: datetime, end: datetime, resolution: Optional[str] = None,
+               aggregation: str = "last", sectors: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Rates and sector multiples between start and end, bucketed server-side.
+    "last" takes each bucket's latest snapshot; "mean" averages the bucket.
+    """
+    if resolution is None:
+        resolution = choose_resolution(start, end)
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"resolution must be one of {RESOLUTIONS}")
+    if aggregation not in AGGREGATIONS:
+        raise ValueError(f"aggregation must be one of {AGGREGATIONS}")
+
+    in_range = (MarketSnapshot.date >= start, MarketSnapshot.date <= end)
+    bucket = _bucket(db, MarketSnapshot.date, resolution).label("bucket")
+
+    if aggregation == "last":
+        latest = db.query(bucket, func.max(MarketSnapshot.date).label("latest")).filter(*in_range).group_by(bucket).subquery()
+        snapshot_rows = db.query(
+            latest.c.bucket, func.max(MarketSnapshot.id).label("id")
+        ).join(latest, MarketSnapshot.date == latest.c.latest).group_by(latest.c.bucket).subquery()
+        rate_rows = db.query(
+            snapshot_rows.c.bucket, MarketSnapshot.id, MarketSnapshot.risk_free_rate,
+            MarketSnapshot.corporate_spread_bbb, MarketSnapshot.high_yield_spread
+        ).join(snapshot_rows, MarketSnapshot.id == snapshot_rows.c.id).all()
+        ids = {row.id: _bucket_key(row.bucket) for row in rate_rows}
+        points = db.query(
+            MarketMultiplePoint.snapshot_id, MarketMultiplePoint.sector, MarketMultiplePoint.metric, MarketMultiplePoint.value
+        ).filter(MarketMultiplePoint.snapshot_id.in_(list(ids)))
+        if sectors:
+            points = points.filter(MarketMultiplePoint.sector.in_(sectors))
+        point_rows = [(ids[p.snapshot_id], p.sector, p.metric, p.value) for p in points] if ids else []
+        snapshot_ids = {key: snapshot_id for snapshot_id, key in ids.items()}
+    else:
+        rate_rows = db.query(
+            bucket, func.avg(MarketSnapshot.risk_free_rate).label("risk_free_rate"),
+            func.avg(MarketSnapshot.corporate_spread_bbb).label("corporate_spread_bbb"),
+            func.avg(MarketSnapshot.high_yield_spread).label("high_yield_spread")
+        ).filter(*in_range).group_by(bucket).all()
+        point_bucket = _bucket(db, MarketMultiplePoint.date, resolution).label("bucket")
+        points = db.query(
+            point_bucket, MarketMultiplePoint.sector, MarketMultiplePoint.metric, func.avg(MarketMultiplePoint.value).label("value")
+        ).filter(MarketMultiplePoint.date >= start, MarketMultiplePoint.date <= end)
+        if sectors:
+            points = points.filter(MarketMultiplePoint.sector.in_(sectors))
+        point_rows = [(_bucket_key(p.bucket), p.sector, p.metric, p.value)
+                      for p in points.group_by(point_bucket, MarketMultiplePoint.sector, MarketMultiplePoint.metric)]
+        snapshot_ids = {}
+
+    dates = sorted({_bucket_key(row.bucket) for row in rate_rows})
+    position = {d: i for i, d in enumerate(dates)}
+
+    # Rates as columns; stored spreads may be missing on old snapshots
+    columns = {name: np.full(len(dates), default) for name, default in RATE_DEFAULTS.items()}
+    for row in rate_rows:
+        i = position[_bucket_key(row.bucket)]
+        for name in RATE_DEFAULTS:
+            value = getattr(row, name)
+            if value is not None:
+                columns[name][i] = value
+    rf, bbb, hy = columns["risk_free_rate"], columns["corporate_spread_bbb"], columns["high_yield_spread"]
+    rates = {
+        "risk_free_rate": rf,
+        "senior_debt_rate": rf + bbb,
+        "mezzanine_debt_rate": rf + hy,
+        "preferred_equity_rate": rf + hy + 0.02 # Approx 200bps over HY
+    }
+
+    multiples: Dict[str, Dict[str, List[Optional[float]]]] = {}
+    for key, sector, metric, value in point_rows:
+        series = multiples.setdefault(sector, {}).setdefault(metric, [None] * len(dates))
+        series[position[key]] = value
+
+    return {
+        "resolution": resolution,
+        "aggregation": aggregation,
+        "dates": dates,
+        "snapshot_ids": [snapshot_ids.get(d) for d in dates] if snapshot_ids else None,
+        "rates": {name: [round(float(v), 6) for v in values] for name, values in rates.items()},
+        "multiples": multiples,
+    }
+
+
+def series_to_rows(series: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """The per-snapshot row shape of the original history endpoint, from a columnar series."""
+    rows = []
+    for i, d in enumerate(series["dates"]):
+        exits, leverage = {}, {}
+        for sector, metrics in series["multiples"].items():
+            for metric, values in metrics.items():
+                if values[i] is None:
+                    continue
+                if metric == "exit_multiple":
+                    exits[sector] = values[i]
+                elif metric == "leverage":
+                    leverage[sector] = values[i]
+                else:
+                    leverage.setdefault(sector, {})[metric] = values[i]
+        rows.append({
+            "id": series["snapshot_ids"][i] if series["snapshot_ids"] else None,
+            "date": d,
+            "rates": {name: values[i] for name, values in series["rates"].items()},
+            "multiples": exits,
+            "system_multiples": leverage
+        })
+    return rows
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Optional, Any
+from typing import Optional, Any, Dict
 from backend.calculations.models import HistoricalFinancials, MarketAssumptions
 
 class FinancialDataProvider(ABC):
@@ -34,3 +34,10 @@ class FinancialDataProvider(ABC):
         Fetch the current 10-year Treasury Yield.
         """
         pass
+
+    @abstractmethod
+    def get_price_history(self, ticker: str) -> Dict[str, float]:
+        """
+        Fetch weekly adjusted closes as {"YYYY-MM-DD": price}.
+        """
+        pass
@@ -69,8 +69,8 @@ class HistoricalDataService:
         
         # 2. Seed Historical Market Snapshots (for Backtesting)
         from backend.database.models import MarketSnapshot
+        from backend.services.financial_data.market_history import record_snapshot
         from datetime import datetime
-        import json
         
         # Check if snapshots exist
         if not self.db.query(MarketSnapshot).first():
@@ -81,35 +81,38 @@ class HistoricalDataService:
                     "risk_free_rate": 0.007, # 0.7%
                     "corporate_spread_bbb": 0.025,
                     "high_yield_spread": 0.06,
-                    "sector_leverage_multiples": json.dumps({"Technology": 5.5, "Healthcare": 5.0, "Industrial": 4.5}),
-                    "sector_exit_multiples": json.dumps({"Technology": 12.0, "Healthcare": 13.0, "Industrial": 8.0})
+                    "sector_leverage_multiples": {"Technology": 5.5, "Healthcare": 5.0, "Industrial": 4.5},
+                    "sector_exit_multiples": {"Technology": 12.0, "Healthcare": 13.0, "Industrial": 8.0}
                 },
                 {
                     "date": datetime(2021, 6, 15), # 2021 (Peak)
                     "risk_free_rate": 0.015, # 1.5%
                     "corporate_spread_bbb": 0.015,
                     "high_yield_spread": 0.035,
-                    "sector_leverage_multiples": json.dumps({"Technology": 6.5, "Healthcare": 6.0, "Industrial": 5.5}),
-                    "sector_exit_multiples": json.dumps({"Technology": 15.0, "Healthcare": 16.0, "Industrial": 10.0})
+                    "sector_leverage_multiples": {"Technology": 6.5, "Healthcare": 6.0, "Industrial": 5.5},
+                    "sector_exit_multiples": {"Technology": 15.0, "Healthcare": 16.0, "Industrial": 10.0}
                 },
                 {
                     "date": datetime(2022, 6, 15), # 2022 (Rate Hikes)
                     "risk_free_rate": 0.03, # 3.0%
                     "corporate_spread_bbb": 0.02,
                     "high_yield_spread": 0.05,
-                    "sector_leverage_multiples": json.dumps({"Technology": 4.5, "Healthcare": 5.0, "Industrial": 4.0}),
-                    "sector_exit_multiples": json.dumps({"Technology": 10.0, "Healthcare": 12.0, "Industrial": 7.5})
+                    "sector_leverage_multiples": {"Technology": 4.5, "Healthcare": 5.0, "Industrial": 4.0},
+                    "sector_exit_multiples": {"Technology": 10.0, "Healthcare": 12.0, "Industrial": 7.5}
                 },
                  {
                     "date": datetime(2019, 6, 15), # 2019 (Pre-COVID)
                     "risk_free_rate": 0.02, 
                     "corporate_spread_bbb": 0.018,
                     "high_yield_spread": 0.04,
-                    "sector_leverage_multiples": json.dumps({"Technology": 5.0, "Healthcare": 5.2, "Industrial": 4.2}),
-                    "sector_exit_multiples": json.dumps({"Technology": 11.0, "Healthcare": 13.0, "Industrial": 8.5})
+                    "sector_leverage_multiples": {"Technology": 5.0, "Healthcare": 5.2, "Industrial": 4.2},
+                    "sector_exit_multiples": {"Technology": 11.0, "Healthcare": 13.0, "Industrial": 8.5}
                 }
             ]
             
             for snap in snapshot_data:
-                self.db.add(MarketSnapshot(**snap))
+                record_snapshot(
+                    self.db, snap["risk_free_rate"], snap["corporate_spread_bbb"], snap["high_yield_spread"],
+                    snap["sector_leverage_multiples"], snap["sector_exit_multiples"], date=snap["date"]
+                )
             self.db.commit()
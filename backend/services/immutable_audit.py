@@ -1,9 +1,53 @@
 import hashlib
 import json
-from typing import Optional, List
+import threading
+from types import SimpleNamespace
+from typing import Any, Dict, Optional, List
 from datetime import datetime
+from sqlalchemy import text
 from sqlmodel import Session, select
 from backend.database.models import AuditLog
+from backend.services.audit.chain_verifier import calculate_entry_hash, chain_verifier
+
+# Appends to the chain are serialized: this lock covers threads of one process,
+# lock_chain_tail the other workers (held until the appending transaction ends).
+chain_lock = threading.Lock()
+_CHAIN_LOCK_KEY = 0x617564697463  # pg advisory lock id ("auditc")
+
+def lock_chain_tail(connection):
+    """Take the database lock for appending to the chain, before the tail is read."""
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _CHAIN_LOCK_KEY})
+    elif connection.dialect.name == "sqlite":
+        # A no-op write takes SQLite's write lock; other writers wait in busy_timeout
+        connection.execute(text("UPDATE audit_logs SET id = id WHERE 0 = 1"))
+
+def mine_block(entry, difficulty: int = 2) -> str:
+    """
+    Simple Proof of Work.
+    Increment nonce until hash starts with '0' * difficulty.
+    """
+    prefix = '0' * difficulty
+    while True:
+        entry_hash = calculate_entry_hash(entry)
+        if entry_hash.startswith(prefix):
+            entry.hash = entry_hash
+            return entry_hash
+        entry.nonce += 1
+
+def link_rows(session: Session, rows: List[Dict[str, Any]]):
+    """
+    Chain AuditLog row dicts (in insert order) onto the current tail: sets
+    previous_hash, nonce and hash on each. The caller must hold chain_lock and
+    insert the rows in the same transaction.
+    """
+    lock_chain_tail(session.connection())
+    last_entry = ImmutableAuditService(session)._get_last_entry()
+    previous_hash = last_entry.hash if last_entry and last_entry.hash else "0" * 64
+    for row in rows:
+        block = SimpleNamespace(**dict(row, previous_hash=previous_hash, nonce=0))
+        previous_hash = mine_block(block)
+        row.update(previous_hash=block.previous_hash, nonce=block.nonce, hash=block.hash)
 
 class ImmutableAuditService:
     def __init__(self, session: Session):
@@ -13,121 +57,77 @@ class ImmutableAuditService:
         """
         Creates an audit log entry that is cryptographically linked to the previous entry.
         """
-        # 1. Get Previous Hash
-        last_entry = self._get_last_entry()
-        previous_hash = last_entry.hash if last_entry and last_entry.hash else "0" * 64
-
-        # 2. Prepare Block Data
-        timestamp = datetime.now()
-        
-        details_json = None
-        if details:
-            details_json = json.dumps(details) if isinstance(details, dict) else str(details)
-        
-        entry = AuditLog(
-            user_id=user_id,
-            action_type=action,
-            resource_type=resource_type,
-            resource_id=resource_id,
-            details=details_json or "{}",
-            timestamp=timestamp,
-            previous_hash=previous_hash,
-            nonce=0
-        )
-
-        # 3. Mine the Block (Proof of Work)
-        # We find a nonce such that hash starts with '00' (difficulty tunable)
-        self._mine_block(entry)
-
-        # 4. Save to DB
-        self.session.add(entry)
-        self.session.commit()
+        with chain_lock:
+            # 1. Get Previous Hash (no other appender can move the tail until we commit)
+            lock_chain_tail(self.session.connection())
+            last_entry = self._get_last_entry()
+            previous_hash = last_entry.hash if last_entry and last_entry.hash else "0" * 64
+
+            # 2. Prepare Block Data
+            timestamp = datetime.now()
+
+            details_json = None
+            if details:
+                details_json = json.dumps(details) if isinstance(details, dict) else str(details)
+
+            entry = AuditLog(
+                user_id=user_id,
+                action_type=action,
+                resource_type=resource_type,
+                resource_id=resource_id,
+                details=details_json or "{}",
+                timestamp=timestamp,
+                previous_hash=previous_hash,
+                nonce=0
+            )
+
+            # 3. Mine the Block (Proof of Work)
+            # We find a nonce such that hash starts with '00' (difficulty tunable)
+            self._mine_block(entry)
+
+            # 4. Save to DB
+            self.session.add(entry)
+            self.session.commit()
         self.session.refresh(entry)
-        
+
         return entry
 
-    def get_history(self, resource_id: str = None) -> List[AuditLog]:
+    def get_history(self, resource_id: str = None, after_id: Optional[int] = None, limit: Optional[int] = None) -> List[AuditLog]:
         """
-        Retrieves the audit chain. 
+        Retrieves the audit chain in id order.
         Optionally filters by resource_id (though chained integrity is global).
+        Pass the last id of the previous page as `after_id` to page through
+        long histories (served by the (resource_id, id) index).
         """
         statement = select(AuditLog).order_by(AuditLog.id.asc())
         if resource_id:
             statement = statement.where(AuditLog.resource_id == resource_id)
+        if after_id is not None:
+            statement = statement.where(AuditLog.id > after_id)
+        if limit is not None:
+            statement = statement.limit(limit)
         return self.session.execute(statement).scalars().all()
 
-    def verify_chain_integrity(self) -> dict:
+    def verify_chain_integrity(self, full: bool = False) -> dict:
         """
-        Iterates through the entire chain and verifies hashes and links.
+        Verifies hashes and links of the chain.
+        By default only rows appended since the last verified checkpoint are
+        checked; `full=True` re-verifies every row, range by range between checkpoints.
         Returns validation status and any broken blocks.
         """
-        entries = self.session.execute(select(AuditLog).order_by(AuditLog.id)).scalars().all()
-        if not entries:
-            return {"status": "valid", "count": 0}
-
-        broken_blocks = []
-        
-        # Verify Genesis Block (if exists) or first link
-        # For simplicity, we just loop from index 1 (if index 0 is genesis)
-        # But actually we should verify every block's internal hash vs its content
-        
-        for i, entry in enumerate(entries):
-            # 1. Verify internal hash integrity
-            calculated_hash = self._calculate_hash(entry)
-            if calculated_hash != entry.hash:
-                broken_blocks.append({
-                    "id": entry.id, 
-                    "issue": "Content altered (Hash mismatch)",
-                    "expected": calculated_hash,
-                    "actual": entry.hash
-                })
-                continue
-
-            # 2. Verify Chain Linkage (except first block)
-            if i > 0:
-                previous_entry = entries[i-1]
-                if entry.previous_hash != previous_entry.hash:
-                     broken_blocks.append({
-                        "id": entry.id,
-                        "issue": "Chain broken (Previous Hash mismatch)",
-                        "expected_prev": previous_entry.hash,
-                        "actual_prev": entry.previous_hash
-                    })
-
-        if broken_blocks:
-            return {"status": "compromised", "broken_blocks": broken_blocks}
-        
-        return {"status": "valid", "count": len(entries), "last_hash": entries[-1].hash}
+        if full:
+            return chain_verifier.verify_full(self.session)
+        return chain_verifier.verify_incremental(self.session)
 
     def _get_last_entry(self) -> Optional[AuditLog]:
         statement = select(AuditLog).order_by(AuditLog.id.desc()).limit(1)
         return self.session.execute(statement).scalars().first()
 
     def _mine_block(self, entry: AuditLog, difficulty: int = 2):
-        """
-        Simple Proof of Work.
-        Increment nonce until hash starts with '0' * difficulty.
-        """
-        prefix = '0' * difficulty
-        while True:
-            entry_hash = self._calculate_hash(entry)
-            if entry_hash.startswith(prefix):
-                entry.hash = entry_hash
-                return
-            entry.nonce += 1
+        mine_block(entry, difficulty)
 
     def _calculate_hash(self, entry: AuditLog) -> str:
         """
         SHA-256(index + timestamp + user + action + resource + prev_hash + nonce)
         """
-        # Ensure consistent serialization
-        if isinstance(entry.details, str):
-            details_str = entry.details
-        else:
-            details_str = json.dumps(entry.details, sort_keys=True) if entry.details else "{}"
-        # Note: We must use the exact string representation of timestamp used in DB or convert properly
-        # Ideally, use timestamp.isoformat() but ensure it matches what was stored/retrieved
-        ts_str = entry.timestamp.isoformat()
-        
-        block_content = f"{entry.user_id}{entry.action_type}{entry.resource_id}{details_str}{ts_str}{entry.previous_hash}{entry.nonce}"
-        return hashlib.sha256(block_content.encode()).hexdigest()
+        return calculate_entry_hash(entry)
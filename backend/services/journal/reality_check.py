@@ -1,104 +1,275 @@
-from datetime import datetime
-from typing import List, Dict, Any
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Iterator, Optional
+from sqlalchemy import func, case, cast, and_, Integer
 from sqlalchemy.orm import Session
-from backend.database.models import DecisionRecord, AcknowledgementRecord
+from backend.database.models import DecisionRecord, AcknowledgementRecord, RealityCheckWeek
+import calendar
 import json
 import os
 
+REPORT_DIR = "reports/weekly"
+WEEK = timedelta(days=7)
+
+ACKNOWLEDGED_STATES = ["acknowledged", "resolved", "overridden"]
+NEGATIVE_OUTCOMES = ["DEFAULT", "DILUTION", "FIRE_SALE"]
+
 def get_decisions_between(db: Session, start_date: datetime, end_date: datetime) -> List[DecisionRecord]:
     return db.query(DecisionRecord).filter(
         DecisionRecord.created_at >= start_date,
         DecisionRecord.created_at <= end_date
     ).all()
 
-def calculate_alignment(decision: DecisionRecord) -> str:
+def calculate_alignment(decision) -> str:
     """Determine if outcome aligned with prediction."""
     if not decision.actual_outcome:
         return "PENDING"
-    
+
     # Simple logic: CRITICAL decisions should have negative outcomes if strictly predictive,
     # BUT if we intervened (Action Taken), we might have AVOIDED the negative outcome.
     # This logic checks if the "Reality" matches the "Signal Type".
     # For now, following user spec: CRITICAL -> Expect Negative Outcome if ignored?
     # User Spec: "CRITICAL decisions should have negative outcomes" => YES/NO
     if decision.severity == "CRITICAL":
-        return "YES" if decision.actual_outcome in ["DEFAULT", "DILUTION", "FIRE_SALE"] else "NO"
-    
+        return "YES" if decision.actual_outcome in NEGATIVE_OUTCOMES else "NO"
+
     return "TBD"
 
-def should_tune(decision: DecisionRecord) -> bool:
+def should_tune(decision) -> bool:
     # If High Confidence but Poor Alignment -> Tune
     if decision.confidence > 0.8 and calculate_alignment(decision) == "NO":
         return True
     return False
 
-def generate_weekly_reality_check(db: Session, start_date: datetime, end_date: datetime) -> Dict[str, Any]:
-    """Generate the weekly 'Decisions Fired vs Reality' report."""
-    
-    decisions = get_decisions_between(db, start_date, end_date)
-    
-    # Pre-fetch acknowledgements if needed (or rely on decision.state/acknowledgement_hash)
-    # Since DecisionRecord now has state, we can use that.
-    
-    report = {
-        "report_period": f"{start_date.date()} to {end_date.date()}",
-        "generated_at": datetime.utcnow().isoformat(),
-        "summary": {
-            "total_decisions": len(decisions),
-            "critical_decisions": sum(1 for d in decisions if d.severity == "CRITICAL"),
-            "acknowledged": sum(1 for d in decisions if d.state in ["acknowledged", "resolved", "overridden"]), # inferred from state
-            "with_outcomes": sum(1 for d in decisions if d.actual_outcome is not None)
-        },
-        "decisions_table": []
+# --- SQL building blocks ---------------------------------------------------
+
+def _epoch(db: Session, column):
+    """Seconds since 1970 for a naive UTC timestamp column, in the bound database's dialect."""
+    if db.get_bind().dialect.name == "sqlite":
+        # Drop the fraction first: SQLite rounds it to milliseconds, which can cross a second (and week) boundary
+        return cast(func.strftime('%s', func.substr(column, 1, 19)), Integer)
+    return func.extract('epoch', column)
+
+def _week_index(db: Session, column, first_week: datetime):
+    seconds = _epoch(db, column) - calendar.timegm(first_week.utctimetuple())
+    return seconds // int(WEEK.total_seconds())
+
+def _ack_join():
+    return and_(AcknowledgementRecord.signature_hash == DecisionRecord.acknowledgement_hash,
+                DecisionRecord.acknowledgement_hash.isnot(None))
+
+def _summary_columns(db: Session):
+    """Aggregates computed by the database: counts, response lag and the activity watermark."""
+    lag_hours = (_epoch(db, AcknowledgementRecord.timestamp) - _epoch(db, DecisionRecord.created_at)) / 3600.0
+    return [
+        func.count(DecisionRecord.decision_id).label("total_decisions"),
+        func.sum(case((DecisionRecord.severity == "CRITICAL", 1), else_=0)).label("critical_decisions"),
+        func.sum(case((DecisionRecord.state.in_(ACKNOWLEDGED_STATES), 1), else_=0)).label("acknowledged"),
+        func.sum(case((DecisionRecord.actual_outcome.isnot(None), 1), else_=0)).label("with_outcomes"),
+        func.sum(case((and_(
+            DecisionRecord.confidence > 0.8,
+            DecisionRecord.severity == "CRITICAL",
+            DecisionRecord.actual_outcome.isnot(None),
+            DecisionRecord.actual_outcome != "",
+            DecisionRecord.actual_outcome.notin_(NEGATIVE_OUTCOMES),
+        ), 1), else_=0)).label("tuning_required"),
+        func.avg(lag_hours).label("avg_response_lag_hours"),
+        func.max(lag_hours).label("max_response_lag_hours"),
+        func.max(DecisionRecord.created_at).label("last_created"),
+        func.max(DecisionRecord.outcome_recorded_at).label("last_outcome"),
+        func.max(AcknowledgementRecord.timestamp).label("last_ack"),
+    ]
+
+def _summary(row) -> Dict[str, Any]:
+    return {
+        "total_decisions": row.total_decisions or 0,
+        "critical_decisions": row.critical_decisions or 0,
+        "acknowledged": row.acknowledged or 0,
+        "with_outcomes": row.with_outcomes or 0,
+        "tuning_required": row.tuning_required or 0,
+        "avg_response_lag_hours": round(row.avg_response_lag_hours, 1) if row.avg_response_lag_hours is not None else "N/A",
     }
-    
-    for decision in decisions:
-        # Fetch detailed acknowledgement if needed
-        ack = None
-        if decision.acknowledgement_hash:
-             ack = db.query(AcknowledgementRecord).filter(AcknowledgementRecord.signature_hash == decision.acknowledgement_hash).first()
-
-        row = {
+
+def _watermark(row) -> Optional[datetime]:
+    stamps = [s for s in (row.last_created, row.last_outcome, row.last_ack) if s is not None]
+    # SQLite returns aggregates of DateTime columns as strings
+    stamps = [s if isinstance(s, datetime) else datetime.fromisoformat(s) for s in stamps]
+    return max(stamps) if stamps else None
+
+def _iter_decision_rows(db: Session, start_date: datetime, end_date: datetime) -> Iterator[Dict[str, Any]]:
+    """One joined, streamed query for the decisions table (no per-decision acknowledgement lookups)."""
+    query = db.query(
+        DecisionRecord.decision_id, DecisionRecord.signal, DecisionRecord.company_id, DecisionRecord.created_at,
+        DecisionRecord.severity, DecisionRecord.confidence, DecisionRecord.recommended_actions_json,
+        DecisionRecord.state, DecisionRecord.actual_outcome,
+        AcknowledgementRecord.rationale, AcknowledgementRecord.timestamp.label("ack_timestamp"),
+    ).outerjoin(AcknowledgementRecord, _ack_join()).filter(
+        DecisionRecord.created_at >= start_date,
+        DecisionRecord.created_at < end_date
+    ).order_by(DecisionRecord.created_at, DecisionRecord.decision_id).yield_per(500)
+
+    for decision in query:
+        actions = json.loads(decision.recommended_actions_json) if decision.recommended_actions_json else []
+        has_ack = decision.ack_timestamp is not None
+        yield {
             "decision_id": decision.decision_id,
             "signal": decision.signal,
             "company": decision.company_id,
             "fired_at": decision.created_at.isoformat(),
             "severity": decision.severity,
             "confidence": decision.confidence,
-            "recommended_action": json.loads(decision.recommended_actions_json)[0] if decision.recommended_actions_json else "N/A",
+            "recommended_action": actions[0] if actions else "N/A",
             "human_response": decision.state if decision.state != "active" else "PENDING",
-            "response_rationale": ack.rationale if ack else "",
-            "response_lag_hours": round((ack.timestamp - decision.created_at).total_seconds() / 3600, 1) if ack else "N/A",
+            "response_rationale": decision.rationale if has_ack else "",
+            "response_lag_hours": round((decision.ack_timestamp - decision.created_at).total_seconds() / 3600, 1) if has_ack else "N/A",
             "actual_outcome": decision.actual_outcome or "TBD",
             "outcome_aligned": calculate_alignment(decision),
             "tuning_required": should_tune(decision)
         }
-        report["decisions_table"].append(row)
-    
+
+# --- Reports ---------------------------------------------------------------
+
+def generate_weekly_reality_check(db: Session, start_date: datetime, end_date: datetime) -> Dict[str, Any]:
+    """Generate the weekly 'Decisions Fired vs Reality' report."""
+    # end_date is inclusive
+    end_exclusive = end_date + timedelta(microseconds=1)
+
+    totals = db.query(*_summary_columns(db)).outerjoin(AcknowledgementRecord, _ack_join()).filter(
+        DecisionRecord.created_at >= start_date,
+        DecisionRecord.created_at < end_exclusive
+    ).one()
+
+    report = {
+        "report_period": f"{start_date.date()} to {end_date.date()}",
+        "generated_at": datetime.utcnow().isoformat(),
+        "summary": _summary(totals),
+        "decisions_table": list(_iter_decision_rows(db, start_date, end_exclusive))
+    }
+
     # Save as markdown for readability
-    report_dir = "reports/weekly"
-    os.makedirs(report_dir, exist_ok=True)
-    report_path = f"{report_dir}/{start_date.date()}_reality_check.md"
-    
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    report_path = f"{REPORT_DIR}/{start_date.date()}_reality_check.md"
+
     save_report_as_markdown(report, report_path)
-    
+
     return report
 
+def generate_weekly_reports(db: Session, first_week: datetime, weeks: int = 1, force: bool = False,
+                            report_dir: str = REPORT_DIR) -> Dict[str, Any]:
+    """
+    Refresh the per-week rollups and markdown reports for `weeks` consecutive
+    weeks starting at `first_week`, in one batch: one grouped query for all
+    weekly summaries, then one streamed query for the decision rows of the
+    weeks that changed. Weeks whose activity watermark and decision count
+    match the stored rollup (and whose report exists) are skipped.
+    """
+    end = first_week + weeks * WEEK
+    week_index = _week_index(db, DecisionRecord.created_at, first_week).label("week_index")
+    grouped = db.query(week_index, *_summary_columns(db)).outerjoin(AcknowledgementRecord, _ack_join()).filter(
+        DecisionRecord.created_at >= first_week,
+        DecisionRecord.created_at < end
+    ).group_by(week_index).all()
+    by_week = {int(row.week_index): row for row in grouped}
+
+    stored = {
+        w.week_start: w for w in db.query(RealityCheckWeek).filter(
+            RealityCheckWeek.week_start >= first_week, RealityCheckWeek.week_start < end
+        )
+    }
+
+    stale = []
+    for i in range(weeks):
+        week_start = first_week + i * WEEK
+        row = by_week.get(i)
+        rollup = stored.get(week_start)
+        total = row.total_decisions if row else 0
+        watermark = _watermark(row) if row else None
+        if (not force and rollup is not None and rollup.total_decisions == total
+                and rollup.activity_watermark == watermark
+                and rollup.report_path and os.path.exists(rollup.report_path)):
+            continue
+
+        if rollup is None:
+            rollup = RealityCheckWeek(week_start=week_start)
+            db.add(rollup)
+        summary = _summary(row) if row else _summary(_EmptyWeek)
+        rollup.total_decisions = summary["total_decisions"]
+        rollup.critical_decisions = summary["critical_decisions"]
+        rollup.acknowledged = summary["acknowledged"]
+        rollup.with_outcomes = summary["with_outcomes"]
+        rollup.tuning_required = summary["tuning_required"]
+        rollup.avg_response_lag_hours = row.avg_response_lag_hours if row else None
+        rollup.max_response_lag_hours = row.max_response_lag_hours if row else None
+        rollup.activity_watermark = watermark
+        rollup.report_path = os.path.join(report_dir, f"{week_start.date()}_reality_check.md")
+        rollup.generated_at = datetime.utcnow()
+        stale.append((week_start, summary, rollup.report_path))
+
+    if stale:
+        # Stream the rows of the changed span once, writing each week's report as it completes
+        os.makedirs(report_dir, exist_ok=True)
+        pending = iter(stale)
+        current = next(pending)
+        rows: List[Dict[str, Any]] = []
+
+        def flush(week):
+            week_start, summary, path = week
+            save_report_as_markdown({
+                "report_period": f"{week_start.date()} to {(week_start + WEEK - timedelta(days=1)).date()}",
+                "generated_at": datetime.utcnow().isoformat(),
+                "summary": summary,
+                "decisions_table": rows
+            }, path)
+
+        span_start, span_end = stale[0][0], stale[-1][0] + WEEK
+        for row in _iter_decision_rows(db, span_start, span_end):
+            fired_at = datetime.fromisoformat(row["fired_at"])
+            while current is not None and fired_at >= current[0] + WEEK:
+                flush(current)
+                rows = []
+                current = next(pending, None)
+            if current is not None and fired_at >= current[0]:
+                rows.append(row)
+        while current is not None:
+            flush(current)
+            rows = []
+            current = next(pending, None)
+
+    db.commit()
+    return {
+        "weeks": weeks,
+        "regenerated": [week_start.date().isoformat() for week_start, _, _ in stale],
+        "skipped": weeks - len(stale)
+    }
+
+def regenerate_year(db: Session, year: int, force: bool = False, report_dir: str = REPORT_DIR) -> Dict[str, Any]:
+    """Weekly reports for every Monday-starting week that begins in `year`, in one batch run."""
+    first_week = datetime(year, 1, 1)
+    first_week += timedelta(days=(7 - first_week.weekday()) % 7)
+    weeks = 0
+    while (first_week + weeks * WEEK).year == year:
+        weeks += 1
+    return generate_weekly_reports(db, first_week, weeks, force=force, report_dir=report_dir)
+
+def get_weekly_rollups(db: Session, since: datetime) -> List[RealityCheckWeek]:
+    return db.query(RealityCheckWeek).filter(RealityCheckWeek.week_start >= since).order_by(RealityCheckWeek.week_start).all()
+
+class _EmptyWeek:
+    total_decisions = critical_decisions = acknowledged = with_outcomes = tuning_required = 0
+    avg_response_lag_hours = None
+
 def save_report_as_markdown(report: Dict, path: str):
-    md = f"# Weekly Reality Check: {report['report_period']}\n\n"
-    md += f"**Generated At**: {report['generated_at']}\n\n"
-    
-    md += "## Summary\n"
-    for k, v in report['summary'].items():
-        md += f"- **{k.replace('_', ' ').title()}**: {v}\n"
-    
-    md +=("\n## Decisions Table\n")
-    md +=("| ID | Signal | Severity | Response | Lag (Hrs) | Rationale | Alignment |\n")
-    md +=("|---|---|---|---|---|---|---|\n")
-    
-    for row in report['decisions_table']:
-        rationale_snippet = (row['response_rationale'][:30] + '...') if len(row['response_rationale']) > 30 else row['response_rationale']
-        md += f"| {row['decision_id'][:8]} | {row['signal']} | {row['severity']} | {row['human_response']} | {row['response_lag_hours']} | {rationale_snippet} | {row['outcome_aligned']} |\n"
-        
     with open(path, "w") as f:
-        f.write(md)
+        f.write(f"# Weekly Reality Check: {report['report_period']}\n\n")
+        f.write(f"**Generated At**: {report['generated_at']}\n\n")
+
+        f.write("## Summary\n")
+        for k, v in report['summary'].items():
+            f.write(f"- **{k.replace('_', ' ').title()}**: {v}\n")
+
+        f.write("\n## Decisions Table\n")
+        f.write("| ID | Signal | Severity | Response | Lag (Hrs) | Rationale | Alignment |\n")
+        f.write("|---|---|---|---|---|---|---|\n")
+
+        for row in report['decisions_table']:
+            rationale_snippet = (row['response_rationale'][:30] + '...') if len(row['response_rationale']) > 30 else row['response_rationale']
+            f.write(f"| {row['decision_id'][:8]} | {row['signal']} | {row['severity']} | {row['human_response']} | {row['response_lag_hours']} | {rationale_snippet} | {row['outcome_aligned']} |\n")
@@ -1,95 +1,212 @@
 from sqlalchemy import func
+from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
-from backend.database.models import SessionLocal, SystemMetric, ValuationMetric
+from typing import Any, Dict, Optional
+from backend.database.models import SessionLocal, SystemMetric, ValuationMetric, LatencySketchBucket
+from backend.services.metrics.sketch import BucketStats, LatencySketch, LatencyRecorder, latency_recorder
+from backend.services.alerting.service import alert_service
 from backend.utils.cache import cache
-# import pandas as pd
-import json
+
+def merge_sketch_buckets(db: Session, kind: str, since: datetime, until: Optional[datetime] = None) -> Dict[str, BucketStats]:
+    """
+    Merge persisted per-minute sketches for one kind into one BucketStats per key.
+    A 24h window is at most 1440 rows per key, independent of request volume.
+    """
+    query = db.query(
+        LatencySketchBucket.key,
+        LatencySketchBucket.error_count,
+        LatencySketchBucket.hit_count,
+        LatencySketchBucket.sketch,
+    ).filter(
+        LatencySketchBucket.kind == kind,
+        LatencySketchBucket.bucket_start >= since,
+    )
+    if until is not None:
+        query = query.filter(LatencySketchBucket.bucket_start < until)
+
+    merged: Dict[str, BucketStats] = {}
+    for key, error_count, hit_count, payload in query.yield_per(1000):
+        stats = merged.get(key)
+        if stats is None:
+            stats = merged[key] = BucketStats()
+        stats.sketch.merge(LatencySketch.from_json(payload))
+        stats.error_count += error_count or 0
+        stats.hit_count += hit_count or 0
+    return merged
+
+def _raw_window(query, column, since: datetime, until: Optional[datetime]):
+    query = query.filter(column >= since)
+    if until is not None:
+        query = query.filter(column < until)
+    return query
+
+def _sketches_from_raw_system(db: Session, since: datetime, until: Optional[datetime] = None) -> Dict[str, BucketStats]:
+    """Fallback for time recorded before sketches existed: stream raw rows into sketches."""
+    merged: Dict[str, BucketStats] = {}
+    query = db.query(SystemMetric.endpoint, SystemMetric.response_time_ms, SystemMetric.status_code)
+    for endpoint, response_time, status_code in _raw_window(query, SystemMetric.timestamp, since, until).yield_per(5000):
+        stats = merged.setdefault(endpoint, BucketStats())
+        stats.sketch.add(response_time or 0)
+        if (status_code or 0) >= 400:
+            stats.error_count += 1
+    return merged
+
+def _sketches_from_raw_valuation(db: Session, since: datetime, until: Optional[datetime] = None) -> Dict[str, BucketStats]:
+    merged: Dict[str, BucketStats] = {}
+    query = db.query(ValuationMetric.method_type, ValuationMetric.duration_ms, ValuationMetric.cache_hit)
+    for method_type, duration, cache_hit in _raw_window(query, ValuationMetric.created_at, since, until).yield_per(5000):
+        stats = merged.setdefault(method_type, BucketStats())
+        stats.sketch.add(duration or 0)
+        if cache_hit:
+            stats.hit_count += 1
+    return merged
+
+def _with_pending(merged: Dict[str, BucketStats], kind: str) -> Dict[str, BucketStats]:
+    """Include this worker's not-yet-flushed buckets so summaries are current."""
+    for key, stats in latency_recorder.pending(kind).items():
+        merged.setdefault(key, BucketStats()).merge(stats)
+    return merged
+
+def sketch_coverage_start(db: Session, kind: str, since: datetime) -> Optional[datetime]:
+    """
+    Start of the first sketch bucket (persisted, or pending in this worker) of
+    `kind` in the window. Sketches cover the window from there on; earlier
+    time only has raw rows. None if no sketch falls in the window.
+    """
+    persisted = db.query(func.min(LatencySketchBucket.bucket_start)).filter(
+        LatencySketchBucket.kind == kind,
+        LatencySketchBucket.bucket_start >= since,
+    ).scalar()
+    pending = latency_recorder.oldest_pending(kind)
+    if pending is not None and pending < since:
+        pending = None
+    starts = [start for start in (persisted, pending) if start is not None]
+    return min(starts) if starts else None
+
+def merge_window(db: Session, kind: str, since: datetime, raw_fallback) -> Dict[str, BucketStats]:
+    """
+    Per-key stats over [since, now): sketches where they cover the window,
+    raw rows (via `raw_fallback(db, since, until)`) for the part before the
+    first sketch bucket, so each request is counted exactly once.
+    """
+    covered_from = sketch_coverage_start(db, kind, since)
+    merged = merge_sketch_buckets(db, kind, since) if covered_from is not None else {}
+    if covered_from is None or covered_from > since:
+        for key, stats in raw_fallback(db, since, covered_from).items():
+            merged.setdefault(key, BucketStats()).merge(stats)
+    return _with_pending(merged, kind)
+
+def summarize_users(db: Session, since: datetime) -> Dict[str, Any]:
+    """
+    Active users and requests per user, from the unsampled per-user sketches.
+    Time before those existed only has the sampled raw rows; the result is
+    then flagged as sampled.
+    """
+    raw: Dict[str, BucketStats] = {}
+
+    def raw_users(db: Session, since: datetime, until: Optional[datetime]) -> Dict[str, BucketStats]:
+        query = db.query(SystemMetric.user_id, func.count(SystemMetric.id)).filter(SystemMetric.user_id.isnot(None))
+        for user_id, count in _raw_window(query, SystemMetric.timestamp, since, until).group_by(SystemMetric.user_id):
+            raw[str(user_id)] = BucketStats()
+            raw[str(user_id)].sketch.add(0, weight=count)
+        return raw
+
+    per_user = merge_window(db, LatencyRecorder.KIND_USER, since, raw_users)
+    requests = sum(stats.count for stats in per_user.values())
+    return {
+        "active_users": len(per_user),
+        "avg_actions_per_user": requests / len(per_user) if per_user else 0.0,
+        "active_users_sampled": bool(raw),
+    }
+
+def summarize_system(db: Session, since: datetime) -> Optional[dict]:
+    per_endpoint = merge_window(db, LatencyRecorder.KIND_ENDPOINT, since, _sketches_from_raw_system)
+    if not per_endpoint:
+        return None
+
+    overall = BucketStats()
+    for stats in per_endpoint.values():
+        overall.merge(stats)
+    total_requests = overall.count
+
+    top_endpoints = [
+        {
+            "endpoint": endpoint,
+            "avg_time": stats.sketch.mean,
+            "p95_time": stats.sketch.quantile(0.95),
+            "count": stats.count,
+            "errors": stats.error_count,
+        }
+        for endpoint, stats in sorted(per_endpoint.items(), key=lambda kv: kv[1].count, reverse=True)[:10]
+    ]
+
+    users = summarize_users(db, since)
+
+    return {
+        "total_requests": int(total_requests),
+        "avg_response_time": float(overall.sketch.mean),
+        "p95_response_time": float(overall.sketch.quantile(0.95)),
+        "p99_response_time": float(overall.sketch.quantile(0.99)),
+        "error_rate": float(overall.error_count / total_requests) if total_requests else 0.0,
+        "active_users": users["active_users"],
+        "avg_actions_per_user": float(users["avg_actions_per_user"]),
+        "active_users_sampled": users["active_users_sampled"],  # Partly from sampled raw rows
+        "top_endpoints": top_endpoints,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+def summarize_valuations(db: Session, since: datetime) -> Optional[dict]:
+    per_method = merge_window(db, LatencyRecorder.KIND_VALUATION, since, _sketches_from_raw_valuation)
+    if not per_method:
+        return None
+
+    overall = BucketStats()
+    for stats in per_method.values():
+        overall.merge(stats)
+    total = overall.count
+
+    avg_complexity = db.query(func.avg(ValuationMetric.input_complexity_score))\
+        .filter(ValuationMetric.created_at >= since).scalar()
+
+    return {
+        "total_valuations": int(total),
+        "avg_duration": float(overall.sketch.mean),
+        "p95_duration": float(overall.sketch.quantile(0.95)),
+        "cache_hit_rate": float(overall.hit_count / total) if total else 0.0,
+        "avg_complexity": float(avg_complexity or 0),
+        "method_popularity": {k: v.count / total for k, v in per_method.items()},
+        "method_latency": {
+            k: {"avg": v.sketch.mean, "p50": v.sketch.quantile(0.5), "p95": v.sketch.quantile(0.95)}
+            for k, v in per_method.items()
+        },
+        "timestamp": datetime.utcnow().isoformat()
+    }
 
 def aggregate_metrics():
     """
     Periodic task to aggregate metrics and store/cache results.
+    Latency statistics are merged from per-minute sketches rather than raw rows.
     """
     db = SessionLocal()
     try:
-        # 1. System Metrics Aggregation (Last 24 hours)
+        # Persist this worker's closed buckets first so they are included
+        latency_recorder.flush(db)
+
         last_24h = datetime.utcnow() - timedelta(hours=24)
-        
-        sys_metrics = db.query(SystemMetric).filter(SystemMetric.timestamp >= last_24h).all()
-        
-        if sys_metrics:
-            import pandas as pd
-            df = pd.DataFrame([{
-                "endpoint": m.endpoint,
-                "method": m.method,
-                "response_time": m.response_time_ms,
-                "status_code": m.status_code,
-                "user_id": m.user_id,
-                "timestamp": m.timestamp
-            } for m in sys_metrics])
-            
-            # Calculate stats
-            total_requests = len(df)
-            avg_response_time = df["response_time"].mean()
-            p95_response_time = df["response_time"].quantile(0.95)
-            error_rate = len(df[df["status_code"] >= 400]) / total_requests
-            
-            # Group by endpoint
-            endpoint_stats = df.groupby("endpoint").agg({
-                "response_time": ["mean", "count"],
-                "status_code": lambda x: (x >= 400).sum()
-            }).reset_index()
-            
-            endpoint_stats.columns = ["endpoint", "avg_time", "count", "errors"]
-            top_endpoints = endpoint_stats.sort_values("count", ascending=False).head(10).to_dict("records")
-            
-            # Calculate User Engagement
-            active_users = df["user_id"].nunique() if "user_id" in df.columns else 0
-            avg_actions = total_requests / active_users if active_users > 0 else 0
-
-            system_summary = {
-                "total_requests": int(total_requests),
-                "avg_response_time": float(avg_response_time),
-                "p95_response_time": float(p95_response_time),
-                "error_rate": float(error_rate),
-                "active_users": int(active_users),
-                "avg_actions_per_user": float(avg_actions),
-                "top_endpoints": top_endpoints,
-                "timestamp": datetime.utcnow().isoformat()
-            }
-            
-            # Cache the summary
+
+        # 1. System Metrics Aggregation (Last 24 hours)
+        system_summary = summarize_system(db, last_24h)
+        if system_summary:
             cache.set_sync("metrics:system_summary", system_summary, ttl=3600)
-            
+
             # Check for alerts
-            from backend.services.alerting.service import alert_service
             alert_service.check_system_metrics(system_summary)
-            
+
         # 2. Valuation Metrics Aggregation
-        val_metrics = db.query(ValuationMetric).filter(ValuationMetric.created_at >= last_24h).all()
-        
-        if val_metrics:
-            df_val = pd.DataFrame([{
-                "duration": m.duration_ms,
-                "cache_hit": m.cache_hit,
-                "complexity": m.input_complexity_score,
-                "method": m.method_type
-            } for m in val_metrics])
-            
-            # Method Popularity
-            method_counts = df_val["method"].value_counts(normalize=True).to_dict()
-            method_popularity = {k: float(v) for k, v in method_counts.items()}
-
-            val_summary = {
-                "total_valuations": len(df_val),
-                "avg_duration": float(df_val["duration"].mean()),
-                "cache_hit_rate": float(df_val["cache_hit"].mean()),
-                "avg_complexity": float(df_val["complexity"].mean()),
-                "method_popularity": method_popularity,
-                "timestamp": datetime.utcnow().isoformat()
-            }
-            
+        val_summary = summarize_valuations(db, last_24h)
+        if val_summary:
             cache.set_sync("metrics:valuation_summary", val_summary, ttl=3600)
-            
+
     except Exception as e:
         print(f"Aggregation failed: {e}")
     finally:
@@ -0,0 +1,112 @@
+"""
+Optional daily range partitioning of the raw metrics tables (PostgreSQL only).
+
+With a table converted once by scripts/partition_metrics_tables.py, expiry
+becomes a partition drop: retention drops whole days past the cutoff, which
+is instant and leaves no dead tuples to vacuum. It also creates the
+partitions for the days ahead. A DEFAULT partition catches rows outside the
+created ranges, so inserts never fail if the retention job stops running.
+Tables that aren't partitioned (and every SQLite database) keep the batched
+deletes in retention.py.
+"""
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# Table -> partition key column
+PARTITIONED_TABLES = {
+    "system_metrics": "timestamp",
+    "valuation_metrics": "created_at",
+}
+PARTITIONS_AHEAD_DAYS = 7
+
+
+def is_partitioned(db: Session, table: str) -> bool:
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    return bool(db.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p "
+        "JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = :table)"
+    ), {"table": table}).scalar())
+
+
+def partition_name(table: str, day: datetime) -> str:
+    return f"{table}_p{day:%Y%m%d}"
+
+
+def _create_partitions(db: Session, table: str, first_day: datetime, days: int):
+    for i in range(days):
+        day = first_day + timedelta(days=i)
+        db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {partition_name(table, day)} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{day:%Y-%m-%d}') TO ('{day + timedelta(days=1):%Y-%m-%d}')"
+        ))
+
+
+def ensure_partitions(db: Session, table: str, days_ahead: int = PARTITIONS_AHEAD_DAYS):
+    """Create the daily partitions from today through `days_ahead` days ahead."""
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    _create_partitions(db, table, today, days_ahead + 1)
+    db.commit()
+
+
+def daily_partitions(db: Session, table: str) -> List[Tuple[str, datetime]]:
+    """(name, day) of the table's daily partitions, oldest first."""
+    names = db.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :table"
+    ), {"table": table}).scalars()
+    partitions = []
+    prefix = f"{table}_p"
+    for name in names:
+        try:
+            partitions.append((name, datetime.strptime(name[len(prefix):], "%Y%m%d")))
+        except ValueError:
+            continue  # The DEFAULT partition
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def drop_expired_partitions(db: Session, table: str, cutoff: datetime) -> int:
+    """Drop every daily partition that ends at or before `cutoff`. Returns partitions dropped."""
+    dropped = 0
+    for name, day in daily_partitions(db, table):
+        if day + timedelta(days=1) > cutoff:
+            break
+        db.execute(text(f"DROP TABLE {name}"))
+        db.commit()
+        dropped += 1
+    return dropped
+
+
+def convert_to_partitioned(db: Session, table: str, days_ahead: int = PARTITIONS_AHEAD_DAYS) -> int:
+    """
+    Rebuild `table` as a daily range-partitioned table, copying its rows over in
+    one transaction. The primary key becomes (id, partition column), as
+    PostgreSQL requires, and rows without a timestamp are not copied.
+    Returns the number of rows copied.
+    """
+    column = PARTITIONED_TABLES[table]
+    legacy = f"{table}_unpartitioned"
+    db.execute(text(f"ALTER TABLE {table} RENAME TO {legacy}"))
+    sequence = db.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": legacy}).scalar()
+    db.execute(text(f'CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS) PARTITION BY RANGE ("{column}")'))
+    db.execute(text(f'ALTER TABLE {table} ADD PRIMARY KEY (id, "{column}")'))
+    db.execute(text(f'CREATE INDEX ix_{table}_{column}_partitioned ON {table} ("{column}")'))
+    if sequence:
+        db.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id"))
+    db.execute(text(f"CREATE TABLE {table}_pdefault PARTITION OF {table} DEFAULT"))
+
+    oldest = db.execute(text(f'SELECT min("{column}") FROM {legacy}')).scalar()
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    first_day = min(oldest.replace(hour=0, minute=0, second=0, microsecond=0), today) if oldest else today
+    _create_partitions(db, table, first_day, (today - first_day).days + days_ahead + 1)
+
+    copied = db.execute(text(
+        f'INSERT INTO {table} SELECT * FROM {legacy} WHERE "{column}" IS NOT NULL'
+    )).rowcount
+    db.execute(text(f"DROP TABLE {legacy}"))
+    db.commit()
+    return copied
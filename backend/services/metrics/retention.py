@@ -1,40 +1,141 @@
+"""
+Metrics retention: roll up, then purge.
+
+Raw rows and per-minute latency sketches are first rolled into hourly and
+daily MetricRollup rows (see rollup.py), so long-range trends survive. Then
+rows past the retention window are deleted in small batches, walking the
+primary key, with a commit and a short pause after each batch. Each
+transaction stays short, so concurrent writers aren't locked out and the
+WAL/journal stays small. Rolled-up sources are only purged up to the newest
+rolled-up hour, never before they have been rolled up. On PostgreSQL, tables
+converted to daily partitions (partitions.py) drop whole expired days instead.
+"""
+import os
+import time
 from datetime import datetime, timedelta
+from typing import Optional
 from sqlalchemy.orm import Session
-from backend.database.models import SessionLocal, SystemMetric, ValuationMetric
+from backend.database.models import SessionLocal, SystemMetric, ValuationMetric, MetricRollup, LatencySketchBucket
+from backend.services.metrics import partitions
+from backend.services.metrics.rollup import HOUR, SKETCH_KINDS, raw_timestamp_column, rolled_through, rollup_days, rollup_hours
+from backend.services.metrics.sketch import LatencyRecorder
 # from celery_app import celery_app
 
+PURGE_BATCH_SIZE = int(os.getenv("METRICS_PURGE_BATCH_SIZE", 5000))
+PURGE_PAUSE_SECONDS = float(os.getenv("METRICS_PURGE_PAUSE_SECONDS", 0.2))
+HOURLY_ROLLUP_DAYS = int(os.getenv("METRICS_HOURLY_ROLLUP_DAYS", 90))
+# Rows still being written for the last few minutes of an hour get a chance to land first
+ROLLUP_GRACE = timedelta(minutes=5)
+
+RAW_MODELS = {
+    LatencyRecorder.KIND_ENDPOINT: SystemMetric,
+    LatencyRecorder.KIND_VALUATION: ValuationMetric,
+}
+
+
+def purge_before(db: Session, model, timestamp_column, cutoff: datetime, *criteria,
+                 batch_size: int = PURGE_BATCH_SIZE, pause: float = PURGE_PAUSE_SECONDS) -> int:
+    """
+    Delete rows of `model` older than `cutoff` (and matching `criteria`) in
+    batches of at most `batch_size`, each bounded by an id range found by
+    walking the primary key. Returns the number of rows deleted.
+    """
+    deleted, last_id = 0, None
+    while True:
+        query = db.query(model.id).filter(timestamp_column < cutoff, *criteria)
+        if last_id is not None:
+            query = query.filter(model.id > last_id)
+        ids = [row_id for (row_id,) in query.order_by(model.id).limit(batch_size)]
+        if not ids:
+            break
+        deleted += db.query(model)\
+            .filter(model.id >= ids[0], model.id <= ids[-1], timestamp_column < cutoff, *criteria)\
+            .delete(synchronize_session=False)
+        db.commit()
+        last_id = ids[-1]
+        if len(ids) < batch_size:
+            break
+        time.sleep(pause)
+    return deleted
+
+
+def run_retention(db: Session, days_to_keep: int = 30, hourly_days_to_keep: int = HOURLY_ROLLUP_DAYS,
+                  now: Optional[datetime] = None) -> dict:
+    """Roll up raw metrics, then purge expired raw rows and hourly rollups. Returns counts per step."""
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(days=days_to_keep)
+    result = {'cutoff_date': cutoff.isoformat()}
+
+    for kind, model in RAW_MODELS.items():
+        table = model.__tablename__
+
+        # 1. Roll up first, so purged rows live on in the rollups
+        result[f'{table}_hourly_rollups'] = rollup_hours(db, kind, now - ROLLUP_GRACE)
+        result[f'{table}_daily_rollups'] = rollup_days(db, kind)
+
+        # 2. Purge raw rows, never past what has been rolled up
+        through = rolled_through(db, kind, HOUR)
+        purge_cutoff = min(cutoff, through) if through else None
+        deleted = 0
+        if partitions.is_partitioned(db, table):
+            if purge_cutoff:
+                result[f'{table}_partitions_dropped'] = partitions.drop_expired_partitions(db, table, purge_cutoff)
+            partitions.ensure_partitions(db, table)
+        if purge_cutoff:
+            # Also clears leftovers the partition drop can't reach (e.g. the DEFAULT partition)
+            deleted = purge_before(db, model, raw_timestamp_column(kind), purge_cutoff)
+        result[f'{table}_deleted'] = deleted
+
+    # Per-minute sketches: rolled-up kinds up to the rollup watermark, the rest by age
+    sketches_deleted = 0
+    for kind in SKETCH_KINDS:
+        through = rolled_through(db, kind, HOUR)
+        if through:
+            sketches_deleted += purge_before(db, LatencySketchBucket, LatencySketchBucket.bucket_start,
+                                             min(cutoff, through), LatencySketchBucket.kind == kind)
+    sketches_deleted += purge_before(db, LatencySketchBucket, LatencySketchBucket.bucket_start, cutoff,
+                                     LatencySketchBucket.kind.notin_(SKETCH_KINDS))
+    result['latency_sketch_buckets_deleted'] = sketches_deleted
+
+    # 3. Hourly rollups expire too; daily rollups are kept
+    result['hourly_rollups_deleted'] = purge_before(
+        db, MetricRollup, MetricRollup.bucket_start, now - timedelta(days=hourly_days_to_keep),
+        MetricRollup.granularity == HOUR
+    )
+    return result
+
+
+def rollup_metrics():
+    """Roll completed hours (and days) into MetricRollup rows. Runs hourly so trend dashboards stay current."""
+    db: Session = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        return {
+            kind: rollup_hours(db, kind, now - ROLLUP_GRACE) + rollup_days(db, kind)
+            for kind in RAW_MODELS
+        }
+    except Exception as e:
+        print(f"Error rolling up metrics: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
 # @celery_app.task(name='services.metrics.retention.cleanup_old_metrics')
 def cleanup_old_metrics(days_to_keep: int = 30):
     """
-    Celery task to clean up old metrics.
-    Runs daily at 2 AM via Celery Beat.
-    
+    Roll up, then purge old metrics.
+    Runs daily at 2 AM via the scheduler.
+
     Args:
         days_to_keep: Number of days to retain raw metrics (default: 30)
     """
     db: Session = SessionLocal()
-    
+
     try:
-        cutoff = datetime.utcnow() - timedelta(days=days_to_keep)
-        
-        # Delete old system metrics
-        system_deleted = db.query(SystemMetric)\
-            .filter(SystemMetric.timestamp < cutoff)\
-            .delete(synchronize_session=False)
-        
-        # Delete old valuation metrics
-        valuation_deleted = db.query(ValuationMetric)\
-            .filter(ValuationMetric.created_at < cutoff)\
-            .delete(synchronize_session=False)
-        
-        db.commit()
-        
-        return {
-            'system_metrics_deleted': system_deleted,
-            'valuation_metrics_deleted': valuation_deleted,
-            'cutoff_date': cutoff.isoformat()
-        }
-        
+        return run_retention(db, days_to_keep)
+
     except Exception as e:
         print(f"Error cleaning up old metrics: {e}")
         db.rollback()
@@ -0,0 +1,222 @@
+"""
+Hourly and daily rollups of the metrics tables.
+
+Per-minute sketches and raw rows are only kept for a few weeks. Before they
+expire, every complete hour is rolled into one MetricRollup row per endpoint
+route template (or valuation method): counts, errors, cache hits and a
+latency sketch with its p50/p95/p99. Complete days are then rolled up from
+the hourly rows by merging sketches. Rollups are written once per bucket, in
+time order, so the newest rolled bucket doubles as the progress watermark and
+as the bound below which source rows may be purged.
+
+Endpoint hours are merged from the unsampled per-minute LatencySketchBucket
+rows. Only time before the first endpoint sketch falls back to SystemMetric
+rows, which are sampled (METRICS_SAMPLE_RATE) and keyed by raw path.
+Valuation hours come from ValuationMetric rows (one per valuation).
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from backend.database.models import LatencySketchBucket, MetricRollup, SystemMetric, ValuationMetric
+from backend.services.metrics.sketch import BucketStats, LatencyRecorder, LatencySketch
+
+HOUR = "hour"
+DAY = "day"
+STEPS = {HOUR: timedelta(hours=1), DAY: timedelta(days=1)}
+KINDS = (LatencyRecorder.KIND_ENDPOINT, LatencyRecorder.KIND_VALUATION)
+# Kinds rolled up from the persisted per-minute sketches
+SKETCH_KINDS = (LatencyRecorder.KIND_ENDPOINT,)
+
+# Raw rows are read one day at a time to bound memory on a first, long backfill
+CHUNK = timedelta(days=1)
+
+# (timestamp, key, method, duration ms, error, cache hit)
+RawRow = Tuple[datetime, str, str, float, bool, bool]
+
+
+def floor_hour(ts: datetime) -> datetime:
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def floor_day(ts: datetime) -> datetime:
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def raw_timestamp_column(kind: str):
+    return SystemMetric.timestamp if kind == LatencyRecorder.KIND_ENDPOINT else ValuationMetric.created_at
+
+
+def _raw_rows(db: Session, kind: str, start: datetime, end: datetime) -> Iterator[RawRow]:
+    if kind == LatencyRecorder.KIND_ENDPOINT:
+        rows = db.query(SystemMetric.timestamp, SystemMetric.endpoint, SystemMetric.method,
+                        SystemMetric.response_time_ms, SystemMetric.status_code)\
+            .filter(SystemMetric.timestamp >= start, SystemMetric.timestamp < end)\
+            .yield_per(5000)
+        for ts, endpoint, method, duration, status_code in rows:
+            yield ts, endpoint or "", method or "", duration or 0, (status_code or 0) >= 400, False
+    else:
+        rows = db.query(ValuationMetric.created_at, ValuationMetric.method_type,
+                        ValuationMetric.duration_ms, ValuationMetric.cache_hit)\
+            .filter(ValuationMetric.created_at >= start, ValuationMetric.created_at < end)\
+            .yield_per(5000)
+        for ts, method_type, duration, cache_hit in rows:
+            yield ts, method_type or "", "", duration or 0, False, bool(cache_hit)
+
+
+def sketched_from(db: Session, kind: str) -> Optional[datetime]:
+    """Start of the first persisted sketch bucket of `kind`, if it is rolled up from sketches."""
+    if kind not in SKETCH_KINDS:
+        return None
+    return db.query(func.min(LatencySketchBucket.bucket_start)).filter(LatencySketchBucket.kind == kind).scalar()
+
+
+def _sketch_rows(db: Session, kind: str, start: datetime, end: datetime) -> Iterator[Tuple[datetime, str, BucketStats]]:
+    rows = db.query(LatencySketchBucket.bucket_start, LatencySketchBucket.key, LatencySketchBucket.error_count,
+                    LatencySketchBucket.hit_count, LatencySketchBucket.sketch)\
+        .filter(LatencySketchBucket.kind == kind,
+                LatencySketchBucket.bucket_start >= start, LatencySketchBucket.bucket_start < end)\
+        .yield_per(1000)
+    for ts, key, error_count, hit_count, payload in rows:
+        stats = BucketStats()
+        stats.sketch.merge(LatencySketch.from_json(payload))
+        stats.error_count = error_count or 0
+        stats.hit_count = hit_count or 0
+        yield ts, key, stats
+
+
+def rolled_through(db: Session, kind: str, granularity: str) -> Optional[datetime]:
+    """End of the newest rolled-up bucket (None before the first rollup)."""
+    last = db.query(func.max(MetricRollup.bucket_start))\
+        .filter(MetricRollup.granularity == granularity, MetricRollup.kind == kind).scalar()
+    return last + STEPS[granularity] if last else None
+
+
+def _rollup_row(granularity: str, kind: str, bucket_start: datetime, key: str, method: str,
+                stats: BucketStats) -> MetricRollup:
+    sketch = stats.sketch
+    return MetricRollup(
+        granularity=granularity,
+        bucket_start=bucket_start,
+        kind=kind,
+        key=key[:255],
+        method=method,
+        count=stats.count,
+        error_count=stats.error_count,
+        hit_count=stats.hit_count,
+        sum_ms=sketch.sum,
+        max_ms=sketch.max if stats.count else 0.0,
+        p50_ms=sketch.quantile(0.5),
+        p95_ms=sketch.quantile(0.95),
+        p99_ms=sketch.quantile(0.99),
+        sketch=sketch.to_json(),
+    )
+
+
+def rollup_hours(db: Session, kind: str, until: datetime) -> int:
+    """
+    Roll complete hours before `until` that aren't rolled up yet (from
+    sketches, or raw rows before the first sketch). Returns rows written.
+    """
+    first_sketch = sketched_from(db, kind)
+    start = rolled_through(db, kind, HOUR)
+    if start is None:
+        oldest = [ts for ts in (db.query(func.min(raw_timestamp_column(kind))).scalar(), first_sketch) if ts]
+        if not oldest:
+            return 0
+        start = floor_hour(min(oldest))
+    until = floor_hour(until)
+
+    written = 0
+    while start < until:
+        end = min(start + CHUNK, until)
+        buckets: Dict[Tuple[datetime, str, str], BucketStats] = {}
+        if first_sketch is not None:
+            for ts, key, stats in _sketch_rows(db, kind, start, end):
+                buckets.setdefault((floor_hour(ts), key, ""), BucketStats()).merge(stats)
+        raw_end = end if first_sketch is None else max(start, min(end, first_sketch))
+        for ts, key, method, duration, error, hit in _raw_rows(db, kind, start, raw_end):
+            stats = buckets.get((floor_hour(ts), key, method))
+            if stats is None:
+                stats = buckets[(floor_hour(ts), key, method)] = BucketStats()
+            stats.sketch.add(duration)
+            if error:
+                stats.error_count += 1
+            if hit:
+                stats.hit_count += 1
+        db.add_all(_rollup_row(HOUR, kind, hour, key, method, stats)
+                   for (hour, key, method), stats in sorted(buckets.items()))
+        db.commit()
+        written += len(buckets)
+        start = end
+    return written
+
+
+def rollup_days(db: Session, kind: str) -> int:
+    """Merge hourly rollups of complete days into daily ones. Returns rows written."""
+    hours_through = rolled_through(db, kind, HOUR)
+    if hours_through is None:
+        return 0
+    start = rolled_through(db, kind, DAY)
+    if start is None:
+        oldest = db.query(func.min(MetricRollup.bucket_start))\
+            .filter(MetricRollup.granularity == HOUR, MetricRollup.kind == kind).scalar()
+        start = floor_day(oldest)
+    until = floor_day(hours_through)
+    if start >= until:
+        return 0
+
+    buckets: Dict[Tuple[datetime, str, str], BucketStats] = {}
+    rows = db.query(MetricRollup.bucket_start, MetricRollup.key, MetricRollup.method,
+                    MetricRollup.error_count, MetricRollup.hit_count, MetricRollup.sketch)\
+        .filter(MetricRollup.granularity == HOUR, MetricRollup.kind == kind,
+                MetricRollup.bucket_start >= start, MetricRollup.bucket_start < until)\
+        .yield_per(1000)
+    for hour, key, method, error_count, hit_count, payload in rows:
+        stats = buckets.setdefault((floor_day(hour), key, method), BucketStats())
+        stats.sketch.merge(LatencySketch.from_json(payload))
+        stats.error_count += error_count or 0
+        stats.hit_count += hit_count or 0
+    db.add_all(_rollup_row(DAY, kind, day, key, method, stats)
+               for (day, key, method), stats in sorted(buckets.items()))
+    db.commit()
+    return len(buckets)
+
+
+def rollup_series(db: Session, kind: str, granularity: str, since: datetime,
+                  key: Optional[str] = None) -> List[dict]:
+    """
+    Per-bucket totals and latency percentiles since `since`, merged over every
+    endpoint / method (or just `key`). Serves long-range dashboards without
+    touching raw rows.
+    """
+    query = db.query(MetricRollup.bucket_start, MetricRollup.error_count, MetricRollup.hit_count,
+                     MetricRollup.sketch)\
+        .filter(MetricRollup.granularity == granularity, MetricRollup.kind == kind,
+                MetricRollup.bucket_start >= since)
+    if key is not None:
+        query = query.filter(MetricRollup.key == key)
+
+    buckets: Dict[datetime, BucketStats] = {}
+    for bucket_start, error_count, hit_count, payload in query.yield_per(1000):
+        stats = buckets.setdefault(bucket_start, BucketStats())
+        stats.sketch.merge(LatencySketch.from_json(payload))
+        stats.error_count += error_count or 0
+        stats.hit_count += hit_count or 0
+
+    return [
+        {
+            "bucket_start": bucket_start.isoformat(),
+            "count": stats.count,
+            "errors": stats.error_count,
+            "cache_hits": stats.hit_count,
+            "error_rate": stats.error_count / stats.count if stats.count else 0.0,
+            "avg": stats.sketch.mean,
+            "p50": stats.sketch.quantile(0.5),
+            "p95": stats.sketch.quantile(0.95),
+            "p99": stats.sketch.quantile(0.99),
+        }
+        for bucket_start, stats in sorted(buckets.items())
+    ]
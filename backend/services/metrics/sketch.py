@@ -0,0 +1,295 @@
+"""
+Mergeable latency sketches.
+
+A LatencySketch is a log-bucketed histogram with bounded relative error
+(DDSketch-style): every recorded value lands in bucket ceil(log_gamma(x)),
+so any quantile estimate is within `relative_accuracy` of the true value.
+Sketches with the same accuracy merge by adding bucket counts, which lets
+per-minute buckets be persisted once and summed over any window later.
+"""
+import json
+import math
+import threading
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Tuple
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+# Values below this (in ms) are counted in the zero bucket
+MIN_TRACKED_VALUE = 0.01
+
+
+class LatencySketch:
+    """Log-bucketed quantile sketch with relative-error guarantees."""
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, weight: int = 1):
+        """Record a value (e.g. a duration in milliseconds)."""
+        if value < 0:
+            value = 0.0
+        if value < MIN_TRACKED_VALUE:
+            self.zero_count += weight
+        else:
+            idx = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[idx] = self.bins.get(idx, 0) + weight
+        self.count += weight
+        self.sum += value * weight
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: "LatencySketch"):
+        """Fold another sketch into this one. Both must share the same accuracy."""
+        if other.count == 0:
+            return
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for idx, c in other.bins.items():
+            self.bins[idx] = self.bins.get(idx, 0) + c
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def subtract(self, other: "LatencySketch"):
+        """
+        Remove a sketch previously merged into this one (sliding windows).
+        min/max can't be undone and stay as the widest bounds seen.
+        """
+        if other.count == 0:
+            return
+        for idx, c in other.bins.items():
+            remaining = self.bins.get(idx, 0) - c
+            if remaining > 0:
+                self.bins[idx] = remaining
+            else:
+                self.bins.pop(idx, None)
+        self.zero_count -= other.zero_count
+        self.count -= other.count
+        self.sum -= other.sum
+        if self.count == 0:
+            self.sum = 0.0
+            self.min = math.inf
+            self.max = -math.inf
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """Estimate the q-th quantile (0 <= q <= 1)."""
+        if self.count == 0:
+            return 0.0
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+
+        for idx in sorted(self.bins):
+            seen += self.bins[idx]
+            if rank < seen:
+                estimate = 2 * self.gamma ** idx / (self.gamma + 1)
+                return min(max(estimate, self.min), self.max)
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "a": self.relative_accuracy,
+            "z": self.zero_count,
+            "n": self.count,
+            "s": round(self.sum, 3),
+            "mn": self.min if self.count else 0.0,
+            "mx": self.max if self.count else 0.0,
+            "b": [[idx, c] for idx, c in sorted(self.bins.items())],
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), separators=(",", ":"))
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LatencySketch":
+        sketch = cls(relative_accuracy=data.get("a", DEFAULT_RELATIVE_ACCURACY))
+        sketch.zero_count = data.get("z", 0)
+        sketch.count = data.get("n", 0)
+        sketch.sum = data.get("s", 0.0)
+        if sketch.count:
+            sketch.min = data.get("mn", 0.0)
+            sketch.max = data.get("mx", 0.0)
+        sketch.bins = {int(idx): int(c) for idx, c in data.get("b", [])}
+        return sketch
+
+    @classmethod
+    def from_json(cls, payload: str) -> "LatencySketch":
+        return cls.from_dict(json.loads(payload))
+
+
+class BucketStats:
+    """Latency sketch plus error / cache-hit counters for one key in one bucket."""
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY):
+        self.sketch = LatencySketch(relative_accuracy)
+        self.error_count = 0
+        self.hit_count = 0
+
+    @property
+    def count(self) -> int:
+        return self.sketch.count
+
+    def merge(self, other: "BucketStats"):
+        self.sketch.merge(other.sketch)
+        self.error_count += other.error_count
+        self.hit_count += other.hit_count
+
+
+class LatencyRecorder:
+    """
+    In-process collector of per-minute latency sketches.
+
+    Request middleware and valuation code call record_*; the scheduler
+    periodically calls flush() to persist closed minute buckets as
+    LatencySketchBucket rows.
+    """
+
+    KIND_ENDPOINT = "endpoint"
+    KIND_VALUATION = "valuation"
+    KIND_USER = "user"  # Keyed by user id: every authenticated request, unsampled
+
+    def __init__(self, bucket_seconds: int = 60, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY):
+        self.bucket_seconds = bucket_seconds
+        self.relative_accuracy = relative_accuracy
+        self._lock = threading.Lock()
+        self._buckets: Dict[Tuple[datetime, str, str], BucketStats] = {}
+
+    def _bucket_start(self, ts: datetime) -> datetime:
+        seconds = ts.hour * 3600 + ts.minute * 60 + ts.second
+        floored = seconds - seconds % self.bucket_seconds
+        return ts.replace(hour=floored // 3600, minute=(floored % 3600) // 60, second=floored % 60, microsecond=0)
+
+    def _record(self, kind: str, key: str, duration_ms: float, error: bool, hit: bool, ts: Optional[datetime]):
+        bucket_key = (self._bucket_start(ts or datetime.utcnow()), kind, key)
+        with self._lock:
+            stats = self._buckets.get(bucket_key)
+            if stats is None:
+                stats = self._buckets[bucket_key] = BucketStats(self.relative_accuracy)
+            stats.sketch.add(duration_ms)
+            if error:
+                stats.error_count += 1
+            if hit:
+                stats.hit_count += 1
+
+    def record_request(self, endpoint: str, status_code: int, duration_ms: float, ts: Optional[datetime] = None):
+        """Record one HTTP request against its endpoint (route template)."""
+        self._record(self.KIND_ENDPOINT, endpoint, duration_ms, status_code >= 400, False, ts)
+
+    def record_valuation(self, method_type: str, duration_ms: float, cache_hit: bool = False, ts: Optional[datetime] = None):
+        """Record one valuation run against its method type."""
+        self._record(self.KIND_VALUATION, method_type, duration_ms, False, cache_hit, ts)
+
+    def record_user(self, user_id: int, duration_ms: float, ts: Optional[datetime] = None):
+        """Record one authenticated request against its user (active-user counts)."""
+        self._record(self.KIND_USER, str(user_id), duration_ms, False, False, ts)
+
+    def drain(self, include_open: bool = False) -> List[Tuple[datetime, str, str, BucketStats]]:
+        """
+        Remove and return buckets ready to persist.
+        The current (still filling) minute is kept unless include_open is set.
+        """
+        current = self._bucket_start(datetime.utcnow())
+        with self._lock:
+            ready = [k for k in self._buckets if include_open or k[0] < current]
+            drained = [(k[0], k[1], k[2], self._buckets.pop(k)) for k in ready]
+        return drained
+
+    def pending(self, kind: str) -> Dict[str, BucketStats]:
+        """Merged view of not-yet-flushed buckets for one kind."""
+        merged: Dict[str, BucketStats] = {}
+        with self._lock:
+            for (_, bucket_kind, key), stats in self._buckets.items():
+                if bucket_kind != kind:
+                    continue
+                merged.setdefault(key, BucketStats(self.relative_accuracy)).merge(stats)
+        return merged
+
+    def oldest_pending(self, kind: str) -> Optional[datetime]:
+        """Start of the oldest not-yet-flushed bucket for one kind."""
+        with self._lock:
+            return min((start for start, bucket_kind, _ in self._buckets if bucket_kind == kind), default=None)
+
+    def flush(self, db=None, include_open: bool = False) -> int:
+        """Persist closed buckets as compact rows. Returns the number of rows written."""
+        from backend.database.models import LatencySketchBucket, write_queue
+
+        drained = self.drain(include_open=include_open)
+        if not drained:
+            return 0
+
+        try:
+            rows = [
+                LatencySketchBucket(
+                    bucket_start=bucket_start,
+                    kind=kind,
+                    key=key[:255],
+                    count=stats.count,
+                    error_count=stats.error_count,
+                    hit_count=stats.hit_count,
+                    sum_ms=stats.sketch.sum,
+                    max_ms=stats.sketch.max,
+                    sketch=stats.sketch.to_json(),
+                )
+                for bucket_start, kind, key, stats in drained
+            ]
+            if db is None:
+                write_queue.run(lambda session: session.add_all(rows))
+            else:
+                db.add_all(rows)
+                db.commit()
+            return len(drained)
+        except Exception as e:
+            print(f"Error persisting latency sketches: {e}")
+            if db is not None:
+                db.rollback()
+            # Put the data back so the next flush retries it
+            with self._lock:
+                for bucket_start, kind, key, stats in drained:
+                    existing = self._buckets.setdefault((bucket_start, kind, key), BucketStats(self.relative_accuracy))
+                    existing.merge(stats)
+            return 0
+
+
+def flush_latency_sketches():
+    """Persist this worker's closed minute buckets."""
+    return latency_recorder.flush()
+
+
+async def flush_latency_sketches_periodically(interval: float = 60.0):
+    """
+    Per-worker flush loop. Every worker holds its own in-memory buckets, so this
+    runs in each of them (unlike leader-only scheduler jobs).
+    """
+    import asyncio
+    from fastapi.concurrency import run_in_threadpool
+
+    while True:
+        await asyncio.sleep(interval)
+        await run_in_threadpool(flush_latency_sketches)
+
+
+latency_recorder = LatencyRecorder()
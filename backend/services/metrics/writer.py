@@ -0,0 +1,163 @@
+"""
+Single long-lived writer for telemetry rows.
+
+Producers (request middleware, valuation tracking, cache-hit accounting)
+call submit() which only appends to a bounded in-memory queue; a single
+daemon thread drains the queue and bulk-inserts rows per table with one
+executemany per batch, through the database write queue. When the queue is
+full new rows are dropped and counted rather than blocking the request path.
+"""
+import atexit
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional
+
+from backend.database.engine import WriteQueue
+
+
+class MetricsWriter:
+    """Bounded queue + one background bulk writer, shared by all metric producers."""
+
+    def __init__(self, engine=None, capacity: int = 50000, batch_size: int = 500, flush_interval: float = 2.0):
+        self._engine = engine
+        self._writes = None
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        # deque.append / popleft are atomic; only the counters below take a (short) lock
+        self._queue: deque = deque()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._counts_lock = threading.Lock()
+
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            from backend.database.models import engine
+            self._engine = engine
+        return self._engine
+
+    @property
+    def writes(self):
+        if self._writes is None:
+            if self._engine is None:
+                from backend.database.models import write_queue
+                self._writes = write_queue
+            else:
+                self._writes = WriteQueue.for_engine(self._engine)
+        return self._writes
+
+    def submit(self, model, row: Dict[str, Any]) -> bool:
+        """
+        Queue one row for `model` (an ORM class). Never blocks.
+        Returns False if the row was dropped because the queue is full or the writer stopped.
+        """
+        if self._stopping.is_set() or len(self._queue) >= self.capacity:
+            self._count("dropped")
+            return False
+
+        self._queue.append((model.__table__, row))
+        self._count("enqueued")
+
+        if self._thread is None:
+            self.start()
+        if len(self._queue) >= self.batch_size:
+            self._wake.set()
+        return True
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="metrics-writer", daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def stop(self, timeout: float = 10.0):
+        """Stop accepting rows and drain everything already queued."""
+        self._stopping.set()
+        self._wake.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        self._thread = None
+        # Anything left (thread never started or timed out) is written inline
+        while self._queue:
+            self._write_batch()
+
+    def flush(self):
+        """Write everything currently queued (synchronously, on the caller's thread)."""
+        while self._queue:
+            self._write_batch()
+
+    def stats(self) -> Dict[str, int]:
+        with self._counts_lock:
+            return {
+                "queued": len(self._queue),
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "batches": self.batches,
+            }
+
+    def _count(self, name: str, amount: int = 1):
+        # `+=` on an attribute is not atomic across threads
+        with self._counts_lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            while len(self._queue) >= self.batch_size:
+                self._write_batch()
+            if self._queue:
+                self._write_batch()
+        while self._queue:
+            self._write_batch()
+
+    def _write_batch(self):
+        by_table: Dict[Any, List[Dict[str, Any]]] = {}
+        taken = 0
+        while taken < self.batch_size:
+            try:
+                table, row = self._queue.popleft()
+            except IndexError:
+                break
+            by_table.setdefault(table, []).append(row)
+            taken += 1
+
+        if not by_table:
+            return
+
+        def insert(session):
+            conn = session.connection()
+            for table, rows in by_table.items():
+                # executemany: one statement, many parameter sets
+                conn.execute(table.insert(), rows)
+
+        try:
+            self.writes.run(insert)
+            with self._counts_lock:
+                self.written += taken
+                self.batches += 1
+        except Exception as e:
+            self._count("failed", taken)
+            print(f"Error writing metrics batch ({taken} rows): {e}")
+            # Back off briefly so a down database doesn't spin the writer
+            time.sleep(0.5)
+
+
+metrics_writer = MetricsWriter()
@@ -1,17 +1,30 @@
-import math
 import json
 from typing import Optional, Dict, Any
+import numpy as np
 from sqlalchemy.orm import Session
-from backend.calculations.real_options_models import RealOptionsRequest, RealOptionsResult, OptionGreeks
+from backend.calculations.real_options_models import (
+    RealOptionsRequest, RealOptionsResult, OptionGreeks,
+    OptionGridRequest, OptionGridResult, OptionSurfaceRequest, OptionSurfaceResult
+)
 from backend.services.financial_data.factory import FinancialDataFactory
+from backend.services.valuation.formulas.option_pricing import OptionPricer, GREEKS
 from backend.database.models import ValuationRun
 
-# Helper functions for Normal Distribution
-def norm_pdf(x):
-    return math.exp(-x**2 / 2) / math.sqrt(2 * math.pi)
+# Abandonment is the right to sell (a put); expand/delay/patent are rights to invest (calls)
+PUT_TYPES = {"abandonment", "put"}
+PRICING_METHODS = ("black_scholes", "binomial")
+# Options x lattice steps one binomial grid/surface request may ask for
+MAX_LATTICE_WORK = 2_000_000
 
-def norm_cdf(x):
-    return (1.0 + math.erf(x / math.sqrt(2.0))) / 2.0
+def is_put_option(option_type: str) -> bool:
+    return option_type.lower() in PUT_TYPES
+
+def check_lattice_work(options: int, steps: int) -> None:
+    if options * steps > MAX_LATTICE_WORK:
+        raise ValueError(
+            f"{options} options x {steps} lattice steps exceeds the binomial limit of {MAX_LATTICE_WORK}; "
+            "reduce the grid or the lattice steps"
+        )
 
 class RealOptionsService:
     def __init__(self):
@@ -27,20 +40,15 @@ class RealOptionsService:
         r = validated_inputs.risk_free_rate
         sigma = validated_inputs.volatility
         
-        # 2. Calculate Option Value (BSM)
+        # 2. Calculate Option Value and Greeks in one pass (BSM, or a lattice for early exercise)
         # Most real options are treated as Call Options (Right to Expand/Delay/Invest)
         # Abandonment is a Put Option.
-        is_put = request.option_type.lower() == "abandonment"
+        is_put = is_put_option(request.option_type)
+        priced = self._price(S, K, T, r, sigma, is_put, request.value_leakage, request.pricing_method, request.lattice_steps)
+        value = float(priced["price"])
+        greeks = OptionGreeks(**{name: float(priced[name]) for name in GREEKS})
         
-        if is_put:
-            value = self._black_scholes_put(S, K, T, r, sigma)
-        else:
-            value = self._black_scholes_call(S, K, T, r, sigma)
-            
-        # 3. Calculate Greeks
-        greeks = self._calculate_greeks(S, K, T, r, sigma, is_put)
-        
-        # 4. Generate Insight
+        # 3. Generate Insight
         insight = self._generate_strategic_insight(request.option_type, value, validated_inputs)
         
         return RealOptionsResult(
@@ -53,10 +61,61 @@ class RealOptionsService:
                 "time_to_expiration": T,
                 "risk_free_rate": r,
                 "volatility": sigma,
-                "option_type": request.option_type
+                "value_leakage": request.value_leakage,
+                "option_type": request.option_type,
+                "pricing_method": request.pricing_method
             }
         )
 
+    def price_grid(self, request: OptionGridRequest) -> OptionGridResult:
+        """
+        Prices a batch of options given as parallel arrays (length-1 arrays
+        broadcast), with all Greeks, in one vectorized pass.
+        """
+        columns = [request.asset_value, request.strike_price, request.time_to_expiration,
+                   request.risk_free_rate, request.volatility, request.option_type, request.value_leakage]
+        n = max(len(c) for c in columns)
+        if any(len(c) not in (1, n) for c in columns):
+            raise ValueError("Input arrays must all have the same length (or length 1)")
+        if request.pricing_method == "binomial":
+            check_lattice_work(n, request.lattice_steps)
+        is_put = np.array([is_put_option(t) for t in request.option_type])
+        priced = self._price(
+            np.array(request.asset_value), np.array(request.strike_price), np.array(request.time_to_expiration),
+            np.array(request.risk_free_rate), np.array(request.volatility), is_put, np.array(request.value_leakage),
+            request.pricing_method, request.lattice_steps
+        )
+        return OptionGridResult(
+            pricing_method=request.pricing_method,
+            **{name: np.broadcast_to(values, (n,)).tolist() for name, values in priced.items()}
+        )
+
+    def price_surface(self, request: OptionSurfaceRequest) -> OptionSurfaceResult:
+        """Option value across a volatility x time-to-expiration grid."""
+        if request.pricing_method not in PRICING_METHODS:
+            raise ValueError(f"pricing_method must be one of {PRICING_METHODS}")
+        if request.pricing_method == "binomial":
+            check_lattice_work(request.volatility_steps * request.time_steps, request.lattice_steps)
+        volatilities = np.linspace(request.volatility_min, request.volatility_max, request.volatility_steps)
+        times = np.linspace(request.time_min, request.time_max, request.time_steps)
+        values = OptionPricer.surface(
+            request.asset_value, request.strike_price, request.risk_free_rate, volatilities, times,
+            is_put_option(request.option_type), request.value_leakage, request.pricing_method, request.lattice_steps
+        )
+        return OptionSurfaceResult(
+            volatilities=volatilities.tolist(),
+            times=times.tolist(),
+            values=values.tolist(),
+            pricing_method=request.pricing_method
+        )
+
+    def _price(self, S, K, T, r, sigma, is_put, q, method: str, steps: int) -> Dict[str, Any]:
+        if method == "binomial":
+            return OptionPricer.binomial(S, K, T, r, sigma, is_put, q, steps=steps)
+        if method == "black_scholes":
+            return OptionPricer.black_scholes(S, K, T, r, sigma, is_put, q)
+        raise ValueError(f"pricing_method must be one of {PRICING_METHODS}")
+
     async def _validate_and_enrich_inputs(self, request: RealOptionsRequest, db: Optional[Session] = None) -> RealOptionsRequest:
         """Intelligently populate missing inputs."""
         # Risk Free Rate
@@ -106,48 +165,6 @@ class RealOptionsService:
             print(f"Error fetching DCF value: {e}")
             return 0.0
 
-    def _black_scholes_call(self, S, K, T, r, sigma):
-        if T <= 0: return max(S - K, 0)
-        d1 = (math.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * math.sqrt(T))
-        d2 = d1 - sigma * math.sqrt(T)
-        return S * norm_cdf(d1) - K * math.exp(-r * T) * norm_cdf(d2)
-
-    def _black_scholes_put(self, S, K, T, r, sigma):
-        if T <= 0: return max(K - S, 0)
-        d1 = (math.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * math.sqrt(T))
-        d2 = d1 - sigma * math.sqrt(T)
-        return K * math.exp(-r * T) * norm_cdf(-d2) - S * norm_cdf(-d1)
-
-    def _calculate_greeks(self, S, K, T, r, sigma, is_put):
-        if T <= 0:
-            return OptionGreeks(delta=0, gamma=0, vega=0, theta=0, rho=0)
-            
-        d1 = (math.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * math.sqrt(T))
-        d2 = d1 - sigma * math.sqrt(T)
-        
-        # Common Greeks
-        gamma = norm_pdf(d1) / (S * sigma * math.sqrt(T))
-        vega = S * norm_pdf(d1) * math.sqrt(T) # Usually divided by 100 for % change
-        
-        if is_put:
-            delta = norm_cdf(d1) - 1
-            theta = (-S * norm_pdf(d1) * sigma / (2 * math.sqrt(T)) + 
-                     r * K * math.exp(-r * T) * norm_cdf(-d2))
-            rho = -K * T * math.exp(-r * T) * norm_cdf(-d2)
-        else:
-            delta = norm_cdf(d1)
-            theta = (-S * norm_pdf(d1) * sigma / (2 * math.sqrt(T)) - 
-                     r * K * math.exp(-r * T) * norm_cdf(d2))
-            rho = K * T * math.exp(-r * T) * norm_cdf(d2)
-            
-        return OptionGreeks(
-            delta=delta,
-            gamma=gamma,
-            vega=vega / 100, # Scaled for 1% vol change
-            theta=theta / 365, # Scaled for 1 day time decay
-            rho=rho / 100 # Scaled for 1% rate change
-        )
-
     def _generate_strategic_insight(self, option_type: str, value: float, inputs: RealOptionsRequest) -> str:
         S_fmt = f"${inputs.asset_value/1e6:.1f}M"
         K_fmt = f"${inputs.strike_price/1e6:.1f}M"
@@ -21,7 +21,6 @@ async def simulate_market_data():
         # Pick 1-3 random tickers to update
         tickers_to_update = random.sample(list(mock_prices.keys()), k=random.randint(1, 3))
         
-        updates = []
         for ticker in tickers_to_update:
             # Fluctuate price by -0.5% to +0.5%
             # Fluctuate price based on configured volatility
@@ -31,20 +30,16 @@ async def simulate_market_data():
             new_price = current_price * (1 + change_pct)
             mock_prices[ticker] = new_price
             
-            updates.append({
-                "ticker": ticker,
-                "price": round(new_price, 2),
-                "change_percent": round(change_pct * 100, 2)
-            })
-            
-            
-        # Broadcast simulation event
-        message = {
-            "type": "market_update",
-            "data": updates
-        }
-        
-        await manager.broadcast(message)
+            # Broadcast simulation event on the ticker's topic
+            message = {
+                "type": "market_update",
+                "data": [{
+                    "ticker": ticker,
+                    "price": round(new_price, 2),
+                    "change_percent": round(change_pct * 100, 2)
+                }]
+            }
+            await manager.broadcast(message, topic=ticker)
 
         # Randomly generate an alert (20% chance)
         if random.random() < 0.2:
@@ -60,7 +55,7 @@ async def simulate_market_data():
                     "severity": severity
                 }
             }
-            await manager.broadcast(alert_msg)
+            await manager.broadcast(alert_msg, topic=alert_ticker)
         
         # Wait 2-5 seconds before next update
         # Wait based on configured interval
@@ -1,49 +1,279 @@
+"""
+Realtime hub for WebSocket clients.
+
+Broadcasts go through a pub/sub backplane so that a message published by
+any gunicorn worker reaches clients connected to every worker:
+
+- RedisBackplane (REDIS_URL set and the `redis` package installed) fans
+  messages out across processes;
+- InProcessBackplane keeps everything inside one process (single worker,
+  tests).
+
+Each message is serialized to JSON once per broadcast. Each client has a
+bounded send queue drained by its own sender task, so a slow client never
+delays the others; a client whose queue overflows (or whose send stalls)
+is evicted. Clients may subscribe to topics (tickers, "portfolio:<id>");
+clients with no subscriptions receive everything.
+"""
 from fastapi import WebSocket
-from typing import List, Dict
+from typing import List, Dict, Optional, Set, Callable, Awaitable, Iterable
 import json
 import asyncio
+import os
+
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+WILDCARD = "*"
+CHANNEL = os.getenv("REALTIME_CHANNEL", "realtime:broadcast")
+
+Listener = Callable[[str], Awaitable[None]]
+
+
+def _encode(topic: Optional[str], text: str) -> str:
+    # JSON text never contains a raw newline, so the first one separates the topic
+    return f"{topic or WILDCARD}\n{text}"
+
+
+def _decode(envelope: str):
+    topic, _, text = envelope.partition("\n")
+    return (None if topic == WILDCARD else topic), text
+
+
+class InProcessBus:
+    """Shared subscriber list for InProcessBackplanes (one per process by default)."""
 
-class WebSocketManager:
     def __init__(self):
-        # Store active connections
-        self.active_connections: List[WebSocket] = []
-    
+        self.listeners: List[Listener] = []
+
+
+class InProcessBackplane:
+    """Delivers published messages to listeners in this process only."""
+
+    def __init__(self, bus: Optional[InProcessBus] = None):
+        self.bus = bus or InProcessBus()
+        self._listener: Optional[Listener] = None
+
+    async def start(self, listener: Listener):
+        self._listener = listener
+        self.bus.listeners.append(listener)
+
+    async def publish(self, envelope: str):
+        for listener in list(self.bus.listeners):
+            await listener(envelope)
+
+    async def stop(self):
+        if self._listener in self.bus.listeners:
+            self.bus.listeners.remove(self._listener)
+        self._listener = None
+
+
+class RedisBackplane:
+    """Redis pub/sub backplane; every worker subscribes to the same channel."""
+
+    def __init__(self, url: str, channel: str = CHANNEL):
+        self.url = url
+        self.channel = channel
+        self._redis = None
+        self._pubsub = None
+        self._reader: Optional[asyncio.Task] = None
+
+    async def _client(self):
+        if self._redis is None:
+            self._redis = aioredis.from_url(self.url, decode_responses=True)
+        return self._redis
+
+    async def start(self, listener: Listener):
+        client = await self._client()
+        self._pubsub = client.pubsub()
+        await self._pubsub.subscribe(self.channel)
+        self._reader = asyncio.create_task(self._read(listener))
+
+    async def _read(self, listener: Listener):
+        while True:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message and message.get("type") == "message":
+                    await listener(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Realtime backplane read error: {e}")
+                await asyncio.sleep(1.0)
+
+    async def publish(self, envelope: str):
+        client = await self._client()
+        await client.publish(self.channel, envelope)
+
+    async def stop(self):
+        if self._reader is not None:
+            self._reader.cancel()
+            self._reader = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+
+def create_backplane():
+    redis_url = os.getenv("REDIS_URL")
+    if redis_url and REDIS_AVAILABLE:
+        return RedisBackplane(redis_url)
+    if redis_url:
+        print("REDIS_URL set but the redis package is not installed; realtime broadcasts stay within each worker.")
+    return InProcessBackplane()
+
+
+class ClientConnection:
+    """One WebSocket client: its topic subscriptions and a bounded outgoing queue."""
+
+    def __init__(self, websocket: WebSocket, max_queue: int, send_timeout: float, on_evict: Callable[["ClientConnection"], None]):
+        self.websocket = websocket
+        self.topics: Set[str] = set()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.send_timeout = send_timeout
+        self.sending_since: Optional[float] = None
+        self._on_evict = on_evict
+        self._sender = asyncio.create_task(self._send_loop())
+
+    def wants(self, topic: Optional[str]) -> bool:
+        return topic is None or not self.topics or WILDCARD in self.topics or topic in self.topics
+
+    def is_stalled(self, now: float) -> bool:
+        return self.sending_since is not None and now - self.sending_since > self.send_timeout
+
+    def offer(self, text: str) -> bool:
+        """Queue a pre-serialized message without waiting. False if the client is too slow."""
+        try:
+            self.queue.put_nowait(text)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def _send_loop(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                text = await self.queue.get()
+                # Stalled sends are detected by the manager on the next delivery
+                # (asyncio.wait_for can swallow cancellation on Python < 3.12)
+                self.sending_since = loop.time()
+                await self.websocket.send_text(text)
+                self.sending_since = None
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error sending message: {e}")
+            self._on_evict(self)
+
+    def detach(self):
+        self._sender.cancel()
+
+    async def close(self, code: int = 1000):
+        self.detach()
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+
+class WebSocketManager:
+    def __init__(self, backplane=None, max_queue: int = 100, send_timeout: float = 5.0):
+        self.backplane = backplane
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.connections: Dict[WebSocket, ClientConnection] = {}
+        self.evicted_count = 0
+        self._started = False
+
+    @property
+    def active_connections(self) -> List[WebSocket]:
+        return list(self.connections)
+
+    async def start(self):
+        """Subscribe this worker to the backplane (idempotent)."""
+        if self._started:
+            return
+        if self.backplane is None:
+            self.backplane = create_backplane()
+        self._started = True
+        await self.backplane.start(self._deliver)
+
+    async def stop(self):
+        if self._started:
+            await self.backplane.stop()
+            self._started = False
+        for conn in list(self.connections.values()):
+            await conn.close()
+        self.connections.clear()
+
     async def connect(self, websocket: WebSocket):
         """Accepts a new WebSocket connection."""
+        await self.start()
         await websocket.accept()
-        self.active_connections.append(websocket)
-        print(f"Client connected. Total connections: {len(self.active_connections)}")
-        
+        self.connections[websocket] = ClientConnection(websocket, self.max_queue, self.send_timeout, self._evict)
+        print(f"Client connected. Total connections: {len(self.connections)}")
+
     def disconnect(self, websocket: WebSocket):
         """Removes a WebSocket connection."""
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-            print(f"Client disconnected. Total connections: {len(self.active_connections)}")
-            
-    async def broadcast(self, message: Dict):
-        """Sends a message to all connected clients."""
-        if not self.active_connections:
+        conn = self.connections.pop(websocket, None)
+        if conn is not None:
+            conn.detach()
+            print(f"Client disconnected. Total connections: {len(self.connections)}")
+
+    def subscribe(self, websocket: WebSocket, topics: Iterable[str]) -> Set[str]:
+        conn = self.connections.get(websocket)
+        if conn is None:
+            return set()
+        conn.topics.update(str(t) for t in topics)
+        return conn.topics
+
+    def unsubscribe(self, websocket: WebSocket, topics: Iterable[str]) -> Set[str]:
+        conn = self.connections.get(websocket)
+        if conn is None:
+            return set()
+        conn.topics.difference_update(str(t) for t in topics)
+        return conn.topics
+
+    async def broadcast(self, message: Dict, topic: Optional[str] = None):
+        """
+        Publishes a message to every worker's clients (those following `topic`,
+        or all clients if no topic is given).
+        """
+        await self.start()
+        await self.backplane.publish(_encode(topic, json.dumps(message)))
+
+    async def _deliver(self, envelope: str):
+        """Backplane callback: fan a serialized message out to this worker's clients."""
+        if not self.connections:
             return
-            
-        disconnected_clients = []
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                print(f"Error sending message: {e}")
-                disconnected_clients.append(connection)
-                
-        # Clean up stale connections
-        for dead_connection in disconnected_clients:
-            self.disconnect(dead_connection)
+        topic, text = _decode(envelope)
+        now = asyncio.get_running_loop().time()
+        for conn in list(self.connections.values()):
+            if conn.is_stalled(now):
+                self._evict(conn)
+            elif conn.wants(topic) and not conn.offer(text):
+                self._evict(conn)
+
+    def _evict(self, conn: ClientConnection):
+        """Drop a slow or broken client so it cannot hold up anyone else."""
+        if self.connections.pop(conn.websocket, None) is None:
+            return
+        self.evicted_count += 1
+        print(f"Evicting slow WebSocket client. Total connections: {len(self.connections)}")
+        # 1013: try again later
+        asyncio.ensure_future(conn.close(code=1013))
 
     async def send_personal_message(self, message: Dict, websocket: WebSocket):
         """Sends a message to a specific client."""
-        try:
-            await websocket.send_json(message)
-        except Exception as e:
-            print(f"Error sending personal message: {e}")
-            self.disconnect(websocket)
+        conn = self.connections.get(websocket)
+        if conn is not None and not conn.offer(json.dumps(message)):
+            self._evict(conn)
 
 # Global Manager Instance
 manager = WebSocketManager()
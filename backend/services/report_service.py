@@ -1,44 +1,11 @@
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY, TA_RIGHT
-
-from pptx import Presentation
-from pptx.util import Inches, Pt
-from pptx.dml.color import RGBColor
-
-from docx import Document
-from docx.shared import Inches as DocxInches
-from docx.shared import Pt as DocxPt
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-
 import io
 import json
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 from pydantic import BaseModel
 
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import seaborn as sns
-import pandas as pd
-import numpy as np
-
-# Configure standard aesthetic - Professional Clean
-sns.set_theme(style="white", font="sans-serif")
-plt.rcParams['figure.figsize'] = (10, 6)
-plt.rcParams['axes.titlesize'] = 14
-plt.rcParams['axes.labelsize'] = 11
-plt.rcParams['xtick.labelsize'] = 10
-plt.rcParams['ytick.labelsize'] = 10
-plt.rcParams['axes.spines.top'] = False
-plt.rcParams['axes.spines.right'] = False
-plt.rcParams['axes.grid'] = True
-plt.rcParams['grid.alpha'] = 0.3
-plt.rcParams['grid.linestyle'] = '--'
+# Rendering libraries (ReportLab, pptx, docx, matplotlib) are imported by the
+# adapters and the chart generator on first use; see backend.reports
 
 # --- Configuration Models ---
 
@@ -53,11 +20,12 @@ class ReportConfig(BaseModel):
 # --- Pipeline Implementation ---
 from backend.reports.registry import ReportTemplateRegistry, ReportContext
 from backend.reports.content import ReportContent, ReportSection
-from backend.reports.adapters import PDFAdapter, PPTXAdapter, ExcelAdapter
+from backend.reports.adapters import PDFAdapter, PPTXAdapter, ExcelAdapter, DocxAdapter
 from backend.reports.narrative import AINarrativeEngine
 from backend.reports.charts import SmartChartGenerator
 
 from functools import lru_cache
+from fastapi.concurrency import run_in_threadpool
 from backend.reports.validator import ReportQualityValidator
 from backend.compliance.framework import ComplianceFramework
 
@@ -191,14 +159,14 @@ class ReportService:
             print(f"Report Validation Issues: {issues}")
             # In strict mode, we might raise an error. For now, log warnings.
 
-        # 4. Render Adapter
-        if config.format == "pdf":
-            return PDFAdapter().render(content)
-        elif config.format == "pptx":
-            return PPTXAdapter().render(content)
-        elif config.format == "excel":
-           return ExcelAdapter().render(content)
-        elif config.format == "docx":
-            return DocxAdapter().render(content)
-            
-        raise ValueError("Unsupported format")
+        # 4. Render Adapter (CPU-bound, so off the event loop)
+        adapters = {
+            "pdf": PDFAdapter,
+            "pptx": PPTXAdapter,
+            "excel": ExcelAdapter,
+            "docx": DocxAdapter,
+        }
+        adapter = adapters.get(config.format)
+        if adapter is None:
+            raise ValueError("Unsupported format")
+        return await run_in_threadpool(adapter().render, content)
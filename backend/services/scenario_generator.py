@@ -1,7 +1,46 @@
-from typing import Dict, Any, List, Optional, Callable
-from backend.calculations.models import ValuationInput, ProjectionAssumptions
+from typing import Dict, Any, List, Optional, Callable, Sequence, Tuple
+import numpy as np
+from backend.calculations.models import (
+    ValuationInput, ProjectionAssumptions, ScenarioInput, ScenarioConfig, ScenarioDelta
+)
 import copy
 
+# Sanity bounds applied to every generated scenario (None = unbounded)
+BOUNDS = {
+    "ebitda_margin_start": (-0.5, 0.9),
+    "ebitda_margin_end": (-0.5, 0.9),
+    "revenue_growth_start": (-0.5, 2.0),
+    "capex_percent_revenue": (0.0, None),
+    "working_capital.dso": (0.0, None),
+    "working_capital.dio": (0.0, None),
+    "working_capital.dpo": (0.0, None),
+}
+
+
+class Shift:
+    """
+    Template adjustment: base + slope * intensity, starting from `default`
+    when the base value is unset and never going below `floor`.
+    Declarative so that whole scenario families can be built as arrays.
+    """
+    def __init__(self, slope: float, default: Optional[float] = None, floor: Optional[float] = None):
+        self.slope = slope
+        self.default = default
+        self.floor = floor
+
+    def __call__(self, base, intensity: float):
+        value = (base if base is not None else self.default) + self.slope * intensity
+        return value if self.floor is None else max(self.floor, value)
+
+
+def _get(projections: ProjectionAssumptions, field: str):
+    if "." in field:
+        parent_field, child_field = field.split(".")
+        parent_obj = getattr(projections, parent_field)
+        return getattr(parent_obj, child_field) if parent_obj else None
+    return getattr(projections, field)
+
+
 class ScenarioGeneratorService:
     def __init__(self):
         self.templates = self._load_templates()
@@ -17,12 +56,12 @@ class ScenarioGeneratorService:
                 "description": "Aggressive growth through customer acquisition",
                 "explanation": "To gain market share, we project higher revenue growth but lower margins due to increased sales and marketing spend. Working capital requirements (DSO) will also increase as we offer better terms to customers.",
                 "adjustments": {
-                    "revenue_growth_start": lambda base, intensity: base + (0.05 * intensity),
-                    "revenue_growth_end": lambda base, intensity: base + (0.03 * intensity),
-                    "ebitda_margin_start": lambda base, intensity: base - (0.02 * intensity),
-                    "ebitda_margin_end": lambda base, intensity: base - (0.01 * intensity),
-                    "working_capital.dso": lambda base, intensity: base + (10 * intensity),
-                    "capex_percent_revenue": lambda base, intensity: (base if base is not None else 0.04) + (0.015 * intensity)
+                    "revenue_growth_start": Shift(0.05),
+                    "revenue_growth_end": Shift(0.03),
+                    "ebitda_margin_start": Shift(-0.02),
+                    "ebitda_margin_end": Shift(-0.01),
+                    "working_capital.dso": Shift(10),
+                    "capex_percent_revenue": Shift(0.015, default=0.04)
                 }
             },
             "cost_cutting": {
@@ -30,11 +69,11 @@ class ScenarioGeneratorService:
                 "description": "Focus on profitability over growth",
                 "explanation": "Lower revenue growth as unprofitable segments are pruned. Margins expand due to efficiency measures, and CapEx is reduced to maintenance levels.",
                 "adjustments": {
-                    "revenue_growth_start": lambda base, intensity: base - (0.03 * intensity),
-                    "revenue_growth_end": lambda base, intensity: base - (0.01 * intensity),
-                    "ebitda_margin_start": lambda base, intensity: base + (0.03 * intensity),
-                    "ebitda_margin_end": lambda base, intensity: base + (0.04 * intensity),
-                    "capex_percent_revenue": lambda base, intensity: max(0.01, (base if base is not None else 0.04) - (0.01 * intensity))
+                    "revenue_growth_start": Shift(-0.03),
+                    "revenue_growth_end": Shift(-0.01),
+                    "ebitda_margin_start": Shift(0.03),
+                    "ebitda_margin_end": Shift(0.04),
+                    "capex_percent_revenue": Shift(-0.01, default=0.04, floor=0.01)
                 }
             },
             "recession": {
@@ -42,12 +81,12 @@ class ScenarioGeneratorService:
                 "description": "Economic downturn scenario",
                 "explanation": "Significant hit to revenue growth and margins. CapEx is cut to preserve cash. Working capital cycle lengthens (slower collections).",
                 "adjustments": {
-                    "revenue_growth_start": lambda base, intensity: base - (0.10 * intensity),
-                    "revenue_growth_end": lambda base, intensity: base - (0.05 * intensity),
-                    "ebitda_margin_start": lambda base, intensity: base - (0.05 * intensity),
-                    "ebitda_margin_end": lambda base, intensity: base - (0.02 * intensity),
-                    "working_capital.dso": lambda base, intensity: base + (15 * intensity),
-                    "capex_percent_revenue": lambda base, intensity: max(0.005, (base if base is not None else 0.04) - (0.02 * intensity))
+                    "revenue_growth_start": Shift(-0.10),
+                    "revenue_growth_end": Shift(-0.05),
+                    "ebitda_margin_start": Shift(-0.05),
+                    "ebitda_margin_end": Shift(-0.02),
+                    "working_capital.dso": Shift(15),
+                    "capex_percent_revenue": Shift(-0.02, default=0.04, floor=0.005)
                 }
             },
             "blue_sky": {
@@ -55,11 +94,11 @@ class ScenarioGeneratorService:
                 "description": "Optimistic growth scenario",
                 "explanation": "High revenue growth combined with margin expansion due to economies of scale. CapEx increases to support growth.",
                 "adjustments": {
-                    "revenue_growth_start": lambda base, intensity: base + (0.08 * intensity),
-                    "revenue_growth_end": lambda base, intensity: base + (0.05 * intensity),
-                    "ebitda_margin_start": lambda base, intensity: base + (0.02 * intensity),
-                    "ebitda_margin_end": lambda base, intensity: base + (0.05 * intensity),
-                    "capex_percent_revenue": lambda base, intensity: (base if base is not None else 0.04) + (0.01 * intensity)
+                    "revenue_growth_start": Shift(0.08),
+                    "revenue_growth_end": Shift(0.05),
+                    "ebitda_margin_start": Shift(0.02),
+                    "ebitda_margin_end": Shift(0.05),
+                    "capex_percent_revenue": Shift(0.01, default=0.04)
                 }
             }
         }
@@ -109,30 +148,141 @@ class ScenarioGeneratorService:
         self._validate_and_reconcile(projections)
 
         return {
-            "base_assumptions": base_inputs.dict(),
-            "generated_assumptions": new_inputs.dict(),
+            "base_assumptions": base_inputs.model_dump(),
+            "generated_assumptions": new_inputs.model_dump(),
             "changes": changes,
             "explanation": template["explanation"],
             "scenario_name": template["name"]
         }
 
-    def _validate_and_reconcile(self, projections: ProjectionAssumptions):
+    def generate_family(self, base_inputs: ValuationInput,
+                        variants: Sequence[Tuple[str, float]]) -> List[ScenarioDelta]:
         """
-        Ensure generated assumptions are logical.
+        Generate many scenarios at once from (scenario_type, intensity) pairs,
+        e.g. an intensity ladder or a PWSA scenario family.
+
+        Every template adjustment is a Shift, so the whole family is one
+        (variants x fields) array: base + slope * intensity, floored, then
+        clamped to BOUNDS. Nothing is copied; each scenario comes back as the
+        delta of fields it changes from the base projections, to be applied
+        with apply_delta / to_scenario_inputs / to_pwsa_scenarios.
         """
-        # 1. Margins cannot be > 100% or < -100% (usually)
-        projections.ebitda_margin_start = max(-0.5, min(0.9, projections.ebitda_margin_start))
-        projections.ebitda_margin_end = max(-0.5, min(0.9, projections.ebitda_margin_end))
+        if not base_inputs.dcf_input:
+            raise ValueError("DCF Inputs are required for scenario generation")
+        for scenario_type, _ in variants:
+            if scenario_type not in self.templates:
+                raise ValueError(f"Unknown scenario type: {scenario_type}")
 
-        # 2. Revenue growth sanity (-50% to +200%)
-        projections.revenue_growth_start = max(-0.5, min(2.0, projections.revenue_growth_start))
-        
-        # 3. CapEx cannot be negative
-        if projections.capex_percent_revenue is not None:
-            projections.capex_percent_revenue = max(0.0, projections.capex_percent_revenue)
-
-        # 4. Working Capital sanity
-        if projections.working_capital:
-            projections.working_capital.dso = max(0, projections.working_capital.dso)
-            projections.working_capital.dio = max(0, projections.working_capital.dio)
-            projections.working_capital.dpo = max(0, projections.working_capital.dpo)
+        projections = base_inputs.dcf_input.projections
+        fields = list(dict.fromkeys(
+            [field for template in self.templates.values() for field in template["adjustments"]] + list(BOUNDS)
+        ))
+        column = {field: j for j, field in enumerate(fields)}
+        base_values = [_get(projections, field) for field in fields]
+        base = np.array([np.nan if value is None else value for value in base_values], dtype=float)
+        # Nested fields are only adjusted when their parent object exists
+        present = np.array([
+            "." not in field or getattr(projections, field.split(".")[0]) is not None for field in fields
+        ])
+
+        n, m = len(variants), len(fields)
+        slope = np.zeros((n, m))
+        default = np.full((n, m), np.nan)
+        floor = np.full((n, m), -np.inf)
+        touched = np.zeros((n, m), dtype=bool)
+        for i, (scenario_type, _) in enumerate(variants):
+            for field, shift in self.templates[scenario_type]["adjustments"].items():
+                j = column[field]
+                touched[i, j] = True
+                slope[i, j] = shift.slope
+                if shift.default is not None:
+                    default[i, j] = shift.default
+                if shift.floor is not None:
+                    floor[i, j] = shift.floor
+        touched &= present
+        intensity = np.array([intensity for _, intensity in variants], dtype=float)[:, None]
+
+        start = np.where(np.isnan(base), default, base)
+        values = np.where(touched, np.maximum(floor, start + slope * intensity), base)
+        for field, (low, high) in BOUNDS.items():
+            values[:, column[field]] = np.clip(values[:, column[field]], low, high)
+
+        # A scenario's delta: the fields its template sets, plus any the bounds moved
+        with np.errstate(invalid="ignore"):
+            changed = touched | ((values != base) & ~np.isnan(values))
+
+        deltas = []
+        for i, (scenario_type, scenario_intensity) in enumerate(variants):
+            deltas.append(ScenarioDelta(
+                scenario_type=scenario_type,
+                scenario_name=self.templates[scenario_type]["name"],
+                intensity=scenario_intensity,
+                changes={fields[j]: float(values[i, j]) for j in np.flatnonzero(changed[i])},
+            ))
+        return deltas
+
+    def apply_delta(self, projections: ProjectionAssumptions, delta: ScenarioDelta) -> ProjectionAssumptions:
+        """
+        Projections with a scenario's changes applied. A shallow copy: sub-objects
+        the delta doesn't touch (e.g. working capital) are shared with the base.
+        """
+        update: Dict[str, Any] = {}
+        nested: Dict[str, Dict[str, float]] = {}
+        for field, value in delta.changes.items():
+            if "." in field:
+                parent_field, child_field = field.split(".")
+                nested.setdefault(parent_field, {})[child_field] = value
+            else:
+                update[field] = value
+        for parent_field, children in nested.items():
+            update[parent_field] = getattr(projections, parent_field).model_copy(update=children)
+        return projections.model_copy(update=update)
+
+    def to_scenario_inputs(self, base_inputs: ValuationInput, deltas: List[ScenarioDelta]) -> List[ScenarioInput]:
+        """Deltas as ValuationInput.scenarios entries, valued by ValuationEngine.calculate."""
+        projections = base_inputs.dcf_input.projections
+        return [
+            ScenarioInput(scenario_name=self._label(delta), projections=self.apply_delta(projections, delta))
+            for delta in deltas
+        ]
+
+    def to_pwsa_scenarios(self, base_inputs: ValuationInput, deltas: List[ScenarioDelta],
+                          probabilities: List[float]) -> List[ScenarioConfig]:
+        """
+        Deltas as PWSA scenarios. Each scenario's ValuationInput is a shallow
+        copy of the base sharing everything but the DCF projections.
+        """
+        if len(probabilities) != len(deltas):
+            raise ValueError("One probability is required per scenario")
+        dcf_input = base_inputs.dcf_input
+        return [
+            ScenarioConfig(
+                name=self._label(delta),
+                probability=probability,
+                assumptions=base_inputs.model_copy(update={
+                    "dcf_input": dcf_input.model_copy(update={"projections": self.apply_delta(dcf_input.projections, delta)})
+                }),
+            )
+            for delta, probability in zip(deltas, probabilities)
+        ]
+
+    def _label(self, delta: ScenarioDelta) -> str:
+        return f"{delta.scenario_name} ({delta.intensity:g}x)"
+
+    def _validate_and_reconcile(self, projections: ProjectionAssumptions):
+        """
+        Ensure generated assumptions are logical: margins, revenue growth,
+        CapEx and working capital days are clamped to BOUNDS.
+        """
+        for field, (low, high) in BOUNDS.items():
+            value = _get(projections, field)
+            if value is None:
+                continue
+            value = max(low, value)
+            if high is not None:
+                value = min(high, value)
+            if "." in field:
+                parent_field, child_field = field.split(".")
+                setattr(getattr(projections, parent_field), child_field, value)
+            else:
+                setattr(projections, field, value)
@@ -0,0 +1,367 @@
+"""
+Cross-worker coordination: leader election and run-once startup tasks.
+
+gunicorn runs several workers of this app and every one of them executes the
+FastAPI startup hook. Singleton work (APScheduler jobs, the market simulator)
+must run in exactly one worker, and one-time setup (create_all, views, seeds)
+should run once per schema version rather than once per worker.
+
+The lock primitive is chosen from the database dialect:
+- SQLite: an fcntl file lock next to the database file
+- PostgreSQL: a session-level pg_advisory_lock held on a dedicated connection
+- anything else (or no fcntl): a lease row in `service_leases`, renewed by its holder
+
+The first two are released by the OS / database when the holding process
+dies; the lease row expires after its TTL. Either way another worker takes
+over on its next election attempt.
+"""
+import hashlib
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from sqlalchemy import select, update, or_, text
+from sqlalchemy.exc import IntegrityError, OperationalError, ProgrammingError
+
+from backend.database.models import Base, ServiceLease, StartupTaskRecord
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger("coordination")
+logger.setLevel(logging.INFO)
+
+NODE_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _default_engine():
+    from backend.database.models import engine
+    return engine
+
+
+class FileLock:
+    """Non-blocking exclusive flock on a file. Released automatically if the process dies."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fh = None
+
+    def try_acquire(self) -> bool:
+        if self._fh is not None:
+            return True
+        fh = open(self.path, "a+")
+        try:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            fh.close()
+            return False
+        fh.seek(0)
+        fh.truncate()
+        fh.write(NODE_ID)
+        fh.flush()
+        self._fh = fh
+        return True
+
+    def is_held(self) -> bool:
+        return self._fh is not None
+
+    def release(self):
+        if self._fh is not None:
+            try:
+                fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+            finally:
+                self._fh.close()
+                self._fh = None
+
+
+class AdvisoryLock:
+    """PostgreSQL session-level advisory lock held on a dedicated connection."""
+
+    def __init__(self, engine, name: str):
+        self.engine = engine
+        # Advisory lock keys are signed 64-bit integers
+        self.key = int.from_bytes(hashlib.sha1(name.encode()).digest()[:8], "big", signed=True)
+        self._conn = None
+
+    def try_acquire(self) -> bool:
+        if self._conn is not None:
+            return self.is_held()
+        conn = self.engine.connect()
+        try:
+            acquired = conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": self.key}).scalar()
+            conn.commit()
+        except Exception:
+            conn.close()
+            raise
+        if not acquired:
+            conn.close()
+            return False
+        self._conn = conn
+        return True
+
+    def is_held(self) -> bool:
+        if self._conn is None:
+            return False
+        try:
+            self._conn.execute(text("SELECT 1"))
+            self._conn.commit()
+            return True
+        except Exception:
+            # Connection dropped: the server has released the lock
+            self._conn = None
+            return False
+
+    def release(self):
+        if self._conn is not None:
+            try:
+                self._conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.key})
+                self._conn.commit()
+            except Exception:
+                pass
+            finally:
+                self._conn.close()
+                self._conn = None
+
+
+class LeaseLock:
+    """Lease row with a TTL. The holder must call is_held() (which renews) more often than ttl."""
+
+    def __init__(self, engine, name: str, ttl_seconds: float = 30.0, holder: str = NODE_ID):
+        self.engine = engine
+        self.name = name
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.holder = holder
+        self._held = False
+
+    def try_acquire(self) -> bool:
+        now = datetime.utcnow()
+        with self.engine.begin() as conn:
+            result = conn.execute(
+                update(ServiceLease)
+                .where(ServiceLease.name == self.name)
+                .where(or_(ServiceLease.holder == self.holder, ServiceLease.expires_at < now))
+                .values(holder=self.holder, expires_at=now + self.ttl, updated_at=now)
+            )
+            if result.rowcount == 1:
+                self._held = True
+                return True
+            exists = conn.execute(select(ServiceLease.name).where(ServiceLease.name == self.name)).first()
+            if exists:
+                self._held = False
+                return False
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(ServiceLease.__table__.insert().values(
+                    name=self.name, holder=self.holder, expires_at=now + self.ttl, updated_at=now
+                ))
+            self._held = True
+        except IntegrityError:
+            self._held = False
+        return self._held
+
+    def is_held(self) -> bool:
+        if not self._held:
+            return False
+        try:
+            return self.try_acquire()
+        except Exception as e:
+            logger.warning(f"Lease renewal for '{self.name}' failed: {e}")
+            self._held = False
+            return False
+
+    def release(self):
+        if not self._held:
+            return
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(
+                    update(ServiceLease)
+                    .where(ServiceLease.name == self.name, ServiceLease.holder == self.holder)
+                    .values(expires_at=datetime.utcnow())
+                )
+        finally:
+            self._held = False
+
+
+def _lock_dir(engine) -> str:
+    configured = os.getenv("COORDINATION_LOCK_DIR")
+    if configured:
+        return configured
+    database = engine.url.database
+    if database and database != ":memory:":
+        return os.path.dirname(os.path.abspath(database))
+    return tempfile.gettempdir()
+
+
+def make_lock(name: str, engine=None, ttl_seconds: float = 30.0):
+    """Pick the cheapest lock primitive that works across workers for this database."""
+    engine = engine or _default_engine()
+    dialect = engine.dialect.name
+    if dialect == "sqlite" and fcntl is not None:
+        safe_name = "".join(c if c.isalnum() or c in "-_" else "_" for c in name)
+        return FileLock(os.path.join(_lock_dir(engine), f".{safe_name}.lock"))
+    if dialect == "postgresql":
+        return AdvisoryLock(engine, name)
+    return LeaseLock(engine, name, ttl_seconds=ttl_seconds)
+
+
+def ensure_coordination_tables(engine=None):
+    engine = engine or _default_engine()
+    try:
+        Base.metadata.create_all(bind=engine, tables=[ServiceLease.__table__, StartupTaskRecord.__table__])
+    except (OperationalError, ProgrammingError):
+        # Another worker created them concurrently
+        pass
+
+
+def schema_fingerprint() -> str:
+    """Short hash of the ORM schema, so create_all/views re-run only when models change."""
+    parts = []
+    for table in sorted(Base.metadata.tables.values(), key=lambda t: t.name):
+        parts.append(table.name)
+        parts.extend(f"{c.name}:{c.type}" for c in table.columns)
+        parts.extend(sorted(i.name or "" for i in table.indexes))
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()[:16]
+
+
+def _is_completed(engine, name: str, version: str) -> bool:
+    with engine.connect() as conn:
+        row = conn.execute(
+            select(StartupTaskRecord.version).where(StartupTaskRecord.name == name)
+        ).first()
+    return row is not None and row[0] == version
+
+
+def _mark_completed(engine, name: str, version: str):
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        result = conn.execute(
+            update(StartupTaskRecord)
+            .where(StartupTaskRecord.name == name)
+            .values(version=version, completed_by=NODE_ID, completed_at=now)
+        )
+        if result.rowcount == 0:
+            conn.execute(StartupTaskRecord.__table__.insert().values(
+                name=name, version=version, completed_by=NODE_ID, completed_at=now
+            ))
+
+
+def run_once(name: str, func: Callable[[], None], version: str = "1", timeout: float = 300.0, engine=None) -> bool:
+    """
+    Run `func` once per (name, version) across all workers.
+
+    The first worker to take the lock runs it; the others wait until it is
+    recorded as completed and return immediately. If the running worker dies
+    before completing, the lock is released and a waiting worker runs it.
+    Returns True if this call ran the task.
+    """
+    engine = engine or _default_engine()
+    ensure_coordination_tables(engine)
+    if _is_completed(engine, name, version):
+        return False
+
+    lock = make_lock(f"startup-{name}", engine)
+    deadline = time.monotonic() + timeout
+    while not lock.try_acquire():
+        if _is_completed(engine, name, version):
+            return False
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Timed out waiting for startup task '{name}'")
+        time.sleep(0.2)
+
+    try:
+        if _is_completed(engine, name, version):
+            return False
+        start = time.perf_counter()
+        func()
+        _mark_completed(engine, name, version)
+        logger.info(f"Startup task '{name}' completed in {time.perf_counter() - start:.2f}s by {NODE_ID}")
+        return True
+    finally:
+        lock.release()
+
+
+class LeaderElector:
+    """
+    Keeps trying to become leader for `name`; calls on_elected when it wins and
+    on_demoted when it loses the lock (or stops). Followers retry every
+    `interval` seconds, which bounds failover time after the leader dies.
+    """
+
+    def __init__(self, name: str, on_elected: Optional[Callable[[], None]] = None,
+                 on_demoted: Optional[Callable[[], None]] = None, interval: float = 10.0,
+                 lock=None, engine=None):
+        self.name = name
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.interval = interval
+        self._engine = engine
+        self._lock = lock
+        self._is_leader = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._is_leader
+
+    @property
+    def lock(self):
+        if self._lock is None:
+            engine = self._engine or _default_engine()
+            ensure_coordination_tables(engine)
+            # Lease TTL comfortably exceeds the renewal interval
+            self._lock = make_lock(f"leader-{self.name}", engine, ttl_seconds=self.interval * 3)
+        return self._lock
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"leader-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._is_leader:
+            self._step_down()
+        if self._lock is not None:
+            self._lock.release()
+
+    def tick(self):
+        """One election round (exposed for tests)."""
+        try:
+            if not self._is_leader:
+                if self.lock.try_acquire():
+                    self._is_leader = True
+                    logger.info(f"{NODE_ID} elected leader for '{self.name}'")
+                    if self.on_elected:
+                        self.on_elected()
+            elif not self.lock.is_held():
+                logger.warning(f"{NODE_ID} lost leadership for '{self.name}'")
+                self._step_down()
+        except Exception as e:
+            logger.error(f"Leader election for '{self.name}' failed: {e}")
+
+    def _step_down(self):
+        self._is_leader = False
+        if self.on_demoted:
+            try:
+                self.on_demoted()
+            except Exception as e:
+                logger.error(f"on_demoted for '{self.name}' failed: {e}")
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.tick()
+            self._stop.wait(self.interval)
@@ -1,15 +1,39 @@
+"""
+Per-worker health monitor for the admin dashboard.
+
+The request middleware calls log_request on every request, so it only does
+O(1) work: the request lands in a fixed-size ring buffer (a bounded deque,
+formatted only when read) and in rolling windows of per-second slots. Each
+window keeps its request count, errors and a latency sketch as running totals.
+A slot that falls out of the window is subtracted from them, so rates and
+percentiles are read without rescanning requests.
+
+OS stats (CPU, memory, disk, this process's open connections) are sampled by
+a background loop every HEALTH_SAMPLE_SECONDS and served from the last
+snapshot, so polling the dashboard never blocks on psutil. Connections are
+counted for this process only, not by scanning every socket on the host.
+"""
+import os
 import psutil
+import threading
 import time
-from typing import Dict, Any, List
+from collections import deque
+from typing import Deque, Dict, Any, List, Optional, Tuple
 from pydantic import BaseModel
 from datetime import datetime
+from backend.services.metrics.sketch import BucketStats
+
+SAMPLE_INTERVAL_SECONDS = float(os.getenv("HEALTH_SAMPLE_SECONDS", 5))
+# Rolling windows reported by get_metrics: label -> seconds
+WINDOWS = {"1m": 60, "5m": 300}
 
 class SystemStats(BaseModel):
     cpu_percent: float
     memory_percent: float
     disk_percent: float
     uptime_seconds: float
-    active_connections: int
+    active_connections: int # Open connections of this worker process
+    sampled_at: Optional[str] = None
 
 class RequestLog(BaseModel):
     timestamp: str
@@ -18,55 +42,135 @@ class RequestLog(BaseModel):
     status_code: int
     duration_ms: float
 
+class RollingWindow:
+    """Requests, errors and latency over the last `seconds`, kept in per-second slots."""
+
+    def __init__(self, seconds: int):
+        self.seconds = seconds
+        self._slots: Deque[Tuple[int, BucketStats]] = deque()
+        self.total = BucketStats()
+
+    def _expire(self, now: float):
+        oldest = int(now) - self.seconds
+        while self._slots and self._slots[0][0] <= oldest:
+            _, stats = self._slots.popleft()
+            self.total.sketch.subtract(stats.sketch)
+            self.total.error_count -= stats.error_count
+
+    def add(self, now: float, duration_ms: float, error: bool):
+        self._expire(now)
+        second = int(now)
+        if not self._slots or self._slots[-1][0] != second:
+            self._slots.append((second, BucketStats()))
+        slot = self._slots[-1][1]
+        for stats in (slot, self.total):
+            stats.sketch.add(duration_ms)
+            if error:
+                stats.error_count += 1
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        self._expire(now)
+        sketch, count = self.total.sketch, self.total.count
+        return {
+            "window_seconds": self.seconds,
+            "requests": count,
+            "request_rate": count / self.seconds,
+            "error_rate": self.total.error_count / count if count else 0.0,
+            "avg_ms": sketch.mean,
+            "p50_ms": sketch.quantile(0.5),
+            "p95_ms": sketch.quantile(0.95),
+            "p99_ms": sketch.quantile(0.99),
+        }
+
 class HealthMonitorService:
-    def __init__(self):
+    def __init__(self, max_logs: int = 100):
         self.start_time = time.time()
-        self.request_logs: List[RequestLog] = []
-        self.max_logs = 100
+        self.max_logs = max_logs
+        # Newest on the right; (timestamp, method, endpoint, status_code, duration_ms)
+        self.request_logs: Deque[Tuple[float, str, str, int, float]] = deque(maxlen=max_logs)
         self.request_counts = {"total": 0, "success": 0, "error": 0}
+        self.windows = {label: RollingWindow(seconds) for label, seconds in WINDOWS.items()}
+        self._lock = threading.Lock()
+        self._process = psutil.Process()
+        self._snapshot: Optional[SystemStats] = None
 
-    def get_system_stats(self) -> SystemStats:
-        """
-        Returns current system resource usage.
-        """
-        return SystemStats(
+    def sample(self) -> SystemStats:
+        """Read OS stats now and keep them as the served snapshot."""
+        try:
+            connections = len(self._process.net_connections(kind="inet"))
+        except (psutil.Error, OSError):
+            connections = 0
+        self._snapshot = SystemStats(
             cpu_percent=psutil.cpu_percent(interval=None),
             memory_percent=psutil.virtual_memory().percent,
             disk_percent=psutil.disk_usage('/').percent,
             uptime_seconds=time.time() - self.start_time,
-            active_connections=len(psutil.net_connections())
+            active_connections=connections,
+            sampled_at=datetime.now().isoformat()
         )
+        return self._snapshot
+
+    def get_system_stats(self) -> SystemStats:
+        """
+        Returns the latest sampled system resource usage (sampled now if the
+        background loop hasn't run yet).
+        """
+        snapshot = self._snapshot or self.sample()
+        return snapshot.model_copy(update={"uptime_seconds": time.time() - self.start_time})
 
     def log_request(self, method: str, endpoint: str, status_code: int, duration_ms: float):
         """
         Logs an API request for metrics tracking.
         """
-        self.request_counts["total"] += 1
-        if 200 <= status_code < 400:
-            self.request_counts["success"] += 1
-        else:
-            self.request_counts["error"] += 1
-
-        log = RequestLog(
-            timestamp=datetime.now().isoformat(),
-            method=method,
-            endpoint=endpoint,
-            status_code=status_code,
-            duration_ms=duration_ms
-        )
-        
-        self.request_logs.insert(0, log)
-        if len(self.request_logs) > self.max_logs:
-            self.request_logs.pop()
+        now = time.time()
+        error = status_code >= 400
+        with self._lock:
+            self.request_counts["total"] += 1
+            self.request_counts["error" if error else "success"] += 1
+            self.request_logs.append((now, method, endpoint, status_code, duration_ms))
+            for window in self.windows.values():
+                window.add(now, duration_ms, error)
+
+    def recent_logs(self, limit: int = 20) -> List[RequestLog]:
+        """The `limit` newest requests, newest first."""
+        with self._lock:
+            newest = list(self.request_logs)[-limit:]
+        return [
+            RequestLog(
+                timestamp=datetime.fromtimestamp(ts).isoformat(),
+                method=method,
+                endpoint=endpoint,
+                status_code=status_code,
+                duration_ms=duration_ms
+            )
+            for ts, method, endpoint, status_code, duration_ms in reversed(newest)
+        ]
 
     def get_metrics(self) -> Dict[str, Any]:
         """
         Returns aggregated metrics and logs.
         """
+        now = time.time()
+        with self._lock:
+            requests = dict(self.request_counts)
+            windows = {label: window.snapshot(now) for label, window in self.windows.items()}
         return {
-            "system": self.get_system_stats().dict(),
-            "requests": self.request_counts,
-            "recent_logs": [log.dict() for log in self.request_logs[:20]]
+            "system": self.get_system_stats().model_dump(),
+            "requests": requests,
+            "windows": windows,
+            "recent_logs": [log.model_dump() for log in self.recent_logs()]
         }
 
+async def sample_health_periodically(interval: float = SAMPLE_INTERVAL_SECONDS):
+    """
+    Per-worker sampling loop: every worker serves its own health snapshot,
+    so this runs in each of them.
+    """
+    import asyncio
+    from fastapi.concurrency import run_in_threadpool
+
+    while True:
+        await run_in_threadpool(health_monitor_service.sample)
+        await asyncio.sleep(interval)
+
 health_monitor_service = HealthMonitorService()
@@ -23,6 +23,9 @@ class SchedulerService:
     def stop(self):
         if self.is_running:
             self.scheduler.shutdown()
+            # A shut-down scheduler cannot be restarted; keep a fresh one in case
+            # this worker is re-elected leader later
+            self.scheduler = BackgroundScheduler()
             self.is_running = False
             logger.info("Scheduler stopped.")
 
@@ -37,6 +40,15 @@ class SchedulerService:
         )
         logger.info("Job 'refresh_market_data' scheduled for 21:15 UTC.")
 
+        # Beta/WACC estimates (after the market data refresh): ingest weekly prices, then one local pass
+        self.scheduler.add_job(
+            self.refresh_wacc_components,
+            CronTrigger(hour=21, minute=45),
+            id="refresh_wacc_components",
+            replace_existing=True
+        )
+        logger.info("Job 'refresh_wacc_components' scheduled for 21:45 UTC.")
+
         # Metric Aggregation (Every 5 minutes)
         # Replacing Celery task: services.metrics.aggregator.aggregate_metrics
         from backend.services.metrics.aggregator import aggregate_metrics
@@ -48,7 +60,26 @@ class SchedulerService:
         )
         logger.info("Job 'aggregate_metrics' scheduled for every 5 minutes.")
 
-        # Metrics Cleanup (Daily at 2 AM UTC)
+        # Incremental Pattern Training (Every 15 minutes; folds new valuation runs into the archetypes)
+        self.scheduler.add_job(
+            self.train_patterns_incremental,
+            CronTrigger(minute="*/15"),
+            id="train_patterns_incremental",
+            replace_existing=True
+        )
+        logger.info("Job 'train_patterns_incremental' scheduled for every 15 minutes.")
+
+        # Metrics Rollups (Hourly; hourly/daily aggregates for long-range dashboards)
+        from backend.services.metrics.retention import rollup_metrics
+        self.scheduler.add_job(
+            rollup_metrics,
+            CronTrigger(minute=10),
+            id="rollup_metrics",
+            replace_existing=True
+        )
+        logger.info("Job 'rollup_metrics' scheduled for every hour at :10.")
+
+        # Metrics Cleanup (Daily at 2 AM UTC; rolls up, then purges raw rows in small batches)
         # Replacing Celery task: services.metrics.retention.cleanup_old_metrics
         from backend.services.metrics.retention import cleanup_old_metrics
         self.scheduler.add_job(
@@ -59,6 +90,34 @@ class SchedulerService:
         )
         logger.info("Job 'cleanup_old_metrics' scheduled for 02:00 UTC.")
 
+        # Portfolio Compliance Audit (Daily at 3 AM UTC; unchanged runs are skipped)
+        from backend.compliance.batch import run_compliance_batch
+        self.scheduler.add_job(
+            run_compliance_batch,
+            CronTrigger(hour=3, minute=0),
+            id="compliance_batch",
+            replace_existing=True
+        )
+        logger.info("Job 'compliance_batch' scheduled for 03:00 UTC.")
+
+        # Full Audit Chain Verification (Daily at 4 AM UTC; dashboards only check new rows)
+        self.scheduler.add_job(
+            self.verify_audit_chain,
+            CronTrigger(hour=4, minute=0),
+            id="verify_audit_chain",
+            replace_existing=True
+        )
+        logger.info("Job 'verify_audit_chain' scheduled for 04:00 UTC.")
+
+        # Weekly Reality Check (Mondays at 5 AM UTC; refreshes recent weeks that saw late acknowledgements/outcomes)
+        self.scheduler.add_job(
+            self.weekly_reality_check,
+            CronTrigger(day_of_week="mon", hour=5, minute=0),
+            id="weekly_reality_check",
+            replace_existing=True
+        )
+        logger.info("Job 'weekly_reality_check' scheduled for Mondays 05:00 UTC.")
+
     def refresh_market_data(self):
         logger.info("Executing job: refresh_market_data")
         try:
@@ -81,4 +140,66 @@ class SchedulerService:
         except Exception as e:
             logger.error(f"Failed to refresh market data: {e}")
 
+    def refresh_wacc_components(self):
+        logger.info("Executing job: refresh_wacc_components")
+        from backend.database.models import SessionLocal, Company
+        from backend.services.wacc.estimation import wacc_estimation_service
+        db = SessionLocal()
+        try:
+            tickers = [ticker for (ticker,) in db.query(Company.ticker)]
+            wacc_estimation_service.ingest_from_provider(db, tickers)
+            capital_structure = wacc_estimation_service.capital_structure_from_provider(tickers)
+            components = wacc_estimation_service.refresh(db, tickers, capital_structure=capital_structure)
+            logger.info(f"WACC components refreshed for {len(components)} tickers.")
+        except Exception as e:
+            logger.error(f"Failed to refresh WACC components: {e}")
+        finally:
+            db.close()
+
+    def train_patterns_incremental(self):
+        logger.info("Executing job: train_patterns_incremental")
+        from backend.database.models import SessionLocal
+        from backend.services.ai.pattern_store import pattern_store
+        db = SessionLocal()
+        try:
+            applied = pattern_store.train_incremental(db)
+            logger.info(f"Pattern training folded in {applied} new valuation runs.")
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to train patterns incrementally: {e}")
+        finally:
+            db.close()
+
+    def verify_audit_chain(self):
+        logger.info("Executing job: verify_audit_chain")
+        from backend.database.models import SessionLocal
+        from backend.services.immutable_audit import ImmutableAuditService
+        db = SessionLocal()
+        try:
+            result = ImmutableAuditService(db).verify_chain_integrity(full=True)
+            if result["status"] == "valid":
+                logger.info(f"Audit chain verified through id {result['verified_through']}.")
+            else:
+                logger.error(f"Audit chain compromised: {len(result['broken_blocks'])} broken blocks.")
+        except Exception as e:
+            logger.error(f"Failed to verify audit chain: {e}")
+        finally:
+            db.close()
+
+    def weekly_reality_check(self, weeks: int = 8):
+        logger.info("Executing job: weekly_reality_check")
+        from datetime import datetime, timedelta
+        from backend.database.models import SessionLocal
+        from backend.services.journal.reality_check import generate_weekly_reports
+        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        this_week = today - timedelta(days=today.weekday())
+        db = SessionLocal()
+        try:
+            result = generate_weekly_reports(db, this_week - timedelta(weeks=weeks), weeks)
+            logger.info(f"Reality check: regenerated {len(result['regenerated'])} weeks, {result['skipped']} unchanged.")
+        except Exception as e:
+            logger.error(f"Failed to generate weekly reality check: {e}")
+        finally:
+            db.close()
+
 scheduler_service = SchedulerService()
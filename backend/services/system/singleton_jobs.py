@@ -0,0 +1,55 @@
+"""
+Background work that must run in exactly one gunicorn worker.
+
+Every worker starts a LeaderElector; only the elected leader runs the
+APScheduler jobs and the market simulator. If the leader dies, another
+worker wins the next election round and starts them.
+"""
+import asyncio
+import logging
+from typing import Optional
+
+from backend.services.system.coordination import LeaderElector
+
+logger = logging.getLogger("singleton_jobs")
+logger.setLevel(logging.INFO)
+
+
+class SingletonJobs:
+    def __init__(self, name: str = "background-jobs", interval: float = 10.0):
+        self.elector = LeaderElector(name, on_elected=self._start_jobs, on_demoted=self._stop_jobs, interval=interval)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._simulator = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self.elector.is_leader
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        """Begin taking part in leader election. `loop` runs the async simulator when elected."""
+        self._loop = loop
+        self.elector.start()
+
+    def stop(self):
+        self.elector.stop()
+
+    def _start_jobs(self):
+        from backend.services.system.scheduler_service import scheduler_service
+        from backend.services.realtime.market_simulator import simulate_market_data
+
+        scheduler_service.start()
+        if self._loop is not None and self._simulator is None:
+            self._simulator = asyncio.run_coroutine_threadsafe(simulate_market_data(), self._loop)
+        logger.info("Singleton background jobs started in this worker.")
+
+    def _stop_jobs(self):
+        from backend.services.system.scheduler_service import scheduler_service
+
+        scheduler_service.stop()
+        if self._simulator is not None:
+            self._simulator.cancel()
+            self._simulator = None
+        logger.info("Singleton background jobs stopped in this worker.")
+
+
+singleton_jobs = SingletonJobs()
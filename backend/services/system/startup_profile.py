@@ -0,0 +1,100 @@
+"""
+Worker startup cost: how long the app took to import, the resident memory it
+left behind, which heavy libraries got loaded and when each lazy router group
+was mounted. `preload` imports the shared heavy modules and every router
+group up front, for a gunicorn master that forks its workers afterwards.
+
+For a per-module breakdown run scripts/import_profile.py.
+"""
+import importlib
+import os
+import sys
+import time
+from typing import Any, Dict, Optional
+
+# Libraries that dominate import time and memory, loaded on first use
+HEAVY_MODULES = (
+    "matplotlib", "seaborn", "sklearn", "scipy", "pandas",
+    "reportlab", "pptx", "docx", "openpyxl", "groq",
+)
+
+# Imported in the gunicorn master in preload mode, so workers share their pages
+PRELOAD_MODULES = (
+    "backend.reports.charts",
+    "backend.reports.adapters",
+    "backend.reporting",
+    "backend.utils.excel_export",
+    "backend.services.analytics.reporting_service",
+    "reportlab.platypus",
+    "pptx",
+    "docx",
+    "openpyxl",
+    "pandas",
+)
+
+
+def rss_mb() -> Optional[float]:
+    """Current resident set size (Linux), else the peak from getrusage."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, IndexError):
+        try:
+            import resource
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+        except Exception:
+            return None
+
+
+class StartupProfile:
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.import_seconds: Optional[float] = None
+        self.import_rss_mb: Optional[float] = None
+        self.preloaded = False
+        self.preload_seconds: Optional[float] = None
+
+    def app_imported(self):
+        self.import_seconds = time.perf_counter() - self.started_at
+        self.import_rss_mb = rss_mb()
+        print(f"App imported in {self.import_seconds:.2f}s, RSS {self.import_rss_mb or 0:.0f} MB, "
+              f"heavy modules: {', '.join(self.heavy_modules_loaded()) or 'none'}")
+
+    def heavy_modules_loaded(self):
+        return [name for name in HEAVY_MODULES if name in sys.modules]
+
+    def preload(self, app):
+        """Import shared heavy modules and mount every router group now."""
+        from backend.api.lazy_routes import load_all
+
+        started = time.perf_counter()
+        for module in PRELOAD_MODULES:
+            try:
+                importlib.import_module(module)
+            except Exception as e:
+                print(f"Error preloading {module}: {e}")
+        from backend.reports.charts import _pyplot
+        _pyplot()  # matplotlib with the Agg backend and the report theme
+        load_all(app)
+        self.preloaded = True
+        self.preload_seconds = time.perf_counter() - started
+        print(f"Preloaded shared modules in {self.preload_seconds:.2f}s, RSS {rss_mb() or 0:.0f} MB")
+
+    def report(self) -> Dict[str, Any]:
+        from backend.api.lazy_routes import router_group_status
+
+        return {
+            "pid": os.getpid(),
+            "import_seconds": self.import_seconds,
+            "import_rss_mb": self.import_rss_mb,
+            "rss_mb": rss_mb(),
+            "preloaded": self.preloaded,
+            "preload_seconds": self.preload_seconds,
+            "heavy_modules_loaded": self.heavy_modules_loaded(),
+            "modules_loaded": len(sys.modules),
+            "router_groups": router_group_status(),
+        }
+
+
+startup_profile = StartupProfile()
@@ -1,12 +1,9 @@
-import numpy as np
 import os
-import json
 from typing import List, Dict, Any, Optional, Tuple
 from pydantic import BaseModel
 from backend.calculations.models import ValuationInput
-from alpha_vantage.fundamentaldata import FundamentalData
 from groq import Groq
-from backend.database.models import SessionLocal, IndustryNorm, ValidationPattern
+from backend.services.ai.pattern_store import pattern_store
 
 class AnomalyResult(BaseModel):
     field: str
@@ -25,6 +22,7 @@ class PatternMatch(BaseModel):
     confidence: float
     typical_assumptions: Dict[str, str]
     avg_values: Dict[str, float]
+    is_outlier: bool = False # Far from every archetype of the sector (standardized distance)
 
 class ValidationAnalysisResponse(BaseModel):
     anomalies: List[AnomalyResult]
@@ -47,22 +45,8 @@ class AnomalyDetectionService:
         }
 
     def _get_db_benchmarks(self, sector: str) -> Dict[str, Tuple[float, float]]:
-        """Fetch benchmarks from the database for a given sector."""
-        db = SessionLocal()
-        try:
-            norms = db.query(IndustryNorm).filter(IndustryNorm.sector == sector).all()
-            if not norms:
-                return {}
-            
-            benchmarks = {}
-            for norm in norms:
-                benchmarks[norm.metric] = (norm.mean, norm.std_dev)
-            return benchmarks
-        except Exception as e:
-            print(f"Database Error: {e}")
-            return {}
-        finally:
-            db.close()
+        """Sector benchmarks from the database, served from the in-memory pattern store."""
+        return pattern_store.norms(sector)
 
     def _get_alpha_vantage_benchmarks(self, ticker: str) -> Dict[str, tuple]:
         """
@@ -72,6 +56,7 @@ class AnomalyDetectionService:
             return {}
 
         try:
+            from alpha_vantage.fundamentaldata import FundamentalData  # Pulls in pandas; only needed here
             fd = FundamentalData(key=self.alpha_vantage_key, output_format='json')
             overview, _ = fd.get_company_overview(symbol=ticker)
             # In a real app, we would parse 'Industry' from overview and map it to our DB sectors
@@ -82,58 +67,29 @@ class AnomalyDetectionService:
 
     def _find_matching_pattern(self, sector: str, growth: float, margin: float) -> Optional[PatternMatch]:
         """Finds the closest cluster pattern for the given input."""
-        db = SessionLocal()
         try:
-            patterns = db.query(ValidationPattern).all() # Filter by sector in memory for flexibility or query
-            # Filter for sector-specific patterns
-            sector_patterns = []
-            for p in patterns:
-                cond = json.loads(p.condition_json)
-                if cond.get("sector") == sector:
-                    sector_patterns.append((p, cond))
-            
-            if not sector_patterns:
+            hit = pattern_store.nearest(sector, growth, margin)
+            if hit is None:
                 return None
 
-            # Find closest centroid
-            best_match = None
-            min_dist = float('inf')
-
-            for pattern, cond in sector_patterns:
-                avg_growth = cond.get("avg_growth", 0)
-                avg_margin = cond.get("avg_margin", 0)
-                
-                # Euclidean distance (simple)
-                dist = np.sqrt((growth - avg_growth)**2 + (margin - avg_margin)**2)
-                
-                if dist < min_dist:
-                    min_dist = dist
-                    best_match = (pattern, cond)
-
-            if best_match:
-                pattern, cond = best_match
+            cond = hit.condition
+            return PatternMatch(
+                matched_cluster=hit.name,
                 # Confidence based on distance (closer = higher confidence)
-                confidence = max(0.0, 1.0 - min_dist) 
-                
-                return PatternMatch(
-                    matched_cluster=pattern.message_template.split('(')[1].split(')')[0], # Extract name
-                    confidence=confidence,
-                    typical_assumptions={
-                        "revenue_growth": f"{cond['growth_range'][0]:.1%} - {cond['growth_range'][1]:.1%}",
-                        "ebitda_margin": f"{cond['margin_range'][0]:.1%} - {cond['margin_range'][1]:.1%}"
-                    },
-                    avg_values={
-                        "revenue_growth": cond.get("avg_growth", 0),
-                        "ebitda_margin": cond.get("avg_margin", 0)
-                    }
-                )
-            return None
-
+                confidence=max(0.0, 1.0 - hit.distance),
+                typical_assumptions={
+                    "revenue_growth": f"{cond['growth_range'][0]:.1%} - {cond['growth_range'][1]:.1%}",
+                    "ebitda_margin": f"{cond['margin_range'][0]:.1%} - {cond['margin_range'][1]:.1%}"
+                },
+                avg_values={
+                    "revenue_growth": cond.get("avg_growth", 0),
+                    "ebitda_margin": cond.get("avg_margin", 0)
+                },
+                is_outlier=hit.is_outlier
+            )
         except Exception as e:
             print(f"Pattern Match Error: {e}")
             return None
-        finally:
-            db.close()
 
     def _get_ai_summary(self, anomalies: List[AnomalyResult], company_name: str, pattern: Optional[PatternMatch]) -> str:
         if not self.groq_key:
@@ -269,6 +225,8 @@ class AnomalyDetectionService:
             suggestions.append(f"Matched Archetype: {pattern_match.matched_cluster}")
             suggestions.append(f"Typical Growth: {pattern_match.typical_assumptions['revenue_growth']}")
             suggestions.append(f"Typical Margin: {pattern_match.typical_assumptions['ebitda_margin']}")
+            if pattern_match.is_outlier:
+                suggestions.append(f"Growth/margin mix is unlike any typical {sector} company; double-check both")
 
         # 5. Calculate Score
         score = 1.0
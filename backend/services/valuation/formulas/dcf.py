@@ -1,5 +1,6 @@
 from typing import Tuple, List, Dict, Any
-from backend.calculations.models import DCFInput
+import numpy as np
+from backend.calculations.models import DCFInput, HistoricalFinancials, ProjectionAssumptions
 
 class DCFCalculator:
     @staticmethod
@@ -8,84 +9,11 @@ class DCFCalculator:
             return 0.0, [], {}
             
         proj = dcf_input.projections
-        hist = dcf_input.historical
-        
-        # Simple projection for 5 years
-        last_revenue = hist.revenue[-1]
-        projected_cash_flows = []
-        
-        current_revenue = last_revenue
-        
-        # Initialize previous WC for change calculation
-        if proj.working_capital:
-            prev_ar = (last_revenue / 365) * proj.working_capital.dso
-            proxy_cogs = last_revenue * 0.6 
-            prev_inv = (proxy_cogs / 365) * proj.working_capital.dio
-            prev_ap = (proxy_cogs / 365) * proj.working_capital.dpo
-            prev_nwc = prev_ar + prev_inv - prev_ap
-        else:
-            prev_nwc = 0 
-            
-        for year in range(5):
-            # 1. Revenue
-            growth_rate = proj.revenue_growth_start + (proj.revenue_growth_end - proj.revenue_growth_start) * (year / 4)
-            current_revenue *= (1 + growth_rate)
-            
-            # 2. EBITDA
-            margin = proj.ebitda_margin_start + (proj.ebitda_margin_end - proj.ebitda_margin_start) * (year / 4)
-            ebitda = current_revenue * margin
-            
-            # 3. Depreciation & EBIT
-            depreciation = current_revenue * proj.depreciation_rate
-            ebit = ebitda - depreciation
-            
-            # 4. Tax & NOPAT
-            tax = max(0, ebit * proj.tax_rate)
-            nopat = ebit - tax
-            
-            # 5. Working Capital
-            if proj.working_capital:
-                ar = (current_revenue / 365) * proj.working_capital.dso
-                proxy_cogs = current_revenue * 0.6
-                inv = (proxy_cogs / 365) * proj.working_capital.dio
-                ap = (proxy_cogs / 365) * proj.working_capital.dpo
-                nwc = ar + inv - ap
-                change_in_nwc = nwc - prev_nwc
-                prev_nwc = nwc
-            else:
-                nwc = current_revenue * 0.05
-                change_in_nwc = nwc - (current_revenue / (1+growth_rate) * 0.05)
-            
-            # 6. CapEx
-            if proj.capex_percent_revenue is not None:
-                capex = current_revenue * proj.capex_percent_revenue
-            else:
-                capex = depreciation * 1.1
-            
-            # 7. FCFF
-            fcff = nopat + depreciation - capex - change_in_nwc
-            projected_cash_flows.append(fcff)
-            
-        # Terminal Value
-        terminal_cash_flow = projected_cash_flows[-1] * (1 + proj.terminal_growth_rate)
-        tv_ggm = terminal_cash_flow / (proj.discount_rate - proj.terminal_growth_rate)
-        
-        tv_multiple = 0
-        if proj.terminal_exit_multiple:
-            terminal_ebitda = ebitda 
-            tv_multiple = terminal_ebitda * proj.terminal_exit_multiple
-            
-        terminal_value = tv_multiple if proj.terminal_exit_multiple else tv_ggm
-        
-        # Discounting (Mid-Year Convention)
-        dcf_value = 0
-        for i, cf in enumerate(projected_cash_flows):
-            # Mid-year convention: Discount factor is (i + 0.5)
-            dcf_value += cf / ((1 + proj.discount_rate) ** (i + 0.5))
-            
-        # Terminal Value is at end of year 5, so discount by 5 years
-        dcf_value += terminal_value / ((1 + proj.discount_rate) ** 5)
-        
+        last_revenue = dcf_input.historical.revenue[-1]
+        dcf_values, fcff = DCFCalculator._kernel(dcf_input.historical, [proj])
+        dcf_value = float(dcf_values[0])
+        projected_cash_flows = fcff[0].tolist()
+
         return dcf_value, projected_cash_flows, {
             "revenue": [last_revenue * (1 + proj.revenue_growth_start + (proj.revenue_growth_end - proj.revenue_growth_start) * (i / 4)) for i in range(5)],
             "ebitda": [
@@ -102,3 +30,100 @@ class DCFCalculator:
                 "equity": [dcf_value * (1.05 ** i) for i in range(5)]
             }
         }
+
+    @staticmethod
+    def calculate_batch(historical: HistoricalFinancials, projections: List[ProjectionAssumptions]) -> np.ndarray:
+        """
+        DCF values of many projection sets over the same history, e.g. the
+        scenarios of a PWSA, in one kernel pass.
+        """
+        if not projections:
+            return np.zeros(0)
+        return DCFCalculator._kernel(historical, projections)[0]
+
+    @staticmethod
+    def _kernel(historical: HistoricalFinancials, projections: List[ProjectionAssumptions]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The DCF model for a list of projection sets over one history, shared by
+        calculate() and calculate_batch(). Returns (DCF values, FCFF of shape
+        [sets, 5 years]). Raises ValueError if any set's terminal value is undefined.
+        """
+
+        def column(name, default=np.nan):
+            return np.array([default if getattr(p, name) is None else getattr(p, name) for p in projections], dtype=float)
+
+        exit_multiple = column("terminal_exit_multiple", 0.0)
+        discount_rate, terminal_growth = column("discount_rate"), column("terminal_growth_rate")
+        # Gordon growth is undefined when the discount rate equals the growth rate
+        if ((exit_multiple == 0) & (discount_rate == terminal_growth)).any():
+            raise ValueError("Discount rate must differ from the terminal growth rate when no exit multiple is set")
+
+        wc_factor = np.array([
+            (p.working_capital.dso + 0.6 * p.working_capital.dio - 0.6 * p.working_capital.dpo) / 365
+            if p.working_capital else np.nan
+            for p in projections
+        ])
+        return DCFCalculator.kernel(
+            last_revenue=np.full(len(projections), float(historical.revenue[-1])),
+            growth_start=column("revenue_growth_start"), growth_end=column("revenue_growth_end"),
+            margin_start=column("ebitda_margin_start"), margin_end=column("ebitda_margin_end"),
+            depreciation_rate=column("depreciation_rate"), tax_rate=column("tax_rate"),
+            discount_rate=discount_rate, terminal_growth=terminal_growth,
+            exit_multiple=exit_multiple, capex_percent=column("capex_percent_revenue"),
+            wc_factor=wc_factor,
+        )
+
+    @staticmethod
+    def kernel(last_revenue, growth_start, growth_end, margin_start, margin_end, depreciation_rate, tax_rate,
+               discount_rate, terminal_growth, exit_multiple, capex_percent, wc_factor) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The DCF model over arrays of assumptions (any broadcastable shape), one
+        array pass per projection year. An exit multiple of 0 or NaN means
+        Gordon growth; a NaN capex % or working-capital factor (NWC as a share
+        of revenue) means that input is absent. Returns (DCF values, FCFF with
+        a trailing axis of 5 years); values are not finite where the terminal
+        value is undefined.
+        """
+        (last_revenue, growth_start, growth_end, margin_start, margin_end, depreciation_rate, tax_rate,
+         discount_rate, terminal_growth, exit_multiple, capex_percent, wc_factor) = np.broadcast_arrays(*(
+            np.asarray(a, dtype=float) for a in (
+                last_revenue, growth_start, growth_end, margin_start, margin_end, depreciation_rate, tax_rate,
+                discount_rate, terminal_growth, exit_multiple, capex_percent, wc_factor,
+            )
+        ))
+        has_wc = ~np.isnan(wc_factor)
+
+        current_revenue = last_revenue
+        prev_nwc = np.where(has_wc, current_revenue * wc_factor, 0.0)
+        dcf_value = np.zeros(current_revenue.shape)
+        fcff = np.zeros(current_revenue.shape + (5,))
+        for year in range(5):
+            growth_rate = growth_start + (growth_end - growth_start) * (year / 4)
+            current_revenue = current_revenue * (1 + growth_rate)
+            margin = margin_start + (margin_end - margin_start) * (year / 4)
+            ebitda = current_revenue * margin
+            depreciation = current_revenue * depreciation_rate
+            ebit = ebitda - depreciation
+            nopat = ebit - np.maximum(0, ebit * tax_rate)
+
+            nwc = current_revenue * wc_factor
+            with np.errstate(divide="ignore", invalid="ignore"):
+                change_in_nwc = np.where(
+                    has_wc, nwc - prev_nwc,
+                    current_revenue * 0.05 - (current_revenue / (1 + growth_rate) * 0.05)
+                )
+            prev_nwc = nwc
+
+            capex = np.where(np.isnan(capex_percent), depreciation * 1.1, current_revenue * capex_percent)
+            fcff[..., year] = nopat + depreciation - capex - change_in_nwc
+            # Mid-year convention: Discount factor is (year + 0.5)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                dcf_value = dcf_value + fcff[..., year] / ((1 + discount_rate) ** (year + 0.5))
+
+        # Terminal Value: exit multiple when one is set, else Gordon growth on the last cash flow
+        with np.errstate(divide="ignore", invalid="ignore"):
+            tv_ggm = fcff[..., -1] * (1 + terminal_growth) / (discount_rate - terminal_growth)
+            uses_multiple = ~np.isnan(exit_multiple) & (exit_multiple != 0)
+            terminal_value = np.where(uses_multiple, ebitda * np.nan_to_num(exit_multiple), tv_ggm)
+            # Terminal Value is at end of year 5, so discount by 5 years
+            return dcf_value + terminal_value / ((1 + discount_rate) ** 5), fcff
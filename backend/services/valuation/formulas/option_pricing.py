@@ -0,0 +1,180 @@
+"""
+Vectorized option pricing for real options.
+
+Every function takes arrays (or scalars) of S, K, T, r, sigma, is_put and q
+(value leakage / dividend yield) that broadcast against each other, and
+prices all of them in one NumPy pass.
+
+- black_scholes: European prices and all Greeks from one shared d1/d2.
+- binomial: Cox-Ross-Rubinstein lattice with optional early exercise, for
+  American-style expand/abandon options. The backward induction is a loop
+  over time steps only; each step is one array operation over every option.
+
+Greeks use the service's reporting scale: vega and rho per 1% change,
+theta per calendar day.
+
+A lattice holds a few (steps + 1) x options arrays, so binomial prices
+options in chunks of at most LATTICE_NODES nodes per array.
+"""
+from typing import Dict
+
+import numpy as np
+from scipy.special import ndtr
+
+GREEKS = ("delta", "gamma", "vega", "theta", "rho")
+
+_SQRT_2PI = np.sqrt(2 * np.pi)
+# Lattice nodes per working array (8 bytes each); bounds the memory of one chunk
+LATTICE_NODES = 1_000_000
+
+
+def _norm_pdf(x: np.ndarray) -> np.ndarray:
+    return np.exp(-0.5 * x * x) / _SQRT_2PI
+
+
+def _broadcast(S, K, T, r, sigma, is_put, q):
+    S, K, T, r, sigma, q = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in (S, K, T, r, sigma, q)))
+    is_put = np.broadcast_to(np.asarray(is_put, dtype=bool), S.shape)
+    return S, K, T, r, sigma, is_put, q
+
+
+class OptionPricer:
+    @staticmethod
+    def black_scholes(S, K, T, r, sigma, is_put=False, q=0.0) -> Dict[str, np.ndarray]:
+        """Prices and Greeks as {"price", "delta", "gamma", "vega", "theta", "rho"} arrays."""
+        S, K, T, r, sigma, is_put, q = _broadcast(S, K, T, r, sigma, is_put, q)
+        # Expired or riskless options are worth their (discounted) intrinsic value with zero Greeks
+        live = (T > 0) & (sigma > 0)
+        T_ = np.where(live, T, 1.0)
+        sigma_ = np.where(live, sigma, 1.0)
+
+        sqrt_t = np.sqrt(T_)
+        vol_t = sigma_ * sqrt_t
+        d1 = (np.log(S / K) + (r - q + 0.5 * sigma_ ** 2) * T_) / vol_t
+        d2 = d1 - vol_t
+        disc_r = np.exp(-r * T_)
+        disc_q = np.exp(-q * T_)
+        pdf_d1 = _norm_pdf(d1)
+
+        # For puts, N(-x) = 1 - N(x); sign flips select the put branch in one expression
+        sign = np.where(is_put, -1.0, 1.0)
+        nd1 = ndtr(sign * d1)
+        nd2 = ndtr(sign * d2)
+        price = sign * (S * disc_q * nd1 - K * disc_r * nd2)
+        delta = sign * disc_q * nd1
+        gamma = disc_q * pdf_d1 / (S * vol_t)
+        vega = S * disc_q * pdf_d1 * sqrt_t
+        theta = (-S * disc_q * pdf_d1 * sigma_ / (2 * sqrt_t)
+                 - sign * r * K * disc_r * nd2 + sign * q * S * disc_q * nd1)
+        rho = sign * K * T_ * disc_r * nd2
+
+        forward_intrinsic = np.maximum(sign * (S * np.exp(-q * np.maximum(T, 0)) - K * np.exp(-r * np.maximum(T, 0))), 0.0)
+        zero = np.zeros_like(S)
+        return {
+            "price": np.where(live, price, forward_intrinsic),
+            "delta": np.where(live, delta, zero),
+            "gamma": np.where(live, gamma, zero),
+            "vega": np.where(live, vega / 100, zero),  # Scaled for 1% vol change
+            "theta": np.where(live, theta / 365, zero),  # Scaled for 1 day time decay
+            "rho": np.where(live, rho / 100, zero),  # Scaled for 1% rate change
+        }
+
+    @staticmethod
+    def binomial(S, K, T, r, sigma, is_put=False, q=0.0, steps: int = 200, american: bool = True,
+                 greeks: bool = True) -> Dict[str, np.ndarray]:
+        """
+        CRR lattice prices (early exercise when `american`). Delta, gamma and
+        theta are read off the first two steps of the tree; vega and rho are
+        central differences of two extra lattice passes each.
+        """
+        if steps < 2:
+            raise ValueError("steps must be at least 2")
+        S, K, T, r, sigma, is_put, q = _broadcast(S, K, T, r, sigma, is_put, q)
+        shape = S.shape
+        columns = [a.ravel() for a in (S, K, T, r, sigma, is_put, q)]
+
+        chunk = max(1, LATTICE_NODES // (steps + 1))
+        parts = [
+            OptionPricer._binomial_chunk(*(c[start:start + chunk] for c in columns), steps, american, greeks)
+            for start in range(0, max(len(columns[0]), 1), chunk)
+        ]
+        return {name: np.concatenate([part[name] for part in parts]).reshape(shape) for name in parts[0]}
+
+    @staticmethod
+    def _binomial_chunk(S, K, T, r, sigma, is_put, q, steps, american, greeks) -> Dict[str, np.ndarray]:
+        price, delta, gamma, theta = OptionPricer._lattice(S, K, T, r, sigma, is_put, q, steps, american)
+        result = {"price": price}
+        if greeks:
+            h = 0.005
+            up = OptionPricer._lattice(S, K, T, r, sigma + h, is_put, q, steps, american)[0]
+            down = OptionPricer._lattice(S, K, T, r, np.maximum(sigma - h, 0.0), is_put, q, steps, american)[0]
+            vega = (up - down) / (sigma + h - np.maximum(sigma - h, 0.0))
+            up = OptionPricer._lattice(S, K, T, r + h, sigma, is_put, q, steps, american)[0]
+            down = OptionPricer._lattice(S, K, T, r - h, sigma, is_put, q, steps, american)[0]
+            rho = (up - down) / (2 * h)
+            result.update(delta=delta, gamma=gamma, vega=vega / 100, theta=theta / 365, rho=rho / 100)
+        return result
+
+    @staticmethod
+    def _lattice(S, K, T, r, sigma, is_put, q, steps, american):
+        n = len(S)
+        live = (T > 0) & (sigma > 0)
+        T_ = np.where(live, T, 1.0)
+        sigma_ = np.where(live, sigma, 1.0)
+
+        dt = T_ / steps
+        u = np.exp(sigma_ * np.sqrt(dt))
+        d = 1 / u
+        growth = np.exp((r - q) * dt)
+        p = np.clip((growth - d) / (u - d), 0.0, 1.0)
+        disc = np.exp(-r * dt)
+        sign = np.where(is_put, -1.0, 1.0)
+
+        # Nodes are rows (options are columns) so each step works on contiguous memory, in place.
+        # Node j at step i has price S * u^(2j - i), so step i's prices are step i+1's (less the top node) times u
+        spot = S * np.exp(np.log(u) * (2 * np.arange(steps + 1) - steps)[:, None])
+        values = np.maximum(sign * (spot - K), 0.0)
+        exercise = np.empty_like(values)
+        carry = np.empty_like(values)
+        up_weight, down_weight = disc * p, disc * (1 - p)
+        level = {}
+        for i in range(steps - 1, -1, -1):
+            rows = i + 1
+            np.multiply(values[1:rows + 1], up_weight, out=carry[:rows])
+            values[:rows] *= down_weight
+            values[:rows] += carry[:rows]
+            if american:
+                spot[:rows] *= u
+                np.subtract(spot[:rows], K, out=exercise[:rows])
+                exercise[:rows] *= sign
+                np.maximum(values[:rows], exercise[:rows], out=values[:rows])
+            if i <= 2:
+                level[i] = values[:rows].T.copy()
+
+        price = level[0][:, 0]
+        v1, v2 = level[1], level[2]
+        s_u, s_d = S * u, S * d
+        delta = (v1[:, 1] - v1[:, 0]) / (s_u - s_d)
+        s_uu, s_dd = S * u * u, S * d * d
+        gamma = ((v2[:, 2] - v2[:, 1]) / (s_uu - S) - (v2[:, 1] - v2[:, 0]) / (S - s_dd)) / (0.5 * (s_uu - s_dd))
+        theta = (v2[:, 1] - price) / (2 * dt)
+
+        intrinsic = np.maximum(sign * (S - K), 0.0)
+        if not live.all():
+            # Riskless (sigma = 0) options fall back to the closed form; expired ones to intrinsic value
+            bs = OptionPricer.black_scholes(S, K, T, r, sigma, is_put, q)
+            fallback = np.where(american & (T > 0), np.maximum(bs["price"], intrinsic), bs["price"])
+            price = np.where(live, price, fallback)
+            zero = np.zeros(n)
+            delta, gamma, theta = (np.where(live, g, zero) for g in (delta, gamma, theta))
+        return price, delta, gamma, theta
+
+    @staticmethod
+    def surface(S: float, K: float, r: float, volatilities, times, is_put: bool = False, q: float = 0.0,
+                method: str = "black_scholes", steps: int = 100) -> np.ndarray:
+        """Option value over a (volatility x time) grid, as a len(volatilities) x len(times) array."""
+        vols = np.asarray(volatilities, dtype=float)[:, None]
+        times = np.asarray(times, dtype=float)[None, :]
+        if method == "binomial":
+            return OptionPricer.binomial(S, K, times, r, vols, is_put, q, steps=steps, greeks=False)["price"]
+        return OptionPricer.black_scholes(S, K, times, r, vols, is_put, q)["price"]
@@ -2,9 +2,9 @@ import time
 import functools
 from datetime import datetime
 from typing import Optional
-from sqlalchemy.orm import Session
-from backend.database.models import SessionLocal, ValuationMetric
-import threading
+from backend.database.models import ValuationMetric
+from backend.services.metrics.sketch import latency_recorder
+from backend.services.metrics.writer import metrics_writer
 
 class ValuationTracker:
     """Context manager for tracking valuation execution."""
@@ -23,29 +23,19 @@ class ValuationTracker:
     def __exit__(self, exc_type, exc_val, exc_tb):
         end_time = time.time()
         duration_ms = int((end_time - self.start_time) * 1000)
+        latency_recorder.record_valuation(self.method_type, (end_time - self.start_time) * 1000)
         
-        # Record metric in background
-        threading.Thread(target=self._record_metric, args=(self.start_time, end_time, duration_ms)).start()
-        
-    def _record_metric(self, start_ts, end_ts, duration_ms):
-        db: Session = SessionLocal()
-        try:
-            metric = ValuationMetric(
-                valuation_id=self.valuation_id,
-                method_type=self.method_type,
-                start_time=datetime.fromtimestamp(start_ts),
-                end_time=datetime.fromtimestamp(end_ts),
-                duration_ms=duration_ms,
-                cache_hit=False, # TODO: Implement cache tracking
-                input_complexity_score=self.complexity_score,
-                user_id=self.user_id
-            )
-            db.add(metric)
-            db.commit()
-        except Exception as e:
-            print(f"Error recording valuation metric: {e}")
-        finally:
-            db.close()
+        # Queue for the shared metrics writer (no per-valuation thread or session)
+        metrics_writer.submit(ValuationMetric, {
+            "valuation_id": self.valuation_id,
+            "method_type": self.method_type,
+            "start_time": datetime.fromtimestamp(self.start_time),
+            "end_time": datetime.fromtimestamp(end_time),
+            "duration_ms": duration_ms,
+            "cache_hit": False,
+            "input_complexity_score": self.complexity_score,
+            "user_id": self.user_id
+        })
 
 def instrument_valuation(method_type: str):
     """
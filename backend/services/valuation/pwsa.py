@@ -0,0 +1,147 @@
+"""
+Probability-weighted scenario analysis (PWSA) over large scenario sets.
+
+PWSA scenarios usually differ only in their DCF projections. The executor
+groups scenarios whose other inputs are identical; within a group, the
+scenario-invariant methods (peer set/GPC, precedent transactions, LBO, ANAV,
+VC) are computed once, the FCFF DCF of every scenario is one vectorized
+kernel pass, and the method blend is an array expression. A scenario with no
+siblings is valued with the full ValuationEngine.calculate, as before.
+
+The result lists every scenario's value, so those are held as one array
+(not per-scenario result dicts). Weighted moments and the maximum are
+accumulated over it chunk by chunk; VaR is an exact weighted quantile of
+the same array.
+"""
+import json
+from typing import Dict, List, TYPE_CHECKING
+
+import numpy as np
+
+from backend.calculations.models import PWSARequest, PWSAResult, ScenarioResult, RiskMetrics, ValuationInput
+from backend.services.valuation.formulas.dcf import DCFCalculator
+
+if TYPE_CHECKING:
+    from backend.calculations.core import ValuationEngine
+
+CHUNK_SIZE = 256
+
+# Inputs that don't affect a scenario's enterprise value, or that PWSA varies per scenario
+SCENARIO_FIELDS = {"scenarios": True, "sensitivity_analysis": True, "dcf_input": {"projections"}}
+
+
+def weighted_quantile(values: np.ndarray, weights: np.ndarray, q: float) -> float:
+    """Lowest value whose cumulative weight reaches q of the total."""
+    order = np.argsort(values, kind="stable")
+    cumulative = np.cumsum(weights[order])
+    k = min(int(np.searchsorted(cumulative, q * cumulative[-1])), len(values) - 1)
+    return float(values[order[k]])
+
+
+class WeightedAccumulator:
+    """
+    Streaming weighted mean and variance (West's update, one chunk at a
+    time) and maximum, in constant memory.
+    """
+    def __init__(self):
+        self.total_weight = 0.0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.max = -np.inf
+
+    def update(self, values: np.ndarray, weights: np.ndarray):
+        values = np.asarray(values, dtype=float)
+        weights = np.asarray(weights, dtype=float)
+        if not len(values):
+            return
+        self.max = max(self.max, float(values.max()))
+
+        chunk_weight = float(weights.sum())
+        if chunk_weight <= 0:
+            return
+        chunk_mean = float((weights * values).sum() / chunk_weight)
+        chunk_m2 = float((weights * (values - chunk_mean) ** 2).sum())
+        total = self.total_weight + chunk_weight
+        delta = chunk_mean - self.mean
+        self.mean += delta * chunk_weight / total
+        self._m2 += chunk_m2 + delta ** 2 * self.total_weight * chunk_weight / total
+        self.total_weight = total
+
+    @property
+    def variance(self) -> float:
+        return self._m2 / self.total_weight if self.total_weight > 0 else 0.0
+
+
+class PWSAExecutor:
+    def __init__(self, engine: "ValuationEngine"):
+        self.engine = engine
+
+    def run(self, request: PWSARequest) -> PWSAResult:
+        # 1. Normalize Probabilities
+        total_prob = sum(s.probability for s in request.scenarios)
+        if total_prob == 0:
+            raise ValueError("Total probability cannot be zero")
+        probabilities = np.array([s.probability for s in request.scenarios], dtype=float) / total_prob
+
+        # 2. Value every scenario, one family of shared inputs at a time
+        values = np.zeros(len(request.scenarios))
+        for indices in self._families(request).values():
+            if len(indices) == 1:
+                values[indices[0]] = self.engine.calculate(request.scenarios[indices[0]].assumptions)["enterprise_value"]
+            else:
+                values[indices] = self._value_family([request.scenarios[i].assumptions for i in indices])
+
+        # 3. Weighted moments, VaR and upside
+        accumulator = WeightedAccumulator()
+        for start in range(0, len(values), CHUNK_SIZE):
+            accumulator.update(values[start:start + CHUNK_SIZE], probabilities[start:start + CHUNK_SIZE])
+
+        return PWSAResult(
+            probability_weighted_value=accumulator.mean,
+            scenario_results=[
+                ScenarioResult(name=s.name, value=float(value), probability=float(probability))
+                for s, value, probability in zip(request.scenarios, values, probabilities)
+            ],
+            risk_metrics=RiskMetrics(
+                var_95=weighted_quantile(values, probabilities, 0.05),
+                upside_potential=accumulator.max,
+                standard_deviation=accumulator.variance ** 0.5
+            )
+        )
+
+    def _families(self, request: PWSARequest) -> Dict[str, List[int]]:
+        """Scenario indices grouped by everything but their DCF projections."""
+        families: Dict[str, List[int]] = {}
+        for i, scenario in enumerate(request.scenarios):
+            key = json.dumps(scenario.assumptions.dict(exclude=SCENARIO_FIELDS), sort_keys=True, default=str)
+            families.setdefault(key, []).append(i)
+        return families
+
+    def _value_family(self, family: List[ValuationInput]) -> np.ndarray:
+        """Enterprise values of scenarios that share all inputs but their projections."""
+        reference = family[0]
+        invariant = self.engine._scenario_invariant_methods(reference)
+        weights = reference.method_weights
+
+        dcf_values = np.zeros(len(family))
+        if reference.dcf_input:
+            projections = [assumptions.dcf_input.projections for assumptions in family]
+            for start in range(0, len(family), CHUNK_SIZE):
+                dcf_values[start:start + CHUNK_SIZE] = DCFCalculator.calculate_batch(
+                    reference.dcf_input.historical, projections[start:start + CHUNK_SIZE]
+                )
+
+        # The blend is linear in the DCF value once the set of methods is fixed,
+        # and that set only depends on whether the DCF value is positive
+        with_dcf = self.engine._select_methods(1.0, invariant, weights)
+        dcf_weight = with_dcf.pop("DCF_FCFF")["weight"]
+        other_value = sum(m["value"] * m["weight"] for m in with_dcf.values())
+        other_weight = sum(m["weight"] for m in with_dcf.values())
+        without_dcf = self.engine._blend(self.engine._select_methods(0.0, invariant, weights))
+
+        total_weight = other_weight + dcf_weight
+        if total_weight > 0:
+            blended = (other_value + dcf_values * dcf_weight) / total_weight
+        else:
+            blended = np.zeros(len(family))
+        return np.where(dcf_values > 0, blended, without_dcf)
@@ -0,0 +1,281 @@
+"""
+Vectorized beta and WACC estimation for many tickers at once.
+
+Weekly prices of every ticker (and the market index) are stored locally in
+security_prices. A refresh loads the trailing window of them with one query
+into a (weeks x tickers) returns matrix and computes, for all tickers in one
+array pass:
+
+- OLS betas against the market over the window (missing weeks are skipped
+  per ticker);
+- Blume-adjusted betas (2/3 raw + 1/3 market);
+- Hamada unlevering at each ticker's own debt/equity (from its latest
+  balance sheet) and relevering at a target capital structure;
+- cost of equity, cost of debt, capital-structure weights and WACC.
+
+The results are cached per ticker and price date in wacc_components, so WACC
+lookups and sector/portfolio refreshes read local rows; the only network
+step is ingesting new prices, which happens in the background.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from backend.calculations.models import HistoricalFinancials
+from backend.database.models import SecurityPrice, WaccComponent
+
+MARKET_TICKER = os.getenv("WACC_MARKET_TICKER", "SPY")
+DEFAULT_WINDOW = 104  # Two years of weekly returns
+MIN_OBSERVATIONS = 26
+BLUME_WEIGHT = 2 / 3
+DEFAULT_DEBT_TO_EQUITY = 0.40 / 0.60  # The 60/40 equity/debt split used when the capital structure is unknown
+DEFAULT_TAX_RATE = 0.21
+DEFAULT_DEBT_SPREAD = 0.02
+DEFAULT_RISK_FREE_RATE = 0.045
+
+
+def returns_matrix(db: Session, tickers: List[str], start: Optional[datetime] = None,
+                   end: Optional[datetime] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Simple returns of `tickers` as a (periods x len(tickers)) array, NaN where
+    a ticker has no price on either side of a period, plus the period end dates.
+    """
+    query = db.query(SecurityPrice.ticker, SecurityPrice.date, SecurityPrice.adj_close)\
+        .filter(SecurityPrice.ticker.in_(tickers))
+    if start:
+        query = query.filter(SecurityPrice.date >= start)
+    if end:
+        query = query.filter(SecurityPrice.date <= end)
+    rows = query.all()
+    if not rows:
+        return np.zeros((0, len(tickers))), np.array([], dtype="datetime64[s]")
+
+    column = {ticker: j for j, ticker in enumerate(tickers)}
+    dates, date_index = np.unique(np.array([row[1] for row in rows], dtype="datetime64[s]"), return_inverse=True)
+    prices = np.full((len(dates), len(tickers)), np.nan)
+    prices[date_index, [column[row[0]] for row in rows]] = [row[2] for row in rows]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = prices[1:] / prices[:-1] - 1.0
+    return returns, dates[1:]
+
+
+def ols_betas(returns: np.ndarray, market: np.ndarray,
+              min_observations: int = MIN_OBSERVATIONS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    OLS beta of every column of `returns` on `market` over all periods given,
+    as arrays of betas and observation counts per ticker. NaN where fewer
+    than `min_observations` periods had both returns.
+    """
+    valid = np.isfinite(returns) & np.isfinite(market)[:, None]
+    x = np.where(valid, market[:, None], 0.0)
+    y = np.where(valid, returns, 0.0)
+
+    n = valid.sum(axis=0).astype(float)
+    sx, sy = x.sum(axis=0), y.sum(axis=0)
+    sxx, sxy = (x * x).sum(axis=0), (x * y).sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        beta = (n * sxy - sx * sy) / (n * sxx - sx * sx)
+    beta = np.where(n >= min_observations, beta, np.nan)
+    return beta, n.astype(int)
+
+
+def book_debt_to_equity(financials: HistoricalFinancials) -> Optional[float]:
+    """Debt/equity from the latest fiscal year with positive book equity, None if unknown."""
+    if not financials.total_debt or not financials.total_equity:
+        return None
+    for _, debt, equity in sorted(zip(financials.years, financials.total_debt, financials.total_equity), reverse=True):
+        if equity and equity > 0 and debt is not None and debt >= 0:
+            return debt / equity
+    return None
+
+
+def blume_adjust(beta: np.ndarray) -> np.ndarray:
+    return BLUME_WEIGHT * beta + (1 - BLUME_WEIGHT) * 1.0
+
+
+def unlever(beta: np.ndarray, debt_to_equity: np.ndarray, tax_rate: np.ndarray) -> np.ndarray:
+    """Hamada asset beta."""
+    return beta / (1 + (1 - tax_rate) * debt_to_equity)
+
+
+def relever(asset_beta: np.ndarray, debt_to_equity: np.ndarray, tax_rate: np.ndarray) -> np.ndarray:
+    return asset_beta * (1 + (1 - tax_rate) * debt_to_equity)
+
+
+def wacc_build_up(beta: np.ndarray, debt_to_equity: np.ndarray, tax_rate: np.ndarray, risk_free_rate: float,
+                  market_risk_premium: float, cost_of_debt: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    cost_of_equity = risk_free_rate + beta * market_risk_premium
+    if cost_of_debt is None:
+        cost_of_debt = np.full_like(beta, risk_free_rate + DEFAULT_DEBT_SPREAD)
+    equity_weight = 1 / (1 + debt_to_equity)
+    debt_weight = 1 - equity_weight
+    return {
+        "cost_of_equity": cost_of_equity,
+        "cost_of_debt": cost_of_debt,
+        "equity_weight": equity_weight,
+        "debt_weight": debt_weight,
+        "wacc": equity_weight * cost_of_equity + debt_weight * cost_of_debt * (1 - tax_rate),
+    }
+
+
+class WaccEstimationService:
+    def __init__(self):
+        self.market_ticker = MARKET_TICKER
+        self.default_mrp = float(os.getenv("DEFAULT_MARKET_RISK_PREMIUM", 0.055))
+
+    def ingest_prices(self, db: Session, prices: Dict[str, Dict[datetime, float]]) -> int:
+        """Store {ticker: {date: adjusted close}}, replacing any prices already held for those dates."""
+        rows = [
+            {"ticker": ticker.upper(), "date": date, "adj_close": float(price)}
+            for ticker, series in prices.items() for date, price in series.items() if price is not None
+        ]
+        if not rows:
+            return 0
+        for ticker, series in prices.items():
+            db.query(SecurityPrice).filter(
+                SecurityPrice.ticker == ticker.upper(), SecurityPrice.date.in_(list(series))
+            ).delete(synchronize_session=False)
+        db.bulk_insert_mappings(SecurityPrice, rows)
+        db.commit()
+        return len(rows)
+
+    def ingest_from_provider(self, db: Session, tickers: Iterable[str], max_workers: int = 4) -> int:
+        """Fetch weekly price histories (and the market's) from the data provider. Network bound; run in the background."""
+        from backend.services.financial_data.factory import FinancialDataFactory
+        provider = FinancialDataFactory.get_provider()
+
+        def history(ticker):
+            try:
+                series = provider.get_price_history(ticker)
+                return ticker, {datetime.strptime(day, "%Y-%m-%d"): price for day, price in series.items()}
+            except Exception as e:
+                print(f"Error fetching price history for {ticker}: {e}")
+                return ticker, {}
+
+        tickers = list(dict.fromkeys([self.market_ticker] + [t.upper() for t in tickers]))
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            prices = dict(pool.map(history, tickers))
+        return self.ingest_prices(db, prices)
+
+    def capital_structure_from_provider(self, tickers: Iterable[str], max_workers: int = 4) -> Dict[str, float]:
+        """
+        Book debt/equity per ticker from the data provider's balance sheets.
+        Tickers without usable figures are left out. Network bound; run in the background.
+        """
+        from backend.services.financial_data.factory import FinancialDataFactory
+        provider = FinancialDataFactory.get_provider()
+
+        def ratio(ticker):
+            try:
+                return ticker, book_debt_to_equity(provider.get_financials(ticker))
+            except Exception as e:
+                print(f"Error fetching financials for {ticker}: {e}")
+                return ticker, None
+
+        tickers = [t for t in dict.fromkeys(t.upper() for t in tickers) if t != self.market_ticker]
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            return {ticker: value for ticker, value in pool.map(ratio, tickers) if value is not None}
+
+    def refresh(self, db: Session, tickers: List[str], as_of: Optional[datetime] = None,
+                capital_structure: Optional[Dict[str, float]] = None, target_debt_to_equity: Optional[Dict[str, float]] = None,
+                tax_rates: Optional[Dict[str, float]] = None, risk_free_rate: Optional[float] = None,
+                window: int = DEFAULT_WINDOW) -> List[WaccComponent]:
+        """
+        Recompute and store the WACC components of `tickers` as of the last
+        price date up to `as_of`, all in one local array pass.
+
+        Debt/equity ratios come from `capital_structure` (see
+        capital_structure_from_provider), else the ticker's last stored
+        components, else the default 60/40 split; betas are relevered at
+        `target_debt_to_equity` (default: the ticker's own ratio).
+        """
+        tickers = [t for t in dict.fromkeys(t.upper() for t in tickers) if t != self.market_ticker]
+        if not tickers:
+            return []
+        symbols = tickers + [self.market_ticker]
+        end = as_of or db.query(func.max(SecurityPrice.date)).filter(SecurityPrice.ticker.in_(symbols)).scalar()
+        if end is None:
+            raise ValueError("No price history stored for these tickers")
+        # Only the trailing window is needed: window + 1 weekly prices, plus a week of slack
+        returns, dates = returns_matrix(db, symbols, start=end - timedelta(weeks=window + 1), end=end)
+        if not len(dates):
+            raise ValueError("No price history stored for these tickers")
+
+        returns = returns[-window:]
+        raw_beta, observations = ols_betas(returns[:, :-1], returns[:, -1])
+        # Too little history: assume market beta
+        adjusted_beta = np.where(np.isfinite(raw_beta), blume_adjust(raw_beta), 1.0)
+
+        previous = self.latest(db, tickers)
+        capital_structure = {k.upper(): v for k, v in (capital_structure or {}).items()}
+        target_debt_to_equity = {k.upper(): v for k, v in (target_debt_to_equity or {}).items()}
+        tax_rates = {k.upper(): v for k, v in (tax_rates or {}).items()}
+
+        def column(overrides, attribute, default):
+            return np.array([
+                overrides[t] if t in overrides else getattr(previous[t], attribute) if t in previous else default
+                for t in tickers
+            ], dtype=float)
+
+        debt_to_equity = column(capital_structure, "debt_to_equity", DEFAULT_DEBT_TO_EQUITY)
+        tax_rate = column(tax_rates, "tax_rate", DEFAULT_TAX_RATE)
+        target = np.array([target_debt_to_equity.get(t, de) for t, de in zip(tickers, debt_to_equity)])
+
+        unlevered_beta = unlever(adjusted_beta, debt_to_equity, tax_rate)
+        relevered_beta = relever(unlevered_beta, target, tax_rate)
+        if risk_free_rate is None:
+            risk_free_rate = self._risk_free_rate()
+        build_up = wacc_build_up(relevered_beta, target, tax_rate, risk_free_rate, self.default_mrp)
+
+        as_of_date = dates[-1].astype(datetime)
+        db.query(WaccComponent).filter(
+            WaccComponent.ticker.in_(tickers), WaccComponent.as_of == as_of_date
+        ).delete(synchronize_session=False)
+        components = [
+            WaccComponent(
+                ticker=ticker,
+                as_of=as_of_date,
+                observations=int(observations[j]),
+                raw_beta=float(raw_beta[j]) if np.isfinite(raw_beta[j]) else None,
+                adjusted_beta=float(adjusted_beta[j]),
+                unlevered_beta=float(unlevered_beta[j]),
+                relevered_beta=float(relevered_beta[j]),
+                debt_to_equity=float(debt_to_equity[j]),
+                tax_rate=float(tax_rate[j]),
+                risk_free_rate=float(risk_free_rate),
+                market_risk_premium=self.default_mrp,
+                **{name: float(values[j]) for name, values in build_up.items()}
+            )
+            for j, ticker in enumerate(tickers)
+        ]
+        db.add_all(components)
+        db.commit()
+        return components
+
+    def latest(self, db: Session, tickers: List[str]) -> Dict[str, WaccComponent]:
+        """Most recent stored components per ticker."""
+        tickers = [t.upper() for t in tickers]
+        newest = db.query(WaccComponent.ticker, func.max(WaccComponent.as_of).label("as_of"))\
+            .filter(WaccComponent.ticker.in_(tickers))\
+            .group_by(WaccComponent.ticker).subquery()
+        rows = db.query(WaccComponent).join(
+            newest, (WaccComponent.ticker == newest.c.ticker) & (WaccComponent.as_of == newest.c.as_of)
+        ).all()
+        return {row.ticker: row for row in rows}
+
+    def _risk_free_rate(self) -> float:
+        from backend.services.financial_data.market_data_service import market_data_service
+        try:
+            rates = market_data_service.fetch_interest_rates()
+            return float(rates.get("risk_free_rate") or DEFAULT_RISK_FREE_RATE)
+        except Exception as e:
+            print(f"Error fetching risk-free rate, using default: {e}")
+            return DEFAULT_RISK_FREE_RATE
+
+
+wacc_estimation_service = WaccEstimationService()
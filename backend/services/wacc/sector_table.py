@@ -0,0 +1,98 @@
+"""
+Locally cached industry reference values for assumption audits.
+
+Audits compare a model's WACC against its industry's; resolving that inline
+means provider calls (beta, treasury yield) on every audit. Instead the
+sector table is resolved in the background: every company's WACC is read
+from the locally estimated components (fetched only for companies without
+them), averaged per sector and swapped in at once. Lookups are dictionary
+reads and never fetch; a ticker outside the table simply has no reference.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Optional
+
+from backend.services.wacc.service import WaccCalculatorService
+
+REFRESH_INTERVAL_SECONDS = float(os.getenv("SECTOR_WACC_REFRESH_SECONDS", 6 * 3600))
+
+
+class SectorWaccTable:
+    def __init__(self):
+        self._sector_of: Dict[str, str] = {}
+        self._sector_wacc: Dict[str, float] = {}
+        self._refresh_lock = threading.Lock()
+        # Bumped on every refresh so incremental audits know to re-check WACC
+        self.version = 0
+        self.refreshed_at: Optional[datetime] = None
+
+    def industry_wacc(self, ticker: Optional[str]) -> Optional[float]:
+        if not ticker:
+            return None
+        sector = self._sector_of.get(ticker.upper())
+        return self._sector_wacc.get(sector) if sector else None
+
+    def load(self, sector_of: Dict[str, str], sector_wacc: Dict[str, float]):
+        """Swap in a new table (ticker -> sector, sector -> average WACC)."""
+        self._sector_of, self._sector_wacc = (
+            {ticker.upper(): sector for ticker, sector in sector_of.items()}, dict(sector_wacc)
+        )
+        self.version += 1
+        self.refreshed_at = datetime.utcnow()
+
+    def refresh(self, db=None, max_workers: int = 4):
+        """Fetch the WACC of every known company and average it per sector. Blocking."""
+        from backend.database.models import Company, SessionLocal
+
+        if not self._refresh_lock.acquire(blocking=False):
+            return  # A refresh is already running
+        own_session = db is None
+        db = db or SessionLocal()
+        try:
+            sector_of = {ticker.upper(): sector for ticker, sector in db.query(Company.ticker, Company.sector)}
+            service = WaccCalculatorService()
+
+            # Locally estimated components first; only tickers without them hit the provider
+            waccs = {ticker: data.wacc for ticker, data in service.get_cached_market_data(list(sector_of), db).items()}
+
+            def company_wacc(ticker):
+                try:
+                    return ticker, service.fetch_market_data(ticker).wacc
+                except Exception as e:
+                    print(f"Could not fetch WACC for {ticker}: {e}")
+                    return ticker, None
+
+            missing = [ticker for ticker in sector_of if ticker not in waccs]
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                waccs.update(pool.map(company_wacc, missing))
+
+            by_sector: Dict[str, list] = {}
+            for ticker, wacc in waccs.items():
+                if wacc is not None:
+                    by_sector.setdefault(sector_of[ticker], []).append(wacc)
+            if by_sector or not self._sector_wacc:
+                self.load(sector_of, {sector: sum(values) / len(values) for sector, values in by_sector.items()})
+        except Exception as e:
+            print(f"Error refreshing sector WACC table: {e}")
+        finally:
+            if own_session:
+                db.close()
+            self._refresh_lock.release()
+
+
+async def refresh_sector_wacc_periodically(interval: float = REFRESH_INTERVAL_SECONDS):
+    """
+    Per-worker refresh loop: each worker audits from its own in-memory table,
+    so this runs in each of them (unlike leader-only scheduler jobs).
+    """
+    import asyncio
+    from fastapi.concurrency import run_in_threadpool
+
+    while True:
+        await run_in_threadpool(sector_wacc_table.refresh)
+        await asyncio.sleep(interval)
+
+
+sector_wacc_table = SectorWaccTable()
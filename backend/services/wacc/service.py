@@ -1,15 +1,34 @@
 import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy.orm import Session
 from backend.services.financial_data.factory import FinancialDataFactory
 from backend.calculations.models import MarketAssumptions
 
+# Stored components whose last price date is older than this are not served
+MAX_COMPONENT_AGE = timedelta(days=int(os.getenv("WACC_COMPONENT_MAX_AGE_DAYS", 14)))
+
 class WaccCalculatorService:
+    max_component_age = MAX_COMPONENT_AGE
+
     def __init__(self):
         self.provider = FinancialDataFactory.get_provider()
         self.default_mrp = float(os.getenv("DEFAULT_MARKET_RISK_PREMIUM", 0.055))
 
-    def get_market_data(self, ticker: str) -> MarketAssumptions:
+    def get_market_data(self, ticker: str, db: Optional[Session] = None, as_of: Optional[datetime] = None) -> MarketAssumptions:
         """
         Get market assumptions for a ticker, including WACC calculation.
+        Uses the locally estimated WACC components when the ticker has recent
+        ones (as of `as_of`, default now), else asks the provider.
+        """
+        cached = self.get_cached_market_data([ticker], db, as_of=as_of).get(ticker.upper())
+        if cached:
+            return cached
+        return self.fetch_market_data(ticker)
+
+    def fetch_market_data(self, ticker: str) -> MarketAssumptions:
+        """
+        Market assumptions straight from the data provider (beta and treasury yield round trips).
         """
         # 1. Fetch Market Data
         beta = self.provider.get_company_beta(ticker)
@@ -49,3 +68,38 @@ class WaccCalculatorService:
             cost_of_equity=ke,
             wacc=wacc
         )
+
+    def get_cached_market_data(self, tickers: List[str], db: Optional[Session] = None,
+                               as_of: Optional[datetime] = None) -> Dict[str, MarketAssumptions]:
+        """
+        Market assumptions of many tickers from the stored WACC components
+        (see services.wacc.estimation), without any provider calls. Tickers
+        without components, or whose components are more than
+        max_component_age older than `as_of` (default now), are left out.
+        """
+        from backend.database.models import ReadSessionLocal
+        from backend.services.wacc.estimation import wacc_estimation_service
+
+        oldest = (as_of or datetime.utcnow()) - self.max_component_age
+        own_session = db is None
+        db = db or ReadSessionLocal()
+        try:
+            components = wacc_estimation_service.latest(db, tickers)
+        except Exception as e:
+            print(f"Error reading cached WACC components: {e}")
+            return {}
+        finally:
+            if own_session:
+                db.close()
+        return {
+            ticker: MarketAssumptions(
+                risk_free_rate=c.risk_free_rate,
+                beta=c.relevered_beta,
+                market_risk_premium=c.market_risk_premium,
+                cost_of_debt=c.cost_of_debt,
+                cost_of_equity=c.cost_of_equity,
+                wacc=c.wacc
+            )
+            for ticker, c in components.items()
+            if c.as_of >= oldest
+        }
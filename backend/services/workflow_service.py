@@ -4,13 +4,12 @@ from sqlmodel import Session, select
 from fastapi import HTTPException
 from backend.database.models import ValuationRun, User, AuditLog
 from backend.services.immutable_audit import ImmutableAuditService
-from backend.compliance.framework import ComplianceFramework
+from backend.compliance.batch import compliance_status_for
 
 class WorkflowService:
     def __init__(self, session: Session):
         self.session = session
         self.audit_service = ImmutableAuditService(session)
-        self.framework = ComplianceFramework()
 
     def transition_status(self, valuation_id: str, new_status: str, user_id: int):
         """
@@ -71,9 +70,10 @@ class WorkflowService:
         return valuation
 
     def _enforce_compliance_gate(self, valuation_id: str):
-        # Mock data for check - in real app would parse 'valuation.input_data'
-        audit = self.framework.audit_valuation(valuation_id, {}, None)
-        if audit.overall_risk_score >= 10.0: # Threshold for BLOCKING
+        # Stored result from the batch audit; re-audited only if the run changed since.
+        # Not persisted here, so a failed transition commits nothing; the batch refreshes it.
+        status = compliance_status_for(self.session, valuation_id)
+        if status is not None and status.overall_risk_score >= 10.0: # Threshold for BLOCKING
             # Check if critical
             # simplified logic
             raise HTTPException(status_code=400, detail="Compliance Checks Failed: Critical Risks Detected. Resolve before Review.")
@@ -6,6 +6,14 @@ cd "$(dirname "$0")"
 # Export PYTHONPATH to include the current directory (which is inside backend/) and the parent
 export PYTHONPATH=$PYTHONPATH:.
 
+# Preload mode: import the app (and its heavy report/Excel libraries) once in the
+# master so the forked workers share that memory copy-on-write
+PRELOAD_FLAG=""
+if [ "${GUNICORN_PRELOAD:-false}" = "true" ]; then
+    export APP_PRELOAD=true
+    PRELOAD_FLAG="--preload"
+fi
+
 # Run with Gunicorn for production performance
 # Using Uvicorn workers
-gunicorn main:app --workers 4 --worker-class uvicorn.workers.UvicornWorker --bind 0.0.0.0:$PORT
+gunicorn main:app --workers 4 --worker-class uvicorn.workers.UvicornWorker --bind 0.0.0.0:$PORT $PRELOAD_FLAG
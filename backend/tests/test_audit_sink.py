@@ -0,0 +1,151 @@
+"""
+Tests for the group-committing audit sink and AuditMiddleware.
+"""
+import json
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.database.models import Base, User, AuditLog, AuditChainCheckpoint
+from backend.middleware.security_middleware import AuditMiddleware
+from backend.services.audit.sink import AuditSink
+from backend.services.immutable_audit import ImmutableAuditService
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine, tables=[User.__table__, AuditLog.__table__, AuditChainCheckpoint.__table__])
+    yield engine
+    engine.dispose()
+
+
+def _count(engine):
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(AuditLog)).scalar()
+
+
+class FlakySink(AuditSink):
+    """Sink whose database can be switched off."""
+    down = False
+
+    def _insert(self, rows):
+        if self.down:
+            raise ConnectionError("database unavailable")
+        super()._insert(rows)
+
+    def _db_reachable(self):
+        return not self.down
+
+
+def test_group_commit(engine, tmp_path):
+    sink = AuditSink(engine=engine, batch_size=500, spill_dir=str(tmp_path))
+    sink._thread = object()  # keep the background writer out of the test
+    for i in range(1200):
+        sink.submit("UPDATE", user_id=1, resource_type="valuation", resource_id=f"v{i}", details={"i": i})
+    sink.flush()
+
+    assert _count(engine) == 1200
+    assert sink.stats()["batches"] == 3
+    assert sink.stats()["spilled"] == 0
+
+
+def test_spill_when_db_down_and_replay(engine, tmp_path):
+    sink = FlakySink(engine=engine, capacity=5, batch_size=10, spill_dir=str(tmp_path))
+    sink._thread = object()
+    sink.down = True
+
+    for i in range(8):
+        sink.submit("POST_/api/x", user_id=1, details={"i": i})
+    assert sink.stats()["spilled"] == 3  # queue full: overflow went to disk
+    sink.flush()  # batch insert fails: the queued rows go to disk too
+    assert _count(engine) == 0
+    assert sink.stats()["spilled"] == 8
+
+    sink.down = False
+    sink.flush()
+    assert _count(engine) == 8
+    assert sink.stats()["replayed"] == 8
+    assert not list(tmp_path.glob("audit-spill-*"))
+
+
+def test_sink_rows_extend_the_hash_chain(engine, tmp_path):
+    sink = FlakySink(engine=engine, capacity=3, batch_size=2, spill_dir=str(tmp_path))
+    sink._thread = object()
+    db = sessionmaker(bind=engine)()
+    service = ImmutableAuditService(db)
+
+    service.log_event_cryptographic(user_id=1, action="UPDATE", resource_type="valuation_run", resource_id="v1")
+    for i in range(5):
+        sink.submit("POST_/api/x", user_id=1, details={"i": i})  # Two of them spill
+    sink.flush()
+    service.log_event_cryptographic(user_id=1, action="UPDATE", resource_type="valuation_run", resource_id="v2")
+
+    assert _count(engine) == 7
+    assert service.verify_chain_integrity()["status"] == "valid"
+    assert service.verify_chain_integrity(full=True)["status"] == "valid"
+    hashes = db.execute(select(AuditLog.hash).order_by(AuditLog.id)).scalars().all()
+    assert all(h and h.startswith("00") for h in hashes)
+    db.close()
+
+
+def test_rejected_row_does_not_block_batch(engine, tmp_path):
+    sink = AuditSink(engine=engine, spill_dir=str(tmp_path))
+    sink._thread = object()
+    sink.submit("OK_1")
+    sink._queue.append({"action_type": None, "timestamp": None})  # violates NOT NULL
+    sink.submit("OK_2")
+    sink.flush()
+
+    assert _count(engine) == 2
+    assert sink.stats()["rejected"] == 1
+    assert len(list(tmp_path.glob("audit-rejected-*"))) == 1
+
+
+def test_stop_drains_queue(engine, tmp_path):
+    sink = AuditSink(engine=engine, flush_interval=60, spill_dir=str(tmp_path))
+    for i in range(20):
+        sink.submit("DELETE_VALUATION", user_id=1, resource_id=str(i))
+    sink.stop()
+
+    assert _count(engine) == 20
+    with engine.connect() as conn:
+        assert conn.execute(select(AuditLog.risk_level).limit(1)).scalar() == "high"
+
+
+def test_middleware_reuses_resolved_principal(engine, tmp_path, monkeypatch):
+    sink = AuditSink(engine=engine, spill_dir=str(tmp_path))
+    sink._thread = object()
+    monkeypatch.setattr("backend.middleware.security_middleware.audit_sink", sink)
+
+    def no_decode(token):
+        raise AssertionError("JWT decoded twice")
+    monkeypatch.setattr("backend.middleware.security_middleware.verify_token", no_decode)
+
+    app = FastAPI()
+    app.add_middleware(AuditMiddleware)
+
+    @app.post("/things")
+    def create_thing(request: Request):
+        request.state.user_id = 42  # what get_current_user does
+        return {"ok": True}
+
+    @app.get("/things")
+    def list_things():
+        return []
+
+    client = TestClient(app)
+    assert client.post("/things", headers={"Authorization": "Bearer abc"}).status_code == 200
+    assert client.get("/things").status_code == 200
+    sink.flush()
+
+    with engine.connect() as conn:
+        rows = conn.execute(select(AuditLog.action_type, AuditLog.user_id, AuditLog.details)).all()
+    assert len(rows) == 1
+    assert rows[0].action_type == "POST_/things"
+    assert rows[0].user_id == 42
+    assert json.loads(rows[0].details)["status_code"] == 200
@@ -0,0 +1,131 @@
+"""
+Tests for panel-wide metrics and concurrent peer benchmarking.
+"""
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from backend.calculations.benchmarking_models import CompanyMetrics
+from backend.calculations.metrics_calculator import MetricsCalculator, MetricsPanel
+from backend.calculations.models import HistoricalFinancials
+from backend.services.benchmarking_service import BenchmarkingService
+from backend.services.financial_data.cache import cache
+
+
+def _financials(seed, years=(2023, 2022, 2021, 2020), low=-0.2):
+    rng = np.random.default_rng(seed)
+    n = len(years)
+    series = lambda scale: list(rng.uniform(low, 1.0, n) * scale)
+    return HistoricalFinancials(
+        years=list(years), revenue=series(1000), ebitda=series(200), ebit=series(150), net_income=series(100),
+        capex=series(50), nwc=series(30), total_assets=series(2000), total_equity=series(800),
+        total_debt=series(400), current_assets=series(600), current_liabilities=series(300),
+        cash_and_equivalents=series(100), inventory=series(80), receivables=series(90),
+    )
+
+
+def test_panel_matches_single_company_results():
+    panel = {f"T{i}": _financials(i, years=(2023, 2022, 2021, 2020)[: 1 + i % 4]) for i in range(40)}
+    panel["EMPTY"] = HistoricalFinancials(years=[], revenue=[], ebitda=[], ebit=[], net_income=[], capex=[], nwc=[])
+    results = MetricsCalculator.calculate_panel(panel)
+
+    assert results["EMPTY"] == CompanyMetrics(ticker="EMPTY")
+    for ticker, financials in panel.items():
+        assert results[ticker] == MetricsCalculator.calculate_metrics(financials, ticker)
+    # Undefined ratios stay None
+    assert any(m.revenue_growth is None for m in results.values())
+
+
+def test_scalar_reference_values():
+    f = HistoricalFinancials(
+        years=[2023, 2022, 2021], revenue=[121.0, 110.0, 100.0], ebitda=[30.0, 20.0, -5.0], ebit=[20.0, 15.0, 10.0],
+        net_income=[12.0, 10.0, 8.0], capex=[1, 1, 1], nwc=[1, 1, 1], total_assets=[200.0], total_equity=[0.0],
+        total_debt=[50.0], current_liabilities=[40.0], current_assets=[80.0], cash_and_equivalents=[10.0],
+    )
+    m = MetricsCalculator.calculate_metrics(f, "ACME")
+    assert m.period == "2023"
+    assert m.revenue_growth == pytest.approx(0.1)
+    assert m.ebitda_growth is None  # negative start value
+    assert m.roe is None and m.debt_to_equity is None  # zero equity
+    assert m.current_ratio == 2.0 and m.quick_ratio == 2.0
+    assert m.net_debt_to_ebitda == pytest.approx(40 / 30)
+
+
+def test_medians_and_percentiles():
+    peers = [CompanyMetrics(ticker=f"P{i}", roe=v, net_margin=None) for i, v in enumerate([0.3, 0.1, 0.2, 0.1])]
+    panel = MetricsPanel(peers)
+
+    medians = panel.medians()
+    assert medians["roe"] == pytest.approx(0.15)
+    assert medians["net_margin"] is None
+
+    # Target ranked among peers + itself, as before: rank / (count - 1)
+    assert panel.percentile_of({"roe": 0.2})["roe"] == pytest.approx(2 / 4 * 100)
+    assert panel.percentile_of({"net_margin": 0.1})["net_margin"] == 50.0
+
+    within = panel.percentiles()[:, panel.fields.index("roe")]
+    np.testing.assert_allclose(within, [100.0, 0.0, 2 / 3 * 100, 0.0])
+    assert np.isnan(panel.percentiles()[:, panel.fields.index("net_margin")]).all()
+
+
+class SlowProvider:
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def get_statements(self, ticker, user=None):
+        with self.lock:
+            self.calls.append(ticker)
+        if ticker == "BROKEN":
+            raise ConnectionError("provider down")
+        time.sleep(self.delay)
+        return _financials(sum(map(ord, ticker)), low=0.1)
+
+
+@pytest.fixture
+def slow_provider(monkeypatch):
+    provider = SlowProvider()
+    monkeypatch.setattr("backend.services.benchmarking_service.provider", provider)
+    cache.clear_pattern("statements:")
+    cache.clear_pattern("metrics:")
+    yield provider
+    cache.clear_pattern("statements:")
+    cache.clear_pattern("metrics:")
+
+
+def test_panel_fetch_is_concurrent_and_cached(slow_provider):
+    service = BenchmarkingService()
+    tickers = [f"TK{i}" for i in range(24)] + ["BROKEN"]
+
+    started = time.perf_counter()
+    metrics = service.get_panel_metrics(tickers)
+    elapsed = time.perf_counter() - started
+    assert elapsed < 24 * slow_provider.delay / 3  # not one fetch after another
+    assert len(metrics) == 24 and "BROKEN" not in metrics
+    assert metrics["TK3"] == MetricsCalculator.calculate_metrics(_financials(sum(map(ord, "TK3")), low=0.1), "TK3")
+    assert cache.get("metrics:TK3:2023") is not None
+
+    slow_provider.calls.clear()
+    assert service.get_panel_metrics(tickers[:5]) == {t: metrics[t] for t in tickers[:5]}
+    assert slow_provider.calls == []
+
+
+def test_comparison_and_screen(slow_provider):
+    service = BenchmarkingService()
+    response = service.get_comparison("TGT", peer_tickers=["A1", "A2", "TGT", "A1", "BROKEN"])
+    assert response.peers_used == ["A1", "A2"]
+    assert response.target.ticker == "TGT"
+    assert {c.metric for c in response.comparisons} <= {
+        "ROE", "Net Margin", "EBITDA Margin", "Current Ratio", "Debt/Equity", "Revenue Growth", "Asset Turnover"
+    }
+
+    screen = service.screen_sector(tickers=["A1", "A2", "A3", "BROKEN"])
+    assert [c.ticker for c in screen.companies] == ["A1", "A2", "A3"]
+    assert screen.tickers_failed == ["BROKEN"]
+    assert set(screen.percentiles) == {"A1", "A2", "A3"}
+    for field, value in screen.medians.dict().items():
+        if field not in ("ticker", "period") and value is not None:
+            assert value == pytest.approx(float(np.median([getattr(c, field) for c in screen.companies if getattr(c, field) is not None])))
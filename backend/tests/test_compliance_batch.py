@@ -0,0 +1,109 @@
+"""
+Tests for the batch compliance runner and stored per-run compliance status.
+"""
+import json
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.compliance.batch import BatchComplianceRunner, compliance_status_for
+from backend.compliance.framework import ComplianceFramework
+from backend.database.models import Base, User, ValuationRun, ValuationComplianceStatus
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine, tables=[
+        User.__table__, ValuationRun.__table__, ValuationComplianceStatus.__table__
+    ])
+    factory = sessionmaker(bind=engine)
+    db = factory()
+    for i in range(7):
+        db.add(ValuationRun(
+            id=f"run-{i:02d}",
+            company_name=f"Co {i}",
+            mode="manual",
+            input_data=json.dumps({"fair_value_level": 2, "revenue": 100 + i}),
+            results=json.dumps({"enterprise_value": 1000 + i}),
+            user_id=1,
+            reviewer_id=2 if i % 2 else None,
+            status="archived" if i == 6 else "draft",
+        ))
+    db.commit()
+    db.close()
+    yield factory
+    engine.dispose()
+
+
+def test_validators_are_shared_and_unique():
+    first, second = ComplianceFramework(), ComplianceFramework()
+    assert first.validators is second.validators
+    assert sorted(first.validators) == ["asc_820", "lending_covenants", "sox_404"]
+
+
+def test_batch_audits_active_runs_then_skips_unchanged(session_factory):
+    runner = BatchComplianceRunner(session_factory=session_factory, page_size=4, max_workers=1)
+
+    first = runner.run()
+    assert first["scanned"] == 6  # archived run excluded
+    assert first["audited"] == 6
+    assert first["skipped"] == 0
+    assert sum(first["by_status"].values()) == 6
+
+    second = runner.run()
+    assert second["audited"] == 0
+    assert second["skipped"] == 6
+
+    forced = runner.run(force=True)
+    assert forced["audited"] == 6
+
+    db = session_factory()
+    row = db.get(ValuationComplianceStatus, "run-01")
+    checks = json.loads(row.checks_json)
+    assert set(checks) == {"asc_820", "sox_404", "lending_covenants"}
+    assert db.get(ValuationComplianceStatus, "run-06") is None
+    db.close()
+
+
+def test_changed_run_is_reaudited(session_factory):
+    runner = BatchComplianceRunner(session_factory=session_factory, page_size=4, max_workers=1)
+    runner.run()
+
+    db = session_factory()
+    before = db.get(ValuationComplianceStatus, "run-00")
+    assert before.high_issues > 0  # SOX: no reviewer assigned
+    old_hash = before.content_hash
+
+    run = db.get(ValuationRun, "run-00")
+    run.reviewer_id = 2
+    run.input_data = json.dumps({"fair_value_level": 1, "market_participant_assumptions_verified": True})
+    db.commit()
+
+    preview = compliance_status_for(db, "run-00")
+    assert preview.content_hash != old_hash
+    assert preview.low_issues is not None
+    db.expire_all()
+    assert db.get(ValuationComplianceStatus, "run-00").content_hash == old_hash  # Reads don't write
+
+    refreshed = compliance_status_for(db, "run-00", persist=True)
+    assert refreshed.content_hash == preview.content_hash
+    db.expire_all()
+    assert db.get(ValuationComplianceStatus, "run-00").content_hash == refreshed.content_hash
+    assert compliance_status_for(db, "missing") is None
+    db.close()
+
+    assert runner.run()["skipped"] == 6
+
+
+def test_batch_in_worker_processes(session_factory):
+    inline = BatchComplianceRunner(session_factory=session_factory, page_size=3, max_workers=1).run(force=True)
+    pooled = BatchComplianceRunner(session_factory=session_factory, page_size=3, max_workers=2).run(force=True)
+    assert pooled["audited"] == inline["audited"] == 6
+    assert pooled["by_status"] == inline["by_status"]
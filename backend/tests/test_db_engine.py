@@ -0,0 +1,134 @@
+"""
+Tests for the database engine profiles, read sessions and the SQLite write queue.
+"""
+import queue
+import threading
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from backend.database.engine import WriteQueue, build_engine
+from backend.database.models import Base, SecurityPrice
+
+
+@pytest.fixture
+def url(tmp_path):
+    url = f"sqlite:///{tmp_path / 'profile.db'}"
+    engine = build_engine(url)
+    Base.metadata.create_all(bind=engine, tables=[SecurityPrice.__table__])
+    engine.dispose()
+    return url
+
+
+def _price(session, day):
+    session.add(SecurityPrice(ticker="AAA", date=datetime(2024, 1, day), adj_close=float(day)))
+
+
+def test_sqlite_profile_pragmas(url):
+    engine = build_engine(url)
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1  # NORMAL
+        assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() >= 1000
+        assert conn.exec_driver_sql("PRAGMA query_only").scalar() == 0
+    engine.dispose()
+
+
+def test_in_memory_sqlite_skips_wal():
+    engine = build_engine("sqlite://")
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "memory"
+    engine.dispose()
+
+
+def test_read_engine_is_query_only(url):
+    engine = build_engine(url, read_only=True)
+    session = sessionmaker(bind=engine)()
+    assert session.execute(text("SELECT count(*) FROM security_prices")).scalar() == 0
+    with pytest.raises(OperationalError):
+        _price(session, 1)
+        session.flush()
+    session.close()
+    engine.dispose()
+
+
+def test_write_queue_commits_and_serializes(url):
+    engine = build_engine(url)
+    writes = WriteQueue(sessionmaker(bind=engine), serialize=True)
+    writer_threads = set()
+
+    def job(day):
+        def write(session):
+            writer_threads.add(threading.current_thread().name)
+            _price(session, day)
+            return day
+        return write
+
+    futures = [writes.submit(job(day)) for day in range(1, 21)]
+    assert [f.result(timeout=10) for f in futures] == list(range(1, 21))
+    assert writer_threads == {"sqlite-writer"}
+    assert writes.completed == 20
+
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT count(*) FROM security_prices").scalar() == 20
+    engine.dispose()
+
+
+def test_write_queue_rolls_back_and_reraises(url):
+    engine = build_engine(url)
+    writes = WriteQueue(sessionmaker(bind=engine), serialize=True)
+
+    def failing(session):
+        _price(session, 1)
+        session.flush()
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        writes.run(failing, timeout=10)
+    assert writes.failed == 1
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT count(*) FROM security_prices").scalar() == 0
+    engine.dispose()
+
+
+def test_write_queue_is_bounded(url):
+    engine = build_engine(url)
+    writes = WriteQueue(sessionmaker(bind=engine), serialize=True, capacity=1)
+    started, release = threading.Event(), threading.Event()
+
+    def blocking(session):
+        started.set()
+        return release.wait(10)
+
+    first = writes.submit(blocking)  # Occupies the writer
+    assert started.wait(10)
+    writes.submit(lambda session: None)  # Fills the queue
+    with pytest.raises(queue.Full):
+        writes.submit(lambda session: None, timeout=0.05)
+    release.set()
+    assert first.result(timeout=10) is True
+    engine.dispose()
+
+
+def test_write_queue_runs_inline_when_not_serialized(url):
+    engine = build_engine(url)
+    writes = WriteQueue(sessionmaker(bind=engine), serialize=False)
+    caller = threading.current_thread().name
+    assert writes.run(lambda session: threading.current_thread().name) == caller
+    engine.dispose()
+
+
+def test_writer_engine_holds_one_connection(url):
+    engine = build_engine(url, writer=True)
+    writes = WriteQueue(sessionmaker(bind=engine), serialize=True)
+    for day in (1, 2, 3):
+        writes.run(lambda session, day=day: _price(session, day))
+    assert engine.pool.size() == 1
+    assert engine.pool.checkedout() == 0
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT count(*) FROM security_prices").scalar() == 3
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+    engine.dispose()
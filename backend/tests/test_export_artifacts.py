@@ -0,0 +1,138 @@
+"""
+Tests for export artifact caching, streamed CSV and write-only workbooks.
+"""
+import csv
+import io
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from openpyxl import load_workbook
+
+from backend.services.export.artifacts import ArtifactStore, serve_artifact, stream_artifact
+from backend.utils.csv_export import iter_valuation_csv
+from backend.utils.excel_export import create_valuation_excel
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ArtifactStore(root=str(tmp_path / "artifacts"))
+
+
+def test_get_or_render_renders_once(store):
+    calls = []
+
+    def render(fh):
+        calls.append(1)
+        fh.write(b"payload")
+
+    key = ArtifactStore.key("valuation", "run-1", "rev-a", "xlsx", "2")
+    first = store.get_or_render(key, "xlsx", render)
+    second = store.get_or_render(key, "xlsx", render)
+
+    assert first == second
+    assert len(calls) == 1
+    assert (store.hits, store.misses) == (1, 1)
+    with open(first, "rb") as fh:
+        assert fh.read() == b"payload"
+
+    # A new revision of the run is a different artifact
+    other = ArtifactStore.key("valuation", "run-1", "rev-b", "xlsx", "2")
+    assert other != key
+
+
+def test_tee_publishes_only_complete_streams(store):
+    key = ArtifactStore.key("partial")
+
+    def broken():
+        yield b"a"
+        raise RuntimeError("client went away")
+
+    with pytest.raises(RuntimeError):
+        list(store.tee(key, "csv", broken()))
+    assert store.get(key, "csv") is None
+
+    assert b"".join(store.tee(key, "csv", iter([b"a", b"b"]))) == b"ab"
+    with open(store.get(key, "csv"), "rb") as fh:
+        assert fh.read() == b"ab"
+
+
+def test_prune_evicts_oldest(tmp_path):
+    store = ArtifactStore(root=str(tmp_path), max_bytes=10)
+    store.get_or_render("aa" + "0" * 62, "bin", lambda fh: fh.write(b"x" * 8))
+    store.get_or_render("bb" + "0" * 62, "bin", lambda fh: fh.write(b"y" * 8))
+
+    assert store.get("aa" + "0" * 62, "bin") is None
+    assert store.get("bb" + "0" * 62, "bin") is not None
+
+
+def test_csv_stream_matches_rows_and_chunks():
+    inputs = {"revenue": 1000, "dcf": {"growth": [0.1, 0.2], "wacc": 0.09}}
+    results = {f"metric_{i}": i for i in range(25)}
+
+    chunks = list(iter_valuation_csv(inputs, results, chunk_rows=10))
+    assert len(chunks) > 1
+
+    rows = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+    assert rows[0] == ["Section", "Key", "Value"]
+    assert ["Input", "Input.dcf.growth", "[0.1, 0.2]"] in rows
+    assert ["Output", "Output.metric_24", "24"] in rows
+    assert len(rows) == 1 + 3 + 25
+
+
+def test_write_only_workbook_layout():
+    run_data = {
+        "company_name": "Test Corp",
+        "mode": "manual",
+        "created_at": "2024-01-01T00:00:00",
+        "input_data": {"dcf_input": {
+            "historical": {"years": [2022, 2023], "revenue": [100, 120]},
+            "projections": {"revenue_growth_rate": 0.05}
+        }},
+        "results": {"enterprise_value": 5000, "methods": {"DCF": {"value": 5000, "weight": 1.0}}},
+    }
+    wb = load_workbook(create_valuation_excel(run_data))
+
+    assert wb.sheetnames == ["Summary", "Inputs", "Results"]
+    summary = wb["Summary"]
+    assert summary["A1"].value == "Valuation Summary"
+    assert summary["B3"].value == "Test Corp"
+    assert summary["B8"].value == 5000
+    assert summary["A14"].value == "DCF"
+    inputs = wb["Inputs"]
+    assert inputs["B6"].value == 2022
+    assert inputs["C7"].value == 120
+    assert inputs["A16"].value == "Revenue Growth Rate"
+
+
+def test_etag_round_trip(store):
+    app = FastAPI()
+    renders = []
+
+    def render(fh):
+        renders.append(1)
+        fh.write(b"report")
+
+    @app.get("/file")
+    async def get_file(request: Request):
+        return await serve_artifact(request, "k" * 64, "pdf", render, "application/pdf", "r.pdf", store=store)
+
+    @app.get("/stream")
+    def get_stream(request: Request):
+        return stream_artifact(request, "s" * 64, "csv", iter([b"a,b\n"]), "text/csv", "r.csv", store=store)
+
+    client = TestClient(app)
+    first = client.get("/file")
+    assert first.status_code == 200
+    assert first.content == b"report"
+    etag = first.headers["etag"]
+
+    revalidated = client.get("/file", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert client.get("/file").content == b"report"
+    assert len(renders) == 1
+
+    assert client.get("/stream").content == b"a,b\n"
+    cached = client.get("/stream")
+    assert cached.content == b"a,b\n"
+    assert store.hits == 2
@@ -0,0 +1,91 @@
+"""
+Tests for the multi-path fund simulator and its vectorized IRR solver.
+"""
+import numpy as np
+import pytest
+
+from backend.calculations.fund_models import FundModel, FundStrategy
+from backend.services.analytics.fund_simulator_service import LBOFundSimulator, irr
+
+
+@pytest.fixture
+def fund():
+    return FundModel(name="Fund I", vintage_year=2024, committed_capital=1000)
+
+
+@pytest.fixture
+def strategy():
+    return FundStrategy(min_deal_size=50, max_deal_size=150, target_sectors=["Technology"])
+
+
+def test_irr_solver():
+    flows = np.array([
+        [-100, 0, 0, 0, 150],
+        [-100, 110, 0, 0, 0],
+        [-100, 50, 60, 0, 0],
+        [-100, -10, 0, 0, 0],  # never returns capital
+        [-100, -20, 80, 90, -5],  # fee called after the last exit
+    ], dtype=float)
+    rates = irr(flows)
+    assert rates[0] == pytest.approx(1.5 ** 0.25 - 1)
+    assert rates[1] == pytest.approx(0.1)
+    assert np.isnan(rates[3])
+    t = np.arange(flows.shape[1])
+    for row, rate in zip(flows[[0, 1, 2, 4]], rates[[0, 1, 2, 4]]):
+        assert (row / (1 + rate) ** t).sum() == pytest.approx(0.0, abs=1e-6)
+
+
+def test_paths_waterfall_matches_single_path(fund, strategy):
+    simulator = LBOFundSimulator()
+    deals = simulator._generate_deal_flow(fund, strategy, 50, np.random.default_rng(3))
+    # Capital is never deployed past the fund size
+    assert (deals["investment"].sum(axis=1) <= fund.committed_capital + 1e-9).all()
+
+    flows = simulator._aggregate_cash_flows(fund, deals)
+    waterfall = simulator._waterfall_paths(fund, flows)
+    for path in range(0, 50, 7):
+        raw = {year: amount for year, amount in enumerate(flows[path]) if amount}
+        net, gross, invested, distributed, _ = simulator._calculate_waterfall(fund, raw)
+        assert [f.amount for f in net] == pytest.approx(list(waterfall["net_flows"][path]))
+        assert (gross, invested, distributed) == pytest.approx(
+            (waterfall["gross"][path], waterfall["invested"][path], waterfall["distributed"][path]))
+    # Carry is the part of the distributions the LPs didn't receive
+    lp = waterfall["net_flows"].sum(axis=1) + waterfall["invested"]
+    np.testing.assert_allclose(waterfall["carry"], waterfall["distributed"] - lp)
+
+
+def test_ten_thousand_paths(fund, strategy):
+    simulator = LBOFundSimulator()
+    result = simulator.simulate_fund_paths(fund, strategy, paths=10000, seed=42)
+
+    assert result.paths == 10000
+    assert result.irr_undefined_paths == 0
+    assert 0.05 < result.net_irr.median < 0.25
+    assert result.net_irr.p5 < result.net_irr.median < result.net_irr.p95
+    assert result.tvpi.mean > 1.0 and result.carry.p5 > 0
+    assert len(result.mean_net_cash_flows) == fund.fund_term_years + 1
+    assert simulator.simulate_fund_paths(fund, strategy, paths=100, seed=7) == simulator.simulate_fund_paths(fund, strategy, paths=100, seed=7)
+
+    # Losing strategies have no carry and mostly undefined or negative IRRs
+    losing = simulator.simulate_fund_paths(fund, FundStrategy(min_deal_size=50, max_deal_size=150, target_sectors=["Technology"], target_irr_mean=-0.3), paths=1000, seed=1)
+    assert losing.carry.p95 == 0.0
+    assert losing.probability_loss == 1.0
+
+
+def test_single_path_reports_real_irr(fund, strategy):
+    result = LBOFundSimulator().simulate_fund(fund, strategy)
+    amounts = np.array([f.amount for f in result.cash_flows])
+    assert result.net_irr is not None and result.net_irr != 0.15
+    assert (amounts / (1 + result.net_irr) ** np.arange(len(amounts))).sum() == pytest.approx(0.0, abs=1e-4)
+
+
+def test_undefined_irr_is_reported_not_zeroed(fund, strategy):
+    simulator = LBOFundSimulator()
+    wipeout = FundStrategy(min_deal_size=50, max_deal_size=150, target_sectors=["Technology"],
+                           target_irr_mean=-0.99, target_irr_std_dev=0.0)
+    assert simulator.simulate_fund(fund, wipeout).net_irr is None
+
+    result = simulator.simulate_fund_paths(fund, wipeout, paths=200, seed=5)
+    assert result.irr_undefined_paths == 200
+    assert result.net_irr is None  # No path has an IRR to summarize
+    assert result.tvpi.median < 0.1
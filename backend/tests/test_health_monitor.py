@@ -0,0 +1,57 @@
+"""
+Tests for the ring-buffer health monitor and its rolling windows.
+"""
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from backend.services.metrics.sketch import LatencySketch
+from backend.services.system.health_monitor import HealthMonitorService, RollingWindow
+
+
+def test_request_log_ring_buffer_keeps_newest_first():
+    monitor = HealthMonitorService(max_logs=5)
+    for i in range(12):
+        monitor.log_request("GET", f"/api/{i}", 500 if i % 4 == 0 else 200, float(i))
+
+    assert len(monitor.request_logs) == 5
+    assert [log.endpoint for log in monitor.recent_logs(3)] == ["/api/11", "/api/10", "/api/9"]
+    assert monitor.request_counts == {"total": 12, "success": 9, "error": 3}
+
+
+def test_rolling_window_expires_old_slots():
+    window = RollingWindow(seconds=10)
+    for second in range(20):
+        window.add(1000.0 + second, duration_ms=10.0 * (second + 1), error=second < 15)
+
+    snapshot = window.snapshot(1019.5)
+    assert snapshot["requests"] == 10  # Seconds 1010-1019
+    assert snapshot["error_rate"] == pytest.approx(0.5)
+    assert snapshot["p50_ms"] == pytest.approx(np.quantile(np.arange(11, 21) * 10.0, 0.5), rel=0.1)
+
+    assert window.snapshot(1100.0)["requests"] == 0
+
+
+def test_sketch_subtract_undoes_merge():
+    first, second = LatencySketch(), LatencySketch()
+    for value in (5, 12, 40):
+        first.add(value)
+    for value in (300, 450):
+        second.add(value)
+    first.merge(second)
+    first.subtract(second)
+    assert first.count == 3
+    assert first.quantile(0.5) == pytest.approx(12, rel=0.02)
+
+
+def test_system_stats_are_served_from_the_sampled_snapshot():
+    monitor = HealthMonitorService()
+    monitor.sample()
+    with patch("backend.services.system.health_monitor.psutil.virtual_memory") as virtual_memory, \
+            patch.object(monitor._process, "net_connections") as net_connections:
+        metrics = monitor.get_metrics()
+    virtual_memory.assert_not_called()
+    net_connections.assert_not_called()
+    assert set(metrics["windows"]) == {"1m", "5m"}
+    assert metrics["system"]["active_connections"] >= 0
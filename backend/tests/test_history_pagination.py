@@ -0,0 +1,78 @@
+"""
+Tests for keyset pagination of the audit/decision history endpoints and the
+SQL-side pilot statistics.
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.api.audit_routes import get_audit_logs
+from backend.api.decision_routes import get_critical_decisions, get_decision_history, get_pilot_analysis
+from backend.database.models import AuditLog, Base, Company, DecisionRecord, User
+
+START = datetime(2026, 1, 1)
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'history.db'}")
+    Base.metadata.create_all(bind=engine, tables=[
+        User.__table__, AuditLog.__table__, Company.__table__, DecisionRecord.__table__,
+    ])
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _audit_logs(db, **filters):
+    return asyncio.run(get_audit_logs(**{
+        "skip": 0, "limit": 50, "user_id": None, "action_type": None, "risk_level": None,
+        "before": None, "before_id": None, "db": db, "current_user": None, **filters
+    }))
+
+
+def test_audit_log_pages_cover_every_row_once(db):
+    # Pairs of rows share a timestamp, so the id has to break ties
+    for i in range(25):
+        db.add(AuditLog(timestamp=START + timedelta(minutes=i // 2), action_type="EXPORT" if i % 3 else "LOGIN",
+                        risk_level="high" if i % 5 == 0 else "low"))
+    db.commit()
+
+    seen, before, before_id = [], None, None
+    while True:
+        page = _audit_logs(db, limit=4, before=before, before_id=before_id)
+        if not page:
+            break
+        seen.extend(log.id for log in page)
+        before, before_id = page[-1].timestamp, page[-1].id
+
+    newest_first = [log.id for log in db.query(AuditLog).order_by(AuditLog.timestamp.desc(), AuditLog.id.desc())]
+    assert seen == newest_first
+    assert all(log.action_type == "LOGIN" for log in _audit_logs(db, action_type="LOGIN"))
+    assert {log.risk_level for log in _audit_logs(db, risk_level="high")} == {"high"}
+
+
+def test_decision_history_keyset_and_pilot_counts(db):
+    db.add(Company(ticker="ACME", name="Acme", sector="SaaS"))
+    states = ["active", "resolved", "acknowledged", "overridden", "resolved"]
+    for i, state in enumerate(states):
+        db.add(DecisionRecord(decision_id=f"d{i}", company_id="ACME", signal="COVENANT_BREACH",
+                              severity="CRITICAL" if i else "HIGH", confidence=0.9, recommended_actions_json="[]",
+                              state=state, created_at=START + timedelta(days=i)))
+    db.commit()
+
+    first = get_decision_history("ACME", limit=2, severity=None, before=None, before_id=None, db=db)
+    assert [d.decision_id for d in first] == ["d4", "d3"]
+    second = get_decision_history("ACME", limit=2, severity=None, before=START + timedelta(days=3),
+                                  before_id="d3", db=db)
+    assert [d.decision_id for d in second] == ["d2", "d1"]
+
+    critical = get_critical_decisions(since=None, limit=None, before=None, before_id=None, db=db)
+    assert [d.decision_id for d in critical] == ["d4", "d3", "d2", "d1"]
+
+    stats = get_pilot_analysis(db=db)["decision_outcomes"]
+    assert (stats["total_critical"], stats["acknowledged"], stats["overridden"]) == (4, 3, 1)
@@ -0,0 +1,165 @@
+"""
+Tests for field-level incremental re-audits and the sector WACC reference table.
+"""
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.calculations.models import (
+    DCFInput, DebtTranche, GPCInput, HistoricalFinancials, LBOFinancing, LBOInput, ProjectionAssumptions, ValuationInput
+)
+from backend.database.models import Base, Company
+from backend.services.auditing_service import AuditingService, AuditSessionStore
+from backend.services.wacc.sector_table import SectorWaccTable
+
+
+@pytest.fixture
+def service():
+    service = AuditingService()
+    service.sector_table = SectorWaccTable()
+    service.sector_table.load({"ACME": "Technology"}, {"Technology": 0.10})
+    service.rules = service._build_rules()
+    return service
+
+
+@pytest.fixture
+def input_data():
+    historical = HistoricalFinancials(
+        years=[2021, 2022], revenue=[100, 120], ebitda=[20, 24], ebit=[15, 19], net_income=[10, 14],
+        capex=[5, 7], nwc=[10, 12]
+    )
+    projections = ProjectionAssumptions(
+        revenue_growth_start=0.6, revenue_growth_end=0.05, ebitda_margin_start=0.2, ebitda_margin_end=0.25,
+        tax_rate=0.25, discount_rate=0.04, terminal_growth_rate=0.03
+    )
+    return ValuationInput(
+        company_name="Acme",
+        dcf_input=DCFInput(historical=historical, projections=projections, shares_outstanding=100, net_debt=10),
+        gpc_input=GPCInput(target_ticker="acme", peer_tickers=[], metrics={}),
+        lbo_input=LBOInput(
+            entry_revenue=100, entry_ebitda=20, entry_ev_ebitda_multiple=8.0, exit_ev_ebitda_multiple=10.0,
+            financing=LBOFinancing(tranches=[DebtTranche(name="Senior", leverage_multiple=4.0, interest_rate=0.07),
+                                             DebtTranche(name="Sub", leverage_multiple=3.0, interest_rate=0.1)]),
+            target_irr=0.3, revenue_growth_rate=0.02
+        )
+    )
+
+
+def _fields(issues):
+    return sorted(issue.field for issue in issues)
+
+
+def test_full_audit_never_fetches_inline(service, input_data):
+    with patch("backend.services.wacc.service.WaccCalculatorService.fetch_market_data", side_effect=AssertionError):
+        issues = asyncio.run(service.audit_valuation_input(input_data))
+    assert _fields(issues) == [
+        "dcf_input.projections.discount_rate",  # 4% vs a 10% sector average
+        "dcf_input.projections.revenue_growth_start",
+        "lbo_input.exit_ev_ebitda_multiple",
+        "lbo_input.financing",
+        "lbo_input.financing.equity_contribution_percent",
+        "lbo_input.target_irr",
+    ]
+    # Tickers outside the table have no industry reference, so no WACC check
+    input_data.gpc_input.target_ticker = "ZZZZ"
+    assert "dcf_input.projections.discount_rate" not in _fields(service.start_audit(input_data).issues)
+
+
+def test_diff_reruns_only_affected_rules(service, input_data):
+    report = service.start_audit(input_data)
+    assert len(report.rules_run) == len(service.rules)
+
+    edit = service.reaudit(report.audit_id, {"dcf_input.projections.discount_rate": 0.09})
+    assert edit.rules_run == ["industry_wacc"]
+    assert "dcf_input.projections.discount_rate" not in _fields(edit.issues)
+
+    # Diffs chain, and each one matches a full audit of the edited input
+    edit = service.reaudit(edit.audit_id, {"lbo_input.financing.tranches": [{"name": "Senior", "leverage_multiple": 3.0, "interest_rate": 0.07}]})
+    assert set(edit.rules_run) == {"lbo_leverage", "lbo_equity_contribution"}
+    expected = input_data.copy(deep=True)
+    expected.dcf_input.projections.discount_rate = 0.09
+    expected.lbo_input.financing.tranches = [DebtTranche(name="Senior", leverage_multiple=3.0, interest_rate=0.07)]
+    assert _fields(edit.issues) == _fields(service.start_audit(expected).issues)
+
+    # Branching from the first audit still sees the original input
+    assert service.reaudit(report.audit_id, {"company_name": "Other"}).issues == report.issues
+    assert input_data.dcf_input.projections.discount_rate == 0.04
+
+    with pytest.raises(KeyError):
+        service.reaudit("missing", {})
+
+
+def test_diff_on_another_worker_rebuilds_from_base(service, input_data):
+    report = service.start_audit(input_data)
+    service.sessions = AuditSessionStore()  # A worker that never saw the audit
+
+    change = {"dcf_input.projections.discount_rate": 0.09}
+    with pytest.raises(KeyError):
+        service.reaudit(report.audit_id, change)
+    edit = service.reaudit(report.audit_id, change, base=input_data)
+    assert "dcf_input.projections.discount_rate" not in _fields(edit.issues)
+    assert service.reaudit(edit.audit_id, {"company_name": "Acme"}).issues == edit.issues
+
+    service.sessions = AuditSessionStore()
+    other = input_data.model_copy(update={"company_name": "Other"})
+    with pytest.raises(ValueError):
+        service.reaudit(report.audit_id, change, base=other)
+
+
+def test_invalid_changes_are_rejected(service, input_data):
+    audit_id = service.start_audit(input_data).audit_id
+    with pytest.raises(ValueError):
+        service.reaudit(audit_id, {"dcf_input.projections.discount_rate": "high"})
+    with pytest.raises(ValueError):
+        service.reaudit(audit_id, {"lbo_input.financing.tranches": 3})
+    with pytest.raises(ValueError):
+        service.reaudit(audit_id, {"dcf_input.projections.no_such_field": 0.1})
+
+
+def test_reference_refresh_rechecks_wacc(service, input_data):
+    report = service.start_audit(input_data)
+    service.sector_table.load({"ACME": "Technology"}, {"Technology": 0.06})
+    edit = service.reaudit(report.audit_id, {"company_name": "Acme 2"})
+    assert edit.rules_run == ["industry_wacc"]
+    assert "dcf_input.projections.discount_rate" not in _fields(edit.issues)
+
+
+def test_single_field_edit_latency(service, input_data):
+    audit_id = service.start_audit(input_data).audit_id
+    edits = 2000
+    started = time.perf_counter()
+    for i in range(edits):
+        audit_id = service.reaudit(audit_id, {"dcf_input.projections.terminal_growth_rate": 0.02 + (i % 20) * 0.005}).audit_id
+    assert (time.perf_counter() - started) / edits < 0.001
+
+
+def test_sector_table_refresh(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'companies.db'}")
+    Base.metadata.create_all(bind=engine, tables=[Company.__table__])
+    db = sessionmaker(bind=engine)()
+    db.add_all([
+        Company(ticker="AAA", name="A", sector="Technology"),
+        Company(ticker="BBB", name="B", sector="Technology"),
+        Company(ticker="CCC", name="C", sector="Energy"),
+    ])
+    db.commit()
+
+    waccs = {"AAA": 0.08, "BBB": 0.10, "CCC": None}
+
+    def market_data(self, ticker):
+        if waccs[ticker] is None:
+            raise RuntimeError("provider down")
+        return type("MarketAssumptions", (), {"wacc": waccs[ticker]})()
+
+    table = SectorWaccTable()
+    with patch("backend.services.wacc.sector_table.WaccCalculatorService.__init__", return_value=None), \
+            patch("backend.services.wacc.sector_table.WaccCalculatorService.fetch_market_data", market_data):
+        table.refresh(db)
+    assert table.industry_wacc("bbb") == pytest.approx(0.09)
+    assert table.industry_wacc("CCC") is None and table.industry_wacc(None) is None
+    assert table.version == 1
+    db.close()
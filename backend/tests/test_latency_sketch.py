@@ -0,0 +1,132 @@
+"""
+Tests for mergeable latency sketches used by the metrics aggregator.
+"""
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from unittest.mock import patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.database.models import Base, LatencySketchBucket, SystemMetric, User
+from backend.services.metrics.aggregator import summarize_system
+from backend.services.metrics.sketch import LatencySketch, LatencyRecorder
+
+
+def _exact_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+def test_quantiles_within_relative_accuracy():
+    rng = random.Random(42)
+    values = [rng.lognormvariate(4, 1) for _ in range(20000)]
+    sketch = LatencySketch(relative_accuracy=0.01)
+    for v in values:
+        sketch.add(v)
+
+    assert sketch.count == len(values)
+    for q in (0.5, 0.9, 0.95, 0.99):
+        assert sketch.quantile(q) == pytest.approx(_exact_quantile(values, q), rel=0.011)
+
+
+def test_merge_equals_single_sketch_and_roundtrips():
+    rng = random.Random(7)
+    values = [rng.uniform(0, 500) for _ in range(5000)]
+
+    whole = LatencySketch()
+    parts = [LatencySketch() for _ in range(5)]
+    for i, v in enumerate(values):
+        whole.add(v)
+        parts[i % 5].add(v)
+
+    merged = LatencySketch()
+    for part in parts:
+        merged.merge(LatencySketch.from_json(part.to_json()))
+
+    assert merged.count == whole.count
+    assert merged.bins == whole.bins
+    assert merged.quantile(0.95) == whole.quantile(0.95)
+    assert merged.mean == pytest.approx(whole.mean, rel=1e-6)
+
+
+def test_zero_durations_and_empty_sketch():
+    sketch = LatencySketch()
+    assert sketch.quantile(0.5) == 0.0
+    for _ in range(10):
+        sketch.add(0)
+    sketch.add(100)
+    assert sketch.quantile(0.5) == 0.0
+    assert sketch.quantile(1.0) == 100
+
+
+def test_recorder_buckets_by_minute_and_keeps_open_bucket():
+    recorder = LatencyRecorder()
+    now = datetime.utcnow()
+    recorder.record_request("/api/runs/{run_id}", 200, 12.0, ts=now - timedelta(minutes=2))
+    recorder.record_request("/api/runs/{run_id}", 500, 30.0, ts=now - timedelta(minutes=2))
+    recorder.record_request("/api/runs/{run_id}", 200, 8.0, ts=now)
+    recorder.record_valuation("DCF", 250.0, cache_hit=True, ts=now - timedelta(minutes=2))
+
+    drained = recorder.drain()
+    assert len(drained) == 2
+    endpoint_stats = next(s for _, kind, _, s in drained if kind == LatencyRecorder.KIND_ENDPOINT)
+    assert endpoint_stats.count == 2
+    assert endpoint_stats.error_count == 1
+
+    # The current minute is still pending
+    pending = recorder.pending(LatencyRecorder.KIND_ENDPOINT)
+    assert pending["/api/runs/{run_id}"].count == 1
+    assert len(recorder.drain(include_open=True)) == 1
+
+
+def test_summary_merges_raw_rows_before_sketch_coverage(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'metrics.db'}")
+    Base.metadata.create_all(bind=engine, tables=[User.__table__, SystemMetric.__table__, LatencySketchBucket.__table__])
+    db = sessionmaker(bind=engine)()
+    now = datetime.utcnow()
+    since = now - timedelta(hours=24)
+    sketches_from = (now - timedelta(hours=2)).replace(second=0, microsecond=0)
+
+    # Before sketches existed: raw rows only
+    for i in range(30):
+        db.add(SystemMetric(endpoint="/api/runs", method="GET", response_time_ms=100, status_code=200,
+                            user_id=1 + i % 3, timestamp=sketches_from - timedelta(hours=5, minutes=i)))
+    # Since then: a sampled raw row for a request the sketches also counted
+    db.add(SystemMetric(endpoint="/api/runs", method="GET", response_time_ms=20, status_code=200,
+                        user_id=1, timestamp=sketches_from + timedelta(minutes=5)))
+    db.commit()
+
+    recorder = LatencyRecorder()
+    for i in range(40):
+        ts = sketches_from + timedelta(minutes=i)
+        recorder.record_request("/api/runs", 500 if i < 4 else 200, 20.0, ts=ts)
+        recorder.record_user(4 + i % 2, 20.0, ts=ts)
+    with patch("backend.services.metrics.aggregator.latency_recorder", recorder):
+        recorder.flush(db, include_open=True)
+        summary = summarize_system(db, since)
+
+    assert summary["total_requests"] == 70  # 30 raw + 40 sketched, the overlapping raw row not twice
+    assert summary["error_rate"] == pytest.approx(4 / 70)
+    assert summary["active_users"] == 5  # Users 1-3 from raw rows, 4-5 from the per-user sketches
+    assert summary["avg_actions_per_user"] == pytest.approx(70 / 5)
+    assert summary["active_users_sampled"] is True
+
+    with patch("backend.services.metrics.aggregator.latency_recorder", recorder):
+        recent = summarize_system(db, sketches_from)
+    assert recent["total_requests"] == 40
+    assert (recent["active_users"], recent["active_users_sampled"]) == (2, False)
+    db.close()
+    engine.dispose()
+
+
+def test_unmatched_requests_share_one_sketch_key():
+    from fastapi.testclient import TestClient
+    from backend.main import app, UNMATCHED_ROUTE, latency_recorder
+
+    with patch.object(latency_recorder, "record_request") as record_request:
+        client = TestClient(app)
+        client.get("/wp-login.php")
+        client.get("/.env")
+    assert {call.kwargs["endpoint"] for call in record_request.call_args_list} == {UNMATCHED_ROUTE}
@@ -0,0 +1,101 @@
+"""
+Tests for lazily mounted router groups and the import footprint of the app.
+"""
+import json
+import subprocess
+import sys
+import textwrap
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.api.lazy_routes import LazyRouterGroup, include_lazy, lazy_router_groups
+
+
+@pytest.fixture
+def router_module(tmp_path, monkeypatch):
+    name = "lazy_group_under_test"
+    (tmp_path / f"{name}.py").write_text(textwrap.dedent("""
+        from fastapi import APIRouter
+        router = APIRouter(prefix="/api/lazy")
+
+        @router.get("/items")
+        def items():
+            return {"source": "lazy"}
+
+        @router.get("/shadowed")
+        def shadowed():
+            return {"source": "lazy"}
+    """))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield name
+    sys.modules.pop(name, None)
+
+
+def _app(router_module):
+    app = FastAPI()
+
+    @app.get("/api/lazy/shadowed")
+    def earlier():
+        return {"source": "earlier"}
+
+    group = include_lazy(app, "test", ["/api/lazy"], [(router_module, {})])
+    lazy_router_groups.remove(group)
+
+    @app.get("/api/after")
+    def after():
+        return {"source": "after"}
+
+    return app, group
+
+
+def test_group_is_imported_on_first_request(router_module):
+    app, group = _app(router_module)
+    client = TestClient(app)
+
+    assert router_module not in sys.modules
+    assert client.get("/api/after").json() == {"source": "after"}
+    assert not group.loaded and router_module not in sys.modules
+
+    assert client.get("/api/lazy/items").json() == {"source": "lazy"}
+    assert group.loaded and router_module in sys.modules
+    assert group not in app.router.routes
+    assert "/api/lazy/items" in json.dumps(client.get("/openapi.json").json())
+
+
+def test_spliced_routes_keep_their_precedence(router_module):
+    app, group = _app(router_module)
+    client = TestClient(app)
+
+    before = list(app.router.routes)
+    placeholder = before.index(group)
+    client.get("/api/lazy/items")
+    routes = app.router.routes
+    # The group's routes sit where the placeholder was: after the earlier route, before the later one
+    assert routes[:placeholder] == before[:placeholder]
+    assert routes[len(routes) - (len(before) - placeholder - 1):] == before[placeholder + 1:]
+    assert client.get("/api/after").json() == {"source": "after"}
+    assert client.get("/api/lazy/shadowed").json() == {"source": "earlier"}
+    assert client.get("/api/lazy/missing").status_code == 404
+
+
+def test_eager_load(router_module):
+    app = FastAPI()
+    group = LazyRouterGroup("test", ["/api/lazy"], [(router_module, {})])
+    app.router.routes.append(group)
+    group.load(app)
+    assert group.loaded and group.modules_imported >= 1
+    assert TestClient(app).get("/api/lazy/items").status_code == 200
+
+
+def test_app_import_skips_heavy_libraries():
+    probe = (
+        "import sys, json, backend.main; "
+        "print(json.dumps([m for m in ('matplotlib', 'seaborn', 'sklearn', 'pandas', 'reportlab', 'pptx', 'docx', 'openpyxl') "
+        "if m in sys.modules]))"
+    )
+    result = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True,
+                            env={**__import__("os").environ, "LAZY_ROUTERS": "true", "APP_PRELOAD": "false"})
+    assert result.returncode == 0, result.stderr[-2000:]
+    assert json.loads(result.stdout.strip().splitlines()[-1]) == []
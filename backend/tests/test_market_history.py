@@ -0,0 +1,123 @@
+"""
+Tests for long-form market multiples and downsampled history series.
+"""
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from backend.database.models import Base, MarketSnapshot, MarketMultiplePoint
+from backend.services.financial_data import market_history
+from backend.services.financial_data.market_history import (
+    capture_snapshot, choose_resolution, get_series, record_snapshot, series_to_rows
+)
+
+START = datetime(2022, 1, 3)  # a Monday
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'market.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine, tables=[MarketSnapshot.__table__, MarketMultiplePoint.__table__])
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _seed(db, days, per_day=2):
+    for d in range(days):
+        for k in range(per_day):
+            record_snapshot(
+                db, 0.01 + d * 0.0001, 0.02, 0.04,
+                {"Technology": {"senior_leverage": 4.0 + d, "total_leverage": 6.0}, "Industrials": 4.5},
+                {"Technology": 12.0 + d + k, "Industrials": 8.0},
+                date=START + timedelta(days=d, hours=6 * (k + 1))
+            )
+    db.commit()
+
+
+def test_record_snapshot_writes_json_and_points(db):
+    snapshot = record_snapshot(db, 0.04, None, 0.05, {"Tech": {"senior_leverage": 4.0}, "Health": 5.0}, {"Tech": 12.0})
+    db.commit()
+    assert json.loads(snapshot.sector_exit_multiples) == {"Tech": 12.0}
+    points = {(p.sector, p.metric): p.value for p in db.query(MarketMultiplePoint).filter_by(snapshot_id=snapshot.id)}
+    assert points == {("Tech", "exit_multiple"): 12.0, ("Tech", "senior_leverage"): 4.0, ("Health", "leverage"): 5.0}
+
+
+def test_resolution_keeps_payload_bounded(db):
+    assert choose_resolution(START, START + timedelta(days=90)) == "day"
+    assert choose_resolution(START, START + timedelta(days=3 * 365)) == "week"
+    assert choose_resolution(START, START + timedelta(days=20 * 365)) == "month"
+
+    _seed(db, 730, per_day=1)
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    series = get_series(db, START, START + timedelta(days=730))
+    assert len(statements) == 2
+    assert series["resolution"] == "week"
+    assert len(series["dates"]) == 105
+    assert series["dates"][:2] == ["2022-01-03", "2022-01-10"]
+    # Every column is aligned with the dates
+    assert all(len(v) == len(series["dates"]) for v in series["rates"].values())
+    assert len(series["multiples"]["Technology"]["senior_leverage"]) == len(series["dates"])
+    # "last" takes the week's Sunday snapshot
+    assert series["multiples"]["Technology"]["exit_multiple"][0] == 12.0 + 6
+
+
+def test_last_and_mean_aggregation(db):
+    _seed(db, 3)
+    end = START + timedelta(days=3)
+
+    last = get_series(db, START, end, resolution="day")
+    assert last["dates"] == ["2022-01-03", "2022-01-04", "2022-01-05"]
+    assert last["multiples"]["Technology"]["exit_multiple"] == [13.0, 14.0, 15.0]
+    assert last["rates"]["senior_debt_rate"] == [0.03, 0.0301, 0.0302]
+
+    mean = get_series(db, START, end, resolution="day", aggregation="mean", sectors=["Technology"])
+    assert mean["multiples"]["Technology"]["exit_multiple"] == [12.5, 13.5, 14.5]
+    assert set(mean["multiples"]) == {"Technology"}
+    assert mean["snapshot_ids"] is None
+
+    with pytest.raises(ValueError):
+        get_series(db, START, end, resolution="hour")
+
+
+def test_rows_keep_original_shape(db):
+    _seed(db, 2, per_day=1)
+    rows = series_to_rows(get_series(db, START, START + timedelta(days=2), resolution="day"))
+    assert len(rows) == 2
+    snapshot = db.get(MarketSnapshot, rows[1]["id"])
+    assert rows[1]["multiples"] == json.loads(snapshot.sector_exit_multiples)
+    assert rows[1]["system_multiples"] == json.loads(snapshot.sector_leverage_multiples)
+    assert rows[1]["rates"]["preferred_equity_rate"] == pytest.approx(0.0101 + 0.04 + 0.02)
+
+
+def test_capture_fetches_sectors_concurrently(db, monkeypatch):
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def slow(value):
+        def fetch(*args):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.1)
+            with lock:
+                active[0] -= 1
+            return value
+        return fetch
+
+    service = market_history.market_data_service
+    monkeypatch.setattr(service, "fetch_interest_rates", slow(
+        {"risk_free_rate": 0.04, "senior_debt_rate": 0.06, "mezzanine_debt_rate": 0.09}))
+    monkeypatch.setattr(service, "fetch_leverage_multiples", slow({"senior_leverage": 4.0, "total_leverage": 6.0}))
+    monkeypatch.setattr(service, "fetch_exit_multiples", slow({"ev_ebitda": 11.0}))
+
+    snapshot = capture_snapshot(db, ["A", "B", "C", "D"])
+    assert peak[0] >= 4
+    assert snapshot.high_yield_spread == pytest.approx(0.05)
+    assert db.query(MarketMultiplePoint).filter_by(snapshot_id=snapshot.id).count() == 4 * 3
@@ -0,0 +1,120 @@
+"""
+Tests for metrics rollups and the rollup-then-purge retention pipeline.
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.database.models import Base, LatencySketchBucket, MetricRollup, SystemMetric, User, ValuationMetric
+from backend.services.metrics.retention import purge_before, run_retention
+from backend.services.metrics.rollup import DAY, HOUR, rollup_hours, rollup_series
+from backend.services.metrics.sketch import LatencyRecorder
+
+NOW = datetime(2026, 3, 10, 12, 30)
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'metrics.db'}")
+    Base.metadata.create_all(bind=engine, tables=[
+        User.__table__, SystemMetric.__table__, ValuationMetric.__table__, MetricRollup.__table__,
+        LatencySketchBucket.__table__,
+    ])
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _requests(db, start, hours, per_hour=20):
+    durations = []
+    for h in range(hours):
+        for i in range(per_hour):
+            duration = 10 + (i * 7 + h) % 90
+            durations.append(duration)
+            db.add(SystemMetric(endpoint="/api/runs", method="GET", response_time_ms=duration,
+                                status_code=500 if i == 0 else 200,
+                                timestamp=start + timedelta(hours=h, minutes=i * 2)))
+    db.commit()
+    return durations
+
+
+def test_hourly_rollups_match_raw_rows(db):
+    start = datetime(2026, 3, 9, 0)
+    durations = _requests(db, start, hours=3)
+
+    assert rollup_hours(db, "endpoint", start + timedelta(hours=3)) == 3
+    assert rollup_hours(db, "endpoint", start + timedelta(hours=3)) == 0  # Idempotent
+
+    rows = db.query(MetricRollup).filter_by(granularity=HOUR).order_by(MetricRollup.bucket_start).all()
+    assert [(r.count, r.error_count, r.method) for r in rows] == [(20, 1, "GET")] * 3
+    first_hour = np.array(durations[:20])
+    assert rows[0].p95_ms == pytest.approx(np.quantile(first_hour, 0.95), rel=0.05)
+    assert rows[0].sum_ms == pytest.approx(first_hour.sum())
+
+
+def test_retention_rolls_up_before_purging_in_batches(db):
+    old_start = NOW - timedelta(days=40)
+    _requests(db, old_start, hours=30, per_hour=5)  # Crosses a day boundary
+    _requests(db, NOW - timedelta(hours=2), hours=1, per_hour=5)
+    db.add(ValuationMetric(method_type="DCF", duration_ms=120, cache_hit=True, created_at=old_start))
+    db.commit()
+
+    result = run_retention(db, days_to_keep=30, hourly_days_to_keep=90, now=NOW)
+
+    assert result["system_metrics_deleted"] == 150
+    assert result["valuation_metrics_deleted"] == 1
+    assert db.query(SystemMetric).count() == 5  # Recent rows stay
+    # The purged history lives on in the rollups
+    daily = rollup_series(db, "endpoint", DAY, old_start - timedelta(days=1))
+    assert sum(point["count"] for point in daily) == 150
+    assert sum(point["errors"] for point in daily) == 30
+    valuation = rollup_series(db, "valuation", HOUR, old_start - timedelta(days=1))
+    assert valuation[0]["cache_hits"] == 1
+
+
+def test_purge_never_outruns_rollups(db, monkeypatch):
+    _requests(db, NOW - timedelta(days=40), hours=2, per_hour=5)
+    assert rollup_hours(db, "endpoint", NOW - timedelta(days=40, hours=-1)) == 1  # Only the first hour
+    monkeypatch.setattr("backend.services.metrics.retention.rollup_hours", lambda *args: 0)
+
+    result = run_retention(db, days_to_keep=30, now=NOW)
+    assert result["system_metrics_deleted"] == 5  # The second, not rolled up hour is kept
+    assert db.query(SystemMetric).count() == 5
+
+
+def test_purge_before_walks_in_bounded_batches(db):
+    _requests(db, datetime(2026, 1, 1), hours=1, per_hour=23)
+    deleted = purge_before(db, SystemMetric, SystemMetric.timestamp, datetime(2026, 1, 1, 0, 30),
+                           batch_size=4, pause=0)
+    assert deleted == 15  # Rows at minutes 0, 2, ..., 28
+    assert db.query(SystemMetric).count() == 8
+
+
+def test_endpoint_rollups_merge_unsampled_sketches(db):
+    start = datetime(2026, 3, 9, 0)
+    _requests(db, start, hours=1, per_hour=20)  # Sampled raw rows before the first sketch
+    recorder = LatencyRecorder()
+    sketched = start + timedelta(hours=1)
+    for minute in range(120):
+        for i in range(10):
+            recorder.record_request("/api/runs/{run_id}", 500 if i == 0 else 200, 5.0 + i,
+                                    ts=sketched + timedelta(minutes=minute))
+    recorder.flush(db, include_open=True)
+    db.add(SystemMetric(endpoint="/api/runs/abc", method="GET", response_time_ms=7, status_code=200,
+                        timestamp=sketched + timedelta(minutes=3)))  # Sampled copy of a sketched request
+    db.commit()
+
+    assert rollup_hours(db, "endpoint", start + timedelta(hours=3)) == 3
+    rows = db.query(MetricRollup).filter_by(granularity=HOUR).order_by(MetricRollup.bucket_start).all()
+    assert [(r.key, r.count) for r in rows] == [
+        ("/api/runs", 20), ("/api/runs/{run_id}", 600), ("/api/runs/{run_id}", 600),
+    ]
+    assert rows[1].error_count == 60
+
+    result = run_retention(db, days_to_keep=1, now=start + timedelta(days=2))
+    assert result["latency_sketch_buckets_deleted"] == 120
+    assert db.query(LatencySketchBucket).count() == 0
@@ -0,0 +1,116 @@
+"""
+Tests for the shared background metrics writer.
+"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+from backend.database.models import Base, SystemMetric, ValuationMetric
+from backend.services.metrics.writer import MetricsWriter
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine, tables=[SystemMetric.__table__, ValuationMetric.__table__])
+    yield engine
+    engine.dispose()
+
+
+def _system_row(i):
+    return {
+        "endpoint": f"/test/{i % 3}",
+        "method": "GET",
+        "response_time_ms": i,
+        "status_code": 200,
+        "timestamp": datetime.utcnow(),
+    }
+
+
+def _count(engine, model):
+    with engine.connect() as conn:
+        return len(conn.execute(model.__table__.select()).fetchall())
+
+
+def test_stop_drains_all_tables_in_batches(engine):
+    writer = MetricsWriter(engine=engine, batch_size=50, flush_interval=60)
+    for i in range(120):
+        assert writer.submit(SystemMetric, _system_row(i))
+    for i in range(7):
+        writer.submit(ValuationMetric, {"valuation_id": f"v{i}", "method_type": "DCF", "duration_ms": 10})
+
+    writer.stop()
+
+    assert _count(engine, SystemMetric) == 120
+    assert _count(engine, ValuationMetric) == 7
+    stats = writer.stats()
+    assert stats["written"] == 127
+    assert stats["queued"] == 0
+    assert stats["dropped"] == 0
+    # 127 rows at batch_size=50 -> 3 transactions, not 127
+    assert stats["batches"] == 3
+    assert writer.writes.completed == 3  # Each one through the write queue
+
+
+def test_overflow_drops_and_counts(engine):
+    writer = MetricsWriter(engine=engine, capacity=10, batch_size=1000, flush_interval=60)
+    accepted = sum(writer.submit(SystemMetric, _system_row(i)) for i in range(25))
+
+    assert accepted == 10
+    assert writer.stats()["dropped"] == 15
+
+    writer.stop()
+    assert _count(engine, SystemMetric) == 10
+    # Once stopped, new rows are rejected rather than queued forever
+    assert writer.submit(SystemMetric, _system_row(99)) is False
+
+
+def test_single_background_thread(engine):
+    import threading
+
+    writer = MetricsWriter(engine=engine, batch_size=5, flush_interval=0.05)
+    before = threading.active_count()
+    for i in range(40):
+        writer.submit(SystemMetric, _system_row(i))
+    # Only one writer thread regardless of how many batches are triggered
+    assert threading.active_count() <= before + 1
+    writer.stop()
+    assert _count(engine, SystemMetric) == 40
+
+
+def test_counters_are_exact_under_concurrent_producers(engine):
+    from concurrent.futures import ThreadPoolExecutor
+    writer = MetricsWriter(engine=engine, capacity=100, batch_size=1000, flush_interval=60)
+    writer._thread = object()  # Keep the rows queued; only the counters are under test
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda i: writer.submit(SystemMetric, _system_row(i)), range(4000)))
+    stats = writer.stats()
+    assert stats["enqueued"] + stats["dropped"] == 4000
+    assert stats["enqueued"] == stats["queued"]
+
+
+def test_middleware_reads_user_from_request_state(monkeypatch):
+    from fastapi import FastAPI, Request
+    from fastapi.testclient import TestClient
+    from backend.middleware.metrics import SystemMetricsMiddleware
+
+    submitted = []
+    monkeypatch.setenv("METRICS_SAMPLE_RATE", "1")
+    monkeypatch.setattr("backend.middleware.metrics.metrics_writer.submit", lambda model, row: submitted.append(row))
+
+    app = FastAPI()
+    app.add_middleware(SystemMetricsMiddleware)
+
+    @app.get("/things")
+    def list_things(request: Request):
+        request.state.user_id = 42  # what get_current_user does
+        return []
+
+    TestClient(app).get("/things", headers={"Authorization": "Bearer not-a-jwt"})
+    assert [row["user_id"] for row in submitted] == [42]
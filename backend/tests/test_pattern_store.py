@@ -0,0 +1,138 @@
+"""
+Tests for the in-memory pattern store: watermark reloads, vectorized matching
+and incremental (mini-batch k-means) training.
+"""
+import json
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.database.models import (
+    Base, Company, IndustryNorm, PatternTrainingState, UserFeedback, ValidationPattern, ValuationRun
+)
+from backend.services.ai.pattern_store import PatternStore, fold_in
+from backend.services.validation.anomaly_detection import AnomalyDetectionService
+
+ARCHETYPES = [
+    ("Hyper Growth", 0.60, -0.20),
+    ("Efficient Growth", 0.30, 0.10),
+    ("Mature Cash Cow", 0.05, 0.30),
+]
+
+
+def _pattern(sector, name, growth, margin, sample_size=20):
+    return ValidationPattern(
+        pattern_type="cluster_archetype",
+        sector=sector,
+        severity="info",
+        message_template=f"Similar {sector} companies ({name}) typically have Growth: {{growth}} and Margin: {{margin}}",
+        condition_json=json.dumps({
+            "sector": sector,
+            "avg_growth": growth,
+            "avg_margin": margin,
+            "growth_range": [growth - 0.05, growth + 0.05],
+            "margin_range": [margin - 0.05, margin + 0.05],
+            "growth_std": 0.05,
+            "margin_std": 0.05,
+            "sample_size": sample_size,
+        }),
+    )
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'patterns.db'}")
+    Base.metadata.create_all(bind=engine, tables=[
+        Company.__table__, ValuationRun.__table__, ValidationPattern.__table__,
+        IndustryNorm.__table__, UserFeedback.__table__, PatternTrainingState.__table__,
+    ])
+    session = sessionmaker(bind=engine)()
+    session.add_all(_pattern("SaaS", *archetype) for archetype in ARCHETYPES)
+    session.add(_pattern("Retail", "Mature Cash Cow", 0.03, 0.08))
+    session.add(IndustryNorm(sector="SaaS", metric="revenue_growth", mean=0.25, std_dev=0.10))
+    session.commit()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def test_refresh_loads_once_until_watermark_moves(db):
+    store = PatternStore()
+    assert store.refresh(db)
+    assert not store.refresh(db)  # Nothing changed
+    assert store.norms("SaaS") == {"revenue_growth": (0.25, 0.10)}
+    assert len(store.sector_patterns("SaaS").ids) == 3
+
+    db.add(UserFeedback(anomaly_field="pattern_match", user_action="accept"))
+    db.commit()
+    assert store.refresh(db)
+    assert store.feedback_acceptance() == 1.0
+
+
+def test_nearest_matches_brute_force(db):
+    store = PatternStore()
+    store.refresh(db)
+    points = np.random.default_rng(7).uniform([-0.1, -0.4], [0.8, 0.5], size=(200, 2))
+    hits = store.nearest_many("SaaS", points)
+    centroids = np.array([[growth, margin] for _, growth, margin in ARCHETYPES])
+    for point, hit in zip(points, hits):
+        expected = np.sqrt(((centroids - point) ** 2).sum(axis=1)).argmin()
+        assert hit.name == ARCHETYPES[expected][0]
+
+    assert store.nearest("Unknown", 0.1, 0.1) is None
+    assert not store.nearest("SaaS", 0.31, 0.12).is_outlier
+    assert store.nearest("SaaS", 0.30, 0.60).is_outlier  # 10 standard deviations from Efficient Growth
+
+
+def test_fold_in_matches_full_recompute():
+    rng = np.random.default_rng(3)
+    first, second = rng.normal(0.2, 0.05, size=(30, 2)), rng.normal(0.3, 0.08, size=(12, 2))
+    condition = {
+        "avg_growth": first[:, 0].mean(), "avg_margin": first[:, 1].mean(),
+        "growth_std": first[:, 0].std(), "margin_std": first[:, 1].std(), "sample_size": 30,
+    }
+    updated = fold_in(condition, second)
+    combined = np.vstack([first, second])
+    assert updated["sample_size"] == 42
+    assert updated["avg_growth"] == pytest.approx(combined[:, 0].mean(), abs=1e-4)
+    assert updated["margin_std"] == pytest.approx(combined[:, 1].std(), abs=1e-5)
+
+
+def test_train_incremental_folds_new_runs_once(db):
+    db.add(Company(ticker="ACME", name="Acme", sector="SaaS"))
+    start = datetime(2026, 1, 1)
+    for i in range(5):
+        projections = {"revenue_growth_start": 0.32, "ebitda_margin_start": 0.12}
+        db.add(ValuationRun(id=f"run-{i}", company_name="Acme", created_at=start + timedelta(minutes=i),
+                            input_data=json.dumps({"dcf_input": {"projections": projections}})))
+    db.add(ValuationRun(id="run-orphan", company_name="Nobody", created_at=start, input_data="{}"))
+    db.commit()
+
+    store = PatternStore()
+    with patch.object(store, "refresh") as refresh:
+        assert store.train_incremental(db, batch_size=2) == 5
+        refresh.assert_called_once_with(force=True)
+        assert store.train_incremental(db) == 0
+
+    state = db.get(PatternTrainingState, "cluster_archetypes")
+    assert (state.last_run_id, state.runs_seen) == ("run-4", 5)
+    efficient = json.loads(db.query(ValidationPattern).filter(
+        ValidationPattern.message_template.contains("Efficient Growth")).one().condition_json)
+    assert efficient["sample_size"] == 25
+    assert efficient["avg_growth"] == pytest.approx((0.30 * 20 + 0.32 * 5) / 25, abs=1e-4)
+
+
+def test_validation_reads_the_store_not_the_database(db):
+    store = PatternStore()
+    store.refresh(db)
+    service = AnomalyDetectionService()
+    with patch("backend.services.validation.anomaly_detection.pattern_store", store), \
+            patch("backend.database.models.ReadSessionLocal", side_effect=AssertionError("DB hit")):
+        assert service._get_db_benchmarks("SaaS") == {"revenue_growth": (0.25, 0.10)}
+        match = service._find_matching_pattern("SaaS", 0.29, 0.11)
+    assert match.matched_cluster == "Efficient Growth"
+    assert match.confidence == pytest.approx(1 - np.hypot(0.01, 0.01))
@@ -128,50 +128,50 @@ class TestMetricsAggregation:
     @patch('backend.utils.cache.cache.set_sync')
     @patch('backend.services.metrics.aggregator.alert_service')
     def test_aggregate_metrics(self, mock_alert, mock_cache_set, db_session):
-        """Test that aggregation task calculates stats and caches them."""
+        """Test that aggregation merges latency sketches and caches the summary."""
         from backend.services.metrics.aggregator import aggregate_metrics
-        
-        # Create mock system metrics
+        from backend.services.metrics.sketch import LatencyRecorder
+
+        recorder = LatencyRecorder()
+        last_minute = datetime.utcnow() - timedelta(minutes=1)
+        for i in range(100):
+            recorder.record_request("/test", 200, i * 10, ts=last_minute) # 0 to 990
+
+        with patch('backend.services.metrics.aggregator.latency_recorder', recorder):
+            aggregate_metrics()
+
+        # Verify cache set for system summary
+        assert mock_cache_set.call_count >= 1
+        call_args = mock_cache_set.call_args_list[0]
+        key, value = call_args[0][0], call_args[0][1]
+
+        assert key == "metrics:system_summary"
+        assert value['total_requests'] == 100
+        # Sketch quantiles are accurate to ~1% relative error
+        assert value['p95_response_time'] == pytest.approx(945.0, rel=0.02)
+        assert value['error_rate'] == 0.0
+        assert value['top_endpoints'][0]['endpoint'] == "/test"
+
+        # Closed buckets were persisted as compact rows
+        from backend.database.models import LatencySketchBucket
         db = SessionLocal()
         try:
-            for i in range(100):
-                metric = SystemMetric(
-                    endpoint="/test",
-                    method="GET",
-                    response_time_ms=i * 10, # 0 to 990
-                    status_code=200,
-                    timestamp=datetime.utcnow()
-                )
-                db.add(metric)
-            db.commit()
-            
-            # Run aggregation
-            aggregate_metrics()
-            
-            # Verify cache set for system summary
-            assert mock_cache_set.call_count >= 1
-            call_args = mock_cache_set.call_args_list[0]
-            key, value = call_args[0][0], call_args[0][1]
-            
-            assert key == "metrics:system_summary"
-            assert value['total_requests'] == 100
-            assert value['p95_response_time'] == 950.0
-            assert value['error_rate'] == 0.0
-            
-            # Verify alerts checked
-            mock_alert.check_system_metrics.assert_called_once()
-            
+            assert db.query(LatencySketchBucket).count() == 1
         finally:
             db.close()
 
+        # Verify alerts checked
+        mock_alert.check_system_metrics.assert_called_once()
+
     @patch('backend.utils.cache.cache.set_sync')
     def test_aggregate_valuation_metrics(self, mock_cache_set, db_session):
         """Test valuation metrics aggregation."""
         from backend.services.metrics.aggregator import aggregate_metrics
+        from backend.services.metrics.sketch import LatencyRecorder
         
         db = SessionLocal()
         try:
-            # Create mock valuation metrics
+            # Create mock valuation metrics (raw rows, no sketches yet)
             for i in range(10):
                 metric = ValuationMetric(
                     valuation_id=f"val_{i}",
@@ -188,7 +188,8 @@ class TestMetricsAggregation:
             db.commit()
             
             # Run aggregation
-            aggregate_metrics()
+            with patch('backend.services.metrics.aggregator.latency_recorder', LatencyRecorder()):
+                aggregate_metrics()
             
             # Verify cache set for valuation summary
             # Might be the second call if system metrics also ran, or first if only valuation
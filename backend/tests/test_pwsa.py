@@ -95,3 +95,103 @@ def test_pwsa_zero_probability():
     
     with pytest.raises(ValueError, match="Total probability cannot be zero"):
         engine.calculate_pwsa(request)
+
+
+def _family_inputs(n):
+    from backend.calculations.models import (
+        DCFInput, HistoricalFinancials, ProjectionAssumptions, GPCInput, ANAVInput, WorkingCapitalAssumptions
+    )
+    historical = HistoricalFinancials(
+        years=[2020, 2021, 2022], revenue=[100, 110, 120], ebitda=[20, 22, 24], ebit=[15, 17, 19],
+        net_income=[10, 12, 14], capex=[5, 6, 7], nwc=[10, 11, 12]
+    )
+    scenarios = []
+    for i in range(n):
+        projections = ProjectionAssumptions(
+            revenue_growth_start=-0.6 + 0.01 * i, revenue_growth_end=0.05,
+            ebitda_margin_start=-0.3 if i < 3 else 0.2, ebitda_margin_end=-0.3 if i < 3 else 0.25, tax_rate=0.25, discount_rate=0.10 + 0.0005 * i, terminal_growth_rate=0.03,
+            capex_percent_revenue=0.04 if i % 2 else None,
+            terminal_exit_multiple=8.0 if i % 5 == 0 else None,
+            working_capital=WorkingCapitalAssumptions() if i % 3 else None,
+        )
+        scenarios.append(ScenarioConfig(name=f"S{i}", probability=1 + i % 4, assumptions=ValuationInput(
+            company_name="Family",
+            dcf_input=DCFInput(historical=historical, projections=projections, shares_outstanding=1000, net_debt=50),
+            gpc_input=GPCInput(target_ticker="ACME", peer_tickers=["PEER"], metrics={"LTM Revenue": 120, "LTM EBITDA": 24}),
+            anav_input=ANAVInput(assets={"ppe": 400.0}, liabilities={"debt": 100.0}),
+        )))
+    return PWSARequest(scenarios=scenarios)
+
+
+def test_pwsa_family_matches_full_valuations():
+    from unittest.mock import patch
+    from backend.services.valuation.formulas.dcf import DCFCalculator
+    request = _family_inputs(100)
+
+    with patch("backend.calculations.core.GPCCalculator.calculate", return_value=150.0) as gpc, \
+            patch("backend.calculations.core.cache") as cache, \
+            patch("backend.calculations.core.metrics_writer"), \
+            patch.object(DCFCalculator, "_kernel", wraps=DCFCalculator._kernel) as kernel:
+        cache.get_sync.return_value = None
+        engine = ValuationEngine()
+        result = engine.calculate_pwsa(request)
+        # Peer work is done once for the whole family, and the DCFs in one kernel pass
+        assert gpc.call_count == 1
+        assert kernel.call_count == 1
+
+        full = [engine.calculate(s.assumptions)["enterprise_value"] for s in request.scenarios]
+        # Full valuations run it at least once per scenario (plus sensitivities)
+        assert kernel.call_count - 1 >= len(request.scenarios)
+
+    assert [r.value for r in result.scenario_results] == pytest.approx(full)
+    # Some scenarios have a negative DCF and fall back to the other methods
+    assert len(set(round(v, 6) for v in full[:3])) == 1
+
+    reference = PWSARequest(scenarios=[
+        ScenarioConfig(name=s.name, probability=s.probability, assumptions=ValuationInput(company_name=s.name))
+        for s in request.scenarios
+    ])
+    engine = ValuationEngine()
+    engine.calculate = MagicMock(side_effect=lambda a: {"enterprise_value": full[int(a.company_name[1:])]})
+    expected = engine.calculate_pwsa(reference)
+    assert result.probability_weighted_value == pytest.approx(expected.probability_weighted_value)
+    assert result.risk_metrics.dict() == pytest.approx(expected.risk_metrics.dict())
+
+
+def test_weighted_accumulator_streams_chunks():
+    import numpy as np
+    from backend.services.valuation.pwsa import WeightedAccumulator, weighted_quantile
+    rng = np.random.default_rng(0)
+    values, weights = rng.normal(100, 20, 5000), rng.uniform(0, 1, 5000)
+
+    accumulator = WeightedAccumulator()
+    for start in range(0, 5000, 300):
+        accumulator.update(values[start:start + 300], weights[start:start + 300])
+    mean = np.average(values, weights=weights)
+    assert accumulator.mean == pytest.approx(mean)
+    assert accumulator.variance == pytest.approx(np.average((values - mean) ** 2, weights=weights))
+    assert accumulator.max == values.max()
+    order = np.argsort(values)
+    cumulative = np.cumsum(weights[order]) / weights.sum()
+    assert weighted_quantile(values, weights, 0.05) == values[order][np.argmax(cumulative >= 0.05)]
+
+
+def test_degenerate_terminal_growth_is_one_validation_error():
+    from backend.calculations.models import DCFInput
+    from backend.services.valuation.formulas.dcf import DCFCalculator
+    dcf_input = DCFInput(
+        historical={"years": [2022, 2023], "revenue": [90.0, 100.0], "ebitda": [12, 15], "ebit": [9, 11],
+                    "net_income": [6, 7], "capex": [3, 4], "nwc": [2, 3]},
+        projections={"revenue_growth_start": 0.1, "revenue_growth_end": 0.04, "ebitda_margin_start": 0.2,
+                     "ebitda_margin_end": 0.22, "tax_rate": 0.25, "discount_rate": 0.03, "terminal_growth_rate": 0.03},
+        shares_outstanding=10, net_debt=0.0,
+    )
+    sound = dcf_input.projections.model_copy(update={"discount_rate": 0.1})
+    with pytest.raises(ValueError, match="terminal growth"):
+        DCFCalculator.calculate(dcf_input)
+    with pytest.raises(ValueError, match="terminal growth"):
+        DCFCalculator.calculate_batch(dcf_input.historical, [sound, dcf_input.projections])
+
+    # An exit multiple makes the terminal value defined again
+    with_multiple = dcf_input.projections.model_copy(update={"terminal_exit_multiple": 8.0})
+    assert DCFCalculator.calculate_batch(dcf_input.historical, [sound, with_multiple]).shape == (2,)
@@ -0,0 +1,121 @@
+"""
+Tests for vectorized option pricing and the real options batch APIs.
+"""
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from backend.calculations.real_options_models import OptionGridRequest, OptionSurfaceRequest, RealOptionsRequest
+from backend.services.real_options_service import RealOptionsService
+from backend.services.valuation.formulas.option_pricing import OptionPricer
+
+
+def test_black_scholes_reference_values_and_parity():
+    call = OptionPricer.black_scholes(100, 100, 1, 0.05, 0.2, False)
+    put = OptionPricer.black_scholes(100, 100, 1, 0.05, 0.2, True)
+    assert float(call["price"]) == pytest.approx(10.4506, abs=1e-4)
+    assert float(put["price"]) == pytest.approx(5.5735, abs=1e-4)
+    assert float(call["delta"] - put["delta"]) == pytest.approx(1.0)
+
+    # Put-call parity with value leakage, across a whole array at once
+    S = np.linspace(50, 150, 11)
+    c = OptionPricer.black_scholes(S, 90, 2, 0.03, 0.35, False, q=0.02)["price"]
+    p = OptionPricer.black_scholes(S, 90, 2, 0.03, 0.35, True, q=0.02)["price"]
+    np.testing.assert_allclose(c - p, S * np.exp(-0.02 * 2) - 90 * np.exp(-0.03 * 2))
+
+    # Expired options are worth intrinsic value with zero Greeks
+    expired = OptionPricer.black_scholes([120, 80], 100, 0, 0.05, 0.2, [False, True])
+    np.testing.assert_allclose(expired["price"], [20, 20])
+    assert not expired["gamma"].any()
+
+
+@pytest.mark.parametrize("is_put", [False, True])
+def test_greeks_match_finite_differences(is_put):
+    base = dict(S=120.0, K=100.0, T=1.5, r=0.04, sigma=0.3, is_put=is_put, q=0.01)
+    g = OptionPricer.black_scholes(**base)
+    price = lambda **kw: float(OptionPricer.black_scholes(**dict(base, **kw))["price"])
+    h = 1e-4
+    assert float(g["delta"]) == pytest.approx((price(S=120 + h) - price(S=120 - h)) / (2 * h), rel=1e-5)
+    assert float(g["vega"]) == pytest.approx((price(sigma=0.3 + h) - price(sigma=0.3 - h)) / (2 * h) / 100, rel=1e-5)
+    assert float(g["rho"]) == pytest.approx((price(r=0.04 + h) - price(r=0.04 - h)) / (2 * h) / 100, rel=1e-5)
+    assert float(g["theta"]) == pytest.approx(-(price(T=1.5 + h) - price(T=1.5 - h)) / (2 * h) / 365, rel=1e-5)
+
+
+def test_binomial_lattice():
+    european = OptionPricer.binomial(100, 100, 1, 0.05, 0.2, True, steps=800, american=False)
+    bs = OptionPricer.black_scholes(100, 100, 1, 0.05, 0.2, True)
+    for name in ("price", "delta", "gamma", "vega", "theta", "rho"):
+        assert float(european[name]) == pytest.approx(float(bs[name]), rel=2e-2, abs=1e-3)
+
+    # Early exercise is worth something for puts, and nothing for calls without leakage
+    american_put = float(OptionPricer.binomial(100, 100, 1, 0.05, 0.2, True, steps=500)["price"])
+    assert american_put == pytest.approx(6.0896, abs=5e-3)
+    american_call = OptionPricer.binomial(100, 100, 1, 0.05, 0.2, False, steps=500, greeks=False)["price"]
+    assert float(american_call) == pytest.approx(float(OptionPricer.black_scholes(100, 100, 1, 0.05, 0.2)["price"]), abs=1e-2)
+    leaky = OptionPricer.binomial(100, 100, 3, 0.05, 0.2, False, q=0.08, steps=300, greeks=False)["price"]
+    assert float(leaky) > float(OptionPricer.black_scholes(100, 100, 3, 0.05, 0.2, False, q=0.08)["price"]) + 0.1
+
+    with pytest.raises(ValueError):
+        OptionPricer.binomial(100, 100, 1, 0.05, 0.2, steps=1)
+
+
+def test_price_grid_and_surface():
+    service = RealOptionsService()
+    n = 5000
+    rng = np.random.default_rng(7)
+    request = OptionGridRequest(
+        asset_value=list(rng.uniform(50, 150, n)), strike_price=[100.0], time_to_expiration=list(rng.uniform(0.1, 5, n)),
+        risk_free_rate=[0.04], volatility=list(rng.uniform(0.1, 0.6, n)),
+        option_type=["expansion", "abandonment"] * (n // 2),
+    )
+    started = time.perf_counter()
+    grid = service.price_grid(request)
+    assert time.perf_counter() - started < 0.5
+    assert len(grid.price) == len(grid.rho) == n
+    assert grid.delta[0] > 0 > grid.delta[1]  # expansion is a call, abandonment a put
+
+    with pytest.raises(ValueError):
+        service.price_grid(OptionGridRequest(asset_value=[1, 2], strike_price=[1, 2, 3], time_to_expiration=[1],
+                                             risk_free_rate=[0.04], volatility=[0.3]))
+
+    surface = service.price_surface(OptionSurfaceRequest(asset_value=100, strike_price=110, volatility_steps=100, time_steps=100))
+    values = np.array(surface.values)
+    assert values.shape == (100, 100)
+    assert (np.diff(values, axis=0) > 0).all()  # more volatility, more option value
+    lattice = service.price_surface(OptionSurfaceRequest(
+        asset_value=100, strike_price=110, option_type="abandonment", volatility_steps=5, time_steps=5,
+        pricing_method="binomial", lattice_steps=50))
+    assert np.array(lattice.values).shape == (5, 5)
+
+
+def test_binomial_is_chunked_and_bounded(monkeypatch):
+    from backend.services.valuation.formulas import option_pricing
+    rng = np.random.default_rng(3)
+    S, T, sigma = rng.uniform(50, 150, 7), rng.uniform(0.1, 3, 7), rng.uniform(0.1, 0.6, 7)
+    whole = OptionPricer.binomial(S, 100, T, 0.04, sigma, steps=40)
+    monkeypatch.setattr(option_pricing, "LATTICE_NODES", 2 * 41)  # two options per chunk
+    chunked = OptionPricer.binomial(S, 100, T, 0.04, sigma, steps=40)
+    for name in whole:
+        np.testing.assert_allclose(chunked[name], whole[name])
+
+    service = RealOptionsService()
+    with pytest.raises(ValueError):
+        service.price_surface(OptionSurfaceRequest(asset_value=100, strike_price=110, volatility_steps=500,
+                                                   time_steps=500, pricing_method="binomial", lattice_steps=1000))
+    with pytest.raises(ValueError):  # pydantic rejects oversized lists before any pricing
+        OptionGridRequest(asset_value=[100.0] * 10001, strike_price=[100.0], time_to_expiration=[1.0],
+                          risk_free_rate=[0.04], volatility=[0.3])
+
+
+def test_single_option_uses_shared_pricer():
+    service = RealOptionsService()
+    request = RealOptionsRequest(asset_value=100, strike_price=100, time_to_expiration=1, risk_free_rate=0.05,
+                                 volatility=0.2, option_type="abandonment")
+    result = asyncio.run(service.calculate_option_value(request))
+    assert result.option_value == pytest.approx(5.5735, abs=1e-4)
+    assert result.greeks.delta == pytest.approx(-0.3632, abs=1e-4)
+
+    request.pricing_method = "binomial"
+    assert asyncio.run(service.calculate_option_value(request)).option_value > result.option_value
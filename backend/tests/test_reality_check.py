@@ -0,0 +1,118 @@
+"""
+Tests for the weekly reality check report and its per-week rollups.
+"""
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from backend.database.models import Base, Company, DecisionRecord, AcknowledgementRecord, RealityCheckWeek
+from backend.services.journal import reality_check
+from backend.services.journal.reality_check import generate_weekly_reality_check, generate_weekly_reports, regenerate_year
+
+MONDAY = datetime(2025, 3, 3)
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(reality_check, "REPORT_DIR", str(tmp_path / "weekly"))
+    engine = create_engine(f"sqlite:///{tmp_path / 'journal.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine, tables=[
+        Company.__table__, DecisionRecord.__table__, AcknowledgementRecord.__table__, RealityCheckWeek.__table__
+    ])
+    session = sessionmaker(bind=engine)()
+    session.add(Company(ticker="ACME", name="Acme", sector="Tech"))
+    session.commit()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _decision(db, n, created_at, severity="CRITICAL", confidence=0.9, outcome=None, ack_after_hours=None):
+    decision = DecisionRecord(
+        decision_id=f"dec-{n:04d}", company_id="ACME", signal="CASH_RUNWAY", severity=severity,
+        confidence=confidence, recommended_actions_json=json.dumps([f"Action {n}"]), created_at=created_at,
+        actual_outcome=outcome, outcome_recorded_at=created_at + timedelta(days=1) if outcome else None,
+    )
+    db.add(decision)
+    if ack_after_hours is not None:
+        signature = f"sig-{n:04d}"
+        db.add(AcknowledgementRecord(
+            decision_id=decision.decision_id, user_id="u1", user_role="CFO", action="ACKNOWLEDGED",
+            rationale=f"Reviewed decision {n} with the board", signature_hash=signature,
+            timestamp=created_at + timedelta(hours=ack_after_hours),
+        ))
+        decision.state = "resolved"
+        decision.acknowledgement_hash = signature
+    db.commit()
+    return decision
+
+
+def test_weekly_report_uses_constant_queries(db, tmp_path):
+    _decision(db, 1, MONDAY + timedelta(hours=1), ack_after_hours=5)
+    _decision(db, 2, MONDAY + timedelta(days=1), outcome="RECOVERED", ack_after_hours=2.5)
+    _decision(db, 3, MONDAY + timedelta(days=2), severity="HIGH", outcome="DEFAULT")
+    for n in range(4, 30):
+        _decision(db, n, MONDAY + timedelta(days=3, minutes=n), ack_after_hours=1)
+    _decision(db, 99, MONDAY + timedelta(days=8))  # next week
+
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    report = generate_weekly_reality_check(db, MONDAY, MONDAY + timedelta(days=6, hours=23, minutes=59))
+
+    assert len(statements) == 2  # one aggregate, one joined row stream
+    assert report["summary"] == {
+        "total_decisions": 29, "critical_decisions": 28, "acknowledged": 28, "with_outcomes": 2,
+        "tuning_required": 1, "avg_response_lag_hours": round((5 + 2.5 + 26 * 1) / 28, 1),
+    }
+    rows = {r["decision_id"]: r for r in report["decisions_table"]}
+    assert rows["dec-0001"]["response_lag_hours"] == 5.0
+    assert rows["dec-0001"]["recommended_action"] == "Action 1"
+    assert rows["dec-0002"]["tuning_required"] is True
+    assert rows["dec-0003"]["human_response"] == "PENDING"
+    assert rows["dec-0003"]["response_rationale"] == ""
+    assert (tmp_path / "weekly" / "2025-03-03_reality_check.md").exists()
+
+
+def test_batch_regenerates_only_changed_weeks(db, tmp_path):
+    report_dir = str(tmp_path / "batch")
+    _decision(db, 1, MONDAY)  # exactly on the week boundary
+    _decision(db, 2, MONDAY - timedelta(microseconds=1))  # previous week
+    _decision(db, 3, MONDAY + timedelta(weeks=2, days=3), ack_after_hours=4)
+
+    first = generate_weekly_reports(db, MONDAY - timedelta(weeks=1), weeks=4, report_dir=report_dir)
+    assert first["skipped"] == 0
+    weeks = {w.week_start: w for w in db.query(RealityCheckWeek)}
+    assert [weeks[MONDAY + timedelta(weeks=i)].total_decisions for i in range(-1, 3)] == [1, 1, 0, 1]
+    assert weeks[MONDAY + timedelta(weeks=2)].avg_response_lag_hours == pytest.approx(4.0)
+    with open(weeks[MONDAY].report_path) as f:
+        assert "dec-0001" in f.read()
+
+    again = generate_weekly_reports(db, MONDAY - timedelta(weeks=1), weeks=4, report_dir=report_dir)
+    assert again == {"weeks": 4, "regenerated": [], "skipped": 4}
+
+    # A late acknowledgement of an old decision only refreshes that decision's week
+    decision = db.query(DecisionRecord).filter_by(decision_id="dec-0001").one()
+    db.add(AcknowledgementRecord(decision_id="dec-0001", user_id="u2", user_role="GP", action="OVERRIDDEN",
+                                 rationale="late", signature_hash="late-sig", timestamp=MONDAY + timedelta(weeks=3)))
+    decision.state = "overridden"
+    decision.acknowledgement_hash = "late-sig"
+    db.commit()
+
+    third = generate_weekly_reports(db, MONDAY - timedelta(weeks=1), weeks=4, report_dir=report_dir)
+    assert third["regenerated"] == ["2025-03-03"]
+    db.expire_all()
+    assert db.get(RealityCheckWeek, MONDAY).acknowledged == 1
+
+
+def test_regenerate_year(db, tmp_path):
+    for n in range(60):
+        _decision(db, n, datetime(2025, 1, 6) + timedelta(days=6 * n), ack_after_hours=n % 5)
+
+    result = regenerate_year(db, 2025, report_dir=str(tmp_path / "year"))
+    assert result["weeks"] == 52
+    assert len(result["regenerated"]) == 52
+    assert sum(w.total_decisions for w in db.query(RealityCheckWeek)) == 60
+    assert len(list((tmp_path / "year").iterdir())) == 52
@@ -0,0 +1,109 @@
+"""
+Tests for the realtime WebSocket hub: backplane fan-out, topics and slow-consumer eviction.
+"""
+import asyncio
+
+from backend.services.realtime.realtime_service import WebSocketManager, InProcessBackplane, InProcessBus
+
+
+class FakeWebSocket:
+    def __init__(self, stall: bool = False):
+        self.sent = []
+        self.closed_with = None
+        self.stall = stall
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        if self.stall:
+            await asyncio.sleep(3600)
+        self.sent.append(text)
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+async def _drain():
+    await asyncio.sleep(0.01)
+
+
+def test_broadcast_reaches_clients_on_other_workers():
+    async def scenario():
+        bus = InProcessBus()
+        worker_a = WebSocketManager(backplane=InProcessBackplane(bus))
+        worker_b = WebSocketManager(backplane=InProcessBackplane(bus))
+        client_a, client_a2, client_b = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+        await worker_a.connect(client_a)
+        await worker_a.connect(client_a2)
+        await worker_b.connect(client_b)
+
+        await worker_a.broadcast({"type": "market_update", "data": [{"ticker": "AAPL"}]}, topic="AAPL")
+        await _drain()
+
+        assert len(client_a.sent) == 1 and len(client_b.sent) == 1
+        assert client_a.sent[0] == client_b.sent[0]
+        # Serialized once: clients of one worker share the identical string object
+        assert client_a.sent[0] is client_a2.sent[0]
+        await worker_a.stop()
+        await worker_b.stop()
+
+    asyncio.run(scenario())
+
+
+def test_topic_subscriptions_filter_messages():
+    async def scenario():
+        manager = WebSocketManager(backplane=InProcessBackplane())
+        follows_aapl, follows_all = FakeWebSocket(), FakeWebSocket()
+        await manager.connect(follows_aapl)
+        await manager.connect(follows_all)
+        manager.subscribe(follows_aapl, ["AAPL", "portfolio:7"])
+
+        await manager.broadcast({"type": "market_update", "ticker": "MSFT"}, topic="MSFT")
+        await manager.broadcast({"type": "market_update", "ticker": "AAPL"}, topic="AAPL")
+        await manager.broadcast({"type": "notice"})  # untopiced -> everyone
+        await _drain()
+
+        assert len(follows_aapl.sent) == 2
+        assert '"MSFT"' not in "".join(follows_aapl.sent)
+        assert len(follows_all.sent) == 3
+        await manager.stop()
+
+    asyncio.run(scenario())
+
+
+def test_slow_consumer_is_evicted_without_blocking_others():
+    async def scenario():
+        manager = WebSocketManager(backplane=InProcessBackplane(), max_queue=3)
+        slow, fast = FakeWebSocket(stall=True), FakeWebSocket()
+        await manager.connect(slow)
+        await manager.connect(fast)
+
+        for i in range(10):
+            await manager.broadcast({"type": "tick", "i": i})
+            await _drain()
+
+        assert len(fast.sent) == 10
+        assert slow not in manager.connections
+        assert manager.evicted_count == 1
+        assert slow.closed_with == 1013
+        await manager.stop()
+
+    asyncio.run(scenario())
+
+
+def test_stalled_send_is_evicted_after_timeout():
+    async def scenario():
+        manager = WebSocketManager(backplane=InProcessBackplane(), send_timeout=0.05)
+        slow = FakeWebSocket(stall=True)
+        await manager.connect(slow)
+
+        await manager.broadcast({"type": "tick"})
+        await asyncio.sleep(0.1)
+        await manager.broadcast({"type": "tick"})
+        await _drain()
+
+        assert slow not in manager.connections
+        await manager.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,96 @@
+"""
+Tests for board report rendering on the worker pool and its PDF cache.
+"""
+import json
+import uuid
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.database.models import Base, User, ValuationRun
+from backend.reports.charts import SmartChartGenerator
+from backend.services.analytics.render_pool import ReportRenderPool
+from backend.services.analytics.reporting_service import ReportingService, revenue_chart
+from backend.services.export.artifacts import ArtifactStore
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'runs.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine, tables=[User.__table__, ValuationRun.__table__])
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _runs(db, n):
+    ids = []
+    for i in range(n):
+        results = {
+            "enterprise_value": 1_000_000 + i, "equity_value": 900_000,
+            "dcf_details": {"revenue": [100 + i, 120, 150, 180, 220]},
+            "methods": {"DCF_FCFF": {"value": 1_000_000 + i, "weight": 1.0}},
+        }
+        run = ValuationRun(id=str(uuid.uuid4()), company_name=f"Co {i}", mode="manual", input_data="{}",
+                           results=json.dumps(results), created_at=datetime(2025, 1, 1 + i))
+        db.add(run)
+        ids.append(run.id)
+    db.commit()
+    return ids
+
+
+def test_board_report_is_vector_and_cached_per_revision(db, tmp_path):
+    run_id = _runs(db, 1)[0]
+    pool = ReportRenderPool(workers=0, store=ArtifactStore(root=str(tmp_path / "artifacts")))
+
+    path = pool.render_board_report(db, run_id)
+    with open(path, "rb") as fh:
+        pdf = fh.read()
+    assert pdf.startswith(b"%PDF")
+    assert b"/Subtype /Image" not in pdf  # chart embedded as paths, not a raster
+    assert pool.render_board_report(db, run_id) == path
+    assert (pool.store.hits, pool.store.misses) == (1, 1)
+
+    # Editing the run changes its revision, so the report is rendered again
+    run = db.get(ValuationRun, run_id)
+    run.results = json.dumps({"enterprise_value": 5})
+    db.commit()
+    assert pool.render_board_report(db, run_id) != path
+
+    # The legacy entry point renders the same document
+    assert ReportingService(db).generate_board_report(run_id).getvalue().startswith(b"%PDF")
+    with pytest.raises(ValueError):
+        pool.render_board_report(db, "missing")
+
+
+def test_board_pack_renders_on_worker_processes(db, tmp_path):
+    run_ids = _runs(db, 4)
+    pool = ReportRenderPool(workers=2, store=ArtifactStore(root=str(tmp_path / "artifacts")))
+    try:
+        pool.warm()
+        paths = pool.render_board_pack(db, run_ids + run_ids[:1])
+        assert list(paths) == run_ids
+        assert len(set(paths.values())) == 4
+        for path in paths.values():
+            with open(path, "rb") as fh:
+                assert fh.read(4) == b"%PDF"
+        assert pool.store.misses == 4
+
+        assert pool.render_board_pack(db, run_ids) == paths
+        assert pool.store.hits == 4
+    finally:
+        pool.shutdown()
+
+
+def test_chart_caches():
+    assert revenue_chart((1.0, 2.0, 3.0)) is revenue_chart((1.0, 2.0, 3.0))
+
+    generator = SmartChartGenerator()
+    data = {"x": [1, 2, 3], "y": [4.0, 5.0, 6.5]}
+    first = generator.generate_chart(data, "revenue_trend")
+    second = generator.generate_chart(dict(data), "revenue_trend")
+    assert first is not second and first.getvalue() == second.getvalue()
+    assert generator.generate_chart(data, "revenue_trend", fmt="svg").getvalue().lstrip().startswith(b"<?xml")
@@ -0,0 +1,103 @@
+"""
+Tests for batch scenario-family generation.
+"""
+from unittest.mock import patch
+
+import pytest
+
+from backend.calculations.models import (
+    DCFInput, HistoricalFinancials, ProjectionAssumptions, ValuationInput, WorkingCapitalAssumptions
+)
+from backend.services.scenario_generator import ScenarioGeneratorService, _get
+from backend.services.valuation.formulas.dcf import DCFCalculator
+
+
+@pytest.fixture
+def base_inputs():
+    historical = HistoricalFinancials(
+        years=[2020, 2021, 2022], revenue=[100, 110, 120], ebitda=[20, 22, 24], ebit=[15, 17, 19],
+        net_income=[10, 12, 14], capex=[5, 6, 7], nwc=[10, 11, 12]
+    )
+    projections = ProjectionAssumptions(
+        revenue_growth_start=0.1, revenue_growth_end=0.05, ebitda_margin_start=0.2, ebitda_margin_end=0.25,
+        tax_rate=0.25, discount_rate=0.10, terminal_growth_rate=0.03, working_capital=WorkingCapitalAssumptions()
+    )
+    return ValuationInput(
+        company_name="Test Co", year=2023, value=0,
+        dcf_input=DCFInput(historical=historical, projections=projections, shares_outstanding=1000, net_debt=50)
+    )
+
+
+def test_family_matches_single_scenarios(base_inputs):
+    service = ScenarioGeneratorService()
+    variants = [(name, intensity) for name in service.templates for intensity in (0.5, 1.0, 1.5, 6.0)]
+    deltas = service.generate_family(base_inputs, variants)
+    assert len(deltas) == len(variants)
+
+    for delta, (name, intensity) in zip(deltas, variants):
+        single = service.generate_scenario(base_inputs, name, intensity)
+        expected = ProjectionAssumptions(**single["generated_assumptions"]["dcf_input"]["projections"])
+        applied = service.apply_delta(base_inputs.dcf_input.projections, delta)
+        for field, value in expected.dict().items():
+            if field == "working_capital":
+                assert applied.working_capital.dict() == pytest.approx(value)
+            else:
+                assert getattr(applied, field) == pytest.approx(value)
+        assert set(change["field"] for change in single["changes"]) <= set(delta.changes)
+
+    # Extreme intensities are clamped like single scenarios
+    recession = deltas[variants.index(("recession", 6.0))]
+    assert recession.changes["revenue_growth_start"] == -0.5
+    assert recession.changes["capex_percent_revenue"] == 0.005
+
+    with pytest.raises(ValueError):
+        service.generate_family(base_inputs, [("alien_invasion", 1.0)])
+
+
+def test_deltas_share_unchanged_objects(base_inputs):
+    service = ScenarioGeneratorService()
+    base_projections = base_inputs.dcf_input.projections
+    cost_cutting, market_share = service.generate_family(base_inputs, [("cost_cutting", 1.0), ("market_share_gain", 1.0)])
+
+    # Cost cutting leaves working capital alone, so it isn't copied
+    assert "working_capital.dso" not in cost_cutting.changes
+    assert service.apply_delta(base_projections, cost_cutting).working_capital is base_projections.working_capital
+    # Market share gain builds a new one and leaves the base untouched
+    applied = service.apply_delta(base_projections, market_share)
+    assert applied.working_capital.dso == 55.0 and base_projections.working_capital.dso == 45.0
+
+    pwsa = service.to_pwsa_scenarios(base_inputs, [cost_cutting, market_share], [0.4, 0.6])
+    assert pwsa[0].assumptions.dcf_input.historical is base_inputs.dcf_input.historical
+    assert base_inputs.dcf_input.projections.ebitda_margin_start == 0.2
+    with pytest.raises(ValueError):
+        service.to_pwsa_scenarios(base_inputs, [cost_cutting], [0.4, 0.6])
+
+
+def test_engine_consumes_family(base_inputs):
+    service = ScenarioGeneratorService()
+    deltas = service.generate_family(base_inputs, [("blue_sky", 1.0), ("recession", 1.0)])
+    scenarios = service.to_scenario_inputs(base_inputs, deltas)
+    assert [s.scenario_name for s in scenarios] == ["Blue Sky / Upside (1x)", "Recession / Downside (1x)"]
+
+    values = []
+    for scenario in scenarios:
+        dcf_input = base_inputs.dcf_input.copy()
+        dcf_input.projections = scenario.projections
+        values.append(DCFCalculator.calculate(dcf_input)[0])
+    base_value = DCFCalculator.calculate(base_inputs.dcf_input)[0]
+    assert values[0] > base_value > values[1]
+
+
+def test_hundreds_of_variants_cost_a_handful(base_inputs):
+    service = ScenarioGeneratorService()
+    ladder = [(name, 0.01 * step) for name in service.templates for step in range(1, 101)]
+
+    # The base is read once per field and never copied, however many variants there are
+    reads = []
+    for variants in (ladder[:5], ladder):
+        with patch("backend.services.scenario_generator._get", wraps=_get) as get, \
+                patch("backend.services.scenario_generator.copy.deepcopy", side_effect=AssertionError):
+            deltas = service.generate_family(base_inputs, variants)
+        reads.append(get.call_count)
+    assert len(deltas) == 400
+    assert reads[0] == reads[1]
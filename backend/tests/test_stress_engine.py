@@ -0,0 +1,173 @@
+"""
+Tests for the vectorized portfolio stress engine.
+"""
+import json
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.calculations.models import DCFInput
+from backend.calculations.risk_models import StressScenario
+from backend.database.models import Base, User, ValuationRun
+from backend.services.risk.stress_engine import StressEngine, PortfolioState, _company_state
+from backend.services.risk.stress_test_service import StressTestService
+from backend.services.valuation.formulas.dcf import DCFCalculator
+
+
+def _dcf_input(i, working_capital=True, exit_multiple=None, capex=None):
+    return {
+        "historical": {
+            "years": [2021, 2022, 2023], "revenue": [80.0 + i, 90.0 + i, 100.0 + i], "ebitda": [10, 12, 15],
+            "ebit": [8, 9, 11], "net_income": [5, 6, 7], "capex": [3, 3, 4], "nwc": [2, 2, 3],
+        },
+        "projections": {
+            "revenue_growth_start": 0.12 + i * 0.001, "revenue_growth_end": 0.04, "ebitda_margin_start": 0.18,
+            "ebitda_margin_end": 0.24, "tax_rate": 0.25, "discount_rate": 0.10 + (i % 5) * 0.005,
+            "terminal_growth_rate": 0.025, "terminal_exit_multiple": exit_multiple, "capex_percent_revenue": capex,
+            "working_capital": {"dso": 45, "dio": 60, "dpo": 30} if working_capital else None,
+        },
+        "shares_outstanding": 10, "net_debt": 5.0,
+    }
+
+
+def _run(i, **dcf_kwargs):
+    dcf = _dcf_input(i, **dcf_kwargs)
+    dcf_value = DCFCalculator.calculate(DCFInput(**dcf))[0]
+    inputs = {"company_name": f"Co {i}", "dcf_input": dcf}
+    results = {"methods": {
+        "DCF_FCFF": {"value": dcf_value, "weight": 0.4},
+        "GPC": {"value": 300.0 + i, "weight": 0.3},
+        "Precedent_Transactions": {"value": 250.0, "weight": 0.3},
+        "LBO": {"value": 200.0, "weight": 0.0},
+    }}
+    return inputs, results
+
+
+def _shocked(dcf, shocks):
+    proj = dict(dcf["projections"])
+    proj["discount_rate"] += shocks.get("discount_rate", 0.0)
+    proj["revenue_growth_start"] += shocks.get("revenue_growth", 0.0)
+    proj["revenue_growth_end"] += shocks.get("revenue_growth", 0.0)
+    proj["ebitda_margin_start"] += shocks.get("ebitda_margin", 0.0)
+    proj["ebitda_margin_end"] += shocks.get("ebitda_margin", 0.0)
+    if proj["terminal_exit_multiple"]:
+        proj["terminal_exit_multiple"] *= 1 + shocks.get("terminal_multiple", 0.0)
+    return DCFInput(**dict(dcf, projections=proj))
+
+
+@pytest.mark.parametrize("dcf_kwargs", [
+    {}, {"working_capital": False}, {"exit_multiple": 9.0}, {"capex": 0.05, "working_capital": False},
+])
+def test_matches_scalar_valuation(dcf_kwargs):
+    runs = [_run(i, **dcf_kwargs) for i in range(4)]
+    state = PortfolioState([str(i) for i in range(4)], [f"Co {i}" for i in range(4)], [_company_state(*r) for r in runs])
+    shocks = {"discount_rate": 0.02, "revenue_growth": -0.05, "ebitda_margin": -0.03,
+              "terminal_multiple": -0.2, "public_comp_multiple": -0.3}
+
+    outcome = StressEngine().stress(state, [shocks])[0]
+
+    for i, (inputs, results) in enumerate(runs):
+        dcf = DCFCalculator.calculate(_shocked(inputs["dcf_input"], shocks))[0]
+        expected = (dcf * 0.4 + (300.0 + i) * 0.7 * 0.3 + 250.0 * 0.7 * 0.3) / 1.0
+        assert outcome["stressed_value"][i] == pytest.approx(expected, rel=1e-9)
+        base = (results["methods"]["DCF_FCFF"]["value"] * 0.4 + (300.0 + i) * 0.3 + 250.0 * 0.3)
+        assert state.base_value[i] == pytest.approx(base, rel=1e-9)
+
+
+def test_attribution_adds_up_to_total_change():
+    state = PortfolioState(["a", "b"], ["A", "B"], [_company_state(*_run(i)) for i in range(2)])
+    shocks = {"discount_rate": 0.03, "public_comp_multiple": -0.3}
+    outcome = StressEngine().stress(state, [shocks])[0]
+
+    attribution = outcome["attribution"]
+    assert set(attribution) == {"discount_rate", "public_comp_multiple", "interaction"}
+    assert (attribution["discount_rate"] < 0).all()
+    total = sum(attribution.values())
+    np.testing.assert_allclose(total, outcome["stressed_value"] - state.base_value)
+
+
+def test_changes_are_anchored_to_the_stored_ev():
+    inputs, results = _run(0)
+    model = PortfolioState(["a"], ["A"], [_company_state(inputs, results)])
+    anchored = PortfolioState(["a"], ["A"], [_company_state(inputs, dict(results, enterprise_value=400.0))])
+    shocks = {"discount_rate": 0.02, "public_comp_multiple": -0.1}
+
+    plain, outcome = StressEngine().stress(model, [shocks])[0], StressEngine().stress(anchored, [shocks])[0]
+    assert anchored.base_value[0] == 400.0
+    assert anchored.model_gap[0] == pytest.approx(model.base_value[0] - 400.0)
+    assert outcome["stressed_value"][0] - 400.0 == pytest.approx(plain["stressed_value"][0] - model.base_value[0])
+    np.testing.assert_allclose(sum(outcome["attribution"].values()), outcome["stressed_value"] - 400.0)
+
+
+def test_non_positive_dcf_drops_out_of_blend():
+    state = PortfolioState(["a"], ["A"], [_company_state(*_run(0))])
+    # WACC below terminal growth makes the DCF meaningless; the multiples legs carry the value
+    outcome = StressEngine().stress(state, [{"discount_rate": -0.2}])[0]
+    assert outcome["stressed_value"][0] == pytest.approx((300.0 + 250.0) / 2)
+
+
+def test_unknown_shock_rejected():
+    state = PortfolioState(["a"], ["A"], [_company_state(*_run(0))])
+    with pytest.raises(ValueError):
+        StressEngine().stress(state, [{"interest_rates": 0.01}])
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'stress.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine, tables=[User.__table__, ValuationRun.__table__])
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _store(db, i, created_at, **dcf_kwargs):
+    inputs, results = _run(i, **dcf_kwargs)
+    run = ValuationRun(id=str(uuid.uuid4()), company_name=f"Co {i}", mode="manual",
+                       input_data=json.dumps(inputs), results=json.dumps(results), created_at=created_at)
+    db.add(run)
+    db.commit()
+    return run
+
+
+def test_service_uses_latest_run_and_caches_base_state(db, monkeypatch):
+    engine = StressEngine()
+    monkeypatch.setattr("backend.services.risk.stress_test_service.stress_engine", engine)
+    now = datetime.utcnow()
+    _store(db, 1, now - timedelta(days=1))
+    latest = _store(db, 1, now, exit_multiple=8.0)
+    _store(db, 2, now)
+
+    response = StressTestService(db).run_stress_test("Funding Winter")
+    assert [r.valuation_id for r in response.company_results if r.company_name == "Co 1"] == [latest.id]
+    assert len(response.company_results) == 2
+    assert response.total_stressed_value < response.total_base_value
+    assert "discount_rate" in response.company_results[0].attribution
+
+    state = engine._state
+    StressTestService(db).run_stress_grid([StressScenario(name="s", description="", shocks={"tax_rate": 0.05})])
+    assert engine._state is state  # unchanged runs reuse the cached arrays
+
+    latest.results = json.dumps(dict(json.loads(latest.results), note="edited"))
+    db.commit()
+    engine.base_state(db)
+    assert engine._state is not state
+
+
+def test_large_grid_is_interactive():
+    runs = [_company_state(*_run(i, exit_multiple=8.0 if i % 2 else None)) for i in range(500)]
+    state = PortfolioState([str(i) for i in range(500)], [f"Co {i}" for i in range(500)], runs)
+    grid = [{"discount_rate": d, "revenue_growth": g, "public_comp_multiple": -0.1}
+            for d in (0.0, 0.01, 0.02, 0.03, 0.04) for g in (0.0, -0.02, -0.05, -0.1)]
+
+    started = time.perf_counter()
+    outcomes = StressEngine().stress(state, grid)
+    assert time.perf_counter() - started < 5
+    assert len(outcomes) == 20
+    assert outcomes[-1]["stressed_value"].shape == (500,)
@@ -0,0 +1,141 @@
+"""
+Tests for vectorized beta/WACC estimation and the locally cached components.
+"""
+import time
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.calculations.models import HistoricalFinancials
+from backend.database.models import Base, SecurityPrice, WaccComponent
+from backend.services.wacc.estimation import (
+    WaccEstimationService, blume_adjust, book_debt_to_equity, ols_betas, relever, returns_matrix, unlever
+)
+from backend.services.wacc.service import WaccCalculatorService
+
+WEEKS = 157
+START = datetime(2021, 1, 1)
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'wacc.db'}")
+    Base.metadata.create_all(bind=engine, tables=[SecurityPrice.__table__, WaccComponent.__table__])
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _prices(betas, rng, noise=0.002):
+    market = rng.normal(0.002, 0.02, WEEKS - 1)
+    dates = [START + timedelta(weeks=k) for k in range(WEEKS)]
+
+    def series(returns):
+        return dict(zip(dates, 100 * np.concatenate([[1.0], np.cumprod(1 + returns)])))
+
+    prices = {"SPY": series(market)}
+    for i, beta in enumerate(betas):
+        prices[f"T{i:03d}"] = series(beta * market + rng.normal(0, noise, WEEKS - 1))
+    return prices
+
+
+def test_ols_betas_match_polyfit():
+    rng = np.random.default_rng(1)
+    market = rng.normal(0, 0.02, 104)
+    returns = market[:, None] * np.array([0.5, 1.0, 1.8]) + rng.normal(0, 0.01, (104, 3))
+    returns[[10, 50, 51, 90], 1] = np.nan  # missing weeks for one ticker
+
+    betas, observations = ols_betas(returns, market)
+    for j in range(3):
+        ok = np.isfinite(returns[:, j])
+        assert betas[j] == pytest.approx(np.polyfit(market[ok], returns[ok, j], 1)[0])
+        assert observations[j] == ok.sum()
+    assert np.isnan(ols_betas(returns[:20], market[:20])[0]).all()  # fewer than 26 observations
+
+    assert blume_adjust(np.array([1.5]))[0] == pytest.approx(1.3333333)
+    asset = unlever(np.array([1.2]), np.array([0.5]), np.array([0.25]))
+    assert relever(asset, np.array([0.5]), np.array([0.25]))[0] == pytest.approx(1.2)
+
+
+def test_refresh_500_tickers_in_one_pass(db):
+    rng = np.random.default_rng(7)
+    true_betas = rng.uniform(0.4, 2.0, 500)
+    service = WaccEstimationService()
+    service.ingest_prices(db, _prices(true_betas, rng))
+    tickers = [f"T{i:03d}" for i in range(500)]
+
+    started = time.perf_counter()
+    components = service.refresh(db, tickers, capital_structure={"T000": 1.0}, tax_rates={"T000": 0.25},
+                                 target_debt_to_equity={"T001": 0.0}, risk_free_rate=0.04)
+    assert time.perf_counter() - started < 2.0
+
+    by_ticker = {c.ticker: c for c in components}
+    raw = np.array([by_ticker[t].raw_beta for t in tickers])
+    np.testing.assert_allclose(raw, true_betas, atol=0.05)
+    assert by_ticker["T005"].observations == 104
+
+    # Only the trailing window of prices is read
+    with patch("backend.services.wacc.estimation.returns_matrix", wraps=returns_matrix) as loader:
+        service.refresh(db, ["T005"], risk_free_rate=0.04)
+    assert loader.call_args.kwargs["start"] == START + timedelta(weeks=WEEKS - 1 - 105)
+
+    t0 = by_ticker["T000"]
+    assert t0.adjusted_beta == pytest.approx(blume_adjust(t0.raw_beta))
+    assert t0.unlevered_beta == pytest.approx(t0.adjusted_beta / 1.75)
+    assert t0.equity_weight == pytest.approx(0.5)
+    assert t0.wacc == pytest.approx(0.5 * (0.04 + t0.relevered_beta * 0.055) + 0.5 * 0.06 * 0.75)
+    # Relevered at an all-equity target
+    t1 = by_ticker["T001"]
+    assert t1.relevered_beta == pytest.approx(t1.unlevered_beta) and t1.debt_weight == pytest.approx(0.0)
+    # Unknown capital structures use the 60/40 default
+    assert by_ticker["T002"].equity_weight == pytest.approx(0.6)
+
+    # Re-running for the same date replaces rows and keeps the last capital structure
+    service.refresh(db, ["T000"], risk_free_rate=0.04)
+    assert db.query(WaccComponent).filter(WaccComponent.ticker == "T000").count() == 1
+    assert service.latest(db, ["T000"])["T000"].debt_to_equity == 1.0
+
+
+def test_market_data_served_from_components(db):
+    rng = np.random.default_rng(3)
+    prices = _prices([1.2], rng)
+    prices["T001"] = dict(list(prices["T000"].items())[-10:])  # too short to regress
+    service = WaccEstimationService()
+    service.ingest_prices(db, prices)
+    service.refresh(db, ["T000", "T001"], risk_free_rate=0.04)
+
+    short = service.latest(db, ["T001"])["T001"]
+    assert short.raw_beta is None and short.adjusted_beta == 1.0
+
+    wacc_service = WaccCalculatorService()
+    as_of = short.as_of + timedelta(days=3)
+    with patch.object(WaccCalculatorService, "fetch_market_data", side_effect=AssertionError):
+        data = wacc_service.get_market_data("t000", db=db, as_of=as_of)
+        assert data.wacc == service.latest(db, ["T000"])["T000"].wacc
+        assert set(wacc_service.get_cached_market_data(["T000", "T001", "NOPE"], db, as_of=as_of)) == {"T000", "T001"}
+
+    # Stale components are not served; the provider is asked instead
+    later = short.as_of + wacc_service.max_component_age + timedelta(days=1)
+    assert wacc_service.get_cached_market_data(["T000"], db, as_of=later) == {}
+    with patch.object(WaccCalculatorService, "fetch_market_data", return_value="fresh") as fetch:
+        assert wacc_service.get_market_data("T000", db=db, as_of=later) == "fresh"
+    fetch.assert_called_once_with("T000")
+
+
+def test_capital_structure_from_latest_balance_sheet():
+    financials = HistoricalFinancials(
+        years=[2024, 2023], revenue=[1, 1], ebitda=[1, 1], ebit=[1, 1], net_income=[1, 1], capex=[1, 1], nwc=[1, 1],
+        total_debt=[300.0, 100.0], total_equity=[600.0, 500.0],
+    )
+    assert book_debt_to_equity(financials) == pytest.approx(0.5)
+    assert book_debt_to_equity(financials.model_copy(update={"total_equity": [-50.0, 500.0]})) == pytest.approx(0.2)
+
+    provider = MagicMock()
+    provider.get_financials.side_effect = lambda t: financials if t == "AAA" else financials.model_copy(update={"total_debt": None})
+    with patch("backend.services.financial_data.factory.FinancialDataFactory.get_provider", return_value=provider):
+        assert WaccEstimationService().capital_structure_from_provider(["aaa", "BBB", "SPY"]) == {"AAA": 0.5}
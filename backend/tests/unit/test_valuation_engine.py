@@ -54,9 +54,9 @@ def mock_valuation_input():
 @patch('backend.calculations.core.VCMethodCalculator')
 @patch('backend.calculations.core.AssumptionValidator')
 @patch('backend.calculations.core.cache')
-@patch('backend.calculations.core.SessionLocal')
+@patch('backend.calculations.core.metrics_writer')
 def test_calculate_runs_all_methods(
-    mock_session, mock_cache, mock_validator, 
+    mock_writer, mock_cache, mock_validator, 
     mock_vc, mock_anav, mock_lbo, mock_pt, mock_fcfe, mock_gpc, mock_dcf,
     mock_valuation_input
 ):
@@ -84,10 +84,14 @@ def test_calculate_runs_all_methods(
         mock_dcf.calculate.assert_called_once()
         mock_sens.assert_called_once()
 
+        # Metric queued for the shared writer rather than written inline
+        mock_writer.submit.assert_called_once()
+        assert mock_writer.submit.call_args[0][1]["cache_hit"] is False
+
 @patch('backend.calculations.core.DCFCalculator')
 @patch('backend.calculations.core.cache')
-@patch('backend.calculations.core.SessionLocal')
-def test_calculate_uses_cache(mock_session, mock_cache, mock_dcf, mock_valuation_input):
+@patch('backend.calculations.core.metrics_writer')
+def test_calculate_uses_cache(mock_writer, mock_cache, mock_dcf, mock_valuation_input):
     # Setup cache hit
     cached_result = {"enterprise_value": 5000}
     mock_cache.get_sync.return_value = cached_result
@@ -98,6 +102,7 @@ def test_calculate_uses_cache(mock_session, mock_cache, mock_dcf, mock_valuation
     assert result == cached_result
     # Verify DCF was NOT called
     mock_dcf.calculate.assert_not_called()
+    assert mock_writer.submit.call_args[0][1]["cache_hit"] is True
 
 def test_generate_cache_key(mock_valuation_input):
     engine = ValuationEngine(workbook_data=None, mappings=None)
@@ -130,7 +130,7 @@ class TestSuccessMetrics:
         
         # Mock cache and DB to avoid external dependencies
         with patch("backend.calculations.core.cache") as mock_cache:
-            with patch("backend.calculations.core.SessionLocal"):
+            with patch("backend.calculations.core.metrics_writer"):
                 mock_cache.get_sync.return_value = None  # Force calculation
                 
                 engine = ValuationEngine()
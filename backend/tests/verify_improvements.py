@@ -9,12 +9,12 @@ from sqlalchemy import text
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
 from backend.database.models import SessionLocal, SystemMetric, ValuationMetric, init_db
-from backend.middleware.metrics import metrics_buffer
+from backend.services.metrics.writer import metrics_writer
 from backend.services.alerting.service import alert_service, ConsoleChannel
 from backend.database.views import create_views
 
 def test_metrics_buffer():
-    print("\n🧪 Testing MetricsBuffer...")
+    print("\n🧪 Testing MetricsWriter...")
     
     # Clear existing metrics
     db = SessionLocal()
@@ -22,9 +22,9 @@ def test_metrics_buffer():
     db.commit()
     
     # Add metrics
-    print("   Adding 5 metrics to buffer...")
+    print("   Adding 5 metrics to writer queue...")
     for i in range(5):
-        metrics_buffer.add({
+        metrics_writer.submit(SystemMetric, {
             'endpoint': '/test',
             'method': 'GET',
             'response_time_ms': 100,
@@ -37,19 +37,16 @@ def test_metrics_buffer():
     
     # Force flush
     print("   Forcing flush...")
-    metrics_buffer._flush()
-    
-    # Wait for background thread
-    time.sleep(1)
+    metrics_writer.flush()
     
     # Verify
     count = db.query(SystemMetric).count()
     print(f"   Metrics in DB: {count}")
     
     if count == 5:
-        print("✅ MetricsBuffer works!")
+        print("✅ MetricsWriter works!")
     else:
-        print(f"❌ MetricsBuffer failed! Expected 5, got {count}")
+        print(f"❌ MetricsWriter failed! Expected 5, got {count}")
     db.close()
 
 def test_alerting():
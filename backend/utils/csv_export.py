@@ -0,0 +1,48 @@
+import csv
+import io
+import json
+from typing import Any, Dict, Iterator, Tuple
+
+# Bump when the CSV layout changes so cached exports are re-rendered
+TEMPLATE_VERSION = "1"
+
+
+def flatten_dict(d: Dict[str, Any], parent_key: str = '', sep: str = '.') -> Iterator[Tuple[str, Any]]:
+    """Yield (dotted.key, value) pairs; lists are emitted as JSON."""
+    for k, v in d.items():
+        new_key = f"{parent_key}{sep}{k}" if parent_key else k
+        if isinstance(v, dict):
+            yield from flatten_dict(v, new_key, sep=sep)
+        elif isinstance(v, list):
+            yield new_key, json.dumps(v)
+        else:
+            yield new_key, v
+
+
+def iter_valuation_csv(inputs: Dict[str, Any], results: Dict[str, Any], chunk_rows: int = 500) -> Iterator[bytes]:
+    """
+    Stream the Section/Key/Value CSV for a valuation in encoded chunks of
+    `chunk_rows` rows, so the full file is never held in memory.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["Section", "Key", "Value"])
+    pending = 1
+
+    def rows():
+        for k, v in flatten_dict(inputs, parent_key="Input"):
+            yield ["Input", k, v]
+        for k, v in flatten_dict(results, parent_key="Output"):
+            yield ["Output", k, v]
+
+    for row in rows():
+        writer.writerow(row)
+        pending += 1
+        if pending >= chunk_rows:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+
+    if pending:
+        yield buffer.getvalue().encode()
@@ -10,6 +10,7 @@ interface SystemSummary {
     error_rate: number;
     active_users: number;
     avg_actions_per_user: number;
+    active_users_sampled?: boolean; // Partly counted from sampled request rows
     top_endpoints: any[];
     timestamp: string;
 }
@@ -173,7 +174,7 @@ export const PerformanceDashboard: React.FC = () => {
                     </h3>
                     <div className="grid grid-cols-2 gap-4">
                         <div className="bg-blue-50 p-4 rounded-lg">
-                            <p className="text-sm text-gray-600 mb-1">Active Users (24h)</p>
+                            <p className="text-sm text-gray-600 mb-1">Active Users (24h){systemMetrics?.active_users_sampled ? ' (sampled)' : ''}</p>
                             <p className="text-2xl font-bold text-blue-700">{systemMetrics?.active_users || 0}</p>
                         </div>
                         <div className="bg-indigo-50 p-4 rounded-lg">
@@ -179,7 +179,7 @@ export const FundSimulator: React.FC = () => {
                                 <div className="bg-white dark:bg-white/5 p-4 rounded-xl shadow-sm border border-gray-100 dark:border-white/10 print:border-gray-300">
                                     <div className="text-sm text-gray-500 dark:text-gray-400 mb-1">Net IRR</div>
                                     <div className="text-2xl font-bold text-system-blue dark:text-blue-400">
-                                        {formatPercent(results.net_irr)}
+                                        {results.net_irr == null ? 'n/a' : formatPercent(results.net_irr)}
                                     </div>
                                 </div>
                                 <div className="bg-white dark:bg-white/5 p-4 rounded-xl shadow-sm border border-gray-100 dark:border-white/10 print:border-gray-300">